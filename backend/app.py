@@ -19,6 +19,9 @@ from routes.upload import upload_bp
 from routes.data import data_bp
 from routes.business import business_bp
 from routes.product_tags import product_tags_bp
+from routes.pipeline import pipeline_bp
+from commands import register_commands
+from services.projection import compress_response
 
 def create_app(config_name=None):
     """创建Flask应用工厂函数"""
@@ -40,7 +43,8 @@ def create_app(config_name=None):
         r"/api/*": {
             "origins": app.config['CORS_ORIGINS'],
             "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-            "allow_headers": ["Content-Type", "Authorization", "Accept"],
+            "allow_headers": ["Content-Type", "Authorization", "Accept", "If-None-Match"],
+            "expose_headers": ["ETag"],
             "supports_credentials": True
         }
     })
@@ -54,6 +58,13 @@ def create_app(config_name=None):
     app.register_blueprint(data_bp, url_prefix='/api')
     app.register_blueprint(business_bp, url_prefix='/api')
     app.register_blueprint(product_tags_bp, url_prefix='/api')
+    app.register_blueprint(pipeline_bp, url_prefix='/api')
+    
+    # 大JSON响应按客户端的 Accept-Encoding 压缩
+    app.after_request(compress_response)
+    
+    # 注册CLI命令
+    register_commands(app)
     
     # 健康检查端点
     @app.route('/health', methods=['GET'])
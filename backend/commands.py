@@ -0,0 +1,77 @@
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from services.backfill import BackfillRunner
+from services.product_activity import rebuild_product_activities
+from services.internal_order_summary import refresh_for_upload_dates
+
+
+@click.command('backfill')
+@click.option('--start-date', required=True, type=click.DateTime(formats=['%Y-%m-%d']), help='开始日期 YYYY-MM-DD')
+@click.option('--end-date', required=True, type=click.DateTime(formats=['%Y-%m-%d']), help='结束日期 YYYY-MM-DD')
+@click.option('--steps', default='', help='逗号分隔的计算步骤，默认执行完整链路')
+@click.option('--job-name', default=None, help='作业名称，相同名称的作业共享检查点（默认按日期区间生成）')
+@click.option('--restart', is_flag=True, help='清除作业检查点，从头开始回填')
+@click.option('--max-db-load', type=float, default=None, help='数据库占用比例上限 (0, 1]，默认读取BACKFILL_MAX_DB_LOAD')
+@with_appcontext
+def backfill_command(start_date, end_date, steps, job_name, restart, max_db_load):
+    """按日期区间回填完整计算链路（集合式计算，支持断点续跑）
+
+    示例: flask --app app backfill --start-date 2025-01-01 --end-date 2025-03-31
+    """
+    start_date = start_date.date()
+    end_date = end_date.date()
+    if start_date > end_date:
+        raise click.BadParameter('开始日期不能晚于结束日期', param_hint='--start-date')
+
+    step_names = [name.strip() for name in steps.split(',') if name.strip()] or None
+    if max_db_load is None:
+        max_db_load = current_app.config.get('BACKFILL_MAX_DB_LOAD', 1.0)
+    job_name = job_name or f'backfill_{start_date}_{end_date}'
+
+    try:
+        runner = BackfillRunner(job_name, step_names, max_db_load=max_db_load, echo=click.echo)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+    if restart:
+        click.echo(f'已清除作业 {job_name} 的 {runner.reset()} 个检查点')
+
+    try:
+        runner.run(start_date, end_date)
+    except Exception as e:
+        raise click.ClickException(f'回填中断: {e}')
+
+
+@click.command('rebuild-product-activities')
+@with_appcontext
+def rebuild_product_activities_command():
+    """从产品总表的action_list全量重建产品活动日历
+
+    示例: flask --app app rebuild-product-activities
+    """
+    click.echo(f'产品活动日历已重建，共 {rebuild_product_activities()} 个活动')
+
+
+@click.command('rebuild-internal-order-summary')
+@click.option('--start-date', required=True, type=click.DateTime(formats=['%Y-%m-%d']), help='上传开始日期 YYYY-MM-DD')
+@click.option('--end-date', required=True, type=click.DateTime(formats=['%Y-%m-%d']), help='上传结束日期 YYYY-MM-DD')
+@with_appcontext
+def rebuild_internal_order_summary_command(start_date, end_date):
+    """按上传日期区间重建内部订单汇总表
+
+    示例: flask --app app rebuild-internal-order-summary --start-date 2025-01-01 --end-date 2025-03-31
+    """
+    start_date = start_date.date()
+    end_date = end_date.date()
+    if start_date > end_date:
+        raise click.BadParameter('开始日期不能晚于结束日期', param_hint='--start-date')
+
+    click.echo(f'内部订单汇总已重建，共 {refresh_for_upload_dates(start_date, end_date)} 个订单')
+
+
+def register_commands(app):
+    """注册Flask CLI命令"""
+    app.cli.add_command(backfill_command)
+    app.cli.add_command(rebuild_product_activities_command)
+    app.cli.add_command(rebuild_internal_order_summary_command)
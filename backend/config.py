@@ -41,6 +41,60 @@ class Config:
     # 订单详情处理配置
     ENABLE_SUPPLIER_FILTER = True  # 是否启用供应商过滤（只处理包含"供应商"的店铺）
     
+    # 流水线编排配置
+    PIPELINE_AUTO_RUN = os.environ.get('PIPELINE_AUTO_RUN', 'true').lower() == 'true'  # 上传后是否自动增量重算
+    PIPELINE_DEBOUNCE_SECONDS = int(os.environ.get('PIPELINE_DEBOUNCE_SECONDS', 30))  # 防抖窗口内的多次上传合并为一次运行
+    PIPELINE_MAX_WAIT_SECONDS = int(os.environ.get('PIPELINE_MAX_WAIT_SECONDS', 300))  # 持续上传时自第一次上传起最长推迟时间
+    PIPELINE_LOOKBACK_DAYS = 62  # 自动运行时检查的历史天数
+    
+    # 区间计算分区并发配置（每个工作线程占用一个数据库连接，需小于连接池大小）
+    RANGE_EXECUTOR_WORKERS = int(os.environ.get('RANGE_EXECUTOR_WORKERS', 4))
+    RANGE_EXECUTOR_MAX_RETRIES = 3  # 单个日期分区遇到可重试数据库错误时的最大尝试次数
+    
+    # 历史回填配置（flask backfill）
+    BACKFILL_MAX_DB_LOAD = float(os.environ.get('BACKFILL_MAX_DB_LOAD', 0.5))  # 回填占用数据库时间的比例上限
+    
+    # 产品总表变更回填配置（操作人/类目等修改后增量更新merge表）
+    PRODUCT_LIST_SYNC_DELAY_SECONDS = float(os.environ.get('PRODUCT_LIST_SYNC_DELAY_SECONDS', 2))  # 合并短时间内的多次修改
+    PRODUCT_LIST_SYNC_MAX_WAIT_SECONDS = float(os.environ.get('PRODUCT_LIST_SYNC_MAX_WAIT_SECONDS', 30))  # 持续修改时最长推迟时间
+    PRODUCT_LIST_SYNC_BATCH_SIZE = 500  # 每批回填的匹配键数量
+    
+    # 上传合并调度配置
+    MERGE_DEBOUNCE_SECONDS = float(os.environ.get('MERGE_DEBOUNCE_SECONDS', 3))  # 同一天多个门店上传合并为一次合并
+    MERGE_MAX_WAIT_SECONDS = float(os.environ.get('MERGE_MAX_WAIT_SECONDS', 30))  # 持续上传时自第一次上传起最长推迟时间
+    PARTITION_LOCK_TIMEOUT_SECONDS = int(os.environ.get('PARTITION_LOCK_TIMEOUT_SECONDS', 300))  # 等待分区锁的最长时间
+    
+    # 影子分区模式：合并重算先写入影子表，再在短事务内替换正式表分区（读取方不会看到部分数据）
+    SHADOW_PARTITION_MODE = os.environ.get('SHADOW_PARTITION_MODE', 'true').lower() == 'true'
+    
+    # 列式缓存：最近N天的商品合并数据常驻内存，排行/趋势查询在窗口内不再访问数据库明细
+    COLUMNAR_CACHE_ENABLED = os.environ.get('COLUMNAR_CACHE_ENABLED', 'true').lower() == 'true'
+    COLUMNAR_CACHE_DAYS = int(os.environ.get('COLUMNAR_CACHE_DAYS', 62))
+    
+    # 统计/排行接口结果缓存：相同请求合并为一次计算，数据版本变化后自动失效
+    RESULT_CACHE_ENABLED = os.environ.get('RESULT_CACHE_ENABLED', 'true').lower() == 'true'
+    RESULT_CACHE_TTL_SECONDS = int(os.environ.get('RESULT_CACHE_TTL_SECONDS', 300))
+    RESULT_CACHE_MAX_ENTRIES = int(os.environ.get('RESULT_CACHE_MAX_ENTRIES', 256))
+    
+    # 子串搜索索引：编码/名称/门店等模糊筛选先在内存n-gram索引中匹配取值，再用 IN 查询
+    SEARCH_INDEX_ENABLED = os.environ.get('SEARCH_INDEX_ENABLED', 'true').lower() == 'true'
+    SEARCH_MAX_IN_VALUES = int(os.environ.get('SEARCH_MAX_IN_VALUES', 1000))  # 匹配取值超过该数量时回退到LIKE
+    
+    # 数据导出：服务端游标分块读取；xlsx按 (筛选条件, 数据版本) 缓存，大批量导出转为后台任务
+    EXPORT_FOLDER = 'exports'
+    EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 2000))
+    EXPORT_SYNC_MAX_ROWS = int(os.environ.get('EXPORT_SYNC_MAX_ROWS', 20000))  # 超过该行数的xlsx导出在后台生成
+    EXPORT_CACHE_MAX_FILES = int(os.environ.get('EXPORT_CACHE_MAX_FILES', 20))
+    
+    # 响应压缩：客户端接受gzip时压缩超过阈值的JSON响应（列表接口另可通过 Accept 协商列式格式）
+    RESPONSE_GZIP_ENABLED = os.environ.get('RESPONSE_GZIP_ENABLED', 'true').lower() == 'true'
+    RESPONSE_GZIP_MIN_BYTES = int(os.environ.get('RESPONSE_GZIP_MIN_BYTES', 1024))
+    RESPONSE_GZIP_LEVEL = int(os.environ.get('RESPONSE_GZIP_LEVEL', 5))
+    
+    # 任务进度共享：多工作进程部署时进度同时写入task_progress表，进度查询可落在任意工作进程
+    PROGRESS_TRACKER_PERSIST = os.environ.get('PROGRESS_TRACKER_PERSIST', 'true').lower() == 'true'
+    PROGRESS_TRACKER_PERSIST_INTERVAL = float(os.environ.get('PROGRESS_TRACKER_PERSIST_INTERVAL', 1))  # 进度更新写库的最小间隔（秒）
+    
     # CORS配置
     CORS_ORIGINS = ["http://localhost", "http://localhost:80"]
     
@@ -52,6 +106,7 @@ class Config:
         """初始化应用配置"""
         # 创建上传目录
         os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+        os.makedirs(app.config['EXPORT_FOLDER'], exist_ok=True)
 
 class DevelopmentConfig(Config):
     """开发环境配置"""
@@ -65,6 +120,7 @@ class TestingConfig(Config):
     """测试环境配置"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_ENGINE_OPTIONS = {}  # 连接池与MySQL连接参数不适用于SQLite内存库
 
 # 配置字典
 config = {
@@ -0,0 +1,68 @@
+"""gunicorn 配置 - 生产环境多工作进程部署
+
+启动: gunicorn -c gunicorn.conf.py app:app
+
+- 主进程预加载应用并只执行一次数据库初始化，工作进程 fork 后各自重建数据库连接池；
+- 工作类型默认 gthread（每个进程多线程，适合上传、导出等IO等待较多的请求），可改为 sync；
+- 工作进程处理 GUNICORN_MAX_REQUESTS 个请求后回收，退出前等待本进程的后台任务（文件处理、导出、合并等）结束。
+"""
+import multiprocessing
+import os
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = _env_int('GUNICORN_WORKERS', os.environ.get('FLASK_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')  # gthread 或 sync
+threads = _env_int('GUNICORN_THREADS', 4) if worker_class == 'gthread' else 1
+
+# 主进程加载应用，工作进程共享只读的代码与配置
+preload_app = True
+
+# 工作进程回收：处理一定数量的请求后平滑重启（加抖动避免所有进程同时重启）
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = _env_int('GUNICORN_MAX_REQUESTS_JITTER', 100)
+
+# 大文件上传与同步导出耗时较长，与nginx的代理超时保持一致
+timeout = _env_int('GUNICORN_TIMEOUT', 600)
+# 回收或停止时等待进行中的请求与后台任务的时间
+graceful_timeout = _env_int('GUNICORN_GRACEFUL_TIMEOUT', 300)
+keepalive = _env_int('GUNICORN_KEEPALIVE', 5)
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = os.environ.get('GUNICORN_ERROR_LOG', '-')
+loglevel = os.environ.get('LOG_LEVEL', 'info').lower()
+
+
+def on_starting(server):
+    """主进程启动时初始化数据库（建表、默认账户），只执行一次"""
+    from app import app, init_database
+    from models import db
+
+    if not init_database(app):
+        server.log.error("应用启动失败：无法连接数据库")
+        raise SystemExit(1)
+
+    # 主进程不再使用数据库连接，关闭连接池避免被工作进程继承
+    with app.app_context():
+        db.engine.dispose()
+
+
+def post_fork(server, worker):
+    """工作进程不复用从主进程继承的数据库连接"""
+    from app import app
+    from models import db
+
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+def worker_exit(server, worker):
+    """工作进程退出前等待本进程的后台任务结束（最多 graceful_timeout 秒）"""
+    from utils import wait_for_background_work
+
+    if not wait_for_background_work(graceful_timeout):
+        server.log.warning(f"工作进程 {worker.pid} 退出时仍有未完成的后台任务")
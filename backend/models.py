@@ -4,6 +4,74 @@ from datetime import datetime
 
 db = SQLAlchemy()
 
+# 成本计算参数（生成列表达式、种菜汇总以及利润模拟共用；修改后需同步新增迁移重建生成列）
+LOGISTICS_COST_PER_UNIT = 2.5  # 每件物流成本
+ORDER_DEDUCTION_RATE = 0.08  # 订单扣点比例
+TAX_INVOICE_RATE = 0.13  # 税票比例
+UNIT_PRODUCT_COST = 10  # 每件产品成本
+
+# ================================
+# 派生指标生成列表达式（MySQL与SQLite通用写法，只引用同一行的源字段）
+# ================================
+
+def _per_visitor(expression, scale='100.0'):
+    return f"CASE WHEN COALESCE(visitor_count, 0) > 0 THEN ({expression}) * {scale} / visitor_count ELSE 0 END"
+
+_REAL_AMOUNT = "(COALESCE(payment_amount, 0) - COALESCE(refund_amount, 0) - COALESCE(planting_amount, 0))"
+_REAL_BUYER_COUNT = "(COALESCE(payment_buyer_count, 0) - COALESCE(planting_orders, 0))"
+_REAL_PRODUCT_COUNT = "(COALESCE(payment_product_count, 0) - COALESCE(planting_orders, 0))"
+_PRODUCT_COST = f"(({_REAL_PRODUCT_COUNT} + COALESCE(payment_product_count, 0) - COALESCE(payment_buyer_count, 0)) * {UNIT_PRODUCT_COST})"
+_PROMOTION_COST = ("(COALESCE(sitewide_promotion, 0) + COALESCE(keyword_promotion, 0) + COALESCE(product_operation, 0)"
+                   " + COALESCE(crowd_promotion, 0) + COALESCE(super_short_video, 0) + COALESCE(multi_target_direct, 0))")
+_PLANTING_COST = (f"(COALESCE(planting_cost, 0) + COALESCE(planting_orders, 0) * {LOGISTICS_COST_PER_UNIT}"
+                  f" + COALESCE(planting_amount, 0) * {ORDER_DEDUCTION_RATE})")
+
+PRODUCT_MERGE_DERIVED_COLUMNS = {
+    'planting_logistics_cost': f"planting_orders * {LOGISTICS_COST_PER_UNIT}",
+    'planting_deduction': f"planting_amount * {ORDER_DEDUCTION_RATE}",
+    'conversion_rate': _per_visitor("COALESCE(payment_buyer_count, 0)"),
+    'favorite_rate': _per_visitor("COALESCE(favorite_count, 0)"),
+    'cart_rate': _per_visitor("COALESCE(add_to_cart_count, 0)"),
+    'uv_value': _per_visitor("COALESCE(payment_amount, 0)", scale='1.0'),
+    'real_conversion_rate': _per_visitor(_REAL_BUYER_COUNT),
+    'real_amount': _REAL_AMOUNT,
+    'real_buyer_count': _REAL_BUYER_COUNT,
+    'real_product_count': _REAL_PRODUCT_COUNT,
+    'product_cost': _PRODUCT_COST,
+    'real_order_deduction': f"{_REAL_AMOUNT} * {ORDER_DEDUCTION_RATE}",
+    'tax_invoice': f"COALESCE(payment_amount, 0) * {TAX_INVOICE_RATE}",
+    'real_order_logistics_cost': f"{_REAL_PRODUCT_COUNT} * {LOGISTICS_COST_PER_UNIT}",
+    'gross_profit': (f"{_REAL_AMOUNT} - {_PRODUCT_COST} - {_REAL_AMOUNT} * {ORDER_DEDUCTION_RATE}"
+                     f" - COALESCE(payment_amount, 0) * {TAX_INVOICE_RATE} - {_REAL_PRODUCT_COUNT} * {LOGISTICS_COST_PER_UNIT}"
+                     f" - {_PLANTING_COST} - {_PROMOTION_COST}"),
+}
+
+# 订单成本仅在匹配到运营成本且数量、商品金额、供货价均非零时计算，否则为NULL
+_ORDER_COST_READY = ("is_operation_cost_matched = 1 AND COALESCE(quantity, 0) <> 0"
+                     " AND COALESCE(product_amount, 0) <> 0 AND COALESCE(operation_cost_supply_price, 0) <> 0")
+_ORDER_GROSS_PROFIT = (f"(product_amount - quantity * operation_cost_supply_price - quantity * {LOGISTICS_COST_PER_UNIT}"
+                       f" - product_amount * {ORDER_DEDUCTION_RATE} - product_amount * {TAX_INVOICE_RATE})")
+
+def _when_order_cost_ready(expression, condition=''):
+    return f"CASE WHEN {_ORDER_COST_READY}{condition} THEN {expression} END"
+
+ORDER_MERGE_DERIVED_COLUMNS = {
+    'order_profit_margin': _when_order_cost_ready(f"{_ORDER_GROSS_PROFIT} * 100.0 / product_amount", ' AND product_amount > 0'),
+    'avg_order_value': _when_order_cost_ready("product_amount"),
+    'product_cost': _when_order_cost_ready("quantity * operation_cost_supply_price"),
+    'order_logistics_cost': _when_order_cost_ready(f"quantity * {LOGISTICS_COST_PER_UNIT}"),
+    'order_deduction': _when_order_cost_ready(f"product_amount * {ORDER_DEDUCTION_RATE}"),
+    'tax_invoice': _when_order_cost_ready(f"product_amount * {TAX_INVOICE_RATE}"),
+    'gross_profit': _when_order_cost_ready(_ORDER_GROSS_PROFIT),
+    'profit_per_unit': _when_order_cost_ready(
+        f"CASE WHEN quantity > 0 THEN {_ORDER_GROSS_PROFIT} * 1.0 / quantity ELSE 0 END", ' AND product_amount > 0'
+    ),
+}
+
+def _derived(table_columns, name):
+    """派生指标映射为STORED生成列，由数据库随源字段自动维护，应用代码不再写入"""
+    return db.Computed(table_columns[name], persisted=True)
+
 class User(db.Model):
     """用户模型"""
     id = db.Column(db.Integer, primary_key=True)
@@ -160,28 +228,28 @@ class ProductDataMerge(db.Model):
     multi_target_direct = db.Column(db.Float)  # 多目标直投费用
     promotion_summary_updated_at = db.Column(db.DateTime)  # 推广费用汇总更新时间
     
-    # 种菜表格汇总字段
+    # 种菜表格汇总字段（物流成本、扣款金额为生成列）
     planting_orders = db.Column(db.Integer)  # 匹配到的种菜订单数量
     planting_amount = db.Column(db.Float)  # 种菜订单总金额
     planting_cost = db.Column(db.Float)  # 种菜佣金总额
-    planting_logistics_cost = db.Column(db.Float)  # 物流成本 (订单数 * 2.5)
-    planting_deduction = db.Column(db.Float)  # 扣款金额 (总金额 * 0.08)
+    planting_logistics_cost = db.Column(db.Float, _derived(PRODUCT_MERGE_DERIVED_COLUMNS, 'planting_logistics_cost'))  # 物流成本 (订单数 * 2.5)
+    planting_deduction = db.Column(db.Float, _derived(PRODUCT_MERGE_DERIVED_COLUMNS, 'planting_deduction'))  # 扣款金额 (总金额 * 0.08)
     planting_summary_updated_at = db.Column(db.DateTime)  # 种菜汇总更新时间
     
-    # 转化率和业务指标字段
-    conversion_rate = db.Column(db.Float)  # 支付转化率
-    favorite_rate = db.Column(db.Float)  # 收藏率
-    cart_rate = db.Column(db.Float)  # 加购率
-    uv_value = db.Column(db.Float)  # UV价值
-    real_conversion_rate = db.Column(db.Float)  # 真实转化率
-    real_amount = db.Column(db.Float)  # 真实金额
-    real_buyer_count = db.Column(db.Integer)  # 真实买家数
-    real_product_count = db.Column(db.Integer)  # 真实件数
-    product_cost = db.Column(db.Float)  # 产品成本
-    real_order_deduction = db.Column(db.Float)  # 真实订单扣点
-    tax_invoice = db.Column(db.Float)  # 税票
-    real_order_logistics_cost = db.Column(db.Float)  # 真实订单物流成本
-    gross_profit = db.Column(db.Float)  # 毛利
+    # 转化率和业务指标字段（生成列，随源字段自动计算）
+    conversion_rate = db.Column(db.Float, _derived(PRODUCT_MERGE_DERIVED_COLUMNS, 'conversion_rate'))  # 支付转化率
+    favorite_rate = db.Column(db.Float, _derived(PRODUCT_MERGE_DERIVED_COLUMNS, 'favorite_rate'))  # 收藏率
+    cart_rate = db.Column(db.Float, _derived(PRODUCT_MERGE_DERIVED_COLUMNS, 'cart_rate'))  # 加购率
+    uv_value = db.Column(db.Float, _derived(PRODUCT_MERGE_DERIVED_COLUMNS, 'uv_value'))  # UV价值
+    real_conversion_rate = db.Column(db.Float, _derived(PRODUCT_MERGE_DERIVED_COLUMNS, 'real_conversion_rate'))  # 真实转化率
+    real_amount = db.Column(db.Float, _derived(PRODUCT_MERGE_DERIVED_COLUMNS, 'real_amount'))  # 真实金额
+    real_buyer_count = db.Column(db.Integer, _derived(PRODUCT_MERGE_DERIVED_COLUMNS, 'real_buyer_count'))  # 真实买家数
+    real_product_count = db.Column(db.Integer, _derived(PRODUCT_MERGE_DERIVED_COLUMNS, 'real_product_count'))  # 真实件数
+    product_cost = db.Column(db.Float, _derived(PRODUCT_MERGE_DERIVED_COLUMNS, 'product_cost'))  # 产品成本
+    real_order_deduction = db.Column(db.Float, _derived(PRODUCT_MERGE_DERIVED_COLUMNS, 'real_order_deduction'))  # 真实订单扣点
+    tax_invoice = db.Column(db.Float, _derived(PRODUCT_MERGE_DERIVED_COLUMNS, 'tax_invoice'))  # 税票
+    real_order_logistics_cost = db.Column(db.Float, _derived(PRODUCT_MERGE_DERIVED_COLUMNS, 'real_order_logistics_cost'))  # 真实订单物流成本
+    gross_profit = db.Column(db.Float, _derived(PRODUCT_MERGE_DERIVED_COLUMNS, 'gross_profit'))  # 毛利
 
     # merge表的元数据
     is_matched = db.Column(db.Boolean, default=False)  # 是否成功匹配到product_list
@@ -476,21 +544,21 @@ class OrderDetailsMerge(db.Model):
     # 业务计算字段（类似product_data_merge）
     # ================================
     
-    # 基础业务指标
+    # 基础业务指标（除订单转化率外均为生成列，随源字段自动计算）
     order_conversion_rate = db.Column(db.Float, comment='订单转化率')
-    order_profit_margin = db.Column(db.Float, comment='订单利润率')
-    avg_order_value = db.Column(db.Float, comment='平均订单价值')
+    order_profit_margin = db.Column(db.Float, _derived(ORDER_MERGE_DERIVED_COLUMNS, 'order_profit_margin'), comment='订单利润率')
+    avg_order_value = db.Column(db.Float, _derived(ORDER_MERGE_DERIVED_COLUMNS, 'avg_order_value'), comment='平均订单价值')
     
     # 成本计算字段
-    product_cost = db.Column(db.Float, comment='产品成本 (数量 * 运营成本价格)')
-    order_logistics_cost = db.Column(db.Float, comment='订单物流成本 (数量 * 2.5)')
-    order_deduction = db.Column(db.Float, comment='订单扣点 (商品金额 * 0.08)')
-    tax_invoice = db.Column(db.Float, comment='税票 (商品金额 * 0.13)')
+    product_cost = db.Column(db.Float, _derived(ORDER_MERGE_DERIVED_COLUMNS, 'product_cost'), comment='产品成本 (数量 * 运营成本价格)')
+    order_logistics_cost = db.Column(db.Float, _derived(ORDER_MERGE_DERIVED_COLUMNS, 'order_logistics_cost'), comment='订单物流成本 (数量 * 2.5)')
+    order_deduction = db.Column(db.Float, _derived(ORDER_MERGE_DERIVED_COLUMNS, 'order_deduction'), comment='订单扣点 (商品金额 * 0.08)')
+    tax_invoice = db.Column(db.Float, _derived(ORDER_MERGE_DERIVED_COLUMNS, 'tax_invoice'), comment='税票 (商品金额 * 0.13)')
     
     # 利润计算字段
-    gross_profit = db.Column(db.Float, comment='毛利 (商品金额 - 产品成本 - 各项费用)')
+    gross_profit = db.Column(db.Float, _derived(ORDER_MERGE_DERIVED_COLUMNS, 'gross_profit'), comment='毛利 (商品金额 - 产品成本 - 各项费用)')
     net_profit = db.Column(db.Float, comment='净利润')
-    profit_per_unit = db.Column(db.Float, comment='单件利润')
+    profit_per_unit = db.Column(db.Float, _derived(ORDER_MERGE_DERIVED_COLUMNS, 'profit_per_unit'), comment='单件利润')
     
     # 汇总更新时间戳
     cost_summary_updated_at = db.Column(db.DateTime, comment='成本汇总更新时间')
@@ -525,4 +593,210 @@ class AlipayAmount(db.Model):
     filename = db.Column(db.String(255), nullable=False, comment='源文件名')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    uploaded_by = db.Column(db.Integer, db.ForeignKey('user.id'))
\ No newline at end of file
+    uploaded_by = db.Column(db.Integer, db.ForeignKey('user.id'))
+
+class PipelineWatermark(db.Model):
+    """流水线水位表模型 - 记录每个(数据表, 日期, 店铺)分区的最新数据版本"""
+    __tablename__ = 'pipeline_watermark'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    table_name = db.Column(db.String(100), nullable=False, comment='数据表或计算步骤名称')
+    partition_date = db.Column(db.Date, nullable=False, comment='分区日期')
+    store_name = db.Column(db.String(200), nullable=False, default='', comment='分区店铺（空字符串表示整天）')
+    version = db.Column(db.BigInteger, nullable=False, default=0, comment='单调递增的数据版本号')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('table_name', 'partition_date', 'store_name', name='uq_pipeline_watermark_partition'),
+        db.Index('idx_pipeline_watermark_table_date', 'table_name', 'partition_date'),
+    )
+
+class PipelineStepState(db.Model):
+    """流水线步骤状态表模型 - 记录每个计算步骤在日期分区上已消费的输入版本"""
+    __tablename__ = 'pipeline_step_state'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    step_name = db.Column(db.String(100), nullable=False, comment='计算步骤名称')
+    partition_date = db.Column(db.Date, nullable=False, comment='分区日期')
+    input_version = db.Column(db.BigInteger, nullable=False, default=0, comment='上次运行时消费到的输入水位')
+    status = db.Column(db.String(20), nullable=False, default='completed', comment='运行状态: completed/skipped/error')
+    message = db.Column(db.Text, comment='运行结果说明')
+    duration_seconds = db.Column(db.Float, comment='运行耗时（秒）')
+    last_run_at = db.Column(db.DateTime, default=datetime.utcnow, comment='最近运行时间')
+    
+    __table_args__ = (
+        db.UniqueConstraint('step_name', 'partition_date', name='uq_pipeline_step_partition'),
+    )
+
+class BackfillCheckpoint(db.Model):
+    """历史回填检查点模型 - 记录回填作业中已完成的(步骤, 日期)分区，中断后可断点续跑"""
+    __tablename__ = 'backfill_checkpoint'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    job_name = db.Column(db.String(100), nullable=False, comment='回填作业名称')
+    step_name = db.Column(db.String(100), nullable=False, comment='计算步骤名称')
+    partition_date = db.Column(db.Date, nullable=False, comment='分区日期')
+    status = db.Column(db.String(20), nullable=False, default='completed', comment='分区状态: completed/skipped')
+    rows_affected = db.Column(db.Integer, default=0, comment='写入行数')
+    duration_seconds = db.Column(db.Float, comment='执行耗时（秒）')
+    message = db.Column(db.Text, comment='执行结果说明')
+    completed_at = db.Column(db.DateTime, default=datetime.utcnow, comment='完成时间')
+    
+    __table_args__ = (
+        db.UniqueConstraint('job_name', 'step_name', 'partition_date', name='uq_backfill_checkpoint_partition'),
+    )
+
+class ProductListChange(db.Model):
+    """产品总表变更日志模型 - 记录变更涉及的匹配键，由后台任务增量回填到merge表"""
+    __tablename__ = 'product_list_change'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    product_list_id = db.Column(db.Integer, comment='产品总表ID（新增记录提交前为空）')
+    product_id = db.Column(db.String(100), comment='产品ID（匹配product_data_merge.tmall_product_code）')
+    tmall_supplier_id = db.Column(db.String(200), comment='天猫供销ID（匹配order_details_merge.store_style_code）')
+    change_type = db.Column(db.String(20), nullable=False, comment='变更类型: insert/update/delete')
+    changed_fields = db.Column(db.String(500), comment='变更字段，逗号分隔')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime, comment='回填完成时间（为空表示待处理）')
+    
+    __table_args__ = (
+        db.Index('idx_product_list_change_processed', 'processed_at', 'id'),
+    )
+
+# ================================
+# 影子分区表（重算时先在影子表中构建分区数据，再在一个短事务内替换正式表中的分区）
+# ================================
+
+def _shadow_table(model, table_name):
+    """按merge表结构生成影子表：只包含可写入的字段（不含自增主键和生成列），附带构建批次ID"""
+    columns = [
+        db.Column('shadow_id', db.Integer, primary_key=True),
+        db.Column('build_id', db.String(32), nullable=False, index=True, comment='构建批次ID'),
+        db.Column('built_at', db.DateTime, default=datetime.utcnow, comment='构建时间'),
+    ]
+    for column in model.__table__.columns:
+        if column.primary_key or column.computed is not None:
+            continue
+        default = column.default.arg if column.default is not None else None
+        columns.append(db.Column(column.name, column.type, default=default, comment=column.comment))
+    return db.Table(table_name, *columns)
+
+ProductDataMergeShadow = _shadow_table(ProductDataMerge, 'product_data_merge_shadow')
+OrderDetailsMergeShadow = _shadow_table(OrderDetailsMerge, 'order_details_merge_shadow')
+
+# ================================
+# 看板日汇总表（由最终汇总步骤按日期增量刷新，统计接口按日期区间再汇总）
+# ================================
+
+# 汇总度量：product_data_merge字段求和
+ROLLUP_MEASURES = [
+    'payment_amount', 'payment_product_count', 'visitor_count', 'payment_buyer_count',
+    'planting_orders', 'planting_amount', 'refund_amount',
+    'sitewide_promotion', 'keyword_promotion', 'product_operation',
+    'crowd_promotion', 'super_short_video', 'multi_target_direct'
+]
+
+class DailyRollupMixin:
+    """日汇总表公共字段"""
+    id = db.Column(db.Integer, primary_key=True)
+    summary_date = db.Column(db.Date, nullable=False, comment='汇总日期（product_data_merge.upload_date）')
+    payment_amount = db.Column(db.Double, comment='支付金额')
+    payment_product_count = db.Column(db.BigInteger, comment='支付商品件数')
+    visitor_count = db.Column(db.BigInteger, comment='访客数')
+    payment_buyer_count = db.Column(db.BigInteger, comment='支付买家数')
+    planting_orders = db.Column(db.BigInteger, comment='种菜订单数')
+    planting_amount = db.Column(db.Double, comment='种菜金额')
+    refund_amount = db.Column(db.Double, comment='退款金额')
+    sitewide_promotion = db.Column(db.Double, comment='全站推广')
+    keyword_promotion = db.Column(db.Double, comment='关键词推广')
+    product_operation = db.Column(db.Double, comment='货品运营')
+    crowd_promotion = db.Column(db.Double, comment='人群推广')
+    super_short_video = db.Column(db.Double, comment='超级短视频')
+    multi_target_direct = db.Column(db.Double, comment='多目标直投')
+    record_count = db.Column(db.Integer, nullable=False, default=0, comment='商品记录数')
+    refreshed_at = db.Column(db.DateTime, default=datetime.utcnow, comment='刷新时间')
+
+class DailyStoreRollup(DailyRollupMixin, db.Model):
+    """门店日汇总表模型"""
+    __tablename__ = 'daily_store_rollup'
+    
+    store_name = db.Column(db.String(200), nullable=False, comment='店铺名')
+    
+    __table_args__ = (
+        db.UniqueConstraint('summary_date', 'store_name', name='uq_daily_store_rollup'),
+    )
+
+class DailyOperatorRollup(DailyRollupMixin, db.Model):
+    """负责人员日汇总表模型"""
+    __tablename__ = 'daily_operator_rollup'
+    
+    platform = db.Column(db.String(50), nullable=False, comment='平台（团队）')
+    operator = db.Column(db.String(100), nullable=False, comment='操作人（未匹配为"未分配"）')
+    
+    __table_args__ = (
+        db.UniqueConstraint('summary_date', 'platform', 'operator', name='uq_daily_operator_rollup'),
+    )
+
+class DailyCategoryRollup(DailyRollupMixin, db.Model):
+    """类目日汇总表模型"""
+    __tablename__ = 'daily_category_rollup'
+    
+    category = db.Column(db.String(200), nullable=False, comment='产品类目（未匹配为"未分类"）')
+    
+    __table_args__ = (
+        db.UniqueConstraint('summary_date', 'category', name='uq_daily_category_rollup'),
+    )
+
+class ProductActivity(db.Model):
+    """产品活动日历表模型（由product_list.action_list展开，每个活动一行）"""
+    __tablename__ = 'product_activity'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    product_list_id = db.Column(db.Integer, db.ForeignKey('product_list.id', ondelete='CASCADE'), nullable=False, comment='产品总表ID')
+    product_id = db.Column(db.String(100), nullable=False, comment='产品ID/链接ID')
+    activity_name = db.Column(db.String(200), nullable=False, comment='活动名称')
+    warmup_date = db.Column(db.Date, comment='预热开始日期')
+    start_date = db.Column(db.Date, nullable=False, comment='活动开始日期')
+    end_date = db.Column(db.Date, nullable=False, comment='活动结束日期')
+    sequence = db.Column(db.Integer, nullable=False, default=0, comment='在action_list中的顺序')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('idx_product_activity_product_list', 'product_list_id', 'sequence'),
+        db.Index('idx_product_activity_name_dates', 'activity_name', 'start_date', 'end_date'),
+        db.Index('idx_product_activity_dates', 'start_date', 'end_date'),
+    )
+
+class InternalOrderSummary(db.Model):
+    """内部订单汇总表模型（每个内部订单号一行，由订单成本汇总/支付金额更新步骤增量刷新）"""
+    __tablename__ = 'internal_order_summary'
+    
+    internal_order_number = db.Column(db.String(100), primary_key=True, comment='内部订单号')
+    item_count = db.Column(db.Integer, nullable=False, default=0, comment='订单行数')
+    total_cost = db.Column(db.Numeric(14, 2), nullable=False, default=0, comment='总成本（运营成本供货价 × 数量）')
+    sales_amount = db.Column(db.Numeric(12, 2), nullable=False, default=0, comment='销售金额（最新下单行的已付金额）')
+    profit = db.Column(db.Numeric(14, 2), nullable=False, default=0, comment='利润（销售金额 - 总成本，不低于0）')
+    store_name = db.Column(db.String(200), comment='店铺名称')
+    order_time = db.Column(db.DateTime, comment='下单时间')
+    upload_date = db.Column(db.Date, comment='上传日期')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('idx_internal_order_summary_order_time', 'order_time'),
+        db.Index('idx_internal_order_summary_upload_date', 'upload_date'),
+    )
+
+class TaskProgress(db.Model):
+    """任务进度表模型（多工作进程部署时共享 progress_tracker 的任务进度）"""
+    __tablename__ = 'task_progress'
+    
+    task_id = db.Column(db.String(64), primary_key=True, comment='任务ID')
+    status = db.Column(db.String(20), nullable=False, default='running', comment='状态: running, completed, error')
+    progress = db.Column(db.Text, nullable=False, comment='进度信息(JSON)')
+    start_time = db.Column(db.DateTime, comment='开始时间')
+    end_time = db.Column(db.DateTime, comment='结束时间')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('idx_task_progress_status_end_time', 'status', 'end_time'),
+    )
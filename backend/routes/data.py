@@ -1,99 +1,84 @@
-import io
-import pandas as pd
-from flask import Blueprint, request, jsonify, send_file, current_app
+import os
+import uuid
+import numpy as np
+from urllib.parse import quote
+from flask import Blueprint, request, jsonify, send_file, current_app, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from sqlalchemy import text, or_
+from sqlalchemy import text, or_, case
 from datetime import datetime, date, timedelta
-import json
+from collections import namedtuple
+from types import SimpleNamespace
 from models import db, User, ProductData, ProductDataMerge, SubjectReport, OrderDetailsMerge, ProductList
+from services.daily_rollup import daily_rollup
+from services.columnar_cache import columnar_cache, PRODUCT_MERGE_VERSION_TABLES, INTEGER_MEASURES
+from services.data_version import (
+    versioned_view, data_version, yesterday_range, last_30_days_range, ORDER_MERGE_VERSION_TABLES
+)
+from services.result_cache import result_cache
+from services.product_activity import activity_index
+from services.search_index import search_index, SEARCH_FIELDS
+from services.export_service import (
+    export_statement, count_rows as count_export_rows, stream_csv, export_file_cache,
+    download_name as export_download_name, FORMATS as EXPORT_FORMATS
+)
+from services.internal_order_summary import lookup_summaries
+from services.projection import Projection, records_response
+from services.keyset import encode_cursor, decode_cursor, keyset_condition, InvalidCursor
 from utils import format_decimal, handle_db_connection_error
 
 data_bp = Blueprint('data', __name__)
 
-def get_matching_activities(action_list, upload_date):
-    """
-    根据上传日期获取匹配的活动
-    
-    Args:
-        action_list: 活动列表(JSON数据)
-        upload_date: 上传日期
-    
-    Returns:
-        list: 匹配的活动名称列表，每个活动名称可能带有状态标识（如"预热中"、"活动中"）
-    """
-    if not action_list or not upload_date:
-        return []
-    
-    try:
-        # 如果action_list是字符串，解析为JSON
-        if isinstance(action_list, str):
-            activities = json.loads(action_list)
-        else:
-            activities = action_list
-            
-        if not isinstance(activities, list):
-            return []
-        
-        matching_activities = []
-        upload_date_obj = upload_date if isinstance(upload_date, date) else datetime.strptime(upload_date, '%Y-%m-%d').date()
-        
-        for activity in activities:
-            if not isinstance(activity, dict):
-                continue
-                
-            activity_name = activity.get('name')
-            
-            # 获取时间信息，优先使用新格式（包含时分），其次使用旧格式（只有日期）
-            start_time_str = activity.get('start_time') or activity.get('start_date')
-            end_time_str = activity.get('end_time') or activity.get('end_date')
-            warmup_time_str = activity.get('warmup_time')
-            
-            if not all([activity_name, start_time_str, end_time_str]):
-                continue
-            
-            try:
-                # 解析开始和结束时间
-                if 'T' in start_time_str:  # 新格式：包含时分
-                    start_datetime = datetime.fromisoformat(start_time_str.replace('Z', '+00:00'))
-                    start_date = start_datetime.date()
-                else:  # 旧格式：只有日期
-                    start_date = datetime.strptime(start_time_str, '%Y-%m-%d').date()
-                
-                if 'T' in end_time_str:  # 新格式：包含时分
-                    end_datetime = datetime.fromisoformat(end_time_str.replace('Z', '+00:00'))
-                    end_date = end_datetime.date()
-                else:  # 旧格式：只有日期
-                    end_date = datetime.strptime(end_time_str, '%Y-%m-%d').date()
-                
-                # 解析预热时间（如果有）
-                warmup_date = None
-                if warmup_time_str:
-                    if 'T' in warmup_time_str:
-                        warmup_datetime = datetime.fromisoformat(warmup_time_str.replace('Z', '+00:00'))
-                        warmup_date = warmup_datetime.date()
-                    else:
-                        warmup_date = datetime.strptime(warmup_time_str, '%Y-%m-%d').date()
-                
-                # 判断上传日期所处的活动阶段
-                activity_display_name = activity_name
-                
-                if warmup_date and warmup_date <= upload_date_obj < start_date:
-                    # 在预热期间
-                    activity_display_name = f"{activity_name} 预热中"
-                    matching_activities.append(activity_display_name)
-                elif start_date <= upload_date_obj <= end_date:
-                    # 在活动期间
-                    activity_display_name = f"{activity_name} 活动中"
-                    matching_activities.append(activity_display_name)
-                    
-            except (ValueError, TypeError):
-                # 日期格式错误，跳过此活动
-                continue
-                
-        return matching_activities
-        
-    except (json.JSONDecodeError, ValueError, TypeError):
-        return []
+# 数据列表返回的列（真实买家数/件数与支付买家数/件数相同，参与活动由活动日历索引另行计算）
+DATA_LIST_PROJECTION = Projection(ProductDataMerge, [
+    ('id', 'id', 'raw'),
+    ('upload_date', 'upload_date', 'iso'),
+    ('tmall_product_code', 'tmall_product_code', 'raw'),
+    ('product_name', 'product_name', 'raw'),
+    ('participating_activities', None, 'raw'),
+    ('tmall_supplier_name', 'tmall_supplier_name', 'raw'),
+    ('listing_time', 'listing_time', 'iso'),
+    ('product_list_operator', 'product_list_operator', 'raw'),  # 链接负责人
+    ('product_list_image', 'product_list_image', 'raw'),  # 链接主图
+    ('payment_buyer_count', 'payment_buyer_count', 'raw'),
+    ('payment_product_count', 'payment_product_count', 'raw'),
+    ('payment_amount', 'payment_amount', 'decimal'),
+    ('refund_amount', 'refund_amount', 'decimal'),
+    ('visitor_count', 'visitor_count', 'raw'),
+    ('search_guided_visitors', 'search_guided_visitors', 'raw'),
+    ('favorite_count', 'favorite_count', 'raw'),
+    ('add_to_cart_count', 'add_to_cart_count', 'raw'),
+    ('conversion_rate', 'conversion_rate', 'decimal'),
+    ('favorite_rate', 'favorite_rate', 'decimal'),
+    ('cart_rate', 'cart_rate', 'decimal'),
+    ('uv_value', 'uv_value', 'decimal'),
+    ('real_conversion_rate', 'real_conversion_rate', 'decimal'),
+    ('real_amount', 'real_amount', 'decimal'),
+    ('real_buyer_count', 'payment_buyer_count', 'raw'),
+    ('real_product_count', 'payment_product_count', 'raw'),
+    ('product_cost', 'product_cost', 'decimal'),
+    ('real_order_deduction', 'real_order_deduction', 'decimal'),
+    ('tax_invoice', 'tax_invoice', 'decimal'),
+    ('real_order_logistics_cost', 'real_order_logistics_cost', 'decimal'),
+    ('planting_orders', 'planting_orders', 'decimal'),
+    ('planting_amount', 'planting_amount', 'decimal'),
+    ('planting_cost', 'planting_cost', 'decimal'),
+    ('planting_deduction', 'planting_deduction', 'decimal'),
+    ('planting_logistics_cost', 'planting_logistics_cost', 'decimal'),
+    ('keyword_promotion', 'keyword_promotion', 'decimal'),
+    ('sitewide_promotion', 'sitewide_promotion', 'decimal'),
+    ('product_operation', 'product_operation', 'decimal'),
+    ('crowd_promotion', 'crowd_promotion', 'decimal'),
+    ('super_short_video', 'super_short_video', 'decimal'),
+    ('multi_target_direct', 'multi_target_direct', 'decimal'),
+    ('gross_profit', 'gross_profit', 'decimal'),
+])
+
+# 有 (排序字段, id) 复合索引的排序字段（见 mysql/init/20-add-keyset-sort-indexes.sql），按这些字段排序时使用游标分页；
+# 其余字段没有索引，游标定位同样需要对过滤结果排序，仍按页码偏移分页，响应中不返回 next_cursor
+KEYSET_SORT_FIELDS = {
+    'upload_date', 'payment_amount', 'real_amount', 'gross_profit', 'visitor_count',
+    'payment_buyer_count', 'payment_product_count', 'real_buyer_count', 'real_product_count',
+}
 
 @data_bp.route('/data', methods=['GET'])
 @jwt_required()
@@ -117,11 +102,11 @@ def get_data():
     sort_by = request.args.get('sort_by', 'upload_date')  # 默认按上传日期排序
     sort_order = request.args.get('sort_order', 'desc')   # 默认倒序
     
-    # 关联查询product_list表以获取action_list
-    query = db.session.query(ProductDataMerge, ProductList.action_list).outerjoin(
-        ProductList, 
-        ProductDataMerge.tmall_product_code == ProductList.product_id
-    )
+    cursor = request.args.get('cursor')
+    start_date = end_date = None
+    
+    # 只查询合并表，action_list按当前页的产品ID批量获取
+    query = db.session.query(ProductDataMerge)
     
     # 日期区间过滤
     if upload_start_date:
@@ -149,13 +134,13 @@ def get_data():
             pass  # 错误已在上面处理
     
     if tmall_product_code:
-        query = query.filter(ProductDataMerge.tmall_product_code.ilike(f'%{tmall_product_code}%'))
+        query = query.filter(search_index.substring_filter('product_code', tmall_product_code))
     
     if product_name:
-        query = query.filter(ProductDataMerge.product_name.ilike(f'%{product_name}%'))
+        query = query.filter(search_index.substring_filter('product_name', product_name))
     
     if tmall_supplier_name:
-        query = query.filter(ProductDataMerge.tmall_supplier_name.ilike(f'%{tmall_supplier_name}%'))
+        query = query.filter(search_index.substring_filter('store', tmall_supplier_name))
     
     # 动态排序
     # 定义可排序的字段映射，确保安全性
@@ -199,107 +184,82 @@ def get_data():
         'gross_profit': ProductDataMerge.gross_profit
     }
     
-    # 应用排序
-    if sort_by in sortable_fields:
-        sort_field = sortable_fields[sort_by]
-        if sort_order.lower() == 'asc':
-            query = query.order_by(sort_field.asc(), ProductDataMerge.id.asc())
-        else:  # 默认desc
-            query = query.order_by(sort_field.desc(), ProductDataMerge.id.desc())
-    else:
-        # 如果排序字段无效，使用默认排序
-        query = query.order_by(ProductDataMerge.upload_date.desc(), ProductDataMerge.id.desc())
-    
-    # 由于我们现在使用的是联合查询，需要从查询中创建子查询然后分页
-    # 首先构建基础查询，然后应用分页
-    total_query = query
-    
-    # 应用分页（注意：由于我们使用的是复合查询，需要用offset/limit而不是paginate）
-    offset = (page - 1) * per_page
-    items = query.offset(offset).limit(per_page).all()
+    # 总数按 过滤条件 + 数据版本 缓存，翻页时不再重复COUNT
+    filter_key = (upload_start_date, upload_end_date, tmall_product_code, product_name, tmall_supplier_name)
+    total = result_cache.get_or_compute(
+        ('data_total', filter_key, data_version(PRODUCT_MERGE_VERSION_TABLES, start_date, end_date)),
+        lambda: (query.order_by(None).count(), True),
+        current_app.config.get('RESULT_CACHE_TTL_SECONDS', 300),
+        current_app.config.get('RESULT_CACHE_MAX_ENTRIES', 256)
+    )
     
-    # 计算总数（需要从原始联合查询计算）
-    total = total_query.count()
+    # 应用排序（id作为并列时的次序，保证游标分页稳定）
+    if sort_by not in sortable_fields:
+        # 如果排序字段无效，使用默认排序
+        sort_by, sort_order = 'upload_date', 'desc'
+    sort_order = 'asc' if sort_order.lower() == 'asc' else 'desc'
+    sort_field = sortable_fields[sort_by]
+    if sort_order == 'asc':
+        query = query.order_by(sort_field.asc(), ProductDataMerge.id.asc())
+    else:
+        query = query.order_by(sort_field.desc(), ProductDataMerge.id.desc())
     
-    data = []
-    for item_data, action_list in items:
-        # 计算匹配的活动
-        matching_activities = get_matching_activities(action_list, item_data.upload_date)
-        participating_activities = ', '.join(matching_activities) if matching_activities else ''
-        
-        # 直接使用数据库中存储的值
-        real_amount = format_decimal(item_data.real_amount)
-        conversion_rate = format_decimal(item_data.conversion_rate)
-        favorite_rate = format_decimal(item_data.favorite_rate)
-        cart_rate = format_decimal(item_data.cart_rate)
-        uv_value = format_decimal(item_data.uv_value)
-        real_conversion_rate = format_decimal(item_data.real_conversion_rate)
-        product_cost = format_decimal(item_data.product_cost)
-        real_order_deduction = format_decimal(item_data.real_order_deduction)
-        tax_invoice = format_decimal(item_data.tax_invoice)
-        real_order_logistics_cost = format_decimal(item_data.real_order_logistics_cost)
-        gross_profit = format_decimal(item_data.gross_profit)
-        
-        data.append({
-            'id': item_data.id,
-            'upload_date': item_data.upload_date.isoformat() if item_data.upload_date else None,
-            'tmall_product_code': item_data.tmall_product_code,
-            'product_name': item_data.product_name,
-            'participating_activities': participating_activities,  # 新增参与活动字段
-            'tmall_supplier_name': item_data.tmall_supplier_name,
-            'listing_time': item_data.listing_time.isoformat() if item_data.listing_time else None,
-            'product_list_operator': item_data.product_list_operator,  # 链接负责人
-            'product_list_image': item_data.product_list_image,  # 链接主图
-            'payment_buyer_count': item_data.payment_buyer_count,
-            'payment_product_count': item_data.payment_product_count,
-            'payment_amount': format_decimal(item_data.payment_amount),
-            'refund_amount': format_decimal(item_data.refund_amount),
-            'visitor_count': item_data.visitor_count,
-            'search_guided_visitors': item_data.search_guided_visitors,
-            'favorite_count': item_data.favorite_count,
-            'add_to_cart_count': item_data.add_to_cart_count,
-            'conversion_rate': conversion_rate,
-            'favorite_rate': favorite_rate,
-            'cart_rate': cart_rate,
-            'uv_value': uv_value,
-            'real_conversion_rate': real_conversion_rate,
-            'real_amount': real_amount,
-            'real_buyer_count': item_data.payment_buyer_count,
-            'real_product_count': item_data.payment_product_count,
-            'product_cost': product_cost,
-            'real_order_deduction': real_order_deduction,
-            'tax_invoice': tax_invoice,
-            'real_order_logistics_cost': real_order_logistics_cost,
-            'planting_orders': format_decimal(item_data.planting_orders),
-            'planting_amount': format_decimal(item_data.planting_amount),
-            'planting_cost': format_decimal(item_data.planting_cost),
-            'planting_deduction': format_decimal(item_data.planting_deduction),
-            'planting_logistics_cost': format_decimal(item_data.planting_logistics_cost),
-            'keyword_promotion': format_decimal(item_data.keyword_promotion),
-            'sitewide_promotion': format_decimal(item_data.sitewide_promotion),
-            'product_operation': format_decimal(item_data.product_operation),
-            'crowd_promotion': format_decimal(item_data.crowd_promotion),
-            'super_short_video': format_decimal(item_data.super_short_video),
-            'multi_target_direct': format_decimal(item_data.multi_target_direct),
-            'gross_profit': gross_profit
-        })
+    keyset_mode = sort_by in KEYSET_SORT_FIELDS
+    if cursor and keyset_mode:
+        # 游标分页：从上一页最后一行之后继续读取，与页码深度无关
+        try:
+            anchor_id = decode_cursor(cursor, sort_by, sort_order)
+            query = query.filter(keyset_condition(ProductDataMerge, sort_field, sort_order == 'desc', anchor_id))
+        except InvalidCursor as e:
+            return jsonify({'message': str(e)}), 400
+    else:
+        # 未提供游标（跳页）或排序字段不支持游标时按页码偏移
+        query = query.offset((page - 1) * per_page)
+    
+    # 多取一行用于判断是否还有下一页（只查询响应需要的列）
+    items = DATA_LIST_PROJECTION.apply(query).limit(per_page + 1).all()
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        if keyset_mode:
+            next_cursor = encode_cursor(sort_by, sort_order, items[-1].id)
+    
+    # 当前页商品对应的产品总表ID（同一产品ID有多条时取最早录入的一条），活动状态从活动日历索引查询
+    product_list_ids = {}
+    product_ids = {item.tmall_product_code for item in items if item.tmall_product_code}
+    if product_ids:
+        product_list_ids = dict(db.session.query(ProductList.product_id, db.func.min(ProductList.id)).filter(
+            ProductList.product_id.in_(product_ids)
+        ).group_by(ProductList.product_id).all())
+    item_keys = [(product_list_ids.get(item.tmall_product_code), item.upload_date) for item in items]
+    activities = activity_index.matching([key[0] for key in item_keys], [key[1] for key in item_keys])
+    participating_activities = [', '.join(activities.get(item_key, [])) for item_key in item_keys]
     
     # 计算页面信息
+    # 游标分页时 current_page 原样返回客户端传入的 page（客户端按翻页次数维护），不由游标推导：
+    # 推导需要统计锚点行之前的行数，与游标分页要避免的深度扫描相同
     pages = (total + per_page - 1) // per_page  # 向上取整
     
-    return jsonify({
-        'data': data,
-        'total': total,
-        'pages': pages,
-        'current_page': page,
-        'per_page': per_page
-    })
+    return DATA_LIST_PROJECTION.response(
+        items, {'participating_activities': participating_activities},
+        total=total,
+        pages=pages,
+        current_page=page,
+        per_page=per_page,
+        next_cursor=next_cursor
+    )
 
 @data_bp.route('/export-data', methods=['GET'])
 @jwt_required()
 @handle_db_connection_error(max_retries=3, retry_delay=2)
 def export_data():
-    """导出数据列表到Excel（仅管理员可访问）"""
+    """导出数据列表（仅管理员可访问）
+
+    - format=csv：服务端游标分块读取，边查询边以分块响应输出；
+    - format=xlsx（默认）：只写模式生成文件并按 (筛选条件, 数据版本) 缓存，重复导出直接下载缓存文件；
+      行数超过 EXPORT_SYNC_MAX_ROWS（或 async=true）时转为后台任务，返回202及task_id，
+      通过 /progress/<task_id> 查询进度，完成后从 download_url 下载。
+    """
     user_id = int(get_jwt_identity())
     user = db.session.get(User, user_id)
     
@@ -308,165 +268,134 @@ def export_data():
     
     try:
         # 获取查询参数
-        upload_date = request.args.get('upload_date')
-        tmall_product_code = request.args.get('tmall_product_code')
-        product_name = request.args.get('product_name')
-        tmall_supplier_name = request.args.get('tmall_supplier_name')
+        filters = {
+            arg: request.args.get(arg)
+            for arg in ('upload_date', 'tmall_product_code', 'product_name', 'tmall_supplier_name')
+            if request.args.get(arg)
+        }
         sort_by = request.args.get('sort_by', 'upload_date')  # 默认按上传日期排序
         sort_order = request.args.get('sort_order', 'desc')   # 默认倒序
-        
-        # 构建查询
-        query = ProductDataMerge.query
-        
-        if upload_date:
-            query = query.filter(ProductDataMerge.upload_date == upload_date)
-        
-        if tmall_product_code:
-            query = query.filter(ProductDataMerge.tmall_product_code.like(f'%{tmall_product_code}%'))
-        
-        if product_name:
-            query = query.filter(ProductDataMerge.product_name.like(f'%{product_name}%'))
-        
-        if tmall_supplier_name:
-            query = query.filter(ProductDataMerge.tmall_supplier_name.like(f'%{tmall_supplier_name}%'))
-        
-        # 动态排序（与数据列表API相同的逻辑）
-        sortable_fields = {
-            'upload_date': ProductDataMerge.upload_date,
-            'tmall_product_code': ProductDataMerge.tmall_product_code,
-            'product_name': ProductDataMerge.product_name,
-            'tmall_supplier_name': ProductDataMerge.tmall_supplier_name,
-            'listing_time': ProductDataMerge.listing_time,
-            'payment_buyer_count': ProductDataMerge.payment_buyer_count,
-            'payment_product_count': ProductDataMerge.payment_product_count,
-            'payment_amount': ProductDataMerge.payment_amount,
-            'refund_amount': ProductDataMerge.refund_amount,
-            'visitor_count': ProductDataMerge.visitor_count,
-            'search_guided_visitors': ProductDataMerge.search_guided_visitors,
-            'favorite_count': ProductDataMerge.favorite_count,
-            'add_to_cart_count': ProductDataMerge.add_to_cart_count,
-            'conversion_rate': ProductDataMerge.conversion_rate,
-            'favorite_rate': ProductDataMerge.favorite_rate,
-            'cart_rate': ProductDataMerge.cart_rate,
-            'uv_value': ProductDataMerge.uv_value,
-            'real_conversion_rate': ProductDataMerge.real_conversion_rate,
-            'real_amount': ProductDataMerge.real_amount,
-            'real_buyer_count': ProductDataMerge.payment_buyer_count,
-            'real_product_count': ProductDataMerge.payment_product_count,
-            'product_cost': ProductDataMerge.product_cost,
-            'real_order_deduction': ProductDataMerge.real_order_deduction,
-            'tax_invoice': ProductDataMerge.tax_invoice,
-            'real_order_logistics_cost': ProductDataMerge.real_order_logistics_cost,
-            'planting_orders': ProductDataMerge.planting_orders,
-            'planting_amount': ProductDataMerge.planting_amount,
-            'planting_cost': ProductDataMerge.planting_cost,
-            'planting_deduction': ProductDataMerge.planting_deduction,
-            'planting_logistics_cost': ProductDataMerge.planting_logistics_cost,
-            'keyword_promotion': ProductDataMerge.keyword_promotion,
-            'sitewide_promotion': ProductDataMerge.sitewide_promotion,
-            'product_operation': ProductDataMerge.product_operation,
-            'crowd_promotion': ProductDataMerge.crowd_promotion,
-            'super_short_video': ProductDataMerge.super_short_video,
-            'multi_target_direct': ProductDataMerge.multi_target_direct,
-            'gross_profit': ProductDataMerge.gross_profit
-        }
-        
-        # 应用排序
-        if sort_by in sortable_fields:
-            sort_field = sortable_fields[sort_by]
-            if sort_order.lower() == 'asc':
-                query = query.order_by(sort_field.asc(), ProductDataMerge.id.asc())
-            else:  # 默认desc
-                query = query.order_by(sort_field.desc(), ProductDataMerge.id.desc())
-        else:
-            # 如果排序字段无效，使用默认排序
-            query = query.order_by(ProductDataMerge.upload_date.desc(), ProductDataMerge.id.desc())
-        
-        # 获取所有数据（不分页）
-        items = query.all()
-        
-        # 准备数据
-        export_data = []
-        for item in items:
-            # 直接使用数据库中存储的值
-            real_amount = format_decimal(item.real_amount)
-            conversion_rate = format_decimal(item.conversion_rate)
-            favorite_rate = format_decimal(item.favorite_rate)
-            cart_rate = format_decimal(item.cart_rate)
-            uv_value = format_decimal(item.uv_value)
-            real_conversion_rate = format_decimal(item.real_conversion_rate)
-            product_cost = format_decimal(item.product_cost)
-            real_order_deduction = format_decimal(item.real_order_deduction)
-            tax_invoice = format_decimal(item.tax_invoice)
-            real_order_logistics_cost = format_decimal(item.real_order_logistics_cost)
-            gross_profit = format_decimal(item.gross_profit)
-            
-            export_data.append({
-                'ID': item.id,
-                '上传日期': item.upload_date.strftime('%Y-%m-%d') if item.upload_date else '',
-                '天猫ID': item.tmall_product_code or '',
-                '产品名称': item.product_name or '',
-                '店铺名': item.tmall_supplier_name or '',
-                '上架时间': item.listing_time.strftime('%Y-%m-%d') if item.listing_time else '',
-                '支付买家数': item.payment_buyer_count or 0,
-                '支付件数': item.payment_product_count or 0,
-                '支付金额': format_decimal(item.payment_amount),
-                '退款金额': format_decimal(item.refund_amount),
-                '访客数': item.visitor_count or 0,
-                '自然搜索访客': item.search_guided_visitors or 0,
-                '收藏数': item.favorite_count or 0,
-                '加购数': item.add_to_cart_count or 0,
-                '转化率(%)': conversion_rate,
-                '收藏率(%)': favorite_rate,
-                '加购率(%)': cart_rate,
-                'UV价值': uv_value,
-                '真实转化率(%)': real_conversion_rate,
-                '真实金额': real_amount,
-                '真实买家数': item.payment_buyer_count or 0,
-                '真实件数': item.payment_product_count or 0,
-                '产品成本': product_cost,
-                '真实订单扣点': real_order_deduction,
-                '税票': tax_invoice,
-                '真实订单物流成本': real_order_logistics_cost,
-                '种菜订单数': format_decimal(item.planting_orders),
-                '种菜金额': format_decimal(item.planting_amount),
-                '种菜成本': format_decimal(item.planting_cost),
-                '种菜扣款': format_decimal(item.planting_deduction),
-                '种菜物流成本': format_decimal(item.planting_logistics_cost),
-                '关键词推广': format_decimal(item.keyword_promotion),
-                '全站推广': format_decimal(item.sitewide_promotion),
-                '货品运营': format_decimal(item.product_operation),
-                '人群推广': format_decimal(item.crowd_promotion),
-                '超级短视频': format_decimal(item.super_short_video),
-                '多目标直投': format_decimal(item.multi_target_direct),
-                '毛利': gross_profit
-            })
-        
-        # 创建DataFrame
-        df = pd.DataFrame(export_data)
-        
-        # 创建Excel文件
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='数据列表', index=False)
-        
-        output.seek(0)
-        
-        # 生成文件名
-        current_time = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f'数据列表_{current_time}.xlsx'
+        fmt = request.args.get('format', 'xlsx').lower()
+        run_async = request.args.get('async', 'false').lower() == 'true'
+        
+        if fmt not in EXPORT_FORMATS:
+            return jsonify({'message': f'不支持的导出格式: {fmt}'}), 400
+        
+        stmt = export_statement(filters, sort_by, sort_order)
+        chunk_size = current_app.config.get('EXPORT_CHUNK_SIZE', 2000)
+        
+        if fmt == 'csv':
+            response = Response(stream_with_context(stream_csv(stmt, chunk_size)), mimetype=EXPORT_FORMATS['csv'])
+            response.headers['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(export_download_name('csv'))}"
+            return response
+        
+        app = current_app._get_current_object()
+        key = export_file_cache.file_key(fmt, filters, sort_by, sort_order)
+        path = export_file_cache.cached_path(app, key)
+        
+        if path is None:
+            total_rows = count_export_rows(stmt)
+            if run_async or total_rows > current_app.config.get('EXPORT_SYNC_MAX_ROWS', 20000):
+                task_id = export_file_cache.start_build(app, key, stmt, total_rows, str(uuid.uuid4()))
+                return jsonify({
+                    'message': '导出任务已开始后台运行',
+                    'task_id': task_id,
+                    'total_rows': total_rows,
+                    'download_url': f'/api/export-data/files/{key}',
+                    'status': 'processing'
+                }), 202
+            path = export_file_cache.build(app, key, stmt)
         
         return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            os.path.abspath(path),
+            mimetype=EXPORT_FORMATS['xlsx'],
             as_attachment=True,
-            download_name=filename
+            download_name=export_download_name('xlsx')
         )
         
     except Exception as e:
         current_app.logger.error(f'导出数据时出错: {str(e)}')
         return jsonify({'message': f'导出失败: {str(e)}'}), 500
 
+@data_bp.route('/export-data/files/<key>', methods=['GET'])
+@jwt_required()
+def download_export_file(key):
+    """下载后台导出任务生成的文件（仅管理员可访问）"""
+    user_id = int(get_jwt_identity())
+    user = db.session.get(User, user_id)
+    
+    if user.role != 'admin':
+        return jsonify({'message': '权限不足'}), 403
+    
+    path = export_file_cache.cached_path(current_app._get_current_object(), key)
+    if path is None:
+        return jsonify({'message': '导出文件不存在或已过期，请重新导出'}), 404
+    
+    return send_file(
+        os.path.abspath(path),
+        mimetype=EXPORT_FORMATS['xlsx'],
+        as_attachment=True,
+        download_name=export_download_name('xlsx')
+    )
+
+# merge数据列表返回的列
+MERGE_DATA_PROJECTION = Projection(ProductDataMerge, [
+    ('id', 'id', 'raw'),
+    ('product_data_id', 'product_data_id', 'raw'),
+    ('platform', 'platform', 'raw'),
+    # 基础字段
+    ('product_name', 'product_name', 'raw'),
+    ('tmall_product_code', 'tmall_product_code', 'raw'),
+    ('tmall_supplier_name', 'tmall_supplier_name', 'raw'),
+    # 流量相关字段
+    ('visitor_count', 'visitor_count', 'raw'),
+    ('page_views', 'page_views', 'raw'),
+    ('search_guided_visitors', 'search_guided_visitors', 'raw'),
+    # 用户行为字段
+    ('add_to_cart_count', 'add_to_cart_count', 'raw'),
+    ('favorite_count', 'favorite_count', 'raw'),
+    # 支付相关字段
+    ('payment_amount', 'payment_amount', 'raw'),
+    ('payment_product_count', 'payment_product_count', 'raw'),
+    ('payment_buyer_count', 'payment_buyer_count', 'raw'),
+    ('search_guided_payment_buyers', 'search_guided_payment_buyers', 'raw'),
+    # 价值和转化指标
+    ('unit_price', 'unit_price', 'raw'),
+    ('visitor_average_value', 'visitor_average_value', 'raw'),
+    ('payment_conversion_rate', 'payment_conversion_rate', 'raw'),
+    ('order_conversion_rate', 'order_conversion_rate', 'raw'),
+    # 页面行为指标
+    ('avg_stay_time', 'avg_stay_time', 'raw'),
+    ('detail_page_bounce_rate', 'detail_page_bounce_rate', 'raw'),
+    ('order_payment_conversion_rate', 'order_payment_conversion_rate', 'raw'),
+    ('search_payment_conversion_rate', 'search_payment_conversion_rate', 'raw'),
+    # 退款相关字段
+    ('refund_amount', 'refund_amount', 'raw'),
+    ('refund_ratio', 'refund_ratio', 'raw'),
+    # 来自product_list的字段
+    ('product_list_id', 'product_list_id', 'raw'),
+    ('product_list_name', 'product_list_name', 'raw'),
+    ('listing_time', 'listing_time', 'iso'),
+    ('product_list_created_at', 'product_list_created_at', 'iso'),
+    ('product_list_updated_at', 'product_list_updated_at', 'iso'),
+    ('product_list_uploaded_by', 'product_list_uploaded_by', 'raw'),
+    # 推广费用字段
+    ('sitewide_promotion', 'sitewide_promotion', 'raw'),
+    ('keyword_promotion', 'keyword_promotion', 'raw'),
+    ('product_operation', 'product_operation', 'raw'),
+    ('crowd_promotion', 'crowd_promotion', 'raw'),
+    ('super_short_video', 'super_short_video', 'raw'),
+    ('multi_target_direct', 'multi_target_direct', 'raw'),
+    ('promotion_summary_updated_at', 'promotion_summary_updated_at', 'iso'),
+    # 匹配信息
+    ('is_matched', 'is_matched', 'raw'),
+    # 元数据
+    ('filename', 'filename', 'raw'),
+    ('upload_date', 'upload_date', 'iso'),
+    ('uploaded_by', 'uploaded_by', 'raw'),
+    ('created_at', 'created_at', 'iso'),
+])
+
 @data_bp.route('/merge-data', methods=['GET'])
 @jwt_required()
 @handle_db_connection_error(max_retries=3, retry_delay=2)
@@ -498,87 +427,47 @@ def get_merge_data():
     # 按创建时间倒序排列
     query = query.order_by(ProductDataMerge.created_at.desc())
     
-    pagination = query.paginate(
+    pagination = MERGE_DATA_PROJECTION.apply(query).paginate(
         page=page, per_page=per_page, error_out=False
     )
     
-    data = []
-    for item in pagination.items:
-        data.append({
-            'id': item.id,
-            'product_data_id': item.product_data_id,
-            'platform': item.platform,
-            
-            # 基础字段
-            'product_name': item.product_name,
-            'tmall_product_code': item.tmall_product_code,
-            'tmall_supplier_name': item.tmall_supplier_name,
-            
-            # 流量相关字段
-            'visitor_count': item.visitor_count,
-            'page_views': item.page_views,
-            'search_guided_visitors': item.search_guided_visitors,
-            
-            # 用户行为字段
-            'add_to_cart_count': item.add_to_cart_count,
-            'favorite_count': item.favorite_count,
-            
-            # 支付相关字段
-            'payment_amount': item.payment_amount,
-            'payment_product_count': item.payment_product_count,
-            'payment_buyer_count': item.payment_buyer_count,
-            'search_guided_payment_buyers': item.search_guided_payment_buyers,
-            
-            # 价值和转化指标
-            'unit_price': item.unit_price,
-            'visitor_average_value': item.visitor_average_value,
-            'payment_conversion_rate': item.payment_conversion_rate,
-            'order_conversion_rate': item.order_conversion_rate,
-            
-            # 页面行为指标
-            'avg_stay_time': item.avg_stay_time,
-            'detail_page_bounce_rate': item.detail_page_bounce_rate,
-            'order_payment_conversion_rate': item.order_payment_conversion_rate,
-            'search_payment_conversion_rate': item.search_payment_conversion_rate,
-            
-            # 退款相关字段
-            'refund_amount': item.refund_amount,
-            'refund_ratio': item.refund_ratio,
-            
-            # 来自product_list的字段
-            'product_list_id': item.product_list_id,
-            'product_list_name': item.product_list_name,
-            'listing_time': item.listing_time.isoformat() if item.listing_time else None,
-            'product_list_created_at': item.product_list_created_at.isoformat() if item.product_list_created_at else None,
-            'product_list_updated_at': item.product_list_updated_at.isoformat() if item.product_list_updated_at else None,
-            'product_list_uploaded_by': item.product_list_uploaded_by,
-            
-            # 推广费用字段
-            'sitewide_promotion': item.sitewide_promotion,
-            'keyword_promotion': item.keyword_promotion,
-            'product_operation': item.product_operation,
-            'crowd_promotion': item.crowd_promotion,
-            'super_short_video': item.super_short_video,
-            'multi_target_direct': item.multi_target_direct,
-            'promotion_summary_updated_at': item.promotion_summary_updated_at.isoformat() if item.promotion_summary_updated_at else None,
-            
-            # 匹配信息
-            'is_matched': item.is_matched,
-            
-            # 元数据
-            'filename': item.filename,
-            'upload_date': item.upload_date.isoformat() if item.upload_date else None,
-            'uploaded_by': item.uploaded_by,
-            'created_at': item.created_at.isoformat()
-        })
-    
-    return jsonify({
-        'data': data,
-        'total': pagination.total,
-        'pages': pagination.pages,
-        'current_page': pagination.page,
-        'per_page': pagination.per_page
-    })
+    return MERGE_DATA_PROJECTION.response(
+        pagination.items,
+        total=pagination.total,
+        pages=pagination.pages,
+        current_page=pagination.page,
+        per_page=pagination.per_page
+    )
+
+# 主体报表列表返回的列
+SUBJECT_REPORT_PROJECTION = Projection(SubjectReport, [
+    ('id', 'id', 'raw'),
+    ('platform', 'platform', 'raw'),
+    ('report_date', 'report_date', 'iso'),
+    # CSV实际字段映射
+    ('date_field', 'date_field', 'iso'),
+    ('scene_id', 'scene_id', 'raw'),
+    ('scene_name', 'scene_name', 'raw'),
+    ('original_scene_id', 'original_scene_id', 'raw'),
+    ('original_scene_name', 'original_scene_name', 'raw'),
+    ('plan_id', 'plan_id', 'raw'),
+    ('plan_name', 'plan_name', 'raw'),
+    ('subject_id', 'subject_id', 'raw'),
+    ('subject_type', 'subject_type', 'raw'),
+    ('subject_name', 'subject_name', 'raw'),
+    # 展现和点击数据
+    ('impressions', 'impressions', 'raw'),
+    ('clicks', 'clicks', 'raw'),
+    ('cost', 'cost', 'raw'),
+    ('ctr', 'ctr', 'raw'),
+    ('avg_cpc', 'avg_cpc', 'raw'),
+    ('cpm', 'cpm', 'raw'),
+    # 元数据
+    ('filename', 'filename', 'raw'),
+    ('upload_date', 'upload_date', 'iso'),
+    ('uploaded_by', 'uploaded_by', 'raw'),
+    ('created_at', 'created_at', 'iso'),
+])
 
 @data_bp.route('/subject-report', methods=['GET'])
 @jwt_required()
@@ -615,54 +504,95 @@ def get_subject_report():
     # 按创建时间倒序排列
     query = query.order_by(SubjectReport.created_at.desc())
     
-    pagination = query.paginate(
+    pagination = SUBJECT_REPORT_PROJECTION.apply(query).paginate(
         page=page, per_page=per_page, error_out=False
     )
     
+    return SUBJECT_REPORT_PROJECTION.response(
+        pagination.items,
+        total=pagination.total,
+        pages=pagination.pages,
+        current_page=pagination.page,
+        per_page=pagination.per_page
+    )
+
+def _summarize_stats_rows(rows, key_fields, with_promotion_ratio=True):
+    """把日汇总行整理为看板明细（按销售金额倒序）并计算合计，返回 (明细列表, 合计)"""
     data = []
-    for item in pagination.items:
-        data.append({
-            'id': item.id,
-            'platform': item.platform,
-            'report_date': item.report_date.isoformat() if item.report_date else None,
-            
-            # CSV实际字段映射
-            'date_field': item.date_field.isoformat() if item.date_field else None,
-            'scene_id': item.scene_id,
-            'scene_name': item.scene_name,
-            'original_scene_id': item.original_scene_id,
-            'original_scene_name': item.original_scene_name,
-            'plan_id': item.plan_id,
-            'plan_name': item.plan_name,
-            'subject_id': item.subject_id,
-            'subject_type': item.subject_type,
-            'subject_name': item.subject_name,
-            
-            # 展现和点击数据
-            'impressions': item.impressions,
-            'clicks': item.clicks,
-            'cost': item.cost,
-            'ctr': item.ctr,
-            'avg_cpc': item.avg_cpc,
-            'cpm': item.cpm,
-            
-            # 元数据
-            'filename': item.filename,
-            'upload_date': item.upload_date.isoformat() if item.upload_date else None,
-            'uploaded_by': item.uploaded_by,
-            'created_at': item.created_at.isoformat()
+    total_amount = 0
+    total_quantity = 0
+    total_records = 0
+    total_real_amount = 0
+
+    for row in rows:
+        amount = float(row.total_amount) if row.total_amount else 0
+        quantity = int(row.total_quantity) if row.total_quantity else 0
+        visitor_count = int(row.total_visitor_count) if row.total_visitor_count else 0
+        payment_buyer_count = int(row.total_payment_buyer_count) if row.total_payment_buyer_count else 0
+        planting_orders = int(row.total_planting_orders) if row.total_planting_orders else 0
+        planting_amount = float(row.total_planting_amount) if row.total_planting_amount else 0
+        refund_amount = float(row.total_refund_amount) if row.total_refund_amount else 0
+        promotions = {
+            name: float(getattr(row, f'total_{name}') or 0)
+            for name in ('sitewide_promotion', 'keyword_promotion', 'product_operation',
+                         'crowd_promotion', 'super_short_video', 'multi_target_direct')
+        }
+
+        # 计算真实销售金额 = 销售金额 - 退款金额 - 种菜金额
+        real_amount = amount - refund_amount - planting_amount
+
+        # 计算客单价（销售金额/销售件数）
+        unit_price = amount / quantity if quantity > 0 else 0
+
+        # 计算支付转化率（payment_buyer_count/visitor_count）
+        payment_conversion_rate = (payment_buyer_count / visitor_count * 100) if visitor_count > 0 else 0
+
+        # 计算推广总金额
+        total_promotion = sum(promotions.values())
+
+        item = {field: getattr(row, field) for field in key_fields}
+        item.update({
+            'total_amount': amount,
+            'real_amount': round(real_amount, 2),
+            'total_quantity': quantity,
+            'unit_price': round(unit_price, 2),
+            'visitor_count': visitor_count,
+            'payment_buyer_count': payment_buyer_count,
+            'payment_conversion_rate': round(payment_conversion_rate, 2),
+            'planting_orders': planting_orders,
+            'planting_amount': round(planting_amount, 2),
+            'refund_amount': round(refund_amount, 2),
+            **{name: round(value, 2) for name, value in promotions.items()},
+            'total_promotion': round(total_promotion, 2),
+            'record_count': row.record_count
         })
-    
-    return jsonify({
-        'data': data,
-        'total': pagination.total,
-        'pages': pagination.pages,
-        'current_page': pagination.page,
-        'per_page': pagination.per_page
-    })
+        if with_promotion_ratio:
+            # 计算推广占比（推广总金额/真实销售金额）
+            item['promotion_ratio'] = round((total_promotion / real_amount * 100) if real_amount > 0 else 0, 2)
+        data.append(item)
+
+        total_amount += amount
+        total_real_amount += real_amount
+        total_quantity += quantity
+        total_records += row.record_count
+
+    # 按销售金额排序
+    data.sort(key=lambda x: x['total_amount'], reverse=True)
+
+    # 计算总体客单价
+    overall_unit_price = total_amount / total_quantity if total_quantity > 0 else 0
+
+    return data, {
+        'total_amount': round(total_amount, 2),
+        'total_real_amount': round(total_real_amount, 2),
+        'total_quantity': total_quantity,
+        'overall_unit_price': round(overall_unit_price, 2),
+        'total_records': total_records
+    }
 
 @data_bp.route('/stats', methods=['GET'])
 @jwt_required()
+@versioned_view(default_range=yesterday_range)
 def get_stats():
     """获取门店销售统计信息（支持日期区间查询）"""
     user_id = int(get_jwt_identity())
@@ -688,114 +618,16 @@ def get_stats():
                 
         else:
             # 默认使用昨天的数据
-            from datetime import timedelta
-            yesterday = datetime.now().date() - timedelta(days=1)
-            start_date = yesterday
-            end_date = yesterday
-        
-        # 按门店统计销售数据
-        store_stats = db.session.query(
-            ProductDataMerge.tmall_supplier_name.label('store_name'),
-            db.func.sum(ProductDataMerge.payment_amount).label('total_amount'),
-            db.func.sum(ProductDataMerge.payment_product_count).label('total_quantity'),
-            db.func.sum(ProductDataMerge.visitor_count).label('total_visitor_count'),
-            db.func.sum(ProductDataMerge.payment_buyer_count).label('total_payment_buyer_count'),
-            db.func.sum(ProductDataMerge.planting_orders).label('total_planting_orders'),
-            db.func.sum(ProductDataMerge.planting_amount).label('total_planting_amount'),
-            db.func.sum(ProductDataMerge.refund_amount).label('total_refund_amount'),
-            db.func.sum(ProductDataMerge.sitewide_promotion).label('total_sitewide_promotion'),
-            db.func.sum(ProductDataMerge.keyword_promotion).label('total_keyword_promotion'),
-            db.func.sum(ProductDataMerge.product_operation).label('total_product_operation'),
-            db.func.sum(ProductDataMerge.crowd_promotion).label('total_crowd_promotion'),
-            db.func.sum(ProductDataMerge.super_short_video).label('total_super_short_video'),
-            db.func.sum(ProductDataMerge.multi_target_direct).label('total_multi_target_direct'),
-            db.func.count(ProductDataMerge.id).label('record_count')
-        ).filter(
-            ProductDataMerge.tmall_supplier_name.isnot(None),
-            ProductDataMerge.upload_date >= start_date,
-            ProductDataMerge.upload_date <= end_date
-        ).group_by(ProductDataMerge.tmall_supplier_name).all()
+            start_date, end_date = yesterday_range()
         
-        # 计算汇总数据
-        total_amount = 0
-        total_quantity = 0
-        total_records = 0
-        total_real_amount = 0
-        store_data = []
-        
-        for store in store_stats:
-            store_amount = float(store.total_amount) if store.total_amount else 0
-            store_quantity = int(store.total_quantity) if store.total_quantity else 0
-            store_visitor_count = int(store.total_visitor_count) if store.total_visitor_count else 0
-            store_payment_buyer_count = int(store.total_payment_buyer_count) if store.total_payment_buyer_count else 0
-            store_planting_orders = int(store.total_planting_orders) if store.total_planting_orders else 0
-            store_planting_amount = float(store.total_planting_amount) if store.total_planting_amount else 0
-            store_refund_amount = float(store.total_refund_amount) if store.total_refund_amount else 0
-            store_sitewide_promotion = float(store.total_sitewide_promotion) if store.total_sitewide_promotion else 0
-            store_keyword_promotion = float(store.total_keyword_promotion) if store.total_keyword_promotion else 0
-            store_product_operation = float(store.total_product_operation) if store.total_product_operation else 0
-            store_crowd_promotion = float(store.total_crowd_promotion) if store.total_crowd_promotion else 0
-            store_super_short_video = float(store.total_super_short_video) if store.total_super_short_video else 0
-            store_multi_target_direct = float(store.total_multi_target_direct) if store.total_multi_target_direct else 0
-            
-            # 计算真实销售金额 = 销售金额 - 退款金额 - 种菜金额
-            store_real_amount = store_amount - store_refund_amount - store_planting_amount
-            
-            # 计算客单价（销售金额/销售件数）
-            unit_price = store_amount / store_quantity if store_quantity > 0 else 0
-            
-            # 计算支付转化率（payment_buyer_count/visitor_count）
-            payment_conversion_rate = (store_payment_buyer_count / store_visitor_count * 100) if store_visitor_count > 0 else 0
-            
-            # 计算推广总金额
-            total_promotion = (store_sitewide_promotion + store_keyword_promotion + store_product_operation + 
-                             store_crowd_promotion + store_super_short_video + store_multi_target_direct)
-            
-            # 计算推广占比（推广总金额/真实销售金额）
-            promotion_ratio = (total_promotion / store_real_amount * 100) if store_real_amount > 0 else 0
-            
-            store_data.append({
-                'store_name': store.store_name,
-                'total_amount': store_amount,
-                'real_amount': round(store_real_amount, 2),
-                'total_quantity': store_quantity,
-                'unit_price': round(unit_price, 2),
-                'visitor_count': store_visitor_count,
-                'payment_buyer_count': store_payment_buyer_count,
-                'payment_conversion_rate': round(payment_conversion_rate, 2),
-                'planting_orders': store_planting_orders,
-                'planting_amount': round(store_planting_amount, 2),
-                'refund_amount': round(store_refund_amount, 2),
-                'sitewide_promotion': round(store_sitewide_promotion, 2),
-                'keyword_promotion': round(store_keyword_promotion, 2),
-                'product_operation': round(store_product_operation, 2),
-                'crowd_promotion': round(store_crowd_promotion, 2),
-                'super_short_video': round(store_super_short_video, 2),
-                'multi_target_direct': round(store_multi_target_direct, 2),
-                'total_promotion': round(total_promotion, 2),
-                'promotion_ratio': round(promotion_ratio, 2),
-                'record_count': store.record_count
-            })
-            
-            total_amount += store_amount
-            total_real_amount += store_real_amount
-            total_quantity += store_quantity
-            total_records += store.record_count
-        
-        # 按销售金额排序
-        store_data.sort(key=lambda x: x['total_amount'], reverse=True)
-        
-        # 计算总体客单价
-        overall_unit_price = total_amount / total_quantity if total_quantity > 0 else 0
+        # 按门店统计销售数据（读取门店日汇总表）
+        store_stats = daily_rollup.query('store', start_date, end_date)
+        store_data, totals = _summarize_stats_rows(store_stats, ['store_name'])
         
         return jsonify({
             'start_date': start_date.isoformat(),
             'end_date': end_date.isoformat(),
-            'total_amount': round(total_amount, 2),
-            'total_real_amount': round(total_real_amount, 2),
-            'total_quantity': total_quantity,
-            'overall_unit_price': round(overall_unit_price, 2),
-            'total_records': total_records,
+            **totals,
             'store_count': len(store_data),
             'store_stats': store_data
         })
@@ -808,6 +640,7 @@ def get_stats():
 
 @data_bp.route('/stats/operator', methods=['GET'])
 @jwt_required()
+@versioned_view(default_range=yesterday_range)
 def get_operator_stats():
     """获取负责人员销售统计信息（支持日期区间查询）"""
     user_id = int(get_jwt_identity())
@@ -833,118 +666,16 @@ def get_operator_stats():
                 
         else:
             # 默认使用昨天的数据
-            from datetime import timedelta
-            yesterday = datetime.now().date() - timedelta(days=1)
-            start_date = yesterday
-            end_date = yesterday
-        
-        # 按负责人员统计销售数据
-        operator_stats = db.session.query(
-            ProductDataMerge.platform.label('team'),
-            db.func.coalesce(ProductDataMerge.product_list_operator, '未分配').label('operator'),
-            db.func.sum(ProductDataMerge.payment_amount).label('total_amount'),
-            db.func.sum(ProductDataMerge.payment_product_count).label('total_quantity'),
-            db.func.sum(ProductDataMerge.visitor_count).label('total_visitor_count'),
-            db.func.sum(ProductDataMerge.payment_buyer_count).label('total_payment_buyer_count'),
-            db.func.sum(ProductDataMerge.planting_orders).label('total_planting_orders'),
-            db.func.sum(ProductDataMerge.planting_amount).label('total_planting_amount'),
-            db.func.sum(ProductDataMerge.refund_amount).label('total_refund_amount'),
-            db.func.sum(ProductDataMerge.sitewide_promotion).label('total_sitewide_promotion'),
-            db.func.sum(ProductDataMerge.keyword_promotion).label('total_keyword_promotion'),
-            db.func.sum(ProductDataMerge.product_operation).label('total_product_operation'),
-            db.func.sum(ProductDataMerge.crowd_promotion).label('total_crowd_promotion'),
-            db.func.sum(ProductDataMerge.super_short_video).label('total_super_short_video'),
-            db.func.sum(ProductDataMerge.multi_target_direct).label('total_multi_target_direct'),
-            db.func.count(ProductDataMerge.id).label('record_count')
-        ).filter(
-            ProductDataMerge.upload_date >= start_date,
-            ProductDataMerge.upload_date <= end_date
-        ).group_by(
-            ProductDataMerge.platform,
-            db.func.coalesce(ProductDataMerge.product_list_operator, '未分配')
-        ).all()
-        
-        # 计算汇总数据
-        total_amount = 0
-        total_quantity = 0
-        total_records = 0
-        total_real_amount = 0
-        operator_data = []
-        
-        for operator in operator_stats:
-            operator_amount = float(operator.total_amount) if operator.total_amount else 0
-            operator_quantity = int(operator.total_quantity) if operator.total_quantity else 0
-            operator_visitor_count = int(operator.total_visitor_count) if operator.total_visitor_count else 0
-            operator_payment_buyer_count = int(operator.total_payment_buyer_count) if operator.total_payment_buyer_count else 0
-            operator_planting_orders = int(operator.total_planting_orders) if operator.total_planting_orders else 0
-            operator_planting_amount = float(operator.total_planting_amount) if operator.total_planting_amount else 0
-            operator_refund_amount = float(operator.total_refund_amount) if operator.total_refund_amount else 0
-            operator_sitewide_promotion = float(operator.total_sitewide_promotion) if operator.total_sitewide_promotion else 0
-            operator_keyword_promotion = float(operator.total_keyword_promotion) if operator.total_keyword_promotion else 0
-            operator_product_operation = float(operator.total_product_operation) if operator.total_product_operation else 0
-            operator_crowd_promotion = float(operator.total_crowd_promotion) if operator.total_crowd_promotion else 0
-            operator_super_short_video = float(operator.total_super_short_video) if operator.total_super_short_video else 0
-            operator_multi_target_direct = float(operator.total_multi_target_direct) if operator.total_multi_target_direct else 0
-            
-            # 计算真实销售金额 = 销售金额 - 退款金额 - 种菜金额
-            operator_real_amount = operator_amount - operator_refund_amount - operator_planting_amount
-            
-            # 计算客单价（销售金额/销售件数）
-            unit_price = operator_amount / operator_quantity if operator_quantity > 0 else 0
-            
-            # 计算支付转化率（payment_buyer_count/visitor_count）
-            payment_conversion_rate = (operator_payment_buyer_count / operator_visitor_count * 100) if operator_visitor_count > 0 else 0
-            
-            # 计算推广总金额
-            total_promotion = (operator_sitewide_promotion + operator_keyword_promotion + operator_product_operation + 
-                             operator_crowd_promotion + operator_super_short_video + operator_multi_target_direct)
-            
-            # 计算推广占比（推广总金额/真实销售金额）
-            promotion_ratio = (total_promotion / operator_real_amount * 100) if operator_real_amount > 0 else 0
-            
-            operator_data.append({
-                'team': operator.team,
-                'operator': operator.operator,
-                'total_amount': operator_amount,
-                'real_amount': round(operator_real_amount, 2),
-                'total_quantity': operator_quantity,
-                'unit_price': round(unit_price, 2),
-                'visitor_count': operator_visitor_count,
-                'payment_buyer_count': operator_payment_buyer_count,
-                'payment_conversion_rate': round(payment_conversion_rate, 2),
-                'planting_orders': operator_planting_orders,
-                'planting_amount': round(operator_planting_amount, 2),
-                'refund_amount': round(operator_refund_amount, 2),
-                'sitewide_promotion': round(operator_sitewide_promotion, 2),
-                'keyword_promotion': round(operator_keyword_promotion, 2),
-                'product_operation': round(operator_product_operation, 2),
-                'crowd_promotion': round(operator_crowd_promotion, 2),
-                'super_short_video': round(operator_super_short_video, 2),
-                'multi_target_direct': round(operator_multi_target_direct, 2),
-                'total_promotion': round(total_promotion, 2),
-                'promotion_ratio': round(promotion_ratio, 2),
-                'record_count': operator.record_count
-            })
-            
-            total_amount += operator_amount
-            total_real_amount += operator_real_amount
-            total_quantity += operator_quantity
-            total_records += operator.record_count
-        
-        # 按销售金额排序
-        operator_data.sort(key=lambda x: x['total_amount'], reverse=True)
+            start_date, end_date = yesterday_range()
         
-        # 计算总体客单价
-        overall_unit_price = total_amount / total_quantity if total_quantity > 0 else 0
+        # 按负责人员统计销售数据（读取负责人员日汇总表）
+        operator_stats = daily_rollup.query('operator', start_date, end_date)
+        operator_data, totals = _summarize_stats_rows(operator_stats, ['team', 'operator'])
         
         return jsonify({
             'start_date': start_date.isoformat(),
             'end_date': end_date.isoformat(),
-            'total_amount': round(total_amount, 2),
-            'total_real_amount': round(total_real_amount, 2),
-            'total_quantity': total_quantity,
-            'overall_unit_price': round(overall_unit_price, 2),
-            'total_records': total_records,
+            **totals,
             'operator_count': len(operator_data),
             'operator_stats': operator_data
         })
@@ -957,6 +688,7 @@ def get_operator_stats():
 
 @data_bp.route('/stats/category', methods=['GET'])
 @jwt_required()
+@versioned_view(default_range=yesterday_range)
 def get_category_stats():
     """获取类目业绩分布统计信息（支持日期区间查询）"""
     user_id = int(get_jwt_identity())
@@ -982,111 +714,16 @@ def get_category_stats():
                 
         else:
             # 默认使用昨天的数据
-            from datetime import timedelta
-            yesterday = datetime.now().date() - timedelta(days=1)
-            start_date = yesterday
-            end_date = yesterday
-        
-        # 按类目统计销售数据
-        category_stats = db.session.query(
-            db.func.coalesce(ProductDataMerge.product_list_category, '未分类').label('category'),
-            db.func.sum(ProductDataMerge.payment_amount).label('total_amount'),
-            db.func.sum(ProductDataMerge.payment_product_count).label('total_quantity'),
-            db.func.sum(ProductDataMerge.visitor_count).label('total_visitor_count'),
-            db.func.sum(ProductDataMerge.payment_buyer_count).label('total_payment_buyer_count'),
-            db.func.sum(ProductDataMerge.planting_orders).label('total_planting_orders'),
-            db.func.sum(ProductDataMerge.planting_amount).label('total_planting_amount'),
-            db.func.sum(ProductDataMerge.refund_amount).label('total_refund_amount'),
-            db.func.sum(ProductDataMerge.sitewide_promotion).label('total_sitewide_promotion'),
-            db.func.sum(ProductDataMerge.keyword_promotion).label('total_keyword_promotion'),
-            db.func.sum(ProductDataMerge.product_operation).label('total_product_operation'),
-            db.func.sum(ProductDataMerge.crowd_promotion).label('total_crowd_promotion'),
-            db.func.sum(ProductDataMerge.super_short_video).label('total_super_short_video'),
-            db.func.sum(ProductDataMerge.multi_target_direct).label('total_multi_target_direct'),
-            db.func.count(ProductDataMerge.id).label('record_count')
-        ).filter(
-            ProductDataMerge.upload_date >= start_date,
-            ProductDataMerge.upload_date <= end_date
-        ).group_by(
-            db.func.coalesce(ProductDataMerge.product_list_category, '未分类')
-        ).all()
-        
-        # 计算汇总数据
-        total_amount = 0
-        total_quantity = 0
-        total_records = 0
-        total_real_amount = 0
-        category_data = []
-        
-        for category in category_stats:
-            category_amount = float(category.total_amount) if category.total_amount else 0
-            category_quantity = int(category.total_quantity) if category.total_quantity else 0
-            category_visitor_count = int(category.total_visitor_count) if category.total_visitor_count else 0
-            category_payment_buyer_count = int(category.total_payment_buyer_count) if category.total_payment_buyer_count else 0
-            category_planting_orders = int(category.total_planting_orders) if category.total_planting_orders else 0
-            category_planting_amount = float(category.total_planting_amount) if category.total_planting_amount else 0
-            category_refund_amount = float(category.total_refund_amount) if category.total_refund_amount else 0
-            category_sitewide_promotion = float(category.total_sitewide_promotion) if category.total_sitewide_promotion else 0
-            category_keyword_promotion = float(category.total_keyword_promotion) if category.total_keyword_promotion else 0
-            category_product_operation = float(category.total_product_operation) if category.total_product_operation else 0
-            category_crowd_promotion = float(category.total_crowd_promotion) if category.total_crowd_promotion else 0
-            category_super_short_video = float(category.total_super_short_video) if category.total_super_short_video else 0
-            category_multi_target_direct = float(category.total_multi_target_direct) if category.total_multi_target_direct else 0
-            
-            # 计算真实销售金额 = 销售金额 - 退款金额 - 种菜金额
-            category_real_amount = category_amount - category_refund_amount - category_planting_amount
-            
-            # 计算客单价（销售金额/销售件数）
-            unit_price = category_amount / category_quantity if category_quantity > 0 else 0
-            
-            # 计算支付转化率（payment_buyer_count/visitor_count）
-            payment_conversion_rate = (category_payment_buyer_count / category_visitor_count * 100) if category_visitor_count > 0 else 0
-            
-            # 计算推广总金额
-            total_promotion = (category_sitewide_promotion + category_keyword_promotion + category_product_operation + 
-                             category_crowd_promotion + category_super_short_video + category_multi_target_direct)
-            
-            category_data.append({
-                'category': category.category,
-                'total_amount': category_amount,
-                'real_amount': round(category_real_amount, 2),
-                'total_quantity': category_quantity,
-                'unit_price': round(unit_price, 2),
-                'visitor_count': category_visitor_count,
-                'payment_buyer_count': category_payment_buyer_count,
-                'payment_conversion_rate': round(payment_conversion_rate, 2),
-                'planting_orders': category_planting_orders,
-                'planting_amount': round(category_planting_amount, 2),
-                'refund_amount': round(category_refund_amount, 2),
-                'sitewide_promotion': round(category_sitewide_promotion, 2),
-                'keyword_promotion': round(category_keyword_promotion, 2),
-                'product_operation': round(category_product_operation, 2),
-                'crowd_promotion': round(category_crowd_promotion, 2),
-                'super_short_video': round(category_super_short_video, 2),
-                'multi_target_direct': round(category_multi_target_direct, 2),
-                'total_promotion': round(total_promotion, 2),
-                'record_count': category.record_count
-            })
-            
-            total_amount += category_amount
-            total_real_amount += category_real_amount
-            total_quantity += category_quantity
-            total_records += category.record_count
-        
-        # 按销售金额排序
-        category_data.sort(key=lambda x: x['total_amount'], reverse=True)
+            start_date, end_date = yesterday_range()
         
-        # 计算总体客单价
-        overall_unit_price = total_amount / total_quantity if total_quantity > 0 else 0
+        # 按类目统计销售数据（读取类目日汇总表）
+        category_stats = daily_rollup.query('category', start_date, end_date)
+        category_data, totals = _summarize_stats_rows(category_stats, ['category'], with_promotion_ratio=False)
         
         return jsonify({
             'start_date': start_date.isoformat(),
             'end_date': end_date.isoformat(),
-            'total_amount': round(total_amount, 2),
-            'total_real_amount': round(total_real_amount, 2),
-            'total_quantity': total_quantity,
-            'overall_unit_price': round(overall_unit_price, 2),
-            'total_records': total_records,
+            **totals,
             'category_count': len(category_data),
             'category_stats': category_data
         })
@@ -1097,6 +734,54 @@ def get_category_stats():
         current_app.logger.error(f'获取类目业绩分布统计数据时出错: {str(e)}')
         return jsonify({'message': f'获取类目业绩分布统计数据失败: {str(e)}'}), 500
 
+@data_bp.route('/stats/dashboard', methods=['GET'])
+@jwt_required()
+@versioned_view(default_range=yesterday_range)
+def get_dashboard_stats():
+    """一次返回门店/负责人员/类目三个看板（支持日期区间查询）"""
+    user_id = int(get_jwt_identity())
+    user = db.session.get(User, user_id)
+    
+    # 获取日期参数
+    start_date_param = request.args.get('start_date')
+    end_date_param = request.args.get('end_date')
+    
+    try:
+        if start_date_param and end_date_param:
+            start_date = datetime.strptime(start_date_param, '%Y-%m-%d').date()
+            end_date = datetime.strptime(end_date_param, '%Y-%m-%d').date()
+            
+            if start_date > end_date:
+                return jsonify({'message': '开始日期不能晚于结束日期'}), 400
+        else:
+            # 默认使用昨天的数据
+            start_date, end_date = yesterday_range()
+        
+        # 三个看板的日汇总在一条UNION ALL语句中读取
+        panels = daily_rollup.query_panels(start_date, end_date)
+        
+        result = {'start_date': start_date.isoformat(), 'end_date': end_date.isoformat()}
+        for panel, key_fields in (('store', ['store_name']), ('operator', ['team', 'operator']), ('category', ['category'])):
+            panel_data, totals = _summarize_stats_rows(
+                panels[panel], key_fields, with_promotion_ratio=panel != 'category'
+            )
+            # 各看板结构与单独的统计接口一致
+            result[panel] = {
+                'start_date': result['start_date'],
+                'end_date': result['end_date'],
+                **totals,
+                f'{panel}_count': len(panel_data),
+                f'{panel}_stats': panel_data
+            }
+        
+        return jsonify(result)
+        
+    except ValueError:
+        return jsonify({'message': '日期格式错误，请使用YYYY-MM-DD格式'}), 400
+    except Exception as e:
+        current_app.logger.error(f'获取看板统计数据时出错: {str(e)}')
+        return jsonify({'message': f'获取看板统计数据失败: {str(e)}'}), 500
+
 @data_bp.route('/platforms', methods=['GET'])
 @jwt_required()
 def get_platforms():
@@ -1118,8 +803,38 @@ def get_upload_dates():
     dates = db.session.query(ProductData.upload_date).distinct().order_by(ProductData.upload_date.desc()).all()
     return jsonify([d[0].isoformat() for d in dates if d[0]])
 
+@data_bp.route('/search/suggest', methods=['GET'])
+@jwt_required()
+def get_search_suggestions():
+    """筛选框联想建议：返回字段中包含关键词的取值，前缀匹配优先"""
+    field = request.args.get('field', '')
+    q = request.args.get('q', '').strip()
+    limit = min(request.args.get('limit', 10, type=int), 50)
+
+    if field not in SEARCH_FIELDS:
+        return jsonify({'message': f'不支持的搜索字段: {field}'}), 400
+    if not q:
+        return jsonify({'field': field, 'suggestions': []})
+
+    try:
+        return jsonify({'field': field, 'suggestions': search_index.suggest(field, q, max(limit, 1))})
+    except Exception as e:
+        current_app.logger.error(f"获取搜索建议失败: {str(e)}")
+        return jsonify({'message': f'获取搜索建议失败: {str(e)}'}), 500
+
+# 商品趋势返回的数值字段
+TREND_FIELDS = [
+    'search_guided_visitors', 'add_to_cart_count', 'real_amount', 'payment_buyer_count', 'real_conversion_rate',
+    'visitor_count', 'page_views', 'favorite_count', 'payment_amount', 'payment_product_count',
+    'unit_price', 'visitor_average_value', 'payment_conversion_rate', 'order_conversion_rate',
+    'refund_amount', 'refund_ratio', 'conversion_rate', 'favorite_rate', 'cart_rate', 'uv_value',
+    'product_cost', 'gross_profit', 'sitewide_promotion', 'keyword_promotion', 'product_operation',
+    'crowd_promotion', 'super_short_video', 'multi_target_direct',
+]
+
 @data_bp.route('/product-trend/<tmall_product_code>', methods=['GET'])
 @jwt_required()
+@versioned_view(cache=False, default_range=last_30_days_range)
 def get_product_trend(tmall_product_code):
     """获取特定商品的趋势数据（支持自定义日期区间，默认最近30天）"""
     user_id = int(get_jwt_identity())
@@ -1154,15 +869,20 @@ def get_product_trend(tmall_product_code):
                 return jsonify({'message': '日期格式错误，请使用YYYY-MM-DD格式'}), 400
         else:
             # 使用默认的30天前的日期
-            end_date = datetime.now().date()
-            start_date = end_date - timedelta(days=30)
-        
-        # 查询该商品最近30天的数据
-        trend_data = ProductDataMerge.query.filter(
-            ProductDataMerge.tmall_product_code == tmall_product_code,
-            ProductDataMerge.upload_date >= start_date,
-            ProductDataMerge.upload_date <= end_date
-        ).order_by(ProductDataMerge.upload_date.asc()).all()
+            start_date, end_date = last_30_days_range()
+        
+        # 查询该商品最近30天的数据（缓存窗口内直接读取列式缓存）
+        if columnar_cache.covers(start_date, end_date):
+            trend_data = [
+                SimpleNamespace(upload_date=row.pop('date'), **row)
+                for row in columnar_cache.rows(start_date, end_date, TREND_FIELDS, {'product_code': tmall_product_code})
+            ]
+        else:
+            trend_data = ProductDataMerge.query.filter(
+                ProductDataMerge.tmall_product_code == tmall_product_code,
+                ProductDataMerge.upload_date >= start_date,
+                ProductDataMerge.upload_date <= end_date
+            ).order_by(ProductDataMerge.upload_date.asc()).all()
         
         # 调试信息：记录查询参数
         current_app.logger.info(f'趋势查询参数: 商品代码={tmall_product_code}, 开始日期={start_date}, 结束日期={end_date}, 找到数据条数={len(trend_data)}')
@@ -1236,7 +956,230 @@ def get_product_trend(tmall_product_code):
         
     except Exception as e:
         current_app.logger.error(f'获取商品趋势数据时出错: {str(e)}')
-        return jsonify({'message': f'获取趋势数据失败: {str(e)}'}), 500 
+        return jsonify({'message': f'获取趋势数据失败: {str(e)}'}), 500
+
+# 批量趋势：单次最多比较的商品数量及支持的时间粒度
+TREND_BATCH_MAX_CODES = 20
+TREND_GRANULARITIES = ('day', 'week', 'month')
+
+# 按周期直接求和的字段 -> 源字段（real_buyer_count 与单商品趋势一致，取支付买家数）
+TREND_SUM_FIELDS = {
+    'search_guided_visitors': 'search_guided_visitors', 'add_to_cart_count': 'add_to_cart_count',
+    'real_amount': 'real_amount', 'real_buyer_count': 'payment_buyer_count', 'visitor_count': 'visitor_count',
+    'page_views': 'page_views', 'favorite_count': 'favorite_count', 'payment_amount': 'payment_amount',
+    'payment_product_count': 'payment_product_count', 'payment_buyer_count': 'payment_buyer_count',
+    'refund_amount': 'refund_amount', 'product_cost': 'product_cost', 'gross_profit': 'gross_profit',
+    'sitewide_promotion': 'sitewide_promotion', 'keyword_promotion': 'keyword_promotion',
+    'product_operation': 'product_operation', 'crowd_promotion': 'crowd_promotion',
+    'super_short_video': 'super_short_video', 'multi_target_direct': 'multi_target_direct',
+}
+# 上传文件自带的均值/比率字段 -> 权重字段：按周期加权平均（按日且单行时即原值）
+TREND_WEIGHTED_FIELDS = {
+    'unit_price': 'payment_buyer_count',
+    'visitor_average_value': 'visitor_count',
+    'payment_conversion_rate': 'visitor_count',
+    'order_conversion_rate': 'visitor_count',
+    'refund_ratio': 'payment_amount',
+}
+# 生成列比率 -> (分子字段, 系数)：按周期内分子与访客数之和重算，口径同 PRODUCT_MERGE_DERIVED_COLUMNS
+TREND_VISITOR_RATIO_FIELDS = {
+    'real_conversion_rate': ('real_buyer_count', 100.0),
+    'conversion_rate': ('payment_buyer_count', 100.0),
+    'favorite_rate': ('favorite_count', 100.0),
+    'cart_rate': ('add_to_cart_count', 100.0),
+    'uv_value': ('payment_amount', 1.0),
+}
+TREND_BATCH_FIELDS = ['real_buyer_count'] + TREND_FIELDS
+
+def _trend_metric(field):
+    """周期内指标的聚合表达式"""
+    if field in TREND_SUM_FIELDS:
+        return db.func.sum(db.func.coalesce(getattr(ProductDataMerge, TREND_SUM_FIELDS[field]), 0))
+    if field in TREND_WEIGHTED_FIELDS:
+        value = db.func.coalesce(getattr(ProductDataMerge, field), 0)
+        weight = db.func.coalesce(getattr(ProductDataMerge, TREND_WEIGHTED_FIELDS[field]), 0)
+        return case((db.func.sum(weight) > 0, db.func.sum(value * weight) / db.func.sum(weight)),
+                    else_=db.func.avg(value))
+    numerator, scale = TREND_VISITOR_RATIO_FIELDS[field]
+    visitors = db.func.sum(db.func.coalesce(ProductDataMerge.visitor_count, 0))
+    return case((visitors > 0, db.func.sum(db.func.coalesce(getattr(ProductDataMerge, numerator), 0)) * scale / visitors),
+                else_=0)
+
+def _trend_bucket(granularity):
+    """周期起始日期的SQL表达式：日=上传日期，周=所在周的周一，月=当月1日"""
+    column = ProductDataMerge.upload_date
+    if granularity == 'day':
+        return column
+    if db.engine.dialect.name == 'mysql':
+        if granularity == 'week':
+            return db.func.subdate(column, db.func.weekday(column))
+        return db.func.date_format(column, '%Y-%m-01')
+    # SQLite（测试环境）
+    if granularity == 'week':
+        return db.func.date(column, db.func.printf('-%d days', (db.func.strftime('%w', column) + 6) % 7))
+    return db.func.date(column, 'start of month')
+
+def _trend_buckets(start_date, end_date, granularity):
+    """日期区间内的全部周期起始日期（连续，无数据的周期也保留）"""
+    if granularity == 'week':
+        current = start_date - timedelta(days=start_date.weekday())
+    elif granularity == 'month':
+        current = start_date.replace(day=1)
+    else:
+        current = start_date
+    buckets = []
+    while current <= end_date:
+        buckets.append(current)
+        if granularity == 'month':
+            current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+        else:
+            current += timedelta(days=7 if granularity == 'week' else 1)
+    return buckets
+
+@data_bp.route('/product-trends', methods=['GET'])
+@jwt_required()
+@versioned_view(default_range=last_30_days_range)
+def get_product_trends():
+    """批量获取多个商品的趋势数据（列式返回，所有用户可访问）
+
+    参数：codes（逗号分隔的天猫ID，最多20个）、granularity（day/week/month，默认day）、
+    start_date/end_date（默认最近30天，最长365天）、fields（逗号分隔的指标，默认全部）。
+    一次分组查询按 (商品, 周期) 聚合，返回 dates 及每个商品每个指标一个与 dates 对齐的数组，无数据的周期为null。
+    """
+    codes = list(dict.fromkeys(
+        code.strip() for code in request.args.get('codes', '').split(',') if code.strip()
+    ))
+    if not codes:
+        return jsonify({'message': '请提供商品天猫ID'}), 400
+    if len(codes) > TREND_BATCH_MAX_CODES:
+        return jsonify({'message': f'单次最多查询 {TREND_BATCH_MAX_CODES} 个商品'}), 400
+
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in TREND_GRANULARITIES:
+        return jsonify({'message': '时间粒度只能为 day、week 或 month'}), 400
+
+    fields_param = request.args.get('fields')
+    fields = [field.strip() for field in fields_param.split(',') if field.strip()] if fields_param else TREND_BATCH_FIELDS
+    invalid_fields = [field for field in fields if field not in TREND_BATCH_FIELDS]
+    if invalid_fields or not fields:
+        return jsonify({'message': f'不支持的趋势指标: {", ".join(invalid_fields)}'}), 400
+
+    start_date_param = request.args.get('start_date')
+    end_date_param = request.args.get('end_date')
+    if start_date_param and end_date_param:
+        try:
+            start_date = datetime.strptime(start_date_param, '%Y-%m-%d').date()
+            end_date = datetime.strptime(end_date_param, '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'message': '日期格式错误，请使用YYYY-MM-DD格式'}), 400
+        if start_date > end_date:
+            return jsonify({'message': '开始日期不能晚于结束日期'}), 400
+        if (end_date - start_date).days > 365:
+            return jsonify({'message': '查询范围不能超过365天'}), 400
+    else:
+        start_date, end_date = last_30_days_range()
+
+    try:
+        bucket = _trend_bucket(granularity).label('bucket')
+        rows = db.session.execute(
+            db.select(
+                ProductDataMerge.tmall_product_code, bucket,
+                db.func.max(ProductDataMerge.product_name).label('product_name'),
+                *[_trend_metric(field).label(field) for field in fields]
+            ).where(
+                ProductDataMerge.tmall_product_code.in_(codes),
+                ProductDataMerge.upload_date >= start_date,
+                ProductDataMerge.upload_date <= end_date
+            ).group_by(ProductDataMerge.tmall_product_code, bucket)
+        ).all()
+
+        buckets = _trend_buckets(start_date, end_date, granularity)
+        positions = {bucket_date: index for index, bucket_date in enumerate(buckets)}
+        integer_fields = {
+            field for field in fields if TREND_SUM_FIELDS.get(field) in INTEGER_MEASURES
+        }
+        products = {
+            code: {
+                'product_code': code,
+                'product_name': None,
+                'data_count': 0,
+                'metrics': {field: [None] * len(buckets) for field in fields}
+            }
+            for code in codes
+        }
+        for row in rows:
+            bucket_date = row.bucket if isinstance(row.bucket, date) else date.fromisoformat(str(row.bucket)[:10])
+            product = products[row.tmall_product_code]
+            product['product_name'] = product['product_name'] or row.product_name
+            product['data_count'] += 1
+            index = positions[bucket_date]
+            for field in fields:
+                value = getattr(row, field)
+                product['metrics'][field][index] = int(value or 0) if field in integer_fields else (format_decimal(value) or 0)
+
+        # 区间内无数据的商品补查名称，数据库中完全不存在的商品列入 not_found
+        unnamed = [code for code, product in products.items() if product['product_name'] is None]
+        if unnamed:
+            names = dict(db.session.query(
+                ProductDataMerge.tmall_product_code, db.func.max(ProductDataMerge.product_name)
+            ).filter(ProductDataMerge.tmall_product_code.in_(unnamed)).group_by(ProductDataMerge.tmall_product_code).all())
+            for code in unnamed:
+                products[code]['product_name'] = names.get(code)
+        not_found = [code for code in unnamed if products[code]['product_name'] is None]
+
+        return jsonify({
+            'granularity': granularity,
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            'fields': fields,
+            'dates': [bucket_date.isoformat() for bucket_date in buckets],
+            'products': [products[code] for code in codes],
+            'not_found': not_found
+        })
+    except Exception as e:
+        current_app.logger.error(f'批量获取商品趋势数据时出错: {str(e)}')
+        return jsonify({'message': f'获取趋势数据失败: {str(e)}'}), 500
+
+# 订单详情列表返回的列（金额类空值按0）
+ORDER_DETAILS_PROJECTION = Projection(OrderDetailsMerge, [
+    ('id', 'id', 'raw'),
+    ('order_details_id', 'order_details_id', 'raw'),
+    ('internal_order_number', 'internal_order_number', 'raw'),
+    ('online_order_number', 'online_order_number', 'raw'),
+    ('store_code', 'store_code', 'raw'),
+    ('store_name', 'store_name', 'raw'),
+    ('order_time', 'order_time', 'iso'),
+    ('payment_date', 'payment_date', 'iso'),
+    ('shipping_date', 'shipping_date', 'iso'),
+    ('payable_amount', 'payable_amount', 'float0'),
+    ('paid_amount', 'paid_amount', 'float0'),
+    ('express_company', 'express_company', 'raw'),
+    ('tracking_number', 'tracking_number', 'raw'),
+    ('province', 'province', 'raw'),
+    ('city', 'city', 'raw'),
+    ('district', 'district', 'raw'),
+    ('product_code', 'product_code', 'raw'),
+    ('product_name', 'product_name', 'raw'),
+    ('quantity', 'quantity', 'raw'),
+    ('unit_price', 'unit_price', 'float0'),
+    ('product_amount', 'product_amount', 'float0'),
+    ('payment_number', 'payment_number', 'raw'),
+    ('image_url', 'image_url', 'raw'),
+    ('store_style_code', 'store_style_code', 'raw'),
+    ('order_status', 'order_status', 'raw'),
+    ('upload_date', 'upload_date', 'iso'),
+    ('operation_cost_supply_price', 'operation_cost_supply_price', 'float0'),
+    ('product_list_operator', 'product_list_operator', 'raw'),
+])
+
+# 订单去重时优先排除的商品名称关键字（赠品/配件）
+ORDER_DEDUP_EXCLUDED_KEYWORDS = ['支架', '牙线棒']
+
+def _char_length(value):
+    """按字符计算长度：MySQL的LENGTH按字节计算需用CHAR_LENGTH，SQLite没有CHAR_LENGTH，其LENGTH按字符计算"""
+    if db.engine.dialect.name == 'mysql':
+        return db.func.char_length(value)
+    return db.func.length(value)
 
 @data_bp.route('/order-details', methods=['GET'])
 @jwt_required()
@@ -1250,8 +1193,10 @@ def get_order_details():
     # if user.role != 'admin':
     #     return jsonify({'message': '权限不足'}), 403
     
-    page = request.args.get('page', 1, type=int)
+    page = max(request.args.get('page', 1, type=int), 1)
     per_page = request.args.get('per_page', 20, type=int)
+    if per_page < 1:
+        per_page = 20
     sort_by = request.args.get('sort_by', 'order_time')
     sort_order = request.args.get('sort_order', 'desc')
     
@@ -1268,42 +1213,42 @@ def get_order_details():
     # 调试日志：记录接收到的筛选参数
     print(f"订单详情API接收到的筛选参数: start_date={start_date}, end_date={end_date}, store_name={store_name}, operator={operator}, province={province}, city={city}, express_company={express_company}, order_status_list={order_status_list}")
     
-    query = OrderDetailsMerge.query
+    query = db.session.query(OrderDetailsMerge)
     
-    # 日期区间过滤
+    # 日期区间过滤（按下单时间的区间比较，可使用order_time索引）
     if start_date:
         try:
             start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-            query = query.filter(db.func.date(OrderDetailsMerge.order_time) >= start_date)
+            query = query.filter(OrderDetailsMerge.order_time >= datetime.combine(start_date, datetime.min.time()))
         except ValueError:
             return jsonify({'message': '开始日期格式错误，请使用YYYY-MM-DD格式'}), 400
     
     if end_date:
         try:
             end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-            query = query.filter(db.func.date(OrderDetailsMerge.order_time) <= end_date)
+            query = query.filter(OrderDetailsMerge.order_time < datetime.combine(end_date + timedelta(days=1), datetime.min.time()))
         except ValueError:
             return jsonify({'message': '结束日期格式错误，请使用YYYY-MM-DD格式'}), 400
     
     # 店铺名称过滤
     if store_name:
-        query = query.filter(OrderDetailsMerge.store_name.ilike(f'%{store_name}%'))
+        query = query.filter(search_index.substring_filter('order_store', store_name))
     
     # 操作人过滤
     if operator:
-        query = query.filter(OrderDetailsMerge.product_list_operator.ilike(f'%{operator}%'))
+        query = query.filter(search_index.substring_filter('order_operator', operator))
     
     # 省份过滤
     if province:
-        query = query.filter(OrderDetailsMerge.province.ilike(f'%{province}%'))
+        query = query.filter(search_index.substring_filter('order_province', province))
     
     # 城市过滤
     if city:
-        query = query.filter(OrderDetailsMerge.city.ilike(f'%{city}%'))
+        query = query.filter(search_index.substring_filter('order_city', city))
     
     # 快递公司过滤
     if express_company:
-        query = query.filter(OrderDetailsMerge.express_company.ilike(f'%{express_company}%'))
+        query = query.filter(search_index.substring_filter('order_express_company', express_company))
     
     # 订单状态过滤（多选）
     if order_status_list:
@@ -1319,121 +1264,66 @@ def get_order_details():
         if status_filters:
             query = query.filter(or_(*status_filters))
     
-    # 排序
+    # 排序（id作为并列时的次序，保证分页稳定）
+    if sort_by not in OrderDetailsMerge.__table__.columns:
+        sort_by = 'order_time'
+    sort_field = getattr(OrderDetailsMerge, sort_by)
     if sort_order == 'desc':
-        sort_column = getattr(OrderDetailsMerge, sort_by, OrderDetailsMerge.order_time).desc()
+        sort_columns = [sort_field.desc(), OrderDetailsMerge.id.desc()]
     else:
-        sort_column = getattr(OrderDetailsMerge, sort_by, OrderDetailsMerge.order_time).asc()
-    
-    query = query.order_by(sort_column)
-    
-    pagination = query.paginate(
-        page=page, per_page=per_page, error_out=False
+        sort_columns = [sort_field.asc(), OrderDetailsMerge.id.asc()]
+    
+    # 按内部订单号去重（在分页之前由窗口函数完成，页大小与总数均按去重后的订单计算）：
+    # 1. 优先显示product_name不含有"支架","牙线棒"关键字的记录
+    # 2. 同等条件下选择product_name最长的那一条，再按列表排序取第一条
+    # 没有内部订单号的记录全部保留
+    product_name = db.func.coalesce(OrderDetailsMerge.product_name, '')
+    has_excluded_keyword = case(
+        (or_(*[product_name.like(f'%{keyword}%') for keyword in ORDER_DEDUP_EXCLUDED_KEYWORDS]), 1),
+        else_=0
+    )
+    ranked = query.with_entities(
+        OrderDetailsMerge.id,
+        sort_field.label('sort_value'),
+        OrderDetailsMerge.internal_order_number,
+        db.func.row_number().over(
+            partition_by=OrderDetailsMerge.internal_order_number,
+            order_by=[has_excluded_keyword.asc(), _char_length(product_name).desc()] + sort_columns
+        ).label('dedup_rank')
+    ).subquery()
+    deduplicated = db.session.query(ranked.c.id).filter(or_(
+        ranked.c.dedup_rank == 1,
+        ranked.c.internal_order_number.is_(None),
+        ranked.c.internal_order_number == ''
+    ))
+    
+    # 去重后的总数按 过滤条件 + 数据版本 缓存，翻页时不再重复计算
+    filter_key = (start_date, end_date, store_name, operator, province, city, express_company, tuple(order_status_list))
+    total = result_cache.get_or_compute(
+        ('order_details_total', filter_key, data_version(ORDER_MERGE_VERSION_TABLES)),
+        lambda: (deduplicated.count(), True),
+        current_app.config.get('RESULT_CACHE_TTL_SECONDS', 300),
+        current_app.config.get('RESULT_CACHE_MAX_ENTRIES', 256)
     )
     
-    data = []
-    for item in pagination.items:
-        data.append({
-            'id': item.id,
-            'order_details_id': item.order_details_id,
-            'internal_order_number': item.internal_order_number,
-            'online_order_number': item.online_order_number,
-            'store_code': item.store_code,
-            'store_name': item.store_name,
-            'order_time': item.order_time.isoformat() if item.order_time else None,
-            'payment_date': item.payment_date.isoformat() if item.payment_date else None,
-            'shipping_date': item.shipping_date.isoformat() if item.shipping_date else None,
-            'payable_amount': float(item.payable_amount) if item.payable_amount else 0,
-            'paid_amount': float(item.paid_amount) if item.paid_amount else 0,
-            'express_company': item.express_company,
-            'tracking_number': item.tracking_number,
-            'province': item.province,
-            'city': item.city,
-            'district': item.district,
-            'product_code': item.product_code,
-            'product_name': item.product_name,
-            'quantity': item.quantity,
-            'unit_price': float(item.unit_price) if item.unit_price else 0,
-            'product_amount': float(item.product_amount) if item.product_amount else 0,
-            'payment_number': item.payment_number,
-            'image_url': item.image_url,
-            'store_style_code': item.store_style_code,
-            'order_status': item.order_status,
-            'upload_date': item.upload_date.isoformat() if item.upload_date else None,
-            'operation_cost_supply_price': float(item.operation_cost_supply_price) if item.operation_cost_supply_price else 0,
-            'product_list_operator': item.product_list_operator,
-        })
-    
-    # 对内部订单号进行去重处理
-    def deduplicate_by_internal_order_number(data_list):
-        """
-        根据内部订单号去重，去重规则：
-        1. 优先显示product_name不含有"支架","牙线棒"关键字的记录
-        2. 如果有多条不含关键字，则选择product_name最长的那一条
-        """
-        if not data_list:
-            return data_list
-            
-        # 按内部订单号分组
-        grouped = {}
-        no_order_number_items = []  # 没有内部订单号的记录
-        
-        for item in data_list:
-            internal_order_number = item.get('internal_order_number')
-            if internal_order_number:
-                if internal_order_number not in grouped:
-                    grouped[internal_order_number] = []
-                grouped[internal_order_number].append(item)
-            else:
-                # 没有内部订单号的记录直接保留
-                no_order_number_items.append(item)
-        
-        # 对每组进行去重处理
-        deduplicated_data = []
-        for internal_order_number, items in grouped.items():
-            if len(items) == 1:
-                # 只有一条记录，直接添加
-                deduplicated_data.extend(items)
-            else:
-                # 多条记录，需要按规则选择
-                # 优先选择不含"支架"、"牙线棒"关键字的记录
-                excluded_keywords = ["支架", "牙线棒"]
-                preferred_items = []
-                
-                for item in items:
-                    product_name = item.get('product_name', '') or ''
-                    if not any(keyword in product_name for keyword in excluded_keywords):
-                        preferred_items.append(item)
-                
-                if preferred_items:
-                    # 如果有不含关键字的记录，从中选择product_name最长的
-                    selected_item = max(preferred_items, key=lambda x: len(x.get('product_name', '') or ''))
-                else:
-                    # 如果都含关键字，选择product_name最长的
-                    selected_item = max(items, key=lambda x: len(x.get('product_name', '') or ''))
-                
-                deduplicated_data.append(selected_item)
-        
-        # 将没有内部订单号的记录加入结果
-        deduplicated_data.extend(no_order_number_items)
-        
-        # 按原来的顺序返回（保持排序）
-        # 创建一个映射来保持原始顺序
-        order_map = {id(item): i for i, item in enumerate(data_list)}
-        deduplicated_data.sort(key=lambda x: order_map.get(id(x), len(data_list)))
-        
-        return deduplicated_data
-    
-    # 应用去重处理
-    data = deduplicate_by_internal_order_number(data)
-    
-    return jsonify({
-        'data': data,
-        'total': pagination.total,
-        'pages': pagination.pages,
-        'current_page': pagination.page,
-        'per_page': pagination.per_page
-    })
+    if sort_order == 'desc':
+        page_order = [ranked.c.sort_value.desc(), ranked.c.id.desc()]
+    else:
+        page_order = [ranked.c.sort_value.asc(), ranked.c.id.asc()]
+    page_ids = [row.id for row in deduplicated.order_by(*page_order).offset((page - 1) * per_page).limit(per_page)]
+    rows_by_id = {
+        row.id: row for row in db.session.execute(
+            ORDER_DETAILS_PROJECTION.statement().where(OrderDetailsMerge.id.in_(page_ids))
+        )
+    } if page_ids else {}
+    
+    return ORDER_DETAILS_PROJECTION.response(
+        [rows_by_id[item_id] for item_id in page_ids],
+        total=total,
+        pages=(total + per_page - 1) // per_page,
+        current_page=page,
+        per_page=per_page
+    )
 
 @data_bp.route('/order-details-by-internal-number/<internal_order_number>', methods=['GET'])
 @jwt_required()
@@ -1458,7 +1348,6 @@ def get_order_details_by_internal_number(internal_order_number):
         
         # 构建返回数据
         data = []
-        total_cost = 0.0  # 总成本
         
         for item in items:
             # 安全地获取数值字段
@@ -1484,29 +1373,9 @@ def get_order_details_by_internal_number(internal_order_number):
                 'order_status': item.order_status,
             }
             data.append(item_data)
-            
-            # 计算成本：运营成本供货价 × 数量
-            cost = operation_cost_price * quantity
-            total_cost += cost
-        
-        # 计算汇总信息
-        # 销售金额：取第一条的paid_amount（不累加）
-        sales_amount = float(items[0].paid_amount) if items[0].paid_amount is not None else 0
-        
-        # 利润：销售金额 - 成本
-        profit = sales_amount - total_cost
-
-        profit = profit if profit > 0 else 0
         
-        summary = {
-            'internal_order_number': internal_order_number,
-            'sales_amount': sales_amount,
-            'total_cost': total_cost,
-            'profit': profit,
-            'item_count': len(items),
-            'store_name': items[0].store_name if items else '',
-            'order_time': items[0].order_time.isoformat() if items and items[0].order_time else None,
-        }
+        # 汇总信息（成本、销售金额、利润）取自内部订单汇总表，尚未汇总的订单即时计算
+        summary = lookup_summaries([internal_order_number])[internal_order_number]
         
         return jsonify({
             'data': data,
@@ -1521,6 +1390,75 @@ def get_order_details_by_internal_number(internal_order_number):
         print(traceback.format_exc())
         return jsonify({'message': error_msg}), 500
 
+@data_bp.route('/order-details/summaries', methods=['POST'])
+@jwt_required()
+@handle_db_connection_error(max_retries=3, retry_delay=2)
+def get_internal_order_summaries():
+    """批量获取内部订单汇总（成本、销售金额、利润），一次请求返回整页订单"""
+    data = request.get_json(silent=True) or {}
+    internal_order_numbers = data.get('internal_order_numbers')
+    
+    if not isinstance(internal_order_numbers, list) or not internal_order_numbers:
+        return jsonify({'message': '请提供内部订单号列表'}), 400
+    if len(internal_order_numbers) > 500:
+        return jsonify({'message': '每次最多查询500个内部订单号'}), 400
+    
+    try:
+        summaries = lookup_summaries([str(number) for number in internal_order_numbers if number])
+        return jsonify({'summaries': summaries})
+    except Exception as e:
+        current_app.logger.error(f"批量获取内部订单汇总失败: {str(e)}")
+        return jsonify({'message': f'批量获取内部订单汇总失败: {str(e)}'}), 500
+
+def _shipped_order_summaries(target_date, group_columns, cost_amount_column, *filters):
+    """按上传日期汇总已发货订单：一次分组查询得到 订单数（线上订单号去重）/ 销售额 / 成本 / 利润
+
+    cost_amount_column 为计入成本时要求大于0的金额字段（店铺汇总用商品金额，操作人汇总用已付金额）。
+    返回 [(分组取值..., 汇总dict)]；不分组时最多一行，没有订单时为空列表。
+    """
+    supply_price = OrderDetailsMerge.operation_cost_supply_price
+    quantity = OrderDetailsMerge.quantity
+    query = db.session.query(
+        *group_columns,
+        db.func.count(OrderDetailsMerge.id),
+        db.func.count(db.func.distinct(db.func.nullif(OrderDetailsMerge.online_order_number, ''))),
+        db.func.coalesce(db.func.sum(OrderDetailsMerge.paid_amount), 0),
+        db.func.coalesce(db.func.sum(case(
+            ((supply_price != 0) & (quantity != 0) & (cost_amount_column > 0), supply_price * quantity),
+            else_=0
+        )), 0)
+    ).filter(
+        OrderDetailsMerge.upload_date == target_date,
+        OrderDetailsMerge.order_status == '已发货',
+        *filters
+    )
+    if group_columns:
+        query = query.group_by(*group_columns).order_by(*group_columns)
+
+    summaries = []
+    for row in query.all():
+        row_count, order_count, total_sales, total_cost = row[len(group_columns):]
+        if not row_count:
+            continue
+        total_sales, total_cost = float(total_sales), float(total_cost)
+        summaries.append((tuple(row[:len(group_columns)]), {
+            'order_count': order_count,
+            'total_sales': round(total_sales, 2),
+            'total_cost': round(total_cost, 2),
+            'profit': round(total_sales - total_cost, 2)
+        }))
+    return summaries
+
+def _parse_target_date():
+    """解析 target_date 参数，缺失或格式错误返回 (None, 错误响应)"""
+    target_date = request.args.get('target_date')
+    if not target_date:
+        return None, (jsonify({'message': '请提供目标日期'}), 400)
+    try:
+        return datetime.strptime(target_date, '%Y-%m-%d').date(), None
+    except ValueError:
+        return None, (jsonify({'message': '日期格式错误，请使用YYYY-MM-DD格式'}), 400)
+
 @data_bp.route('/store-summary', methods=['GET'])
 @jwt_required()
 def get_store_summary():
@@ -1537,19 +1475,17 @@ def get_store_summary():
     if not store_name or not target_date:
         return jsonify({'message': '请提供店铺名称和目标日期'}), 400
     
-    try:
-        target_date = datetime.strptime(target_date, '%Y-%m-%d').date()
-    except ValueError:
-        return jsonify({'message': '日期格式错误，请使用YYYY-MM-DD格式'}), 400
+    target_date, error = _parse_target_date()
+    if error:
+        return error
     
-    # 查询该店铺在指定日期的所有订单（只统计已发货状态）
-    orders = OrderDetailsMerge.query.filter(
-        OrderDetailsMerge.store_name == store_name,
-        db.func.date(OrderDetailsMerge.upload_date) == target_date,
-        OrderDetailsMerge.order_status == '已发货'
-    ).all()
+    # 汇总该店铺在指定日期的订单（只统计已发货状态）
+    summaries = _shipped_order_summaries(
+        target_date, [], OrderDetailsMerge.product_amount,
+        OrderDetailsMerge.store_name == store_name
+    )
     
-    if not orders:
+    if not summaries:
         return jsonify({
             'message': f'未找到店铺 {store_name} 在 {target_date} 的已发货订单数据',
             'order_count': 0,
@@ -1558,34 +1494,33 @@ def get_store_summary():
             'profit': 0
         })
     
-    # 统计数据
-    unique_orders = set()
-    total_sales = 0
-    total_cost = 0
+    return jsonify({
+        'store_name': store_name,
+        'target_date': target_date.isoformat(),
+        **summaries[0][1]
+    })
+
+@data_bp.route('/store-summary/batch', methods=['GET'])
+@jwt_required()
+def get_store_summaries():
+    """获取指定日期所有店铺的汇总信息（仅管理员可访问）"""
+    user_id = int(get_jwt_identity())
+    user = db.session.get(User, user_id)
     
-    for order in orders:
-        # 订单数量（去重）
-        if order.online_order_number:
-            unique_orders.add(order.online_order_number)
-        
-        # 销售金额
-        if order.paid_amount:
-            total_sales += float(order.paid_amount)
-        
-        # 总成本
-        if order.operation_cost_supply_price and order.quantity and order.product_amount>0:
-            total_cost += float(order.operation_cost_supply_price) * order.quantity
+    if user.role != 'admin':
+        return jsonify({'message': '权限不足'}), 403
     
-    # 利润
-    profit = total_sales - total_cost
+    target_date, error = _parse_target_date()
+    if error:
+        return error
+    
+    summaries = _shipped_order_summaries(
+        target_date, [OrderDetailsMerge.store_name], OrderDetailsMerge.product_amount
+    )
     
     return jsonify({
-        'store_name': store_name,
         'target_date': target_date.isoformat(),
-        'order_count': len(unique_orders),
-        'total_sales': round(total_sales, 2),
-        'total_cost': round(total_cost, 2),
-        'profit': round(profit, 2)
+        'data': [{'store_name': store_name, **summary} for (store_name,), summary in summaries]
     })
 
 @data_bp.route('/operator-summary', methods=['GET'])
@@ -1605,20 +1540,18 @@ def get_operator_summary():
     if not store_name or not operator or not target_date:
         return jsonify({'message': '请提供店铺名称、操作人和目标日期'}), 400
     
-    try:
-        target_date = datetime.strptime(target_date, '%Y-%m-%d').date()
-    except ValueError:
-        return jsonify({'message': '日期格式错误，请使用YYYY-MM-DD格式'}), 400
+    target_date, error = _parse_target_date()
+    if error:
+        return error
     
-    # 查询该操作人在指定店铺和日期的所有订单（只统计已发货状态）
-    orders = OrderDetailsMerge.query.filter(
+    # 汇总该操作人在指定店铺和日期的订单（只统计已发货状态）
+    summaries = _shipped_order_summaries(
+        target_date, [], OrderDetailsMerge.paid_amount,
         OrderDetailsMerge.store_name == store_name,
-        OrderDetailsMerge.product_list_operator == operator,
-        db.func.date(OrderDetailsMerge.upload_date) == target_date,
-        OrderDetailsMerge.order_status == '已发货'
-    ).all()
+        OrderDetailsMerge.product_list_operator == operator
+    )
     
-    if not orders:
+    if not summaries:
         return jsonify({
             'message': f'未找到操作人 {operator} 在店铺 {store_name} 于 {target_date} 的已发货订单数据',
             'store_name': store_name,
@@ -1629,39 +1562,175 @@ def get_operator_summary():
             'profit': 0
         })
     
-    # 统计数据
-    unique_orders = set()
-    total_sales = 0
-    total_cost = 0
+    return jsonify({
+        'store_name': store_name,
+        'operator': operator,
+        'target_date': target_date.isoformat(),
+        **summaries[0][1]
+    })
+
+@data_bp.route('/operator-summary/batch', methods=['GET'])
+@jwt_required()
+def get_operator_summaries():
+    """获取指定日期各店铺下所有操作人的汇总信息，可按店铺过滤（仅管理员可访问）"""
+    user_id = int(get_jwt_identity())
+    user = db.session.get(User, user_id)
     
-    for order in orders:
-        # 订单数量（去重）
-        if order.online_order_number:
-            unique_orders.add(order.online_order_number)
-        
-        # 销售金额
-        if order.paid_amount:
-            total_sales += float(order.paid_amount)
-        
-        # 总成本
-        if order.operation_cost_supply_price and order.quantity and order.paid_amount>0:
-            total_cost += float(order.operation_cost_supply_price) * order.quantity
+    if user.role != 'admin':
+        return jsonify({'message': '权限不足'}), 403
     
-    # 利润
-    profit = total_sales - total_cost
+    target_date, error = _parse_target_date()
+    if error:
+        return error
+    
+    store_name = request.args.get('store_name')
+    filters = [OrderDetailsMerge.store_name == store_name] if store_name else []
+    summaries = _shipped_order_summaries(
+        target_date, [OrderDetailsMerge.store_name, OrderDetailsMerge.product_list_operator],
+        OrderDetailsMerge.paid_amount, *filters
+    )
     
     return jsonify({
-        'store_name': store_name,
-        'operator': operator,
         'target_date': target_date.isoformat(),
-        'order_count': len(unique_orders),
-        'total_sales': round(total_sales, 2),
-        'total_cost': round(total_cost, 2),
-        'profit': round(profit, 2)
-    }) 
+        'data': [
+            {'store_name': store_name, 'operator': operator, **summary}
+            for (store_name, operator), summary in summaries
+        ]
+    })
+
+# 商品排行分类类型 -> (列式缓存维度, 表示NULL的分类值)
+RANKING_CATEGORY_DIMENSIONS = {
+    'store': ('store', '其他'),
+    'operator': ('operator', '未分配'),
+    'category': ('category', '未分类'),
+}
+
+RankingRow = namedtuple('RankingRow', [
+    'tmall_product_code', 'product_name', 'tmall_supplier_name', 'product_list_operator', 'product_list_category',
+    'total_amount', 'total_quantity', 'total_refund_amount', 'total_planting_amount', 'record_count'
+])
+
+
+def _product_ranking_from_cache(start_date, end_date, category_type, category_value, sort_by, sort_order, offset, limit):
+    """从列式缓存计算商品排行，返回 (总数, 当前页行)，结果与SQL分组查询一致"""
+    dimension, null_value = RANKING_CATEGORY_DIMENSIONS[category_type]
+    filters = {dimension: None if category_value == null_value else category_value}
+    result = columnar_cache.aggregate(
+        start_date, end_date,
+        group_by=['product_code', 'product_name', 'store', 'operator', 'category'],
+        measures=['payment_amount', 'payment_product_count', 'refund_amount', 'planting_amount'],
+        filters=filters
+    )
+    sums = result['sums']
+
+    # HAVING SUM(payment_amount) > 0
+    selected = np.flatnonzero(sums['payment_amount'] > 0)
+    if sort_by == 'total_amount':
+        order_values = sums['payment_amount']
+    elif sort_by == 'total_quantity':
+        order_values = sums['payment_product_count']
+    else:
+        order_values = sums['payment_amount'] - sums['refund_amount'] - sums['planting_amount']
+        if sort_by != 'real_amount':
+            sort_order = 'desc'
+    page_indexes = selected[columnar_cache.top_k(
+        order_values[selected], descending=sort_order != 'asc', offset=offset, limit=limit
+    )]
+
+    keys = result['keys']
+    items = [
+        RankingRow(
+            keys['product_code'][index], keys['product_name'][index], keys['store'][index],
+            keys['operator'][index], keys['category'][index],
+            float(sums['payment_amount'][index]), int(sums['payment_product_count'][index]),
+            float(sums['refund_amount'][index]), float(sums['planting_amount'][index]),
+            int(result['count'][index])
+        )
+        for index in page_indexes
+    ]
+    return len(selected), items
+
+
+def _product_ranking_from_sql(start_date, end_date, category_type, category_value, sort_by, sort_order, page, per_page):
+    """缓存窗口外的商品排行查询，返回 (总数, 当前页行)"""
+    # 各项合计的NULL按0处理（与列式缓存一致），否则退款或种菜金额全为空的商品真实销售金额为NULL，排序位置与缓存不同
+    total_amount = db.func.coalesce(db.func.sum(ProductDataMerge.payment_amount), 0)
+    total_quantity = db.func.coalesce(db.func.sum(ProductDataMerge.payment_product_count), 0)
+    total_refund_amount = db.func.coalesce(db.func.sum(ProductDataMerge.refund_amount), 0)
+    total_planting_amount = db.func.coalesce(db.func.sum(ProductDataMerge.planting_amount), 0)
+    real_amount = total_amount - total_refund_amount - total_planting_amount
+
+    # 构建基础查询
+    query = db.session.query(
+        ProductDataMerge.tmall_product_code,
+        ProductDataMerge.product_name,
+        ProductDataMerge.tmall_supplier_name,
+        ProductDataMerge.product_list_operator,
+        ProductDataMerge.product_list_category,
+        total_amount.label('total_amount'),
+        total_quantity.label('total_quantity'),
+        total_refund_amount.label('total_refund_amount'),
+        total_planting_amount.label('total_planting_amount'),
+        db.func.count(ProductDataMerge.id).label('record_count')
+    ).filter(
+        ProductDataMerge.upload_date >= start_date,
+        ProductDataMerge.upload_date <= end_date
+    )
+
+    # 根据分类类型添加过滤条件
+    if category_type == 'store':
+        if category_value == '其他':
+            query = query.filter(ProductDataMerge.tmall_supplier_name == None)
+        else:
+            query = query.filter(ProductDataMerge.tmall_supplier_name == category_value)
+    elif category_type == 'operator':
+        if category_value == '未分配': 
+            query = query.filter(ProductDataMerge.product_list_operator == None)
+        else:
+            query = query.filter(ProductDataMerge.product_list_operator == category_value)
+    elif category_type == 'category':
+        if category_value == '未分类':
+            query = query.filter(ProductDataMerge.product_list_category == None)
+        else:
+            query = query.filter(ProductDataMerge.product_list_category == category_value)
+
+    # 分组
+    query = query.group_by(
+        ProductDataMerge.tmall_product_code,
+        ProductDataMerge.product_name,
+        ProductDataMerge.tmall_supplier_name,
+        ProductDataMerge.product_list_operator,
+        ProductDataMerge.product_list_category
+    )
+
+    # 计算真实销售金额
+    query = query.having(
+        db.func.sum(ProductDataMerge.payment_amount) > 0
+    )
+
+    # 应用排序
+    if sort_by == 'real_amount':
+        # 按真实销售金额排序（需要计算）
+        query = query.order_by(real_amount.asc() if sort_order == 'asc' else real_amount.desc())
+    elif sort_by == 'total_amount':
+        query = query.order_by(total_amount.asc() if sort_order == 'asc' else total_amount.desc())
+    elif sort_by == 'total_quantity':
+        query = query.order_by(total_quantity.asc() if sort_order == 'asc' else total_quantity.desc())
+    else:
+        # 默认按真实销售金额倒序
+        query = query.order_by(real_amount.desc())
+
+    # 计算总数
+    total_query = query
+    total = total_query.count()
+
+    # 应用分页
+    offset = (page - 1) * per_page
+    return total, query.offset(offset).limit(per_page).all()
 
 @data_bp.route('/product-ranking', methods=['GET'])
 @jwt_required()
+@versioned_view(default_range=yesterday_range)
 def get_product_ranking():
     """获取商品销售排行数据（支持按门店、负责人员、类目分类）"""
     user_id = int(get_jwt_identity())
@@ -1695,102 +1764,21 @@ def get_product_ranking():
                 return jsonify({'message': '开始日期不能晚于结束日期'}), 400
         else:
             # 默认使用昨天的数据
-            from datetime import timedelta
-            yesterday = datetime.now().date() - timedelta(days=1)
-            start_date = yesterday
-            end_date = yesterday
+            start_date, end_date = yesterday_range()
         
-        # 构建基础查询
-        query = db.session.query(
-            ProductDataMerge.tmall_product_code,
-            ProductDataMerge.product_name,
-            ProductDataMerge.tmall_supplier_name,
-            ProductDataMerge.product_list_operator,
-            ProductDataMerge.product_list_category,
-            db.func.sum(ProductDataMerge.payment_amount).label('total_amount'),
-            db.func.sum(ProductDataMerge.payment_product_count).label('total_quantity'),
-            db.func.sum(ProductDataMerge.refund_amount).label('total_refund_amount'),
-            db.func.sum(ProductDataMerge.planting_amount).label('total_planting_amount'),
-            db.func.count(ProductDataMerge.id).label('record_count')
-        ).filter(
-            ProductDataMerge.upload_date >= start_date,
-            ProductDataMerge.upload_date <= end_date
-        )
-        
-        # 根据分类类型添加过滤条件
-        if category_type == 'store':
-            if category_value == '其他':
-                query = query.filter(ProductDataMerge.tmall_supplier_name == None)
-            else:
-                query = query.filter(ProductDataMerge.tmall_supplier_name == category_value)
-        elif category_type == 'operator':
-            if category_value == '未分配': 
-                query = query.filter(ProductDataMerge.product_list_operator == None)
-            else:
-                query = query.filter(ProductDataMerge.product_list_operator == category_value)
-        elif category_type == 'category':
-            if category_value == '未分类':
-                query = query.filter(ProductDataMerge.product_list_category == None)
-            else:
-                query = query.filter(ProductDataMerge.product_list_category == category_value)
-        else:
+        if category_type not in RANKING_CATEGORY_DIMENSIONS:
             return jsonify({'message': '无效的分类类型'}), 400
-        
-        # 分组
-        query = query.group_by(
-            ProductDataMerge.tmall_product_code,
-            ProductDataMerge.product_name,
-            ProductDataMerge.tmall_supplier_name,
-            ProductDataMerge.product_list_operator,
-            ProductDataMerge.product_list_category
-        )
-        
-        # 计算真实销售金额
-        query = query.having(
-            db.func.sum(ProductDataMerge.payment_amount) > 0
-        )
-        
-        # 应用排序
-        if sort_by == 'real_amount':
-            # 按真实销售金额排序（需要计算）
-            if sort_order == 'asc':
-                query = query.order_by(
-                    (db.func.sum(ProductDataMerge.payment_amount) - 
-                     db.func.sum(ProductDataMerge.refund_amount) - 
-                     db.func.sum(ProductDataMerge.planting_amount)).asc()
-                )
-            else:
-                query = query.order_by(
-                    (db.func.sum(ProductDataMerge.payment_amount) - 
-                     db.func.sum(ProductDataMerge.refund_amount) - 
-                     db.func.sum(ProductDataMerge.planting_amount)).desc()
-                )
-        elif sort_by == 'total_amount':
-            if sort_order == 'asc':
-                query = query.order_by(db.func.sum(ProductDataMerge.payment_amount).asc())
-            else:
-                query = query.order_by(db.func.sum(ProductDataMerge.payment_amount).desc())
-        elif sort_by == 'total_quantity':
-            if sort_order == 'asc':
-                query = query.order_by(db.func.sum(ProductDataMerge.payment_product_count).asc())
-            else:
-                query = query.order_by(db.func.sum(ProductDataMerge.payment_product_count).desc())
+
+        if columnar_cache.covers(start_date, end_date):
+            offset = (page - 1) * per_page
+            total, items = _product_ranking_from_cache(
+                start_date, end_date, category_type, category_value, sort_by, sort_order, offset, per_page
+            )
         else:
-            # 默认按真实销售金额倒序
-            query = query.order_by(
-                (db.func.sum(ProductDataMerge.payment_amount) - 
-                 db.func.sum(ProductDataMerge.refund_amount) - 
-                 db.func.sum(ProductDataMerge.planting_amount)).desc()
+            total, items = _product_ranking_from_sql(
+                start_date, end_date, category_type, category_value, sort_by, sort_order, page, per_page
             )
         
-        # 计算总数
-        total_query = query
-        total = total_query.count()
-        
-        # 应用分页
-        offset = (page - 1) * per_page
-        items = query.offset(offset).limit(per_page).all()
-        
         # 构建返回数据
         data = []
         for item in items:
@@ -1823,19 +1811,19 @@ def get_product_ranking():
         # 计算页面信息
         pages = (total + per_page - 1) // per_page  # 向上取整
         
-        return jsonify({
-            'category_type': category_type,
-            'category_value': category_value,
-            'start_date': start_date.isoformat(),
-            'end_date': end_date.isoformat(),
-            'sort_by': sort_by,
-            'sort_order': sort_order,
-            'data': data,
-            'total': total,
-            'pages': pages,
-            'current_page': page,
-            'per_page': per_page
-        })
+        return records_response(
+            data,
+            category_type=category_type,
+            category_value=category_value,
+            start_date=start_date.isoformat(),
+            end_date=end_date.isoformat(),
+            sort_by=sort_by,
+            sort_order=sort_order,
+            total=total,
+            pages=pages,
+            current_page=page,
+            per_page=per_page
+        )
         
     except ValueError:
         return jsonify({'message': '日期格式错误，请使用YYYY-MM-DD格式'}), 400
@@ -0,0 +1,88 @@
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from datetime import datetime
+from models import db, User
+from services.pipeline import pipeline_orchestrator
+from utils import progress_tracker
+import logging
+import threading
+import uuid
+
+# 获取日志记录器
+logger = logging.getLogger(__name__)
+
+pipeline_bp = Blueprint('pipeline', __name__)
+
+def _parse_optional_date(value):
+    """解析可选日期参数，格式错误时抛出ValueError"""
+    if not value:
+        return None
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+@pipeline_bp.route('/pipeline/status', methods=['GET'])
+@jwt_required()
+def get_pipeline_status():
+    """获取流水线各步骤待重算分区及最近运行状态"""
+    try:
+        start_date = _parse_optional_date(request.args.get('start_date'))
+        end_date = _parse_optional_date(request.args.get('end_date'))
+    except ValueError:
+        return jsonify({'message': '日期格式错误，请使用YYYY-MM-DD格式'}), 400
+
+    try:
+        return jsonify(pipeline_orchestrator.get_status(start_date, end_date)), 200
+    except Exception as e:
+        logger.error(f"获取流水线状态失败: {str(e)}")
+        return jsonify({'message': f'获取流水线状态失败: {str(e)}'}), 500
+
+def run_pipeline_async(start_date, end_date, task_id, app):
+    """异步执行流水线增量运行"""
+    with app.app_context():
+        progress_tracker.create_task(
+            task_id=task_id,
+            total_items=0,
+            description='流水线增量运行'
+        )
+        try:
+            summary = pipeline_orchestrator.run_pending(start_date, end_date, task_id)
+            progress_tracker.complete_task(
+                task_id,
+                f"流水线运行完成：成功 {summary['completed']} 个分区，跳过 {summary['skipped']} 个，失败 {summary['error']} 个"
+            )
+        except Exception as e:
+            logger.error(f"流水线运行失败，task_id: {task_id}, 错误: {str(e)}")
+            progress_tracker.error_task(task_id, str(e))
+
+@pipeline_bp.route('/pipeline/run', methods=['POST'])
+@jwt_required()
+def run_pipeline():
+    """立即执行一次流水线增量运行（仅重算输入发生变化的分区，仅管理员可访问）"""
+    user_id = int(get_jwt_identity())
+    user = db.session.get(User, user_id)
+
+    if user.role != 'admin':
+        return jsonify({'message': '权限不足'}), 403
+
+    data = request.get_json(silent=True) or {}
+    try:
+        start_date = _parse_optional_date(data.get('start_date'))
+        end_date = _parse_optional_date(data.get('end_date'))
+    except ValueError:
+        return jsonify({'message': '日期格式错误，请使用YYYY-MM-DD格式'}), 400
+
+    if start_date and end_date and start_date > end_date:
+        return jsonify({'message': '开始日期不能晚于结束日期'}), 400
+
+    task_id = str(uuid.uuid4())
+    processing_thread = threading.Thread(
+        target=run_pipeline_async,
+        args=(start_date, end_date, task_id, current_app._get_current_object())
+    )
+    processing_thread.daemon = True
+    processing_thread.start()
+
+    return jsonify({
+        'message': '流水线已开始后台运行',
+        'task_id': task_id,
+        'status': 'processing'
+    }), 202
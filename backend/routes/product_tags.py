@@ -1,12 +1,34 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy import or_
 from models import db, User, ProductList
+from services.product_list_sync import (
+    product_list_sync, record_product_list_change, PRODUCT_MERGE_SOURCE_FIELDS, ORDER_MERGE_SOURCE_FIELDS
+)
+from services.product_activity import sync_product_activities, products_in_activity
+from services.search_index import search_index
+from services.projection import Projection
 from datetime import datetime
 import json
 
 product_tags_bp = Blueprint('product_tags', __name__)
 
+# 产品标签列表返回的列
+PRODUCT_TAG_PROJECTION = Projection(ProductList, [
+    ('id', 'id', 'raw'),
+    ('product_id', 'product_id', 'raw'),
+    ('product_name', 'product_name', 'raw'),
+    ('listing_time', 'listing_time', 'iso'),
+    ('tmall_supplier_id', 'tmall_supplier_id', 'raw'),
+    ('operator', 'operator', 'raw'),
+    ('category', 'category', 'raw'),
+    ('action_list', 'action_list', 'list'),
+    ('main_image_url', 'main_image_url', 'raw'),
+    ('network_disk_path', 'network_disk_path', 'raw'),
+    ('created_at', 'created_at', 'datetime_text'),
+    ('updated_at', 'updated_at', 'datetime_text'),
+])
+
 @product_tags_bp.route('/product-tags', methods=['GET'])
 @jwt_required()
 def get_product_tags():
@@ -38,22 +60,22 @@ def get_product_tags():
     
     # 应用搜索过滤
     if product_id:
-        query = query.filter(ProductList.product_id.ilike(f'%{product_id}%'))
+        query = query.filter(search_index.substring_filter('list_product_id', product_id))
     
     if product_name:
-        query = query.filter(ProductList.product_name.ilike(f'%{product_name}%'))
+        query = query.filter(search_index.substring_filter('list_product_name', product_name))
     
     if listing_time:
         query = query.filter(ProductList.listing_time == listing_time)
     
     if tmall_supplier_id:
-        query = query.filter(ProductList.tmall_supplier_id.ilike(f'%{tmall_supplier_id}%'))
+        query = query.filter(search_index.substring_filter('list_supplier_id', tmall_supplier_id))
     
     if operator:
-        query = query.filter(ProductList.operator.ilike(f'%{operator}%'))
+        query = query.filter(search_index.substring_filter('list_operator', operator))
     
     if category:
-        query = query.filter(ProductList.category.ilike(f'%{category}%'))
+        query = query.filter(search_index.substring_filter('list_category', category))
     
     # 动态排序
     sort_column = getattr(ProductList, sort_by, ProductList.created_at)
@@ -62,38 +84,20 @@ def get_product_tags():
     else:
         query = query.order_by(sort_column.asc())
     
-    # 分页
-    pagination = query.paginate(
+    # 分页（只查询响应需要的列）
+    pagination = PRODUCT_TAG_PROJECTION.apply(query).paginate(
         page=page, per_page=per_page, error_out=False
     )
     
-    # 构建响应数据
-    data = []
-    for item in pagination.items:
-        data.append({
-            'id': item.id,
-            'product_id': item.product_id,
-            'product_name': item.product_name,
-            'listing_time': item.listing_time.strftime('%Y-%m-%d') if item.listing_time else None,
-            'tmall_supplier_id': item.tmall_supplier_id,
-            'operator': item.operator,
-            'category': item.category,
-            'action_list': item.action_list if item.action_list else [],
-            'main_image_url': item.main_image_url,
-            'network_disk_path': item.network_disk_path,
-            'created_at': item.created_at.strftime('%Y-%m-%d %H:%M:%S') if item.created_at else None,
-            'updated_at': item.updated_at.strftime('%Y-%m-%d %H:%M:%S') if item.updated_at else None
-        })
-    
-    return jsonify({
-        'data': data,
-        'current_page': pagination.page,
-        'pages': pagination.pages,
-        'per_page': pagination.per_page,
-        'total': pagination.total,
-        'has_next': pagination.has_next,
-        'has_prev': pagination.has_prev
-    })
+    return PRODUCT_TAG_PROJECTION.response(
+        pagination.items,
+        current_page=pagination.page,
+        pages=pagination.pages,
+        per_page=pagination.per_page,
+        total=pagination.total,
+        has_next=pagination.has_next,
+        has_prev=pagination.has_prev
+    )
 
 @product_tags_bp.route('/product-tags/<int:product_id>/actions', methods=['PUT'])
 @jwt_required()
@@ -137,9 +141,10 @@ def update_product_actions(product_id):
             return jsonify({'message': '日期格式错误，应为YYYY-MM-DD'}), 400
     
     try:
-        # 更新产品的action_list
+        # 更新产品的action_list，同步活动日历
         product.action_list = action_list
         product.updated_at = datetime.utcnow()
+        sync_product_activities([product])
         
         db.session.commit()
         
@@ -189,6 +194,97 @@ def get_product_tag_detail(product_id):
         }
     })
 
+# 允许编辑的产品总表字段
+EDITABLE_PRODUCT_FIELDS = [
+    'product_id', 'product_name', 'listing_time', 'tmall_supplier_id',
+    'operator', 'category', 'main_image_url', 'network_disk_path'
+]
+
+@product_tags_bp.route('/product-tags/<int:product_id>', methods=['PUT'])
+@jwt_required()
+def update_product_tag(product_id):
+    """编辑产品总表记录（仅管理员可访问），影响merge表的修改由后台增量回填"""
+    user_id = int(get_jwt_identity())
+    user = db.session.get(User, user_id)
+    
+    if user.role != 'admin':
+        return jsonify({'message': '权限不足'}), 403
+    
+    product = db.session.get(ProductList, product_id)
+    if not product:
+        return jsonify({'message': '产品不存在'}), 404
+    
+    data = request.get_json()
+    if not data:
+        return jsonify({'message': '缺少请求数据'}), 400
+    
+    values = {}
+    for field in EDITABLE_PRODUCT_FIELDS:
+        if field not in data:
+            continue
+        value = data[field]
+        if isinstance(value, str):
+            value = value.strip() or None
+        if field == 'listing_time' and value:
+            try:
+                value = datetime.strptime(value, '%Y-%m-%d').date()
+            except (TypeError, ValueError):
+                return jsonify({'message': '日期格式错误，应为YYYY-MM-DD'}), 400
+        values[field] = value
+    
+    if 'product_id' in values and not values['product_id']:
+        return jsonify({'message': '产品ID不能为空'}), 400
+    if 'product_name' in values and values['product_name'] is None:
+        values['product_name'] = ''
+    
+    changed_fields = {field for field, value in values.items() if getattr(product, field) != value}
+    if not changed_fields:
+        return jsonify({'message': '没有需要更新的字段', 'changed_fields': []})
+    
+    try:
+        old_product_id = product.product_id
+        old_supplier_id = product.tmall_supplier_id
+        for field in changed_fields:
+            setattr(product, field, values[field])
+        product.updated_at = datetime.utcnow()
+        
+        if 'product_id' in changed_fields:
+            # 活动日历冗余存储了产品ID
+            sync_product_activities([product])
+        
+        sync_required = bool(changed_fields & (PRODUCT_MERGE_SOURCE_FIELDS | ORDER_MERGE_SOURCE_FIELDS))
+        if sync_required:
+            record_product_list_change(
+                product, 'update', changed_fields,
+                old_product_id=old_product_id if 'product_id' in changed_fields else None,
+                old_supplier_id=old_supplier_id if 'tmall_supplier_id' in changed_fields else None
+            )
+        
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'更新失败: {str(e)}'}), 500
+    
+    if sync_required:
+        product_list_sync.schedule(current_app._get_current_object())
+    
+    return jsonify({
+        'message': '产品信息更新成功',
+        'changed_fields': sorted(changed_fields),
+        'data': {
+            'id': product.id,
+            'product_id': product.product_id,
+            'product_name': product.product_name,
+            'listing_time': product.listing_time.strftime('%Y-%m-%d') if product.listing_time else None,
+            'tmall_supplier_id': product.tmall_supplier_id,
+            'operator': product.operator,
+            'category': product.category,
+            'main_image_url': product.main_image_url,
+            'network_disk_path': product.network_disk_path,
+            'updated_at': product.updated_at.strftime('%Y-%m-%d %H:%M:%S')
+        }
+    })
+
 @product_tags_bp.route('/product-tags/batch-actions', methods=['POST'])
 @jwt_required()
 def batch_update_product_actions():
@@ -242,7 +338,8 @@ def batch_update_product_actions():
                 print(f"更新产品 {product.id} 时发生错误: {str(e)}")
                 continue
         
-        # 提交所有更改
+        # 同步活动日历并提交所有更改
+        sync_product_activities(products)
         db.session.commit()
         
         return jsonify({
@@ -278,27 +375,58 @@ def get_all_product_ids():
     
     # 应用搜索过滤
     if product_id:
-        query = query.filter(ProductList.product_id.ilike(f'%{product_id}%'))
+        query = query.filter(search_index.substring_filter('list_product_id', product_id))
     
     if product_name:
-        query = query.filter(ProductList.product_name.ilike(f'%{product_name}%'))
+        query = query.filter(search_index.substring_filter('list_product_name', product_name))
     
     if listing_time:
         query = query.filter(ProductList.listing_time == listing_time)
     
     if tmall_supplier_id:
-        query = query.filter(ProductList.tmall_supplier_id.ilike(f'%{tmall_supplier_id}%'))
+        query = query.filter(search_index.substring_filter('list_supplier_id', tmall_supplier_id))
     
     if operator:
-        query = query.filter(ProductList.operator.ilike(f'%{operator}%'))
+        query = query.filter(search_index.substring_filter('list_operator', operator))
     
     if category:
-        query = query.filter(ProductList.category.ilike(f'%{category}%'))
+        query = query.filter(search_index.substring_filter('list_category', category))
     
     # 只获取ID字段
-    product_ids = [p.id for p in query.all()]
+    product_ids = [row.id for row in query.with_entities(ProductList.id).all()]
     
     return jsonify({
         'product_ids': product_ids,
         'total_count': len(product_ids)
-    }) 
\ No newline at end of file
+    }) 
+
+@product_tags_bp.route('/product-tags/activity-products', methods=['GET'])
+@jwt_required()
+def get_activity_products():
+    """查询指定日期处于某活动（活动中或预热中）的全部产品（所有用户可访问）"""
+    activity_name = request.args.get('name', '').strip()
+    date_param = request.args.get('date', '').strip()
+    
+    if not activity_name or not date_param:
+        return jsonify({'message': '请提供活动名称和日期'}), 400
+    
+    try:
+        target_date = datetime.strptime(date_param, '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'message': '日期格式错误，应为YYYY-MM-DD'}), 400
+    
+    activities = products_in_activity(activity_name, target_date)
+    
+    return jsonify({
+        'activity_name': activity_name,
+        'date': target_date.isoformat(),
+        'total_count': len(activities),
+        'data': [{
+            'id': activity.product_list_id,
+            'product_id': activity.product_id,
+            'status': '预热中' if target_date < activity.start_date else '活动中',
+            'warmup_date': activity.warmup_date.isoformat() if activity.warmup_date else None,
+            'start_date': activity.start_date.isoformat(),
+            'end_date': activity.end_date.isoformat()
+        } for activity in activities]
+    })
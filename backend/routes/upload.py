@@ -3,9 +3,13 @@ import logging
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from werkzeug.utils import secure_filename
-from datetime import datetime
+from datetime import datetime, timedelta
 from models import db, ProductData, ProductList, PlantingRecord, SubjectReport, ProductDataMerge, OrderDetails, OrderDetailsMerge, CompanyCostPricing, OperationCostPricing, AlipayAmount
 from services.file_processor import FileProcessor
+from services.pipeline import pipeline_orchestrator
+from services.product_list_sync import product_list_sync
+from services.merge_scheduler import merge_scheduler
+from services.partition_lock import partition_lock, PartitionLockTimeout
 from utils import progress_tracker
 import threading
 import uuid
@@ -16,6 +20,22 @@ file_processor = FileProcessor()
 # 获取日志记录器
 logger = logging.getLogger(__name__)
 
+def _notify_pipeline(table_name, partition_dates, store_name=''):
+    """通知流水线数据分区发生变化并调度增量运行（失败不影响上传结果）"""
+    try:
+        pipeline_orchestrator.mark_dirty(table_name, partition_dates, store_name)
+        pipeline_orchestrator.schedule(current_app._get_current_object())
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"通知流水线失败: {table_name}, 错误: {e}")
+
+def _notify_product_list_sync():
+    """产品总表变更后调度增量回填merge表（失败不影响上传结果）"""
+    try:
+        product_list_sync.schedule(current_app._get_current_object())
+    except Exception as e:
+        logger.warning(f"调度产品总表增量回填失败: {e}")
+
 @upload_bp.route('/check-file', methods=['POST'])
 @jwt_required()
 def check_file_exists():
@@ -71,42 +91,47 @@ def upload_file():
     if file and file.filename.endswith(('.xlsx', '.xls', '.csv')):
         filename = secure_filename(file.filename)
         
-        # 检查是否已存在相同日期和门店的记录，直接删除不弹确认
-        existing_records = ProductData.query.filter_by(
-            upload_date=upload_date,
-            tmall_supplier_name=supplier_store
-        ).all()
-        
-        if existing_records:
-            # 直接删除现有记录，同时删除相关的merge记录
-            ProductDataMerge.query.filter_by(
-                upload_date=upload_date,
-                tmall_supplier_name=supplier_store
-            ).delete()
-            
-            for record in existing_records:
-                db.session.delete(record)
-            db.session.commit()
-            logger.info(f"已删除门店 {supplier_store} 在 {upload_date} 的 {len(existing_records)} 条旧记录")
-        
         filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
         file.save(filepath)
         
         # 处理文件
         try:
-            success_count = file_processor.process_uploaded_file(
-                filepath, platform, int(get_jwt_identity()), filename, upload_date, supplier_store
-            )
+            # 同一门店同一日期的上传串行执行；旧记录删除与新数据写入在同一事务内提交
+            with partition_lock(f'product_data:{upload_date}:{supplier_store}',
+                                current_app.config.get('PARTITION_LOCK_TIMEOUT_SECONDS', 300)):
+                # 检查是否已存在相同日期和门店的记录，直接删除不弹确认
+                existing_records = ProductData.query.filter_by(
+                    upload_date=upload_date,
+                    tmall_supplier_name=supplier_store
+                ).all()
+                
+                if existing_records:
+                    # 直接删除现有记录；merge记录由合并步骤按店铺分区对齐更新，保留已计算的推广/种菜字段
+                    for record in existing_records:
+                        db.session.delete(record)
+                    logger.info(f"删除门店 {supplier_store} 在 {upload_date} 的 {len(existing_records)} 条旧记录")
+                
+                success_count = file_processor.process_uploaded_file(
+                    filepath, platform, int(get_jwt_identity()), filename, upload_date, supplier_store
+                )
             os.remove(filepath)  # 删除临时文件
             
+            # 合并表由调度器在防抖窗口后按日期合并一次（同一天多个门店的上传合并执行），下游汇总步骤由流水线增量调度
+            _notify_pipeline('product_data', [upload_date], supplier_store)
+            merge_scheduler.enqueue(current_app._get_current_object(), upload_date, supplier_store)
+            
             message = f'文件上传成功，处理了 {success_count} 条数据'
             if existing_records:
                 message += f'，已替换门店"{supplier_store}"之前的 {len(existing_records)} 条记录'
             
             return jsonify({
                 'message': message,
-                'count': success_count
+                'count': success_count,
+                'merge_scheduled': True
             }), 200
+        except PartitionLockTimeout:
+            db.session.rollback()
+            return jsonify({'message': f'门店"{supplier_store}"在 {upload_date} 的数据正在上传，请稍后重试'}), 409
         except Exception as e:
             return jsonify({'message': f'文件处理失败: {str(e)}'}), 500
     
@@ -135,6 +160,7 @@ def upload_product_list():
                 filepath, int(get_jwt_identity())
             )
             os.remove(filepath)  # 删除临时文件
+            _notify_product_list_sync()
             
             # 处理返回结果
             if isinstance(result, dict):
@@ -190,8 +216,10 @@ def upload_planting_records():
                 'existing_count': existing_count
             }), 409
         
-        # 如果强制覆盖，删除现有记录
+        # 如果强制覆盖，删除现有记录（先记下旧数据的日期，这些日期的种菜汇总同样需要重算）
+        replaced_dates = set()
         if existing_count > 0 and force_overwrite:
+            replaced_dates = {row[0] for row in db.session.query(PlantingRecord.order_date).distinct().all()}
             PlantingRecord.query.delete()
             db.session.commit()
         
@@ -204,6 +232,9 @@ def upload_planting_records():
             )
             os.remove(filepath)  # 删除临时文件
             
+            planting_dates = {row[0] for row in db.session.query(PlantingRecord.order_date).distinct().all()}
+            _notify_pipeline('planting_records', planting_dates | replaced_dates)
+            
             message = f'种菜表格登记导入成功，处理了 {success_count} 条数据'
             if existing_count > 0 and force_overwrite:
                 message += f'，已替换之前的 {existing_count} 条记录'
@@ -268,6 +299,11 @@ def upload_subject_report():
             )
             os.remove(filepath)  # 删除临时文件
             
+            report_dates = [row[0] for row in db.session.query(SubjectReport.report_date).filter(
+                SubjectReport.upload_date == upload_date
+            ).distinct().all()]
+            _notify_pipeline('subject_report', report_dates)
+            
             message = f'主体报表导入成功，处理了 {success_count} 条数据'
             if existing_records and force_overwrite:
                 message += f'，已替换之前的 {len(existing_records)} 条记录'
@@ -302,6 +338,10 @@ def process_order_details_async(filepath, user_id, filename, force_overwrite, ta
                 filepath, user_id, filename, force_overwrite, task_id
             )
             logger.info(f"异步处理完成，task_id: {task_id}, 成功处理 {success_count} 条数据")
+            
+            progress = progress_tracker.get_progress(task_id) or {}
+            processed_dates = progress.get('details', {}).get('processed_dates', [])
+            _notify_pipeline('order_details', processed_dates)
         except Exception as e:
             logger.error(f"异步处理失败，task_id: {task_id}, 错误: {str(e)}")
             # 标记任务为错误状态
@@ -466,6 +506,11 @@ def upload_alipay_file():
         )
         os.remove(filepath)  # 删除临时文件
         
+        _notify_pipeline('alipay_amount', [
+            start_date_obj + timedelta(days=offset)
+            for offset in range((end_date_obj - start_date_obj).days + 1)
+        ])
+        
         message = f'支付宝金额文件导入成功，处理了 {success_count} 条数据'
         if existing_count > 0:
             message += f'，已替换该日期范围内的 {existing_count} 条记录'
@@ -486,13 +531,10 @@ def get_upload_progress(task_id):
     """获取文件上传处理进度"""
     # logger.info(f"查询进度，task_id: {task_id}")
     
-    # 先列出所有任务
-    all_tasks = progress_tracker.list_tasks()
-    # logger.info(f"当前所有任务: {list(all_tasks.keys())}")
-    
     progress = progress_tracker.get_progress(task_id)
     
     if not progress:
+        all_tasks = progress_tracker.list_tasks()
         logger.warning(f"未找到任务 {task_id}，当前任务数: {len(all_tasks)}")
         return jsonify({
             'message': '未找到指定的任务',
@@ -0,0 +1,125 @@
+import time
+from datetime import datetime
+from models import db, BackfillCheckpoint
+from services.bulk_calculator import bulk_calculator
+from services.business_calculator import CalculationDataMissing
+from services.pipeline import PIPELINE_STEPS, pipeline_orchestrator
+from services.range_executor import RangeExecutor
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BackfillRunner:
+    """历史回填执行器 - 按日期逐天执行完整计算链路
+
+    每个(步骤, 日期)分区执行后写入检查点，同名作业再次运行时跳过已完成的分区；
+    因缺少输入数据跳过的分区同样记录检查点，但再次运行时会重试（数据可能已补传）；
+    每个分区执行后按 耗时 * (1 / max_db_load - 1) 休眠，使数据库占用比例不超过max_db_load。
+    """
+
+    def __init__(self, job_name, step_names=None, max_db_load=1.0, echo=print):
+        if not 0 < max_db_load <= 1:
+            raise ValueError('max_db_load 必须在 (0, 1] 区间内')
+
+        step_names = set(step_names or [step.name for step in PIPELINE_STEPS])
+        unknown_steps = step_names - {step.name for step in PIPELINE_STEPS}
+        if unknown_steps:
+            raise ValueError(f'未知的计算步骤: {", ".join(sorted(unknown_steps))}')
+
+        self.job_name = job_name
+        # 保持流水线拓扑顺序
+        self.step_names = [step.name for step in PIPELINE_STEPS if step.name in step_names]
+        self.max_db_load = max_db_load
+        self.echo = echo
+
+    def _completed_partitions(self):
+        rows = db.session.query(BackfillCheckpoint.step_name, BackfillCheckpoint.partition_date).filter(
+            BackfillCheckpoint.job_name == self.job_name,
+            BackfillCheckpoint.status == 'completed'
+        ).all()
+        return {(step_name, partition_date) for step_name, partition_date in rows}
+
+    def reset(self):
+        """清除作业的全部检查点，下次运行从头开始"""
+        deleted_count = BackfillCheckpoint.query.filter_by(job_name=self.job_name).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted_count
+
+    def _save_checkpoint(self, step_name, partition_date, status, rows_affected, duration, message):
+        # 之前跳过的分区重试时更新原检查点
+        checkpoint = BackfillCheckpoint.query.filter_by(
+            job_name=self.job_name, step_name=step_name, partition_date=partition_date
+        ).first()
+        if not checkpoint:
+            checkpoint = BackfillCheckpoint(job_name=self.job_name, step_name=step_name, partition_date=partition_date)
+            db.session.add(checkpoint)
+        checkpoint.status = status
+        checkpoint.rows_affected = rows_affected
+        checkpoint.duration_seconds = duration
+        checkpoint.message = message[:2000] if message else message
+        checkpoint.completed_at = datetime.utcnow()
+        db.session.commit()
+
+    def _throttle(self, duration):
+        pause = duration * (1.0 / self.max_db_load - 1)
+        if pause > 0:
+            time.sleep(pause)
+        return pause
+
+    def run(self, start_date, end_date):
+        """执行回填，返回汇总；分区执行出错时抛出异常（已完成分区的检查点保留）"""
+        completed = self._completed_partitions()
+        partitions = [
+            (partition_date, step_name)
+            for partition_date in RangeExecutor.split_dates(start_date, end_date)
+            for step_name in self.step_names
+        ]
+        pending = [(d, s) for d, s in partitions if (s, d) not in completed]
+
+        self.echo(f'回填作业 {self.job_name}: {start_date} ~ {end_date}，共 {len(partitions)} 个分区，'
+                  f'已完成 {len(partitions) - len(pending)} 个，待执行 {len(pending)} 个')
+
+        summary = {'completed': 0, 'skipped': 0, 'rows': 0, 'db_seconds': 0.0, 'throttle_seconds': 0.0}
+        started_at = time.time()
+
+        for index, (partition_date, step_name) in enumerate(pending, 1):
+            partition_start = time.time()
+            try:
+                rows = bulk_calculator.run_step(step_name, partition_date)
+                status, message = 'completed', f'写入 {rows} 行'
+            except CalculationDataMissing as e:
+                db.session.rollback()
+                rows, status, message = 0, 'skipped', e.message
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"回填作业 {self.job_name} 在 {step_name} [{partition_date}] 失败: {e}")
+                self.echo(f'[{index}/{len(pending)}] {partition_date} {step_name} 失败: {e}')
+                self.echo('已完成的分区检查点已保存，修复后使用相同作业名称重新运行即可从该分区继续')
+                raise
+            duration = time.time() - partition_start
+
+            self._save_checkpoint(step_name, partition_date, status, rows, duration, message)
+            if status == 'completed':
+                # 登记流水线步骤状态，避免编排器重复计算已回填的分区
+                pipeline_orchestrator.record_step_run(step_name, [partition_date], '历史回填')
+
+            summary[status] += 1
+            summary['rows'] += rows
+            summary['db_seconds'] += duration
+
+            elapsed = time.time() - started_at
+            rows_per_second = rows / duration if duration > 0 else 0
+            total_rows_per_second = summary['rows'] / elapsed if elapsed > 0 else 0
+            line = (f'[{index}/{len(pending)}] {partition_date} {step_name}: '
+                    f'{message if status == "skipped" else f"{rows} 行"}，{duration:.2f} 秒，{rows_per_second:.0f} 行/秒'
+                    f' | 累计 {summary["rows"]} 行，{total_rows_per_second:.0f} 行/秒')
+            self.echo(line)
+
+            summary['throttle_seconds'] += self._throttle(duration)
+
+        summary['elapsed_seconds'] = time.time() - started_at
+        self.echo(f'回填完成: 成功 {summary["completed"]} 个分区，跳过 {summary["skipped"]} 个，'
+                  f'写入 {summary["rows"]} 行，耗时 {summary["elapsed_seconds"]:.1f} 秒'
+                  f'（数据库 {summary["db_seconds"]:.1f} 秒，限流等待 {summary["throttle_seconds"]:.1f} 秒）')
+        return summary
@@ -0,0 +1,411 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, update, delete, exists, case, and_
+from models import db, ProductData, ProductList, ProductDataMerge, SubjectReport, PlantingRecord, OrderDetails, OrderDetailsMerge, OperationCostPricing, AlipayAmount
+from services.business_calculator import BusinessCalculator, CalculationDataMissing
+from services.daily_rollup import daily_rollup
+from services.internal_order_summary import refresh_for_order_dates, refresh_for_upload_dates
+from services.shadow_partition import ShadowPartition, shadow_mode_enabled
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _zero(column):
+    """NULL按0参与计算"""
+    return db.func.coalesce(column, 0)
+
+
+# product_data与product_data_merge同名的字段
+PRODUCT_DATA_COLUMNS = [
+    'platform', 'product_name', 'tmall_product_code', 'tmall_supplier_name',
+    'visitor_count', 'page_views', 'search_guided_visitors', 'add_to_cart_count', 'favorite_count',
+    'payment_amount', 'payment_product_count', 'payment_buyer_count', 'search_guided_payment_buyers',
+    'unit_price', 'visitor_average_value', 'payment_conversion_rate', 'order_conversion_rate',
+    'avg_stay_time', 'detail_page_bounce_rate', 'order_payment_conversion_rate',
+    'search_payment_conversion_rate', 'refund_amount', 'refund_ratio',
+    'filename', 'upload_date', 'uploaded_by'
+]
+
+# order_details与order_details_merge同名的字段
+ORDER_DETAILS_COLUMNS = [
+    'internal_order_number', 'online_order_number', 'store_code', 'store_name',
+    'order_time', 'payment_date', 'shipping_date', 'payable_amount', 'paid_amount',
+    'express_company', 'tracking_number', 'province', 'city', 'district',
+    'product_code', 'product_name', 'quantity', 'unit_price', 'product_amount',
+    'payment_number', 'image_url', 'store_style_code', 'order_status', 'upload_date'
+]
+
+# 运营成本字段: order_details_merge字段 -> operation_cost_pricing字段
+OPERATION_COST_COLUMNS = {
+    'operation_cost_brand_category': 'brand_category',
+    'operation_cost_product_code': 'product_code',
+    'operation_cost_product_name': 'product_name',
+    'operation_cost_supply_price': 'supply_price',
+    'operation_cost_operation_staff': 'operation_staff',
+    'operation_cost_filename': 'filename',
+}
+
+
+class BulkCalculator:
+    """集合式汇总计算服务类 - 以单日分区为单位，用INSERT...SELECT / 关联子查询UPDATE完成计算
+
+    派生指标为生成列，这里只写入源字段；计算口径与BusinessCalculator逐行计算一致，每个方法返回写入的行数，输入数据缺失时抛出CalculationDataMissing。
+    供历史回填等大批量重算场景使用。
+    """
+
+    def __init__(self):
+        self._steps = {
+            'product_data_merge': self.merge_product_data,
+            'promotion_summary': self.calculate_promotion_summary,
+            'planting_summary': self.calculate_planting_summary,
+            'final_summary': self.calculate_final_summary,
+            'order_details_merge': self.calculate_order_details_merge,
+            'order_cost_summary': self.calculate_order_cost_summary,
+            'order_payment_update': self.calculate_order_payment_update,
+        }
+
+    def run_step(self, step_name, partition_date):
+        """执行流水线步骤的单日分区，返回写入行数"""
+        if step_name not in self._steps:
+            raise ValueError(f'未知的计算步骤: {step_name}')
+        return self._steps[step_name](partition_date)
+
+    @staticmethod
+    def _exists(*criteria):
+        return db.session.query(exists().where(*criteria)).scalar()
+
+    @staticmethod
+    def _day_range(column, partition_date):
+        """日期时间字段落在partition_date当天（范围条件，可使用索引）"""
+        return and_(column >= partition_date, column < partition_date + timedelta(days=1))
+
+    @staticmethod
+    def _replace_partition(model, partition_criteria, target_columns, source):
+        """用source的结果替换model中的分区并提交，返回 (删除行数, 写入行数)
+
+        影子分区模式下先写入影子表，再在一个短事务内替换；否则在当前事务内直接删除后写入。
+        """
+        if shadow_mode_enabled():
+            shadow = ShadowPartition(model, partition_criteria)
+            try:
+                shadow.insert_from_select(target_columns, source)
+            except Exception:
+                db.session.rollback()
+                raise
+            return shadow.publish()
+
+        deleted_count = db.session.execute(delete(model).where(*partition_criteria)).rowcount
+        created_count = db.session.execute(insert(model).from_select(target_columns, source)).rowcount
+        db.session.commit()
+        return deleted_count, created_count
+
+    # ================================
+    # 商品数据链路
+    # ================================
+
+    def merge_product_data(self, upload_date):
+        """重建当天的product_data_merge：product_data LEFT JOIN product_list（同一产品ID取最早一条）"""
+        canonical = select(
+            ProductList.product_id,
+            db.func.min(ProductList.id).label('id')
+        ).group_by(ProductList.product_id).subquery()
+
+        columns = [getattr(ProductData, name) for name in PRODUCT_DATA_COLUMNS] + [
+            ProductData.id,
+            ProductList.id,
+            ProductList.product_name,
+            ProductList.listing_time,
+            ProductList.tmall_supplier_id,
+            ProductList.operator,
+            ProductList.category,
+            ProductList.main_image_url,
+            ProductList.created_at,
+            ProductList.updated_at,
+            ProductList.uploaded_by,
+            case((ProductList.id.isnot(None), True), else_=False),
+        ]
+        target_columns = PRODUCT_DATA_COLUMNS + [
+            'product_data_id',
+            'product_list_id',
+            'product_list_name',
+            'listing_time',
+            'product_list_tmall_supplier_id',
+            'product_list_operator',
+            'product_list_category',
+            'product_list_image',
+            'product_list_created_at',
+            'product_list_updated_at',
+            'product_list_uploaded_by',
+            'is_matched',
+        ]
+
+        source = select(*columns).select_from(ProductData).outerjoin(
+            canonical,
+            and_(canonical.c.product_id == ProductData.tmall_product_code, ProductData.tmall_product_code != '')
+        ).outerjoin(
+            ProductList, ProductList.id == canonical.c.id
+        ).where(ProductData.upload_date == upload_date)
+
+        deleted_count, merge_count = self._replace_partition(
+            ProductDataMerge, [ProductDataMerge.upload_date == upload_date], target_columns, source
+        )
+
+        logger.info(f"集合式合并 {upload_date}: 删除 {deleted_count} 条，写入 {merge_count} 条")
+        return merge_count
+
+    def calculate_promotion_summary(self, target_date):
+        """按场景汇总subject_report.cost写入匹配到主体报表的merge记录"""
+        if not self._exists(ProductDataMerge.upload_date == target_date):
+            raise CalculationDataMissing(
+                f'未找到日期为 {target_date} 的商品排行数据，请先上传当天的商品排行日报（苏宁/天猫等平台数据）',
+                'missing_product_data'
+            )
+        if not self._exists(SubjectReport.report_date == target_date):
+            raise CalculationDataMissing(
+                f'未找到日期为 {target_date} 的主体报表数据，请先上传当天的主体报表',
+                'missing_subject_report'
+            )
+
+        matches_product = and_(
+            SubjectReport.report_date == target_date,
+            SubjectReport.subject_id == ProductDataMerge.tmall_product_code
+        )
+
+        scenes_by_field = {}
+        for scene_name, field_name in BusinessCalculator.SCENE_MAPPING.items():
+            scenes_by_field.setdefault(field_name, []).append(scene_name)
+
+        values = {
+            field_name: select(_zero(db.func.sum(SubjectReport.cost))).where(
+                matches_product, SubjectReport.scene_name.in_(scene_names)
+            ).scalar_subquery()
+            for field_name, scene_names in scenes_by_field.items()
+        }
+        values['promotion_summary_updated_at'] = datetime.utcnow()
+
+        updated_count = db.session.execute(
+            update(ProductDataMerge).where(
+                ProductDataMerge.upload_date == target_date,
+                ProductDataMerge.tmall_product_code.isnot(None),
+                ProductDataMerge.tmall_product_code != '',
+                exists().where(matches_product)
+            ).values(values)
+        ).rowcount
+        db.session.commit()
+        return updated_count
+
+    def calculate_planting_summary(self, summary_date):
+        """按商品汇总当天种菜订单写入merge记录，已没有种菜记录的商品清零残留的种菜汇总"""
+        if not self._exists(PlantingRecord.order_date == summary_date):
+            reset_count = BusinessCalculator.reset_planting_summary(summary_date)
+            if reset_count:
+                db.session.commit()
+                return reset_count
+            db.session.rollback()
+            raise CalculationDataMissing(
+                '未找到所选日期的种菜表格数据，请先上传种菜表格',
+                'NO_PLANTING_DATA', status_code=404
+            )
+        if not self._exists(ProductDataMerge.upload_date == summary_date):
+            raise CalculationDataMissing(
+                '未找到所选日期的商品排行数据，请先上传商品排行日报',
+                'NO_MERGE_DATA', status_code=404
+            )
+
+        matches_product = and_(
+            PlantingRecord.order_date == summary_date,
+            PlantingRecord.product_id == ProductDataMerge.tmall_product_code
+        )
+
+        def planting_aggregate(expression):
+            return select(expression).where(matches_product).scalar_subquery()
+
+        updated_count = db.session.execute(
+            update(ProductDataMerge).where(
+                ProductDataMerge.upload_date == summary_date,
+                exists().where(matches_product)
+            ).values(
+                planting_orders=planting_aggregate(db.func.count(PlantingRecord.id)),
+                planting_amount=planting_aggregate(_zero(db.func.sum(PlantingRecord.amount))),
+                planting_cost=planting_aggregate(_zero(db.func.sum(PlantingRecord.gift_commission))),
+                planting_summary_updated_at=datetime.utcnow()
+            )
+        ).rowcount
+        updated_count += BusinessCalculator.reset_planting_summary(summary_date)
+        db.session.commit()
+        return updated_count
+
+    def calculate_final_summary(self, summary_date):
+        """最终汇总：派生指标均为生成列，刷新当天merge记录的更新时间以及看板日汇总"""
+        updated_count = db.session.execute(
+            update(ProductDataMerge).where(ProductDataMerge.upload_date == summary_date).values(
+                updated_at=datetime.utcnow()
+            )
+        ).rowcount
+        if not updated_count:
+            db.session.rollback()
+            daily_rollup.refresh([summary_date])
+            raise CalculationDataMissing('未找到所选日期的数据', 'NO_DATA', status_code=404)
+
+        db.session.commit()
+        daily_rollup.refresh([summary_date])
+        return updated_count
+
+    # ================================
+    # 订单数据链路
+    # ================================
+
+    def calculate_order_details_merge(self, order_date):
+        """重建当天下单的order_details_merge：order_details LEFT JOIN product_list（同一供销ID取最早一条）
+
+        当天订单详情已被删除时清理残留的合并数据及其内部订单汇总（返回0），没有可清理的数据才抛出CalculationDataMissing。
+        """
+        if not self._exists(self._day_range(OrderDetails.order_time, order_date)):
+            deleted_count = db.session.execute(
+                delete(OrderDetailsMerge).where(self._day_range(OrderDetailsMerge.order_time, order_date))
+            ).rowcount
+            if deleted_count:
+                db.session.commit()
+                refresh_for_order_dates(order_date, order_date)
+                logger.info(f"集合式订单合并 {order_date}: 订单详情已不存在，删除了 {deleted_count} 条合并数据")
+                return 0
+            db.session.rollback()
+            raise CalculationDataMissing(
+                f'未找到日期区间 {order_date} 到 {order_date} 的订单详情数据，请先上传相应日期的订单详情',
+                'missing_order_details'
+            )
+
+        canonical = select(
+            ProductList.tmall_supplier_id,
+            db.func.min(ProductList.id).label('id')
+        ).group_by(ProductList.tmall_supplier_id).subquery()
+
+        columns = [getattr(OrderDetails, name) for name in ORDER_DETAILS_COLUMNS] + [
+            OrderDetails.id,
+            OrderDetails.filename,
+            OrderDetails.uploaded_by,
+            OrderDetails.created_at,
+            OrderDetails.updated_at,
+            ProductList.product_id,
+            ProductList.product_name,
+            ProductList.listing_time,
+            ProductList.tmall_supplier_id,
+            ProductList.operator,
+            case((ProductList.id.isnot(None), True), else_=False),
+        ]
+        target_columns = ORDER_DETAILS_COLUMNS + [
+            'order_details_id',
+            'order_details_filename',
+            'order_details_uploaded_by',
+            'order_details_created_at',
+            'order_details_updated_at',
+            'product_list_product_id',
+            'product_list_product_name',
+            'product_list_listing_time',
+            'product_list_tmall_supplier_id',
+            'product_list_operator',
+            'is_product_list_matched',
+        ]
+
+        source = select(*columns).select_from(OrderDetails).outerjoin(
+            canonical,
+            and_(canonical.c.tmall_supplier_id == OrderDetails.store_style_code, OrderDetails.store_style_code != '')
+        ).outerjoin(
+            ProductList, ProductList.id == canonical.c.id
+        ).where(self._day_range(OrderDetails.order_time, order_date))
+
+        deleted_count, created_count = self._replace_partition(
+            OrderDetailsMerge, [self._day_range(OrderDetailsMerge.order_time, order_date)], target_columns, source
+        )
+
+        logger.info(f"集合式订单合并 {order_date}: 删除 {deleted_count} 条，写入 {created_count} 条")
+        return created_count
+
+    def calculate_order_cost_summary(self, order_date):
+        """匹配运营成本价格并计算当天下单记录的成本与毛利"""
+        in_range = self._day_range(OrderDetailsMerge.order_time, order_date)
+        if not self._exists(in_range):
+            raise CalculationDataMissing(
+                f'未找到日期区间 {order_date} 到 {order_date} 的订单详情合并数据，请先执行第一步：订单详情合并计算',
+                'missing_merge_data'
+            )
+
+        matches_pricing = and_(
+            OperationCostPricing.operation_staff == OrderDetailsMerge.product_list_operator,
+            OperationCostPricing.product_code == OrderDetailsMerge.product_code
+        )
+
+        # 1. 匹配运营成本（同一运营人员+商品编码取最早一条），未匹配的记录清空运营成本字段
+        values = {
+            merge_field: select(getattr(OperationCostPricing, pricing_field)).where(
+                matches_pricing
+            ).order_by(OperationCostPricing.id).limit(1).scalar_subquery()
+            for merge_field, pricing_field in OPERATION_COST_COLUMNS.items()
+        }
+        values['is_operation_cost_matched'] = exists().where(matches_pricing)
+        processed_count = db.session.execute(
+            update(OrderDetailsMerge).where(in_range).values(values)
+        ).rowcount
+
+        # 2. 成本和毛利为生成列，只为可计算成本的记录（数量、商品金额、供货价均非空非零）刷新汇总时间
+        m = OrderDetailsMerge
+        now = datetime.utcnow()
+        calculated_count = db.session.execute(
+            update(m).where(
+                in_range,
+                m.is_operation_cost_matched.is_(True),
+                _zero(m.quantity) != 0,
+                _zero(m.product_amount) != 0,
+                _zero(m.operation_cost_supply_price) != 0
+            ).values(
+                cost_summary_updated_at=now,
+                profit_summary_updated_at=now
+            )
+        ).rowcount
+        db.session.commit()
+        refresh_for_order_dates(order_date, order_date)
+
+        logger.info(f"集合式成本汇总 {order_date}: 处理 {processed_count} 条，计算成本 {calculated_count} 条")
+        return processed_count
+
+    def calculate_order_payment_update(self, upload_date):
+        """按订单号汇总支付宝收支（上传日期起30天）更新当天上传订单的paid_amount"""
+        if not self._exists(OrderDetailsMerge.upload_date == upload_date):
+            raise CalculationDataMissing(
+                f'未找到上传日期区间 {upload_date} 到 {upload_date} 的订单详情合并数据，请先执行前两步',
+                'missing_merge_data'
+            )
+
+        alipay_end_date = upload_date + timedelta(days=30)
+        if not self._exists(AlipayAmount.transaction_date >= upload_date, AlipayAmount.transaction_date <= alipay_end_date):
+            raise CalculationDataMissing(
+                f'未找到日期区间 {upload_date} 到 {alipay_end_date} 的支付宝金额数据，请先上传支付宝数据',
+                'missing_alipay_data'
+            )
+
+        matches_order = and_(
+            AlipayAmount.order_number == OrderDetailsMerge.online_order_number,
+            AlipayAmount.transaction_date >= upload_date,
+            AlipayAmount.transaction_date <= alipay_end_date
+        )
+        # expense通常是负数，所以用加法
+        net_amount = select(
+            _zero(db.func.sum(AlipayAmount.income_amount)) + _zero(db.func.sum(AlipayAmount.expense_amount))
+        ).where(matches_order).scalar_subquery()
+
+        updated_count = db.session.execute(
+            update(OrderDetailsMerge).where(
+                OrderDetailsMerge.upload_date == upload_date,
+                exists().where(matches_order)
+            ).values(
+                paid_amount=net_amount,
+                updated_at=datetime.utcnow()
+            )
+        ).rowcount
+        db.session.commit()
+        refresh_for_upload_dates(upload_date, upload_date)
+        return updated_count
+
+
+# 全局集合式计算实例
+bulk_calculator = BulkCalculator()
@@ -0,0 +1,652 @@
+from datetime import datetime, timedelta
+from sqlalchemy import exists
+from models import db, ProductDataMerge, SubjectReport, PlantingRecord, OrderDetails, ProductList, OperationCostPricing, OrderDetailsMerge, AlipayAmount
+# 成本计算参数定义在models中（派生指标生成列表达式使用），此处导出供计算与模拟服务使用
+from models import LOGISTICS_COST_PER_UNIT, ORDER_DEDUCTION_RATE, TAX_INVOICE_RATE, UNIT_PRODUCT_COST
+from services.daily_rollup import daily_rollup
+from services.internal_order_summary import refresh_for_order_dates, refresh_for_upload_dates
+from services.shadow_partition import ShadowPartition, shadow_mode_enabled
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CalculationDataMissing(Exception):
+    """计算所需的输入数据不存在（前端需要先上传对应数据）"""
+
+    def __init__(self, message, error_type, status_code=400, stats=None):
+        super().__init__(message)
+        self.message = message
+        self.error_type = error_type
+        self.status_code = status_code
+        self.stats = stats
+
+    def to_dict(self):
+        """转换为接口响应格式"""
+        result = {
+            'message': self.message,
+            'error_type': self.error_type
+        }
+        if self.stats is not None:
+            result['stats'] = self.stats
+        return result
+
+
+class BusinessCalculator:
+    """业务汇总计算服务类 - 供接口、流水线编排器共同调用"""
+
+    # 场景名称到推广字段的映射
+    SCENE_MAPPING = {
+        '全站推广': 'sitewide_promotion',
+        '货品全站推广': 'sitewide_promotion',
+        '关键词推广': 'keyword_promotion',
+        '货品运营': 'product_operation',
+        '人群推广': 'crowd_promotion',
+        '超级短视频': 'super_short_video',
+        '多目标直投': 'multi_target_direct'
+    }
+
+    def new_stats(self, step_name):
+        """创建计算步骤的空统计信息"""
+        if step_name == 'promotion_summary':
+            return {
+                'processed_count': 0,
+                'matched_count': 0,
+                'updated_count': 0,
+                'scene_name_distribution': {},
+                'errors': []
+            }
+        if step_name == 'order_details_merge':
+            return {
+                'processed_count': 0,
+                'matched_count': 0,
+                'created_count': 0,
+                'errors': []
+            }
+        if step_name == 'order_cost_summary':
+            return {
+                'processed_count': 0,
+                'operation_cost_matched_count': 0,
+                'updated_count': 0,
+                'cost_calculated_count': 0,
+                'errors': []
+            }
+        if step_name == 'order_payment_update':
+            return {
+                'processed_count': 0,
+                'matched_count': 0,
+                'updated_count': 0,
+                'total_amount': 0,
+                'errors': []
+            }
+        return {'count': 0}
+
+    def partition_dates(self, step_name, start_date, end_date):
+        """返回日期区间内存在输入数据的日期分区，区间内均无数据时抛出CalculationDataMissing"""
+        if step_name in ('promotion_summary', 'planting_summary', 'final_summary'):
+            date_column = ProductDataMerge.upload_date
+            missing = CalculationDataMissing(
+                f'未找到日期区间 {start_date} 到 {end_date} 的商品排行数据，请先上传商品排行日报',
+                'missing_product_data' if step_name == 'promotion_summary' else 'NO_MERGE_DATA',
+                status_code=400 if step_name == 'promotion_summary' else 404
+            )
+        elif step_name == 'order_details_merge':
+            date_column = db.func.date(OrderDetails.order_time)
+            missing = CalculationDataMissing(
+                f'未找到日期区间 {start_date} 到 {end_date} 的订单详情数据，请先上传相应日期的订单详情',
+                'missing_order_details'
+            )
+        elif step_name == 'order_cost_summary':
+            date_column = db.func.date(OrderDetailsMerge.order_time)
+            missing = CalculationDataMissing(
+                f'未找到日期区间 {start_date} 到 {end_date} 的订单详情合并数据，请先执行第一步：订单详情合并计算',
+                'missing_merge_data'
+            )
+        elif step_name == 'order_payment_update':
+            date_column = OrderDetailsMerge.upload_date
+            missing = CalculationDataMissing(
+                f'未找到上传日期区间 {start_date} 到 {end_date} 的订单详情合并数据，请先执行前两步',
+                'missing_merge_data'
+            )
+        else:
+            raise ValueError(f'未知的计算步骤: {step_name}')
+
+        rows = db.session.query(date_column).filter(
+            date_column >= start_date,
+            date_column <= end_date
+        ).distinct().all()
+
+        partition_dates = set()
+        for (value,) in rows:
+            if value is None:
+                continue
+            # func.date在部分数据库方言下返回字符串
+            if isinstance(value, str):
+                value = datetime.strptime(value[:10], '%Y-%m-%d').date()
+            elif isinstance(value, datetime):
+                value = value.date()
+            partition_dates.add(value)
+
+        if not partition_dates:
+            raise missing
+        return sorted(partition_dates)
+
+    def calculate_promotion_summary(self, target_date):
+        """
+        汇总计算推广费用
+        1. product_data_merge LEFT JOIN subject_report
+        2. 匹配条件：product_data_merge.upload_date = subject_report.report_date
+        3. 匹配条件：product_data_merge.tmall_product_code = subject_report.subject_id
+        4. 根据subject_report.scene_name分配subject_report.cost到对应的推广字段
+        """
+        stats = self.new_stats('promotion_summary')
+
+        # 数据存在性检查
+        merge_records = ProductDataMerge.query.filter_by(upload_date=target_date).all()
+        subject_records = SubjectReport.query.filter_by(report_date=target_date).all()
+
+        if not merge_records:
+            raise CalculationDataMissing(
+                f'未找到日期为 {target_date} 的商品排行数据，请先上传当天的商品排行日报（苏宁/天猫等平台数据）',
+                'missing_product_data', stats=stats
+            )
+
+        if not subject_records:
+            raise CalculationDataMissing(
+                f'未找到日期为 {target_date} 的主体报表数据，请先上传当天的主体报表',
+                'missing_subject_report', stats=stats
+            )
+
+        logger.info(f"数据检查通过 - 找到 {len(merge_records)} 条商品数据，{len(subject_records)} 条主体报表数据")
+
+        for merge_record in merge_records:
+            stats['processed_count'] += 1
+
+            try:
+                if not merge_record.tmall_product_code:
+                    continue
+
+                # 查找匹配的subject_report记录
+                subject_reports = SubjectReport.query.filter(
+                    SubjectReport.report_date == target_date,
+                    SubjectReport.subject_id == merge_record.tmall_product_code
+                ).all()
+
+                if not subject_reports:
+                    continue
+
+                stats['matched_count'] += 1
+
+                # 重置所有推广费用字段为0
+                merge_record.sitewide_promotion = 0
+                merge_record.keyword_promotion = 0
+                merge_record.product_operation = 0
+                merge_record.crowd_promotion = 0
+                merge_record.super_short_video = 0
+                merge_record.multi_target_direct = 0
+
+                # 累加各个场景的费用
+                for subject_report in subject_reports:
+                    scene_name = subject_report.scene_name
+                    cost = subject_report.cost or 0
+
+                    # 统计场景名称分布
+                    if scene_name:
+                        if scene_name not in stats['scene_name_distribution']:
+                            stats['scene_name_distribution'][scene_name] = {'count': 0, 'total_cost': 0}
+                        stats['scene_name_distribution'][scene_name]['count'] += 1
+                        stats['scene_name_distribution'][scene_name]['total_cost'] += cost
+
+                    # 根据场景名称分配费用
+                    if scene_name in self.SCENE_MAPPING:
+                        field_name = self.SCENE_MAPPING[scene_name]
+                        current_value = getattr(merge_record, field_name) or 0
+                        setattr(merge_record, field_name, current_value + cost)
+                        logger.info(f"产品 {merge_record.tmall_product_code}: {scene_name} += {cost}")
+
+                # 更新推广费用汇总时间
+                merge_record.promotion_summary_updated_at = datetime.utcnow()
+                stats['updated_count'] += 1
+
+            except Exception as e:
+                error_msg = f"处理产品 {merge_record.tmall_product_code} 时出错: {str(e)}"
+                stats['errors'].append(error_msg)
+                logger.error(error_msg)
+                continue
+
+        db.session.commit()
+        return stats
+
+    @staticmethod
+    def reset_planting_summary(summary_date):
+        """当天已没有种菜记录的商品，其merge记录中残留的种菜汇总清零（不提交），返回清零的记录数"""
+        return ProductDataMerge.query.filter(
+            ProductDataMerge.upload_date == summary_date,
+            ProductDataMerge.planting_orders > 0,
+            ~exists().where(
+                PlantingRecord.order_date == summary_date,
+                PlantingRecord.product_id == ProductDataMerge.tmall_product_code
+            )
+        ).update({
+            'planting_orders': 0,
+            'planting_amount': 0,
+            'planting_cost': 0,
+            'planting_summary_updated_at': datetime.utcnow()
+        }, synchronize_session=False)
+
+    def calculate_planting_summary(self, summary_date):
+        """计算种菜表格汇总数据，返回更新的记录数
+
+        种菜表格覆盖导入后不再包含的商品或日期，merge记录中残留的种菜汇总清零；
+        当天没有种菜数据且没有需要清零的记录时抛出CalculationDataMissing。
+        """
+        # 检查是否有当天的种菜表格数据
+        planting_records = PlantingRecord.query.filter_by(order_date=summary_date).all()
+        if not planting_records:
+            reset_count = self.reset_planting_summary(summary_date)
+            if reset_count:
+                db.session.commit()
+                logger.info(f"{summary_date} 已没有种菜表格数据，清零了 {reset_count} 条记录的种菜汇总")
+                return reset_count
+            db.session.rollback()
+            raise CalculationDataMissing(
+                '未找到所选日期的种菜表格数据，请先上传种菜表格',
+                'NO_PLANTING_DATA', status_code=404
+            )
+
+        # 检查是否有当天的商品排行数据
+        merge_records = ProductDataMerge.query.filter_by(upload_date=summary_date).all()
+        if not merge_records:
+            raise CalculationDataMissing(
+                '未找到所选日期的商品排行数据，请先上传商品排行日报',
+                'NO_MERGE_DATA', status_code=404
+            )
+
+        summary_count = 0
+        for merge_record in merge_records:
+            # 查找匹配的种菜记录
+            matched_records = PlantingRecord.query.filter_by(
+                order_date=summary_date,
+                product_id=merge_record.tmall_product_code
+            ).all()
+
+            if matched_records:
+                planting_orders = len(matched_records)
+                planting_amount = sum(record.amount or 0 for record in matched_records)
+                planting_cost = sum(record.gift_commission or 0 for record in matched_records)
+
+                # 物流成本、扣款金额为生成列，由数据库按订单数和总金额计算
+                merge_record.planting_orders = planting_orders
+                merge_record.planting_amount = planting_amount
+                merge_record.planting_cost = planting_cost
+                merge_record.planting_summary_updated_at = datetime.utcnow()
+
+                summary_count += 1
+
+                logger.info(f"种菜汇总计算 - 商品编码: {merge_record.tmall_product_code}")
+                logger.info(f"  匹配订单数: {planting_orders}")
+                logger.info(f"  总金额: {planting_amount}")
+                logger.info(f"  佣金总额: {planting_cost}")
+
+        summary_count += self.reset_planting_summary(summary_date)
+        db.session.commit()
+        return summary_count
+
+    def calculate_final_summary(self, summary_date):
+        """
+        最终汇总，返回当天的记录数
+        转化率、真实数据、成本和毛利均为生成列，由数据库随源字段（含推广费用、种菜汇总）自动计算，
+        此步骤刷新记录的更新时间以及当天的看板日汇总
+        """
+        merge_query = ProductDataMerge.query.filter_by(upload_date=summary_date)
+        summary_count = merge_query.update({'updated_at': datetime.utcnow()}, synchronize_session=False)
+        if not summary_count:
+            db.session.rollback()
+            # 当天数据已被清空时同步清空日汇总
+            daily_rollup.refresh([summary_date])
+            raise CalculationDataMissing('未找到所选日期的数据', 'NO_DATA', status_code=404)
+
+        db.session.commit()
+        daily_rollup.refresh([summary_date])
+        logger.info(f"最终汇总完成 - 日期: {summary_date}, 记录数: {summary_count}")
+        return summary_count
+
+    def calculate_order_details_merge(self, start_date, end_date):
+        """
+        订单详情合并计算（第一步）
+        将order_details与product_list进行LEFT JOIN
+        匹配规则：order_details.store_style_code = product_list.tmall_supplier_id
+        日期区间与order_details.order_time的日期部分匹配
+        """
+        stats = self.new_stats('order_details_merge')
+
+        # 数据存在性检查 - 检查指定日期区间的订单详情数据（提取order_time的日期部分匹配）
+        order_details_records = db.session.query(OrderDetails).filter(
+            db.func.date(OrderDetails.order_time) >= start_date,
+            db.func.date(OrderDetails.order_time) <= end_date
+        ).all()
+
+        if not order_details_records:
+            raise CalculationDataMissing(
+                f'未找到日期区间 {start_date} 到 {end_date} 的订单详情数据，请先上传相应日期的订单详情',
+                'missing_order_details', stats=stats
+            )
+
+        logger.info(f"数据检查通过 - 找到 {len(order_details_records)} 条订单详情数据")
+
+        partition_criteria = [
+            db.func.date(OrderDetailsMerge.order_time) >= start_date,
+            db.func.date(OrderDetailsMerge.order_time) <= end_date
+        ]
+        # 影子分区模式：新数据先写入影子表，最后在一个短事务内替换，计算期间读取方看到的仍是完整的旧数据
+        shadow = ShadowPartition(OrderDetailsMerge, partition_criteria) if shadow_mode_enabled() else None
+
+        if shadow is None:
+            # 直接删除同一日期区间的现有合并数据（避免先查询大量数据）
+            deleted_count = db.session.query(OrderDetailsMerge).filter(
+                *partition_criteria
+            ).delete(synchronize_session=False)
+
+            if deleted_count > 0:
+                logger.info(f"删除了 {deleted_count} 条同一日期区间的现有合并数据")
+            else:
+                logger.info("没有找到需要删除的同一日期区间合并数据")
+
+        for order_detail in order_details_records:
+            stats['processed_count'] += 1
+
+            try:
+                # 查找匹配的product_list记录
+                product_list_record = None
+                is_matched = False
+
+                if order_detail.store_style_code:
+                    product_list_record = ProductList.query.filter_by(
+                        tmall_supplier_id=order_detail.store_style_code
+                    ).first()
+
+                    if product_list_record:
+                        is_matched = True
+                        stats['matched_count'] += 1
+
+                values = dict(
+                    # 来自order_details的字段
+                    order_details_id=order_detail.id,
+                    internal_order_number=order_detail.internal_order_number,
+                    online_order_number=order_detail.online_order_number,
+                    store_code=order_detail.store_code,
+                    store_name=order_detail.store_name,
+                    order_time=order_detail.order_time,
+                    payment_date=order_detail.payment_date,
+                    shipping_date=order_detail.shipping_date,
+                    payable_amount=order_detail.payable_amount,
+                    paid_amount=order_detail.paid_amount,
+                    express_company=order_detail.express_company,
+                    tracking_number=order_detail.tracking_number,
+                    province=order_detail.province,
+                    city=order_detail.city,
+                    district=order_detail.district,
+                    product_code=order_detail.product_code,
+                    product_name=order_detail.product_name,
+                    quantity=order_detail.quantity,
+                    unit_price=order_detail.unit_price,
+                    product_amount=order_detail.product_amount,
+                    payment_number=order_detail.payment_number,
+                    image_url=order_detail.image_url,
+                    store_style_code=order_detail.store_style_code,
+                    order_status=order_detail.order_status,
+                    order_details_filename=order_detail.filename,
+                    upload_date=order_detail.upload_date,
+                    order_details_uploaded_by=order_detail.uploaded_by,
+                    order_details_created_at=order_detail.created_at,
+                    order_details_updated_at=order_detail.updated_at,
+
+                    # 来自product_list的字段（如果匹配的话）
+                    product_list_product_id=product_list_record.product_id if product_list_record else None,
+                    product_list_product_name=product_list_record.product_name if product_list_record else None,
+                    product_list_listing_time=product_list_record.listing_time if product_list_record else None,
+                    product_list_tmall_supplier_id=product_list_record.tmall_supplier_id if product_list_record else None,
+                    product_list_operator=product_list_record.operator if product_list_record else None,
+
+                    # 匹配状态
+                    is_product_list_matched=is_matched
+                )
+
+                if shadow is not None:
+                    shadow.add(values)
+                else:
+                    db.session.add(OrderDetailsMerge(**values))
+                stats['created_count'] += 1
+
+            except Exception as e:
+                error_msg = f"处理订单 {order_detail.internal_order_number or order_detail.online_order_number} 时出错: {str(e)}"
+                stats['errors'].append(error_msg)
+                logger.error(error_msg)
+                continue
+
+        if shadow is not None:
+            shadow.publish()
+        else:
+            db.session.commit()
+        return stats
+
+    def clear_order_details_merge(self, start_date, end_date, keep_dates):
+        """删除日期区间内不在 keep_dates 中的日期的订单详情合并数据，返回实际清理了数据的日期
+
+        按天执行合并时只重建有订单详情的日期，订单详情已被删除的日期需要单独清理，避免残留旧的合并数据。
+        """
+        keep_dates = set(keep_dates)
+        cleared_dates = []
+        current = start_date
+        while current <= end_date:
+            if current not in keep_dates:
+                day_start = datetime.combine(current, datetime.min.time())
+                deleted_count = db.session.query(OrderDetailsMerge).filter(
+                    OrderDetailsMerge.order_time >= day_start,
+                    OrderDetailsMerge.order_time < day_start + timedelta(days=1)
+                ).delete(synchronize_session=False)
+                if deleted_count:
+                    logger.info(f"{current} 的订单详情已不存在，删除了 {deleted_count} 条合并数据")
+                    cleared_dates.append(current)
+            current += timedelta(days=1)
+        db.session.commit()
+
+        # 被清理订单的内部订单汇总随之删除
+        for cleared_date in cleared_dates:
+            refresh_for_order_dates(cleared_date, cleared_date)
+        return cleared_dates
+
+    def calculate_order_cost_summary(self, start_date, end_date):
+        """
+        订单成本汇总计算（第二步）
+        基于order_details_merge与operation_cost_pricing进行LEFT JOIN
+        匹配规则：order_details_merge.product_list_operator = operation_cost_pricing.operation_staff
+               AND order_details_merge.product_code = operation_cost_pricing.product_code
+        """
+        stats = self.new_stats('order_cost_summary')
+
+        merge_records = db.session.query(OrderDetailsMerge).filter(
+            db.func.date(OrderDetailsMerge.order_time) >= start_date,
+            db.func.date(OrderDetailsMerge.order_time) <= end_date
+        ).all()
+
+        if not merge_records:
+            raise CalculationDataMissing(
+                f'未找到日期区间 {start_date} 到 {end_date} 的订单详情合并数据，请先执行第一步：订单详情合并计算',
+                'missing_merge_data', stats=stats
+            )
+
+        logger.info(f"数据检查通过 - 找到 {len(merge_records)} 条订单详情合并数据")
+
+        for merge_record in merge_records:
+            stats['processed_count'] += 1
+
+            try:
+                # 查找匹配的operation_cost_pricing记录
+                operation_cost_record = None
+                is_operation_cost_matched = False
+
+                if (merge_record.product_list_operator and
+                    merge_record.product_code):
+
+                    operation_cost_record = OperationCostPricing.query.filter_by(
+                        operation_staff=merge_record.product_list_operator,
+                        product_code=merge_record.product_code
+                    ).first()
+
+                    if operation_cost_record:
+                        is_operation_cost_matched = True
+                        stats['operation_cost_matched_count'] += 1
+
+                # 更新运营成本相关字段
+                if operation_cost_record:
+                    merge_record.operation_cost_brand_category = operation_cost_record.brand_category
+                    merge_record.operation_cost_product_code = operation_cost_record.product_code
+                    merge_record.operation_cost_product_name = operation_cost_record.product_name
+                    merge_record.operation_cost_supply_price = operation_cost_record.supply_price
+                    merge_record.operation_cost_operation_staff = operation_cost_record.operation_staff
+                    merge_record.operation_cost_filename = operation_cost_record.filename
+                else:
+                    # 清空运营成本字段
+                    merge_record.operation_cost_brand_category = None
+                    merge_record.operation_cost_product_code = None
+                    merge_record.operation_cost_product_name = None
+                    merge_record.operation_cost_supply_price = None
+                    merge_record.operation_cost_operation_staff = None
+                    merge_record.operation_cost_filename = None
+
+                merge_record.is_operation_cost_matched = is_operation_cost_matched
+
+                # 成本、毛利等业务字段为生成列，由数据库按数量、商品金额和供货价自动计算
+                if (is_operation_cost_matched and
+                    merge_record.quantity and
+                    merge_record.product_amount and
+                    operation_cost_record.supply_price):
+
+                    merge_record.cost_summary_updated_at = datetime.utcnow()
+                    merge_record.profit_summary_updated_at = datetime.utcnow()
+
+                    stats['cost_calculated_count'] += 1
+
+                stats['updated_count'] += 1
+
+            except Exception as e:
+                error_msg = f"处理合并记录 {merge_record.internal_order_number or merge_record.online_order_number} 时出错: {str(e)}"
+                stats['errors'].append(error_msg)
+                logger.error(error_msg)
+                continue
+
+        db.session.commit()
+        refresh_for_order_dates(start_date, end_date)
+        return stats
+
+    def build_alipay_summary(self, start_date, end_date):
+        """按order_number汇总支付宝收支（支付宝数据取日期区间+30天范围）"""
+        # 计算支付宝数据查询的结束日期（原结束日期+30天）
+        alipay_end_date = end_date + timedelta(days=30)
+
+        alipay_records = db.session.query(AlipayAmount).filter(
+            AlipayAmount.transaction_date >= start_date,
+            AlipayAmount.transaction_date <= alipay_end_date
+        ).all()
+
+        if not alipay_records:
+            raise CalculationDataMissing(
+                f'未找到日期区间 {start_date} 到 {alipay_end_date} 的支付宝金额数据，请先上传支付宝数据',
+                'missing_alipay_data'
+            )
+
+        logger.info(f"支付宝数据检查通过 - 找到 {len(alipay_records)} 条支付宝数据")
+
+        alipay_summary = {}
+        for alipay_record in alipay_records:
+            if alipay_record.order_number:
+                order_number = alipay_record.order_number
+                if order_number not in alipay_summary:
+                    alipay_summary[order_number] = {
+                        'total_income': 0,
+                        'total_expense': 0,
+                        'net_amount': 0
+                    }
+
+                income = float(alipay_record.income_amount) if alipay_record.income_amount else 0
+                expense = float(alipay_record.expense_amount) if alipay_record.expense_amount else 0
+
+                alipay_summary[order_number]['total_income'] += income
+                alipay_summary[order_number]['total_expense'] += expense
+                alipay_summary[order_number]['net_amount'] = (
+                    alipay_summary[order_number]['total_income'] +
+                    alipay_summary[order_number]['total_expense']  # expense通常是负数，所以用加法
+                )
+
+        logger.info(f"支付宝数据汇总完成 - 共 {len(alipay_summary)} 个不同的订单号")
+        return alipay_summary
+
+    def calculate_order_payment_update(self, start_date, end_date, alipay_summary=None):
+        """
+        订单支付金额更新（第三步）
+        基于order_details_merge与alipay_amount进行LEFT JOIN
+        匹配规则：order_details_merge.online_order_number = alipay_amount.order_number
+        根据日期区间过滤order_details_merge.upload_date，支付宝数据取日期区间+30天范围
+        汇总相同order_number的income_amount和expense_amount，更新到order_details_merge.paid_amount
+        按天分区执行时可传入外层区间预先汇总的alipay_summary
+        """
+        stats = self.new_stats('order_payment_update')
+
+        merge_records = db.session.query(OrderDetailsMerge).filter(
+            OrderDetailsMerge.upload_date >= start_date,
+            OrderDetailsMerge.upload_date <= end_date
+        ).all()
+
+        if not merge_records:
+            raise CalculationDataMissing(
+                f'未找到上传日期区间 {start_date} 到 {end_date} 的订单详情合并数据，请先执行前两步',
+                'missing_merge_data', stats=stats
+            )
+
+        logger.info(f"数据检查通过 - 找到 {len(merge_records)} 条订单详情合并数据")
+
+        if alipay_summary is None:
+            try:
+                alipay_summary = self.build_alipay_summary(start_date, end_date)
+            except CalculationDataMissing as e:
+                e.stats = stats
+                raise
+
+        for merge_record in merge_records:
+            stats['processed_count'] += 1
+
+            try:
+                if (merge_record.online_order_number and
+                    merge_record.online_order_number in alipay_summary):
+
+                    alipay_data = alipay_summary[merge_record.online_order_number]
+                    net_amount = alipay_data['net_amount']
+
+                    old_paid_amount = merge_record.paid_amount
+
+                    merge_record.paid_amount = net_amount
+                    merge_record.updated_at = datetime.utcnow()
+
+                    stats['matched_count'] += 1
+                    stats['updated_count'] += 1
+                    stats['total_amount'] += net_amount
+
+                    logger.info(f"更新订单 {merge_record.online_order_number} (ID: {merge_record.id}): "
+                              f"收入={alipay_data['total_income']}, "
+                              f"支出={alipay_data['total_expense']}, "
+                              f"净额={net_amount}, "
+                              f"paid_amount: {old_paid_amount} -> {net_amount}")
+
+            except Exception as e:
+                error_msg = f"处理合并记录 {merge_record.internal_order_number or merge_record.online_order_number} 时出错: {str(e)}"
+                stats['errors'].append(error_msg)
+                logger.error(error_msg)
+                continue
+
+        logger.info(f"准备提交数据库事务，共更新 {stats['updated_count']} 条记录")
+        db.session.commit()
+        logger.info("数据库事务提交成功")
+
+        refresh_for_upload_dates(start_date, end_date)
+        return stats
@@ -0,0 +1,232 @@
+import threading
+import time
+from datetime import date, timedelta
+import numpy as np
+from flask import current_app
+from sqlalchemy import select
+from models import db, ProductDataMerge, PipelineWatermark
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# 写入product_data_merge的流水线步骤/变更来源，其分区水位变化时对应日期的缓存分区失效
+PRODUCT_MERGE_VERSION_TABLES = [
+    'product_data_merge', 'promotion_summary', 'planting_summary', 'final_summary', 'product_data_merge_patch'
+]
+
+# 字典编码的维度字段
+DIMENSIONS = {
+    'store': ProductDataMerge.tmall_supplier_name,
+    'operator': ProductDataMerge.product_list_operator,
+    'category': ProductDataMerge.product_list_category,
+    'product_code': ProductDataMerge.tmall_product_code,
+    'product_name': ProductDataMerge.product_name,
+}
+
+# 数值字段（NULL按0参与计算）
+MEASURES = [
+    'payment_amount', 'payment_product_count', 'payment_buyer_count', 'visitor_count', 'page_views',
+    'search_guided_visitors', 'add_to_cart_count', 'favorite_count', 'refund_amount', 'refund_ratio',
+    'planting_amount', 'planting_orders', 'unit_price', 'visitor_average_value',
+    'payment_conversion_rate', 'order_conversion_rate', 'conversion_rate', 'favorite_rate', 'cart_rate',
+    'uv_value', 'real_amount', 'real_conversion_rate', 'product_cost', 'gross_profit',
+    'sitewide_promotion', 'keyword_promotion', 'product_operation',
+    'crowd_promotion', 'super_short_video', 'multi_target_direct',
+]
+
+# 整数型数值字段，返回明细行时还原为int
+INTEGER_MEASURES = {
+    'payment_product_count', 'payment_buyer_count', 'visitor_count', 'page_views',
+    'search_guided_visitors', 'add_to_cart_count', 'favorite_count', 'planting_orders',
+}
+
+
+class _Dictionary:
+    """维度字典：值 <-> 整数编码，0 固定表示 NULL"""
+
+    def __init__(self):
+        self._codes = {None: 0}
+        self.values = [None]
+
+    def encode(self, values):
+        codes = np.empty(len(values), dtype=np.int32)
+        for index, value in enumerate(values):
+            code = self._codes.get(value)
+            if code is None:
+                code = len(self.values)
+                self._codes[value] = code
+                self.values.append(value)
+            codes[index] = code
+        return codes
+
+    def code_of(self, value):
+        """值的编码，字典中不存在时返回-1（匹配不到任何行）"""
+        return self._codes.get(value, -1)
+
+
+class _Partition:
+    """单日分区：维度编码数组 + 数值数组"""
+
+    def __init__(self, partition_date, version, dims, measures):
+        self.partition_date = partition_date
+        self.version = version
+        self.dims = dims
+        self.measures = measures
+        self.size = len(next(iter(measures.values()))) if measures else 0
+
+
+class ColumnarCache:
+    """商品数据列式缓存 - 最近N天的product_data_merge按日期分区缓存为NumPy数组
+
+    维度字段（店铺/操作人/类目/产品ID/商品名称）字典编码为int32，数值字段为float64（NULL记为0）。
+    每次查询前用一次水位查询校验所涉日期的分区版本，流水线在任意进程中写入某天后该分区自动重新加载；
+    窗口外的日期由调用方回退到SQL。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._partitions = {}
+        self._dictionaries = {name: _Dictionary() for name in DIMENSIONS}
+
+    # ================================
+    # 窗口与分区维护
+    # ================================
+
+    def _window_days(self):
+        return current_app.config.get('COLUMNAR_CACHE_DAYS', 62)
+
+    def covers(self, start_date, end_date):
+        """日期区间是否在缓存窗口内"""
+        if not current_app.config.get('COLUMNAR_CACHE_ENABLED', True):
+            return False
+        window_start = date.today() - timedelta(days=self._window_days())
+        return window_start <= start_date <= end_date
+
+    def _partition_versions(self, start_date, end_date):
+        rows = db.session.query(
+            PipelineWatermark.partition_date, db.func.max(PipelineWatermark.version)
+        ).filter(
+            PipelineWatermark.table_name.in_(PRODUCT_MERGE_VERSION_TABLES),
+            PipelineWatermark.partition_date >= start_date,
+            PipelineWatermark.partition_date <= end_date
+        ).group_by(PipelineWatermark.partition_date).all()
+        return {partition_date: version for partition_date, version in rows}
+
+    def _load_partition(self, partition_date, version):
+        columns = list(DIMENSIONS.values()) + [getattr(ProductDataMerge, name) for name in MEASURES]
+        rows = db.session.execute(
+            select(*columns).where(ProductDataMerge.upload_date == partition_date).order_by(ProductDataMerge.id)
+        ).all()
+        values = list(zip(*rows)) if rows else [()] * len(columns)
+
+        dims = {}
+        with self._lock:
+            for index, name in enumerate(DIMENSIONS):
+                dims[name] = self._dictionaries[name].encode(values[index])
+        offset = len(DIMENSIONS)
+        measures = {
+            name: np.nan_to_num(np.array(values[offset + index], dtype=float))
+            for index, name in enumerate(MEASURES)
+        }
+        return _Partition(partition_date, version, dims, measures)
+
+    def _partitions_for(self, start_date, end_date):
+        """返回区间内各日期的最新分区（过期或缺失的分区重新加载）"""
+        versions = self._partition_versions(start_date, end_date)
+        window_start = date.today() - timedelta(days=self._window_days())
+
+        partitions = []
+        partition_date = start_date
+        while partition_date <= end_date:
+            version = versions.get(partition_date, 0)
+            with self._lock:
+                partition = self._partitions.get(partition_date)
+            if partition is None or partition.version != version:
+                partition = self._load_partition(partition_date, version)
+                with self._lock:
+                    self._partitions[partition_date] = partition
+                    # 淘汰滑出窗口的分区
+                    for stale_date in [d for d in self._partitions if d < window_start]:
+                        del self._partitions[stale_date]
+            partitions.append(partition)
+            partition_date += timedelta(days=1)
+        return partitions
+
+    def _concat(self, partitions, filters):
+        """拼接分区并应用维度过滤 {维度: 值}（值为None匹配NULL），返回 (维度数组, 数值数组, 日期数组)"""
+        partitions = [partition for partition in partitions if partition.size]
+        if not partitions:
+            empty_dims = {name: np.zeros(0, dtype=np.int32) for name in DIMENSIONS}
+            return empty_dims, {name: np.zeros(0) for name in MEASURES}, np.zeros(0, dtype=object)
+
+        dims = {name: np.concatenate([p.dims[name] for p in partitions]) for name in DIMENSIONS}
+        measures = {name: np.concatenate([p.measures[name] for p in partitions]) for name in MEASURES}
+        dates = np.concatenate([np.full(p.size, p.partition_date, dtype=object) for p in partitions])
+
+        if filters:
+            mask = np.ones(len(dates), dtype=bool)
+            for name, value in filters.items():
+                mask &= dims[name] == self._dictionaries[name].code_of(value)
+            dims = {name: array[mask] for name, array in dims.items()}
+            measures = {name: array[mask] for name, array in measures.items()}
+            dates = dates[mask]
+        return dims, measures, dates
+
+    # ================================
+    # 查询接口
+    # ================================
+
+    def aggregate(self, start_date, end_date, group_by, measures, filters=None):
+        """按维度分组求和，返回 {'keys': {维度: [值]}, 'sums': {字段: ndarray}, 'count': ndarray}"""
+        started_at = time.time()
+        dims, values, _ = self._concat(self._partitions_for(start_date, end_date), filters)
+
+        if len(group_by) == 1:
+            group_codes, inverse = np.unique(dims[group_by[0]], return_inverse=True)
+            group_codes = group_codes.reshape(-1, 1)
+        else:
+            stacked = np.stack([dims[name] for name in group_by], axis=1) if group_by else np.zeros((0, 0), dtype=np.int32)
+            group_codes, inverse = np.unique(stacked, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        group_count = len(group_codes)
+
+        result = {
+            'keys': {
+                name: [self._dictionaries[name].values[code] for code in group_codes[:, index]]
+                for index, name in enumerate(group_by)
+            },
+            'sums': {
+                name: np.bincount(inverse, weights=values[name], minlength=group_count) for name in measures
+            },
+            'count': np.bincount(inverse, minlength=group_count),
+        }
+        logger.debug(f"列式缓存聚合 {start_date} ~ {end_date} 按 {group_by}: {len(inverse)} 行 -> {group_count} 组，"
+                     f"{(time.time() - started_at) * 1000:.1f} 毫秒")
+        return result
+
+    def rows(self, start_date, end_date, columns, filters=None):
+        """返回过滤后的明细行（按日期升序），每行为 {'date': 日期, 字段: 值}"""
+        _, values, dates = self._concat(self._partitions_for(start_date, end_date), filters)
+        selected = [(name, values[name].tolist(), int if name in INTEGER_MEASURES else float) for name in columns]
+        return [
+            dict({'date': dates[index]}, **{name: cast(array[index]) for name, array, cast in selected})
+            for index in range(len(dates))
+        ]
+
+    @staticmethod
+    def top_k(order_values, descending=True, offset=0, limit=None):
+        """按排序值返回第 offset ~ offset+limit 名的下标（limit较小时只做部分排序）"""
+        total = len(order_values)
+        keys = -order_values if descending else order_values
+        if limit is None or offset + limit >= total:
+            return np.argsort(keys, kind='stable')[offset:]
+        bound = offset + limit
+        # 取第bound名的排序值为阈值，与阈值并列的行全部参与排序，保证分页结果与完整稳定排序一致
+        threshold = keys[np.argpartition(keys, bound - 1)[bound - 1]]
+        candidates = np.flatnonzero(keys <= threshold)
+        return candidates[np.argsort(keys[candidates], kind='stable')][offset:bound]
+
+
+# 全局列式缓存实例
+columnar_cache = ColumnarCache()
@@ -0,0 +1,127 @@
+from datetime import datetime
+from types import SimpleNamespace
+from sqlalchemy import select, insert, delete, union_all
+from models import db, ProductDataMerge, DailyStoreRollup, DailyOperatorRollup, DailyCategoryRollup, ROLLUP_MEASURES
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# 统计接口沿用的汇总字段别名
+MEASURE_LABELS = {
+    'payment_amount': 'total_amount',
+    'payment_product_count': 'total_quantity',
+    'visitor_count': 'total_visitor_count',
+    'payment_buyer_count': 'total_payment_buyer_count',
+}
+
+
+class DailyRollup:
+    """看板日汇总服务类 - 按 (日期, 店铺) / (日期, 平台, 操作人) / (日期, 类目) 物化product_data_merge的求和指标
+
+    刷新以日期为单位在一个事务内 删除 + INSERT...SELECT GROUP BY；统计接口对日期区间内的日汇总再求和，
+    读取量与 天数 x 分组数 成正比，与商品记录数无关。
+    """
+
+    def __init__(self):
+        m = ProductDataMerge
+        # 汇总表 -> (分组字段: 来源表达式, 来源过滤条件)
+        self.rollups = {
+            'store': (DailyStoreRollup, {'store_name': m.tmall_supplier_name}, [m.tmall_supplier_name.isnot(None)]),
+            'operator': (DailyOperatorRollup, {
+                'platform': m.platform,
+                'operator': db.func.coalesce(m.product_list_operator, '未分配'),
+            }, []),
+            'category': (DailyCategoryRollup, {'category': db.func.coalesce(m.product_list_category, '未分类')}, []),
+        }
+
+    def refresh(self, summary_dates):
+        """重建指定日期的全部日汇总并提交，返回写入的汇总行数"""
+        summary_dates = sorted({d for d in summary_dates if d})
+        if not summary_dates:
+            return 0
+
+        m = ProductDataMerge
+        now = datetime.utcnow()
+        row_count = 0
+        try:
+            for summary_date in summary_dates:
+                for rollup_model, keys, criteria in self.rollups.values():
+                    db.session.execute(delete(rollup_model).where(rollup_model.summary_date == summary_date))
+
+                    group_columns = list(keys.values())
+                    source = select(
+                        m.upload_date,
+                        *group_columns,
+                        *[db.func.sum(getattr(m, name)) for name in ROLLUP_MEASURES],
+                        db.func.count(m.id),
+                        db.literal(now)
+                    ).where(m.upload_date == summary_date, *criteria).group_by(m.upload_date, *group_columns)
+
+                    row_count += db.session.execute(insert(rollup_model).from_select(
+                        ['summary_date', *keys.keys(), *ROLLUP_MEASURES, 'record_count', 'refreshed_at'], source
+                    )).rowcount
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        logger.info(f"看板日汇总已刷新: {summary_dates[0]} ~ {summary_dates[-1]} 共 {len(summary_dates)} 天，{row_count} 行")
+        return row_count
+
+    def _key_labels(self, rollup_name):
+        keys = self.rollups[rollup_name][1]
+        # 负责人员汇总的平台字段沿用接口中的 team 命名
+        return ['team' if rollup_name == 'operator' and name == 'platform' else name for name in keys]
+
+    def _select(self, rollup_name, start_date, end_date, key_labels, key_width=None):
+        """日期区间汇总语句；key_width 用于 UNION 时把分组字段补齐到相同列数"""
+        rollup_model, keys, _ = self.rollups[rollup_name]
+        group_columns = [getattr(rollup_model, name) for name in keys]
+        key_columns = [column.label(label) for column, label in zip(group_columns, key_labels)]
+        if key_width is not None:
+            key_columns += [db.null().label(f'key_{index}') for index in range(len(key_columns), key_width)]
+        measures = [
+            db.func.sum(getattr(rollup_model, name)).label(MEASURE_LABELS.get(name, f'total_{name}'))
+            for name in ROLLUP_MEASURES
+        ]
+        return select(
+            *key_columns,
+            *measures,
+            db.cast(db.func.sum(rollup_model.record_count), db.Integer).label('record_count')
+        ).where(
+            rollup_model.summary_date >= start_date,
+            rollup_model.summary_date <= end_date
+        ).group_by(*group_columns)
+
+    def query(self, rollup_name, start_date, end_date):
+        """按日期区间汇总日汇总表，返回行的字段与原先直接汇总product_data_merge时一致"""
+        return db.session.execute(
+            self._select(rollup_name, start_date, end_date, self._key_labels(rollup_name))
+        ).all()
+
+    def query_panels(self, start_date, end_date):
+        """一条 UNION ALL 语句同时汇总门店/负责人员/类目三个看板，返回 {看板: 行列表}
+
+        行的字段与 query() 一致（分组字段按各看板命名），看板之间只需一次数据库往返。
+        """
+        key_width = max(len(keys) for _, keys, _ in self.rollups.values())
+        statements = []
+        for rollup_name in self.rollups:
+            statement = self._select(
+                rollup_name, start_date, end_date, [f'key_{index}' for index in range(key_width)], key_width
+            )
+            statements.append(statement.add_columns(db.literal(rollup_name).label('panel')))
+
+        panels = {rollup_name: [] for rollup_name in self.rollups}
+        for row in db.session.execute(union_all(*statements)).mappings():
+            values = dict(row)
+            rollup_name = values.pop('panel')
+            keys = [values.pop(f'key_{index}') for index in range(key_width)]
+            values.update(zip(self._key_labels(rollup_name), keys))
+            panels[rollup_name].append(SimpleNamespace(**values))
+        return panels
+
+
+# 全局日汇总实例
+daily_rollup = DailyRollup()
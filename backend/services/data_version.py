@@ -0,0 +1,104 @@
+import functools
+import hashlib
+from datetime import datetime, timedelta
+from flask import current_app, request, make_response
+from models import db, PipelineWatermark
+from services.columnar_cache import PRODUCT_MERGE_VERSION_TABLES
+from services.projection import response_shape
+from services.result_cache import result_cache
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 订单详情合并表的数据版本来源（合并、成本汇总、支付金额更新步骤都会改写该表）
+ORDER_MERGE_VERSION_TABLES = ['order_details_merge', 'order_cost_summary', 'order_payment_update']
+
+
+def data_version(table_names, start_date=None, end_date=None):
+    """数据版本：日期区间内各数据表分区水位的最大值（区间端点为None表示不限）
+
+    分区水位由上传（mark_dirty）与流水线计算步骤推进且单调递增，任一相关分区变化都会得到更大的版本。
+    """
+    query = db.session.query(db.func.max(PipelineWatermark.version)).filter(
+        PipelineWatermark.table_name.in_(table_names)
+    )
+    if start_date is not None:
+        query = query.filter(PipelineWatermark.partition_date >= start_date)
+    if end_date is not None:
+        query = query.filter(PipelineWatermark.partition_date <= end_date)
+    return query.scalar() or 0
+
+
+def _request_date_range(date_args):
+    """按查询参数解析接口涉及的日期区间，缺省的端点视为不限；格式错误返回None（交由接口返回400）"""
+    bounds = []
+    for arg in date_args:
+        value = request.args.get(arg)
+        if not value:
+            bounds.append(None)
+            continue
+        try:
+            bounds.append(datetime.strptime(value, '%Y-%m-%d').date())
+        except ValueError:
+            return None
+    return tuple(bounds)
+
+
+def yesterday_range():
+    """统计看板、商品排行未指定日期时的默认区间：昨天"""
+    yesterday = datetime.now().date() - timedelta(days=1)
+    return yesterday, yesterday
+
+
+def last_30_days_range():
+    """商品趋势未指定日期时的默认区间：最近30天"""
+    end_date = datetime.now().date()
+    return end_date - timedelta(days=30), end_date
+
+
+def versioned_view(table_names=PRODUCT_MERGE_VERSION_TABLES, date_args=('start_date', 'end_date'), cache=True,
+                   default_range=None):
+    """只读接口的数据版本装饰器（放在 jwt_required 之后）
+
+    - 以 请求路径 + 排序后的查询参数 + 协商的返回形状 + 日期区间 + 数据版本 生成ETag，If-None-Match 命中时不执行查询直接返回304；
+    - 接口未同时提供起止日期时按默认区间（如昨天）查询的，通过 default_range 传入同一默认区间的计算函数，
+      日期变化后ETag随之变化，不会一直返回前一天的结果；
+    - cache=True 时相同请求合并为一次计算并缓存200响应（见 ResultCache）。
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            date_range = _request_date_range(date_args)
+            if date_range is None:
+                return func(*args, **kwargs)
+            if default_range is not None and not all(date_range):
+                date_range = default_range()
+
+            request_key = (request.path, tuple(sorted(request.args.items(multi=True))), response_shape(), date_range)
+            version = data_version(table_names, *date_range)
+            etag = hashlib.sha1(repr((request_key, version)).encode('utf-8')).hexdigest()
+
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            elif cache and current_app.config.get('RESULT_CACHE_ENABLED', True):
+                def compute():
+                    result = make_response(func(*args, **kwargs))
+                    return (result.get_data(), result.status_code, result.mimetype), result.status_code == 200
+
+                body, status, mimetype = result_cache.get_or_compute(
+                    (request_key, version), compute,
+                    current_app.config.get('RESULT_CACHE_TTL_SECONDS', 300),
+                    current_app.config.get('RESULT_CACHE_MAX_ENTRIES', 256)
+                )
+                response = current_app.response_class(body, status=status, mimetype=mimetype)
+            else:
+                response = make_response(func(*args, **kwargs))
+
+            if response.status_code in (200, 304):
+                response.set_etag(etag, weak=True)
+                # 浏览器每次使用前都需重新验证，数据未变时只返回304
+                response.headers['Cache-Control'] = 'private, no-cache'
+                response.vary.add('Accept')
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,247 @@
+import csv
+import hashlib
+import io
+import os
+import re
+import threading
+from datetime import datetime
+from openpyxl import Workbook
+from sqlalchemy import select, func
+from models import db, ProductDataMerge
+from services.columnar_cache import PRODUCT_MERGE_VERSION_TABLES
+from services.data_version import data_version
+from services.search_index import search_index
+from utils import format_decimal, progress_tracker
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 导出列：(表头, 字段名, 类型)；int 空值导出为0，decimal 保留2位小数，date 格式化为YYYY-MM-DD
+EXPORT_COLUMNS = [
+    ('ID', 'id', 'raw'),
+    ('上传日期', 'upload_date', 'date'),
+    ('天猫ID', 'tmall_product_code', 'text'),
+    ('产品名称', 'product_name', 'text'),
+    ('店铺名', 'tmall_supplier_name', 'text'),
+    ('上架时间', 'listing_time', 'date'),
+    ('支付买家数', 'payment_buyer_count', 'int'),
+    ('支付件数', 'payment_product_count', 'int'),
+    ('支付金额', 'payment_amount', 'decimal'),
+    ('退款金额', 'refund_amount', 'decimal'),
+    ('访客数', 'visitor_count', 'int'),
+    ('自然搜索访客', 'search_guided_visitors', 'int'),
+    ('收藏数', 'favorite_count', 'int'),
+    ('加购数', 'add_to_cart_count', 'int'),
+    ('转化率(%)', 'conversion_rate', 'decimal'),
+    ('收藏率(%)', 'favorite_rate', 'decimal'),
+    ('加购率(%)', 'cart_rate', 'decimal'),
+    ('UV价值', 'uv_value', 'decimal'),
+    ('真实转化率(%)', 'real_conversion_rate', 'decimal'),
+    ('真实金额', 'real_amount', 'decimal'),
+    ('真实买家数', 'payment_buyer_count', 'int'),
+    ('真实件数', 'payment_product_count', 'int'),
+    ('产品成本', 'product_cost', 'decimal'),
+    ('真实订单扣点', 'real_order_deduction', 'decimal'),
+    ('税票', 'tax_invoice', 'decimal'),
+    ('真实订单物流成本', 'real_order_logistics_cost', 'decimal'),
+    ('种菜订单数', 'planting_orders', 'decimal'),
+    ('种菜金额', 'planting_amount', 'decimal'),
+    ('种菜成本', 'planting_cost', 'decimal'),
+    ('种菜扣款', 'planting_deduction', 'decimal'),
+    ('种菜物流成本', 'planting_logistics_cost', 'decimal'),
+    ('关键词推广', 'keyword_promotion', 'decimal'),
+    ('全站推广', 'sitewide_promotion', 'decimal'),
+    ('货品运营', 'product_operation', 'decimal'),
+    ('人群推广', 'crowd_promotion', 'decimal'),
+    ('超级短视频', 'super_short_video', 'decimal'),
+    ('多目标直投', 'multi_target_direct', 'decimal'),
+    ('毛利', 'gross_profit', 'decimal'),
+]
+
+EXPORT_HEADERS = [header for header, _, _ in EXPORT_COLUMNS]
+
+# 查询的字段（去重，保持顺序）及每个导出列在结果行中的位置
+_SELECT_FIELDS = list(dict.fromkeys(field for _, field, _ in EXPORT_COLUMNS))
+_FIELD_POSITIONS = [(_SELECT_FIELDS.index(field), kind) for _, field, kind in EXPORT_COLUMNS]
+
+# 可排序字段（与数据列表API相同）
+EXPORT_SORT_FIELDS = {
+    'real_buyer_count': 'payment_buyer_count',
+    'real_product_count': 'payment_product_count',
+}
+EXPORT_SORT_FIELDS.update({field: field for field in _SELECT_FIELDS if field != 'id'})
+
+FORMATS = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+_FILE_KEY_PATTERN = re.compile(r'^[0-9a-f]{40}$')
+
+
+def _format_value(value, kind):
+    if kind == 'int':
+        return value or 0
+    if kind == 'decimal':
+        return format_decimal(value)
+    if kind == 'date':
+        return value.strftime('%Y-%m-%d') if value else ''
+    if kind == 'text':
+        return value or ''
+    return value
+
+
+def export_statement(filters, sort_by='upload_date', sort_order='desc'):
+    """按数据列表的筛选与排序条件构建导出查询（只查询导出列，不加载ORM对象）"""
+    stmt = select(*[getattr(ProductDataMerge, field) for field in _SELECT_FIELDS])
+
+    if filters.get('upload_date'):
+        stmt = stmt.where(ProductDataMerge.upload_date == filters['upload_date'])
+    if filters.get('tmall_product_code'):
+        stmt = stmt.where(search_index.substring_filter('product_code', filters['tmall_product_code']))
+    if filters.get('product_name'):
+        stmt = stmt.where(search_index.substring_filter('product_name', filters['product_name']))
+    if filters.get('tmall_supplier_name'):
+        stmt = stmt.where(search_index.substring_filter('store', filters['tmall_supplier_name']))
+
+    if sort_by in EXPORT_SORT_FIELDS:
+        sort_field = getattr(ProductDataMerge, EXPORT_SORT_FIELDS[sort_by])
+        if sort_order.lower() == 'asc':
+            return stmt.order_by(sort_field.asc(), ProductDataMerge.id.asc())
+        return stmt.order_by(sort_field.desc(), ProductDataMerge.id.desc())
+    # 如果排序字段无效，使用默认排序
+    return stmt.order_by(ProductDataMerge.upload_date.desc(), ProductDataMerge.id.desc())
+
+
+def count_rows(stmt):
+    """导出查询的总行数"""
+    return db.session.execute(select(func.count()).select_from(stmt.order_by(None).subquery())).scalar() or 0
+
+
+def iter_rows(stmt, chunk_size=2000):
+    """服务端游标分块读取导出行（MySQL下为流式结果集，内存中只保留一个分块）"""
+    result = db.session.execute(stmt.execution_options(stream_results=True, yield_per=chunk_size))
+    try:
+        for partition in result.partitions(chunk_size):
+            yield [[_format_value(row[position], kind) for position, kind in _FIELD_POSITIONS] for row in partition]
+    finally:
+        result.close()
+
+
+def stream_csv(stmt, chunk_size=2000):
+    """逐块生成CSV内容（带BOM，Excel可直接打开中文）"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_HEADERS)
+    yield '\ufeff'.encode('utf-8') + buffer.getvalue().encode('utf-8')
+    for rows in iter_rows(stmt, chunk_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+
+
+def write_xlsx(stmt, path, chunk_size=2000, on_progress=None):
+    """用openpyxl只写模式逐行写入xlsx（行数据直接落盘，内存占用与行数无关），返回写入行数"""
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet('数据列表')
+    worksheet.append(EXPORT_HEADERS)
+    row_count = 0
+    for rows in iter_rows(stmt, chunk_size):
+        for row in rows:
+            worksheet.append(row)
+        row_count += len(rows)
+        if on_progress:
+            on_progress(row_count)
+    workbook.save(path)
+    return row_count
+
+
+class ExportFileCache:
+    """导出文件缓存 - 文件按 (导出格式, 筛选排序条件, 数据版本) 的哈希命名保存在导出目录
+
+    数据版本变化后哈希随之变化，旧文件不再命中并按最多保留数量淘汰；文件名即下载凭据，多个进程共享同一目录。
+    大批量导出在后台线程生成文件，同一文件同时只生成一次。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._building = {}  # 文件key -> task_id
+
+    def file_key(self, fmt, filters, sort_by, sort_order):
+        version = data_version(PRODUCT_MERGE_VERSION_TABLES)
+        payload = repr((fmt, sorted(filters.items()), sort_by, sort_order, version))
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def path_for(self, app, key, fmt='xlsx'):
+        if not _FILE_KEY_PATTERN.match(key) or fmt not in FORMATS:
+            return None
+        return os.path.join(app.config['EXPORT_FOLDER'], f'{key}.{fmt}')
+
+    def cached_path(self, app, key, fmt='xlsx'):
+        path = self.path_for(app, key, fmt)
+        return path if path and os.path.exists(path) else None
+
+    def build(self, app, key, stmt, on_progress=None):
+        """同步生成xlsx文件（先写临时文件再原子替换），返回文件路径"""
+        path = self.path_for(app, key)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        try:
+            write_xlsx(stmt, tmp_path, app.config.get('EXPORT_CHUNK_SIZE', 2000), on_progress)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self._evict(app)
+        return path
+
+    def start_build(self, app, key, stmt, total_rows, task_id):
+        """后台生成xlsx文件；相同文件正在生成时返回已有任务的task_id"""
+        with self._lock:
+            if key in self._building:
+                return self._building[key]
+            self._building[key] = task_id
+
+        progress_tracker.create_task(task_id=task_id, total_items=total_rows, description='数据列表导出')
+
+        def run():
+            with app.app_context():
+                try:
+                    self.build(app, key, stmt, lambda count: progress_tracker.update_progress(
+                        task_id, count, f'已导出 {count}/{total_rows} 行'
+                    ))
+                    progress_tracker.complete_task(task_id, f'导出完成，共 {total_rows} 行')
+                except Exception as e:
+                    logger.error(f"后台导出失败，task_id: {task_id}, 错误: {str(e)}")
+                    progress_tracker.error_task(task_id, str(e))
+                finally:
+                    with self._lock:
+                        self._building.pop(key, None)
+
+        thread = threading.Thread(target=run, name=f'export-{key[:8]}')
+        thread.daemon = True
+        thread.start()
+        return task_id
+
+    def _evict(self, app):
+        """只保留最近生成的若干个导出文件"""
+        folder = app.config['EXPORT_FOLDER']
+        max_files = app.config.get('EXPORT_CACHE_MAX_FILES', 20)
+        files = [
+            os.path.join(folder, name) for name in os.listdir(folder)
+            if _FILE_KEY_PATTERN.match(name.split('.')[0]) and not name.endswith('.tmp')
+        ]
+        files.sort(key=os.path.getmtime, reverse=True)
+        for path in files[max_files:]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def download_name(fmt):
+    return f"数据列表_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+
+
+# 全局导出文件缓存实例
+export_file_cache = ExportFileCache()
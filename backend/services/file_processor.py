@@ -3,6 +3,8 @@ import pandas as pd
 from datetime import datetime
 from models import db, ProductData, ProductList, PlantingRecord, SubjectReport, ProductDataMerge, OrderDetails, CompanyCostPricing, OperationCostPricing, OrderDetailsMerge, AlipayAmount
 from utils import progress_tracker
+from services.product_list_sync import record_product_list_change
+from services.bulk_calculator import PRODUCT_DATA_COLUMNS
 from utils import (
     get_field_mapping, safe_get_value, clean_product_code, safe_get_value_by_index,
     clean_product_code_by_index, safe_get_int, safe_get_float, safe_get_int_by_index,
@@ -18,6 +20,8 @@ logger = logging.getLogger(__name__)
 class FileProcessor:
     """文件处理服务类"""
     
+    PRODUCT_LIST_LOOKUP_CHUNK = 1000  # 合并时按产品ID批量查询product_list的IN列表长度
+    
     def _read_file_with_format(self, filepath, **kwargs):
         """统一的文件读取方法，支持CSV、XLSX、XLS格式"""
         if filepath.endswith('.csv'):
@@ -90,7 +94,7 @@ class FileProcessor:
                 ).all()
                 for record in old_records:
                     db.session.delete(record)
-                db.session.commit()
+                # 与新数据在同一事务内提交（见process_uploaded_file）
                 print(f"已删除门店 {actual_store} 在 {upload_date} 的 {len(old_records)} 条旧记录")
     
     def _process_single_dataframe(self, df, field_mapping, platform, user_id, filename, upload_date, supplier_store, source_name):
@@ -253,112 +257,98 @@ class FileProcessor:
             else:
                 print(f"所有工作表处理完成，总计成功处理 {total_success_count} 条数据")
             
-            # 处理merge表数据
-            try:
-                merge_count = self.process_product_data_merge(upload_date, user_id)
-                print(f"Merge处理完成，处理了 {merge_count} 条数据")
-            except Exception as e:
-                print(f"Merge处理出错: {e}")
-                # merge处理失败不影响主流程
-            
+            # merge表数据由流水线编排器的product_data_merge步骤处理（见routes/upload.py）
             return total_success_count
             
         except Exception as e:
             db.session.rollback()
             raise e
 
-    def process_product_data_merge(self, upload_date, user_id):
-        """处理产品数据合并表"""
+    def process_product_data_merge(self, upload_date, user_id, supplier_store=None):
+        """处理产品数据合并表（按 日期[, 店铺] 分区增量合并）
+
+        以 (店铺, 产品ID) 为键与分区内已有的merge记录对齐：已存在的记录原地更新来源字段，保留推广/种菜等已计算字段；
+        新出现的键插入，来源数据中已不存在的键删除。supplier_store为空时合并当天全部店铺。
+        """
         try:
-            # 1. 删除同一天的merge数据（如果存在）
-            existing_merge_records = ProductDataMerge.query.filter_by(upload_date=upload_date).all()
-            if existing_merge_records:
-                for record in existing_merge_records:
-                    db.session.delete(record)
-                print(f"删除了 {len(existing_merge_records)} 条同一天的merge数据")
-            
-            # 2. 获取当天的product_data数据
-            product_data_records = ProductData.query.filter_by(upload_date=upload_date).all()
-            
-            if not product_data_records:
-                print("没有找到当天的product_data数据")
-                return 0
-            
-            merge_count = 0
+            source_query = ProductData.query.filter_by(upload_date=upload_date)
+            merge_query = ProductDataMerge.query.filter_by(upload_date=upload_date)
+            if supplier_store is not None:
+                source_query = source_query.filter_by(tmall_supplier_name=supplier_store)
+                merge_query = merge_query.filter_by(tmall_supplier_name=supplier_store)
+            
+            # 1. 获取分区内的product_data数据和已有的merge数据
+            product_data_records = source_query.order_by(ProductData.id).all()
+            existing_records = {}
+            for record in merge_query.order_by(ProductDataMerge.id).all():
+                existing_records.setdefault((record.tmall_supplier_name, record.tmall_product_code), []).append(record)
+            
+            # 2. 一次性加载匹配的product_list记录（同一产品ID取最早一条）
+            product_codes = sorted({record.tmall_product_code for record in product_data_records if record.tmall_product_code})
+            product_lists = {}
+            for index in range(0, len(product_codes), self.PRODUCT_LIST_LOOKUP_CHUNK):
+                chunk = product_codes[index:index + self.PRODUCT_LIST_LOOKUP_CHUNK]
+                for product_list_record in ProductList.query.filter(
+                    ProductList.product_id.in_(chunk)
+                ).order_by(ProductList.id).all():
+                    product_lists.setdefault(product_list_record.product_id, product_list_record)
+            
+            inserted_count = 0
+            updated_count = 0
             matched_count = 0
             
-            # 3. 对每条product_data进行左连接处理
+            # 3. 对每条product_data进行左连接处理并与已有记录对齐
             for product_data in product_data_records:
-                # 查找匹配的product_list记录
-                product_list_record = None
-                is_matched = False
+                product_list_record = product_lists.get(product_data.tmall_product_code) if product_data.tmall_product_code else None
+                if product_list_record:
+                    matched_count += 1
                 
-                if product_data.tmall_product_code:
-                    product_list_record = ProductList.query.filter_by(
-                        product_id=product_data.tmall_product_code
-                    ).first()
-                    
-                    if product_list_record:
-                        is_matched = True
-                        matched_count += 1
-                
-                # 创建merge记录
-                merge_record = ProductDataMerge(
-                    # 来自product_data的字段
+                values = {name: getattr(product_data, name) for name in PRODUCT_DATA_COLUMNS}
+                values.update(
                     product_data_id=product_data.id,
-                    platform=product_data.platform,
-                    product_name=product_data.product_name,
-                    tmall_product_code=product_data.tmall_product_code,
-                    tmall_supplier_name=product_data.tmall_supplier_name,
-                    visitor_count=product_data.visitor_count,
-                    page_views=product_data.page_views,
-                    search_guided_visitors=product_data.search_guided_visitors,
-                    add_to_cart_count=product_data.add_to_cart_count,
-                    favorite_count=product_data.favorite_count,
-                    payment_amount=product_data.payment_amount,
-                    payment_product_count=product_data.payment_product_count,
-                    payment_buyer_count=product_data.payment_buyer_count,
-                    search_guided_payment_buyers=product_data.search_guided_payment_buyers,
-                    unit_price=product_data.unit_price,
-                    visitor_average_value=product_data.visitor_average_value,
-                    payment_conversion_rate=product_data.payment_conversion_rate,
-                    order_conversion_rate=product_data.order_conversion_rate,
-                    avg_stay_time=product_data.avg_stay_time,
-                    detail_page_bounce_rate=product_data.detail_page_bounce_rate,
-                    order_payment_conversion_rate=product_data.order_payment_conversion_rate,
-                    search_payment_conversion_rate=product_data.search_payment_conversion_rate,
-                    refund_amount=product_data.refund_amount,
-                    refund_ratio=product_data.refund_ratio,
-                    filename=product_data.filename,
-                    upload_date=product_data.upload_date,
-                    uploaded_by=product_data.uploaded_by,
-                    
-                                    # 来自product_list的字段（如果匹配的话）
-                product_list_id=product_list_record.id if product_list_record else None,
-                product_list_name=product_list_record.product_name if product_list_record else None,
-                listing_time=product_list_record.listing_time if product_list_record else None,
-                                            product_list_tmall_supplier_id=product_list_record.tmall_supplier_id if product_list_record else None,
-                            product_list_operator=product_list_record.operator if product_list_record else None,
-                            product_list_category=product_list_record.category if product_list_record else None,
-                            product_list_image=product_list_record.main_image_url if product_list_record else None,
-                            product_list_created_at=product_list_record.created_at if product_list_record else None,
-                            product_list_updated_at=product_list_record.updated_at if product_list_record else None,
-                product_list_uploaded_by=product_list_record.uploaded_by if product_list_record else None,
-                    
+                    # 来自product_list的字段（如果匹配的话）
+                    product_list_id=product_list_record.id if product_list_record else None,
+                    product_list_name=product_list_record.product_name if product_list_record else None,
+                    listing_time=product_list_record.listing_time if product_list_record else None,
+                    product_list_tmall_supplier_id=product_list_record.tmall_supplier_id if product_list_record else None,
+                    product_list_operator=product_list_record.operator if product_list_record else None,
+                    product_list_category=product_list_record.category if product_list_record else None,
+                    product_list_image=product_list_record.main_image_url if product_list_record else None,
+                    product_list_created_at=product_list_record.created_at if product_list_record else None,
+                    product_list_updated_at=product_list_record.updated_at if product_list_record else None,
+                    product_list_uploaded_by=product_list_record.uploaded_by if product_list_record else None,
                     # 元数据
-                    is_matched=is_matched
+                    is_matched=product_list_record is not None
                 )
                 
-                db.session.add(merge_record)
-                merge_count += 1
+                candidates = existing_records.get((product_data.tmall_supplier_name, product_data.tmall_product_code))
+                if candidates:
+                    merge_record = candidates.pop(0)
+                    updated_count += 1
+                else:
+                    merge_record = ProductDataMerge()
+                    db.session.add(merge_record)
+                    inserted_count += 1
+                
+                for name, value in values.items():
+                    setattr(merge_record, name, value)
+            
+            # 4. 来源数据中已不存在的记录删除
+            deleted_count = 0
+            for records in existing_records.values():
+                for record in records:
+                    db.session.delete(record)
+                    deleted_count += 1
             
             db.session.commit()
-            print(f"Merge处理完成: 总计 {merge_count} 条记录，匹配 {matched_count} 条")
+            merge_count = inserted_count + updated_count
+            logger.info(f"Merge处理完成 {upload_date} {supplier_store or '全部店铺'}: 总计 {merge_count} 条记录"
+                        f"（新增 {inserted_count}，更新 {updated_count}，删除 {deleted_count}），匹配 {matched_count} 条")
             return merge_count
             
         except Exception as e:
             db.session.rollback()
-            print(f"Merge处理失败: {e}")
+            logger.error(f"Merge处理失败: {e}")
             raise e
 
     def process_product_list_file(self, filepath, user_id):
@@ -590,6 +580,8 @@ class FileProcessor:
                             )
                             
                             db.session.add(product_list)
+                            # 登记新增的匹配键，由增量回填关联此前未匹配的merge记录
+                            record_product_list_change(product_list, 'insert')
                             sheet_success_count += 1
                             
                         except Exception as e:
@@ -0,0 +1,135 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, delete, case, and_
+from models import db, OrderDetailsMerge, InternalOrderSummary
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 每批刷新的内部订单号数量
+REFRESH_BATCH_SIZE = 500
+
+
+def summary_statement(internal_order_numbers):
+    """按订单行计算内部订单汇总的查询（口径与订单详情弹窗一致）
+
+    - 总成本：各行 运营成本供货价 × 数量 之和（空值按0）；
+    - 销售金额：下单时间最新一行的已付金额（不累加）；
+    - 利润：销售金额 - 总成本，小于0时记为0；店铺、下单时间、上传日期取同一行。
+    """
+    m = OrderDetailsMerge
+    in_orders = m.internal_order_number.in_(internal_order_numbers)
+
+    ranked = select(
+        m.internal_order_number, m.paid_amount, m.store_name, m.order_time, m.upload_date,
+        db.func.row_number().over(
+            partition_by=m.internal_order_number,
+            order_by=[m.order_time.desc(), m.id.asc()]
+        ).label('line_rank')
+    ).where(in_orders).subquery()
+    first_line = select(ranked).where(ranked.c.line_rank == 1).subquery()
+
+    totals = select(
+        m.internal_order_number,
+        db.func.count(m.id).label('item_count'),
+        db.func.sum(
+            db.func.coalesce(m.operation_cost_supply_price, 0) * db.func.coalesce(m.quantity, 0)
+        ).label('total_cost')
+    ).where(in_orders).group_by(m.internal_order_number).subquery()
+
+    sales_amount = db.func.coalesce(first_line.c.paid_amount, 0)
+    return select(
+        totals.c.internal_order_number,
+        totals.c.item_count,
+        totals.c.total_cost,
+        sales_amount.label('sales_amount'),
+        case(
+            (sales_amount - totals.c.total_cost > 0, sales_amount - totals.c.total_cost),
+            else_=0
+        ).label('profit'),
+        first_line.c.store_name,
+        first_line.c.order_time,
+        first_line.c.upload_date,
+    ).join(first_line, first_line.c.internal_order_number == totals.c.internal_order_number)
+
+
+SUMMARY_COLUMNS = [
+    'internal_order_number', 'item_count', 'total_cost', 'sales_amount', 'profit',
+    'store_name', 'order_time', 'upload_date'
+]
+
+
+def summary_to_dict(row):
+    return {
+        'internal_order_number': row.internal_order_number,
+        'sales_amount': float(row.sales_amount or 0),
+        'total_cost': float(row.total_cost or 0),
+        'profit': float(row.profit or 0),
+        'item_count': row.item_count,
+        'store_name': row.store_name or '',
+        'order_time': row.order_time.isoformat() if row.order_time else None,
+    }
+
+
+def refresh_internal_order_summaries(internal_order_numbers):
+    """按订单行重算指定内部订单号的汇总并提交；订单行已不存在的汇总被删除，返回写入行数"""
+    numbers = sorted({number for number in internal_order_numbers if number})
+    written = 0
+    for start in range(0, len(numbers), REFRESH_BATCH_SIZE):
+        batch = numbers[start:start + REFRESH_BATCH_SIZE]
+        db.session.execute(delete(InternalOrderSummary).where(
+            InternalOrderSummary.internal_order_number.in_(batch)
+        ))
+        written += db.session.execute(
+            insert(InternalOrderSummary).from_select(SUMMARY_COLUMNS, summary_statement(batch))
+        ).rowcount
+        db.session.commit()
+    return written
+
+
+def _refresh_where(line_criteria, summary_criteria):
+    """刷新订单行满足 line_criteria 或已有汇总满足 summary_criteria 的内部订单"""
+    numbers = set(db.session.execute(
+        select(OrderDetailsMerge.internal_order_number).where(
+            line_criteria, OrderDetailsMerge.internal_order_number.isnot(None)
+        ).distinct()
+    ).scalars())
+    numbers.update(db.session.execute(
+        select(InternalOrderSummary.internal_order_number).where(summary_criteria)
+    ).scalars())
+    written = refresh_internal_order_summaries(numbers)
+    logger.info(f"内部订单汇总已刷新: {len(numbers)} 个订单，写入 {written} 行")
+    return written
+
+
+def refresh_for_order_dates(start_date, end_date):
+    """订单成本汇总步骤完成后调用：刷新下单日期在区间内的内部订单"""
+    start_time = datetime.combine(start_date, datetime.min.time())
+    end_time = datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+    return _refresh_where(
+        and_(OrderDetailsMerge.order_time >= start_time, OrderDetailsMerge.order_time < end_time),
+        and_(InternalOrderSummary.order_time >= start_time, InternalOrderSummary.order_time < end_time)
+    )
+
+
+def refresh_for_upload_dates(start_date, end_date):
+    """订单支付金额更新步骤完成后调用：刷新上传日期在区间内的内部订单"""
+    return _refresh_where(
+        and_(OrderDetailsMerge.upload_date >= start_date, OrderDetailsMerge.upload_date <= end_date),
+        and_(InternalOrderSummary.upload_date >= start_date, InternalOrderSummary.upload_date <= end_date)
+    )
+
+
+def lookup_summaries(internal_order_numbers):
+    """批量查询内部订单汇总：{内部订单号: 汇总}；汇总表中还没有的订单按订单行即时计算（不写入）"""
+    numbers = sorted({number for number in internal_order_numbers if number})
+    if not numbers:
+        return {}
+    summaries = {
+        row.internal_order_number: summary_to_dict(row)
+        for row in InternalOrderSummary.query.filter(InternalOrderSummary.internal_order_number.in_(numbers))
+    }
+    missing = [number for number in numbers if number not in summaries]
+    if missing:
+        for row in db.session.execute(summary_statement(missing)):
+            summaries[row.internal_order_number] = summary_to_dict(row)
+    return summaries
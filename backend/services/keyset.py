@@ -0,0 +1,55 @@
+import base64
+import json
+from sqlalchemy import select, and_, or_
+from models import db
+
+
+class InvalidCursor(ValueError):
+    """分页游标无法解析、与当前排序不一致或锚点行已不存在"""
+
+
+def encode_cursor(sort_by, sort_order, anchor_id):
+    """生成不透明的分页游标：记录排序方式与本页最后一行的id"""
+    payload = json.dumps({'s': sort_by, 'o': sort_order, 'id': anchor_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort_by, sort_order):
+    """解析分页游标，返回锚点行id"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        anchor_id = int(payload['id'])
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursor('分页游标格式错误')
+    if payload.get('s') != sort_by or payload.get('o') != sort_order:
+        raise InvalidCursor('分页游标与当前排序方式不一致')
+    return anchor_id
+
+
+def keyset_condition(model, sort_column, descending, anchor_id):
+    """返回位于锚点行之后的过滤条件，排序为 (sort_column, id) 且与 MySQL 的 NULL 排序一致（升序在前、降序在后）
+
+    锚点行的排序值通过主键子查询读取，浮点列也能精确比较，不受序列化精度影响；
+    锚点行已被删除（分区重算）时抛出 InvalidCursor。
+    """
+    anchor = db.session.execute(select(sort_column).where(model.id == anchor_id)).first()
+    if anchor is None:
+        raise InvalidCursor('数据已更新，分页游标已失效，请重新查询')
+    anchor_value = select(sort_column).where(model.id == anchor_id).scalar_subquery()
+
+    if descending:
+        if anchor[0] is None:
+            return and_(sort_column.is_(None), model.id < anchor_id)
+        return or_(
+            sort_column < anchor_value,
+            and_(sort_column == anchor_value, model.id < anchor_id),
+            sort_column.is_(None)
+        )
+
+    if anchor[0] is None:
+        return or_(and_(sort_column.is_(None), model.id > anchor_id), sort_column.isnot(None))
+    return or_(
+        sort_column > anchor_value,
+        and_(sort_column == anchor_value, model.id > anchor_id)
+    )
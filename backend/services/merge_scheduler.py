@@ -0,0 +1,79 @@
+import threading
+from services.pipeline import pipeline_orchestrator
+from utils import DebouncedTask
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class MergeScheduler:
+    """商品数据合并调度器 - 上传只登记待合并的 (日期, 店铺)，防抖窗口结束后每个日期合并一次
+
+    同一日期的多次上传在窗口内合并为一次运行（店铺取并集），合并本身在流水线步骤中持有日期分区锁，
+    与流水线的增量运行互斥，结果不受请求交错顺序影响。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}  # 日期 -> 待合并店铺集合（None表示整天）
+        self._tasks = {}  # 日期 -> DebouncedTask（执行结束后移除）
+
+    def enqueue(self, app, partition_date, store_name=None):
+        """登记待合并分区并触发防抖执行"""
+        with self._lock:
+            if store_name is None:
+                self._pending[partition_date] = None
+            elif partition_date not in self._pending:
+                self._pending[partition_date] = {store_name}
+            elif self._pending[partition_date] is not None:
+                self._pending[partition_date].add(store_name)
+
+            task = self._tasks.get(partition_date)
+            if task is None:
+                task = DebouncedTask(
+                    lambda: self._run(app, partition_date),
+                    app.config.get('MERGE_DEBOUNCE_SECONDS', 3),
+                    name=f'product_data_merge:{partition_date}',
+                    max_wait_seconds=app.config.get('MERGE_MAX_WAIT_SECONDS', 30),
+                    on_idle=lambda finished_task: self._release(partition_date, finished_task)
+                )
+                self._tasks[partition_date] = task
+            # 在调度锁内触发，避免与 _release 交错时移除刚被触发的任务
+            task.trigger()
+
+    def _release(self, partition_date, task):
+        """任务执行结束后移除，日期分区不再长期持有任务对象"""
+        with self._lock:
+            if self._tasks.get(partition_date) is task and not task.is_pending():
+                del self._tasks[partition_date]
+
+    def is_pending(self, partition_date):
+        """日期分区是否有等待中或执行中的合并"""
+        with self._lock:
+            task = self._tasks.get(partition_date)
+            return partition_date in self._pending or (task is not None and task.is_pending())
+
+    def _take(self, partition_date):
+        with self._lock:
+            if partition_date not in self._pending:
+                return False, None
+            return True, self._pending.pop(partition_date)
+
+    def _run(self, app, partition_date):
+        has_pending, stores = self._take(partition_date)
+        if not has_pending:
+            return
+
+        with app.app_context():
+            status, message = pipeline_orchestrator.run_step('product_data_merge', partition_date, stores)
+            store_label = '、'.join(sorted(stores)) if stores else '全部店铺'
+            if status == 'completed':
+                logger.info(f"合并调度 {partition_date} [{store_label}]: {message}")
+            else:
+                logger.warning(f"合并调度 {partition_date} [{store_label}] 未完成: {message}")
+            # 下游汇总步骤由流水线增量调度
+            pipeline_orchestrator.schedule(app)
+
+
+# 全局合并调度实例
+merge_scheduler = MergeScheduler()
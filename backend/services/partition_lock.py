@@ -0,0 +1,62 @@
+import hashlib
+import threading
+from contextlib import contextmanager
+from sqlalchemy import text
+from models import db
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PartitionLockTimeout(Exception):
+    """等待分区锁超时"""
+
+    def __init__(self, name, timeout):
+        self.name = name
+        self.timeout = timeout
+        super().__init__(f'等待分区锁 {name} 超时（{timeout} 秒）')
+
+
+# 非MySQL数据库（开发环境SQLite等）退化为进程内锁
+_local_locks = {}
+_local_locks_guard = threading.Lock()
+
+
+def _mysql_lock_name(name):
+    """MySQL咨询锁名称最长64个字符，超长时使用摘要"""
+    if len(name) <= 64:
+        return name
+    return f'{name[:23]}:{hashlib.sha1(name.encode("utf-8")).hexdigest()}'
+
+
+@contextmanager
+def partition_lock(name, timeout=300):
+    """分区互斥锁：MySQL使用GET_LOCK咨询锁（多进程/多实例之间互斥），其他数据库使用进程内锁
+
+    咨询锁绑定在数据库连接上，这里单独占用一个连接直到释放，不受业务会话提交/回滚的影响。
+    """
+    if db.engine.dialect.name == 'mysql':
+        lock_name = _mysql_lock_name(name)
+        connection = db.engine.connect()
+        try:
+            acquired = connection.execute(
+                text('SELECT GET_LOCK(:name, :timeout)'), {'name': lock_name, 'timeout': timeout}
+            ).scalar()
+            if acquired != 1:
+                raise PartitionLockTimeout(name, timeout)
+            try:
+                yield
+            finally:
+                connection.execute(text('SELECT RELEASE_LOCK(:name)'), {'name': lock_name})
+        finally:
+            connection.close()
+        return
+
+    with _local_locks_guard:
+        lock = _local_locks.setdefault(name, threading.Lock())
+    if not lock.acquire(timeout=timeout):
+        raise PartitionLockTimeout(name, timeout)
+    try:
+        yield
+    finally:
+        lock.release()
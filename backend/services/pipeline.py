@@ -0,0 +1,473 @@
+import threading
+import time
+from datetime import datetime, date, timedelta
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from models import db, PipelineWatermark, PipelineStepState, OrderDetailsMerge
+from services.business_calculator import BusinessCalculator, CalculationDataMissing
+from services.file_processor import FileProcessor
+from services.daily_rollup import daily_rollup
+from services.partition_lock import partition_lock
+from services.range_executor import range_executor
+from utils import DebouncedTask
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineStep:
+    """流水线步骤定义
+
+    inputs为(数据表, 起始偏移天数, 结束偏移天数)列表，分区日期D的输入窗口为[D+起始偏移, D+结束偏移]；
+    第一个输入为主输入。步骤运行成功后以自身名称作为输出表推进水位，供下游步骤判断是否需要重算。
+    """
+
+    def __init__(self, name, inputs, description=''):
+        self.name = name
+        self.inputs = inputs
+        self.description = description
+
+    @property
+    def input_tables(self):
+        return [table_name for table_name, _, _ in self.inputs]
+
+
+# 步骤按拓扑顺序排列：商品数据链路 + 订单数据链路
+PIPELINE_STEPS = [
+    PipelineStep('product_data_merge', [('product_data', 0, 0)], '商品数据合并'),
+    PipelineStep('promotion_summary', [('product_data_merge', 0, 0), ('subject_report', 0, 0)], '推广费用汇总'),
+    PipelineStep('planting_summary', [('product_data_merge', 0, 0), ('planting_records', 0, 0)], '种菜表格汇总'),
+    PipelineStep('final_summary', [('product_data_merge', 0, 0), ('promotion_summary', 0, 0), ('planting_summary', 0, 0)], '最终汇总'),
+    PipelineStep('order_details_merge', [('order_details', 0, 0)], '订单详情合并'),
+    PipelineStep('order_cost_summary', [('order_details_merge', 0, 0)], '订单成本汇总'),
+    PipelineStep('order_payment_update', [('order_cost_summary_by_upload_date', 0, 0), ('alipay_amount', 0, 30)], '订单支付金额更新'),
+]
+
+# 输出分区键与下游步骤不同的步骤：完成后另按下游的分区键推进水位
+# 订单成本汇总按下单日期分区，订单支付金额更新按上传日期分区，下单日期D完成后推进D内订单所属各上传日期的水位
+REPARTITIONED_OUTPUTS = {
+    'order_cost_summary': 'order_cost_summary_by_upload_date',
+}
+
+PIPELINE_STEP_MAP = {step.name: step for step in PIPELINE_STEPS}
+
+
+class PipelineOrchestrator:
+    """流水线编排器 - 基于(数据表, 日期, 店铺)分区水位，只重算输入发生变化的步骤和分区"""
+
+    def __init__(self):
+        self.calculator = BusinessCalculator()
+        self.file_processor = FileProcessor()
+        self._version_lock = threading.Lock()
+        self._last_version = 0
+        self._run_lock = threading.Lock()
+        self._debounced_task = None
+        self._runners = {
+            'product_data_merge': self._run_product_data_merge,
+            'promotion_summary': self._run_promotion_summary,
+            'planting_summary': self._run_planting_summary,
+            'final_summary': self._run_final_summary,
+            'order_details_merge': self._run_order_details_merge,
+            'order_cost_summary': self._run_order_cost_summary,
+            'order_payment_update': self._run_order_payment_update,
+        }
+
+    # ================================
+    # 水位维护
+    # ================================
+
+    def _next_version(self):
+        """生成单调递增的版本号（微秒时间戳）"""
+        with self._version_lock:
+            version = max(int(time.time() * 1000000), self._last_version + 1)
+            self._last_version = version
+            return version
+
+    def _bump_watermark(self, table_name, partition_date, store_name=''):
+        """推进分区水位（不提交事务）"""
+        version = self._next_version()
+        record = PipelineWatermark.query.filter_by(
+            table_name=table_name,
+            partition_date=partition_date,
+            store_name=store_name or ''
+        ).first()
+        if record:
+            record.version = max(record.version or 0, version)
+        else:
+            db.session.add(PipelineWatermark(
+                table_name=table_name,
+                partition_date=partition_date,
+                store_name=store_name or '',
+                version=version
+            ))
+        return version
+
+    def mark_dirty(self, table_name, partition_dates, store_name=''):
+        """数据表分区发生变化（上传/覆盖）时调用，推进对应分区水位"""
+        partition_dates = sorted({d for d in partition_dates if d})
+        if not partition_dates:
+            return 0
+
+        for attempt in range(2):
+            try:
+                for partition_date in partition_dates:
+                    self._bump_watermark(table_name, partition_date, store_name)
+                db.session.commit()
+                break
+            except IntegrityError:
+                # 并发插入同一分区水位，回滚后按更新路径重试
+                db.session.rollback()
+                if attempt == 1:
+                    raise
+
+        logger.info(f"流水线分区已标记变更: {table_name} {store_name or '全部店铺'} "
+                    f"{partition_dates[0]} ~ {partition_dates[-1]} 共 {len(partition_dates)} 天")
+        return len(partition_dates)
+
+    def _load_watermarks(self, table_names, date_from, date_to):
+        """加载水位 {table: {date: {store: version}}}"""
+        query = PipelineWatermark.query.filter(PipelineWatermark.table_name.in_(table_names))
+        if date_from:
+            query = query.filter(PipelineWatermark.partition_date >= date_from)
+        if date_to:
+            query = query.filter(PipelineWatermark.partition_date <= date_to)
+
+        watermarks = {}
+        for record in query.all():
+            table_partitions = watermarks.setdefault(record.table_name, {})
+            table_partitions.setdefault(record.partition_date, {})[record.store_name or ''] = record.version or 0
+        return watermarks
+
+    def _load_step_states(self, step_names, date_from, date_to):
+        """加载步骤状态 {(step, date): PipelineStepState}"""
+        query = PipelineStepState.query.filter(PipelineStepState.step_name.in_(step_names))
+        if date_from:
+            query = query.filter(PipelineStepState.partition_date >= date_from)
+        if date_to:
+            query = query.filter(PipelineStepState.partition_date <= date_to)
+        return {(state.step_name, state.partition_date): state for state in query.all()}
+
+    def _input_version(self, step, partition_date, watermarks):
+        """计算步骤在分区上的输入水位（各输入窗口内版本的最大值）"""
+        input_version = 0
+        for table_name, start_offset, end_offset in step.inputs:
+            table_partitions = watermarks.get(table_name, {})
+            for offset in range(start_offset, end_offset + 1):
+                stores = table_partitions.get(partition_date + timedelta(days=offset))
+                if stores:
+                    input_version = max(input_version, max(stores.values()))
+        return input_version
+
+    def _dirty_stores(self, step, partition_date, consumed_version, watermarks):
+        """主输入当天变化的店铺集合；存在整天级变化时返回None表示整天重算"""
+        table_name = step.inputs[0][0]
+        stores = watermarks.get(table_name, {}).get(partition_date, {})
+        dirty = {store for store, version in stores.items() if version > consumed_version}
+        if not dirty or '' in dirty:
+            return None
+        return dirty
+
+    def _collect_dirty_partitions(self, step, watermarks, states, date_from, date_to):
+        """找出步骤中输入水位高于已消费水位的分区 [(date, input_version, stores)]"""
+        candidates = set()
+        for table_name, start_offset, end_offset in step.inputs:
+            for changed_date in watermarks.get(table_name, {}):
+                for offset in range(start_offset, end_offset + 1):
+                    partition_date = changed_date - timedelta(days=offset)
+                    if (date_from is None or partition_date >= date_from) and \
+                       (date_to is None or partition_date <= date_to):
+                        candidates.add(partition_date)
+
+        dirty_partitions = []
+        for partition_date in sorted(candidates):
+            input_version = self._input_version(step, partition_date, watermarks)
+            state = states.get((step.name, partition_date))
+            consumed_version = state.input_version if state else 0
+            if input_version > consumed_version:
+                dirty_partitions.append((
+                    partition_date,
+                    input_version,
+                    self._dirty_stores(step, partition_date, consumed_version, watermarks)
+                ))
+        return dirty_partitions
+
+    def _window(self, date_from, date_to):
+        """水位加载窗口需要覆盖各输入的偏移范围"""
+        max_end_offset = max(end for step in PIPELINE_STEPS for _, _, end in step.inputs)
+        min_start_offset = min(start for step in PIPELINE_STEPS for _, start, _ in step.inputs)
+        load_from = date_from + timedelta(days=min_start_offset) if date_from else None
+        load_to = date_to + timedelta(days=max_end_offset) if date_to else None
+        return load_from, load_to
+
+    # ================================
+    # 步骤执行
+    # ================================
+
+    def _order_upload_dates(self, order_date):
+        """下单日期分区内订单行的上传日期"""
+        start_time = datetime.combine(order_date, datetime.min.time())
+        rows = db.session.query(OrderDetailsMerge.upload_date).filter(
+            OrderDetailsMerge.order_time >= start_time,
+            OrderDetailsMerge.order_time < start_time + timedelta(days=1),
+            OrderDetailsMerge.upload_date.isnot(None)
+        ).distinct().all()
+        return sorted({upload_date for (upload_date,) in rows})
+
+    def _record_state(self, step, partition_date, input_version, status, message, duration):
+        """记录步骤运行状态，成功时推进步骤输出水位（不提交事务），返回推进的水位 [(数据表, 日期, 版本)]"""
+        state = PipelineStepState.query.filter_by(
+            step_name=step.name, partition_date=partition_date
+        ).first()
+        if not state:
+            state = PipelineStepState(step_name=step.name, partition_date=partition_date)
+            db.session.add(state)
+
+        # 出错的分区保留旧的已消费水位，下次运行时重试
+        if status != 'error':
+            state.input_version = max(state.input_version or 0, input_version)
+        elif state.input_version is None:
+            state.input_version = 0
+        state.status = status
+        state.message = message[:2000] if message else message
+        state.duration_seconds = duration
+        state.last_run_at = datetime.utcnow()
+
+        if status != 'completed':
+            return []
+        outputs = [(step.name, partition_date, self._bump_watermark(step.name, partition_date))]
+        repartitioned_table = REPARTITIONED_OUTPUTS.get(step.name)
+        if repartitioned_table:
+            outputs.extend(
+                (repartitioned_table, upload_date, self._bump_watermark(repartitioned_table, upload_date))
+                for upload_date in self._order_upload_dates(partition_date)
+            )
+        return outputs
+
+    def run_step(self, step_name, partition_date, stores=None):
+        """执行单个步骤的单个日期分区，返回 (status, message)"""
+        status, message, _ = self._execute_step(PIPELINE_STEP_MAP[step_name], partition_date, stores)
+        return status, message
+
+    def _execute_step(self, step, partition_date, stores=None, input_version=None):
+        """执行步骤分区并登记状态，返回 (status, message, 推进的水位列表)"""
+        step_name = step.name
+
+        if input_version is None:
+            load_from, load_to = self._window(partition_date, partition_date)
+            watermarks = self._load_watermarks(step.input_tables, load_from, load_to)
+            input_version = self._input_version(step, partition_date, watermarks)
+
+        start_time = time.time()
+        try:
+            message = self._runners[step_name](partition_date, stores)
+            status = 'completed'
+        except CalculationDataMissing as e:
+            db.session.rollback()
+            status, message = 'skipped', e.message
+        except Exception as e:
+            db.session.rollback()
+            status, message = 'error', str(e)
+            logger.error(f"流水线步骤 {step_name} 在 {partition_date} 执行失败: {e}")
+        duration = time.time() - start_time
+
+        outputs = self._record_state(step, partition_date, input_version, status, message, duration)
+        db.session.commit()
+
+        logger.info(f"流水线步骤 {step.description} [{partition_date}] {status}，耗时 {duration:.2f} 秒: {message}")
+        return status, message, outputs
+
+    def record_step_run(self, step_name, partition_dates, message='手动执行'):
+        """接口直接执行计算后登记步骤状态，避免流水线重复计算"""
+        step = PIPELINE_STEP_MAP[step_name]
+        partition_dates = sorted(set(partition_dates))
+        if not partition_dates:
+            return
+
+        load_from, load_to = self._window(partition_dates[0], partition_dates[-1])
+        watermarks = self._load_watermarks(step.input_tables, load_from, load_to)
+        for partition_date in partition_dates:
+            input_version = self._input_version(step, partition_date, watermarks)
+            self._record_state(step, partition_date, input_version, 'completed', message, None)
+        db.session.commit()
+
+    def run_pending(self, date_from=None, date_to=None, task_id=None):
+        """按拓扑顺序执行所有存在变更的步骤分区，返回运行汇总"""
+        from flask import current_app
+        app = current_app._get_current_object()
+        if date_from is None and date_to is None:
+            lookback_days = app.config.get('PIPELINE_LOOKBACK_DAYS', 62)
+            date_from = date.today() - timedelta(days=lookback_days)
+
+        with self._run_lock:
+            summary = {'completed': 0, 'skipped': 0, 'error': 0, 'runs': []}
+            load_from, load_to = self._window(date_from, date_to)
+            all_tables = sorted({table for step in PIPELINE_STEPS for table in step.input_tables})
+            watermarks = self._load_watermarks(all_tables, load_from, load_to)
+            states = self._load_step_states([step.name for step in PIPELINE_STEPS], date_from, date_to)
+
+            for step in PIPELINE_STEPS:
+                dirty_partitions = self._collect_dirty_partitions(step, watermarks, states, date_from, date_to)
+                if not dirty_partitions:
+                    continue
+
+                if task_id:
+                    from utils import progress_tracker
+                    progress_tracker.update_progress(
+                        task_id=task_id,
+                        processed_items=len(summary['runs']),
+                        message=f"正在执行 {step.description}: {len(dirty_partitions)} 个日期分区"
+                    )
+
+                # 同一步骤的各日期分区相互独立，按天并发执行
+                results = range_executor.map(
+                    app, dirty_partitions,
+                    lambda partition, step=step: self._execute_step(step, partition[0], partition[2], partition[1])
+                )
+                for (partition_date, _, stores), result in zip(dirty_partitions, results):
+                    if result['status'] == 'completed':
+                        status, message, outputs = result['result']
+                    else:
+                        status, message, outputs = 'error', result['message'], []
+
+                    summary[status] += 1
+                    summary['runs'].append({
+                        'step': step.name,
+                        'date': partition_date.strftime('%Y-%m-%d'),
+                        'stores': sorted(stores) if stores else None,
+                        'status': status,
+                        'message': message
+                    })
+
+                    # 同步内存中的水位，使下游步骤在本次运行中即可感知
+                    for table_name, output_date, output_version in outputs:
+                        watermarks.setdefault(table_name, {})[output_date] = {'': output_version}
+
+            logger.info(f"流水线运行完成: 成功 {summary['completed']}，跳过 {summary['skipped']}，失败 {summary['error']}")
+            return summary
+
+    def get_status(self, date_from=None, date_to=None):
+        """获取各步骤待重算分区及最近运行状态"""
+        if date_from is None and date_to is None:
+            from flask import current_app
+            lookback_days = current_app.config.get('PIPELINE_LOOKBACK_DAYS', 62)
+            date_from = date.today() - timedelta(days=lookback_days)
+
+        load_from, load_to = self._window(date_from, date_to)
+        all_tables = sorted({table for step in PIPELINE_STEPS for table in step.input_tables})
+        watermarks = self._load_watermarks(all_tables, load_from, load_to)
+        states = self._load_step_states([step.name for step in PIPELINE_STEPS], date_from, date_to)
+
+        steps = []
+        for step in PIPELINE_STEPS:
+            dirty_partitions = self._collect_dirty_partitions(step, watermarks, states, date_from, date_to)
+            step_states = sorted(
+                (state for (step_name, _), state in states.items() if step_name == step.name),
+                key=lambda state: state.partition_date,
+                reverse=True
+            )
+            steps.append({
+                'step': step.name,
+                'description': step.description,
+                'inputs': step.input_tables,
+                'dirty_partitions': [
+                    {
+                        'date': partition_date.strftime('%Y-%m-%d'),
+                        'stores': sorted(stores) if stores else None
+                    }
+                    for partition_date, _, stores in dirty_partitions
+                ],
+                'recent_runs': [
+                    {
+                        'date': state.partition_date.strftime('%Y-%m-%d'),
+                        'status': state.status,
+                        'message': state.message,
+                        'duration_seconds': state.duration_seconds,
+                        'last_run_at': state.last_run_at.strftime('%Y-%m-%d %H:%M:%S') if state.last_run_at else None
+                    }
+                    for state in step_states[:10]
+                ]
+            })
+
+        return {
+            'steps': steps,
+            'scheduled': self._debounced_task.is_pending() if self._debounced_task else False
+        }
+
+    # ================================
+    # 自动调度
+    # ================================
+
+    def schedule(self, app):
+        """上传后调度一次增量运行，防抖窗口内的多次上传合并为一次运行"""
+        if not app.config.get('PIPELINE_AUTO_RUN', True):
+            return
+
+        if self._debounced_task is None:
+            def run_in_app_context():
+                with app.app_context():
+                    self.run_pending()
+
+            self._debounced_task = DebouncedTask(
+                run_in_app_context,
+                app.config.get('PIPELINE_DEBOUNCE_SECONDS', 30),
+                name='pipeline',
+                max_wait_seconds=app.config.get('PIPELINE_MAX_WAIT_SECONDS', 300)
+            )
+        self._debounced_task.trigger()
+
+    # ================================
+    # 各步骤执行器
+    # ================================
+
+    def _run_product_data_merge(self, partition_date, stores):
+        # 同一日期的合并串行执行（上传调度与增量运行之间互斥）
+        with partition_lock(f'product_data_merge:{partition_date}',
+                            current_app.config.get('PARTITION_LOCK_TIMEOUT_SECONDS', 300)):
+            # 只有部分店铺变化时按店铺分区合并，其余店铺的merge记录及已计算字段保持不变
+            if stores:
+                merge_count = sum(
+                    self.file_processor.process_product_data_merge(partition_date, None, store)
+                    for store in sorted(stores)
+                )
+                message = f'合并 {len(stores)} 个店铺 {merge_count} 条记录'
+            else:
+                merge_count = self.file_processor.process_product_data_merge(partition_date, None)
+                message = f'合并 {merge_count} 条记录'
+        # 合并后即刷新看板日汇总，最终汇总完成后会再刷新一次
+        daily_rollup.refresh([partition_date])
+        return message
+
+    def _run_promotion_summary(self, partition_date, stores):
+        stats = self.calculator.calculate_promotion_summary(partition_date)
+        return f'处理 {stats["processed_count"]} 条，匹配 {stats["matched_count"]} 条，更新 {stats["updated_count"]} 条'
+
+    def _run_planting_summary(self, partition_date, stores):
+        summary_count = self.calculator.calculate_planting_summary(partition_date)
+        return f'更新 {summary_count} 条记录'
+
+    def _run_final_summary(self, partition_date, stores):
+        summary_count = self.calculator.calculate_final_summary(partition_date)
+        return f'更新 {summary_count} 条记录'
+
+    def _run_order_details_merge(self, partition_date, stores):
+        try:
+            stats = self.calculator.calculate_order_details_merge(partition_date, partition_date)
+        except CalculationDataMissing:
+            # 当天订单详情已被删除：清理残留的合并数据，推进水位使下游与读取缓存感知变化
+            db.session.rollback()
+            if not self.calculator.clear_order_details_merge(partition_date, partition_date, []):
+                raise
+            return '订单详情已不存在，已清理当天的合并数据'
+        return f'处理 {stats["processed_count"]} 条，匹配 {stats["matched_count"]} 条，创建 {stats["created_count"]} 条'
+
+    def _run_order_cost_summary(self, partition_date, stores):
+        stats = self.calculator.calculate_order_cost_summary(partition_date, partition_date)
+        return f'处理 {stats["processed_count"]} 条，计算成本 {stats["cost_calculated_count"]} 条'
+
+    def _run_order_payment_update(self, partition_date, stores):
+        stats = self.calculator.calculate_order_payment_update(partition_date, partition_date)
+        return f'处理 {stats["processed_count"]} 条，更新 {stats["updated_count"]} 条'
+
+
+# 全局流水线编排器实例
+pipeline_orchestrator = PipelineOrchestrator()
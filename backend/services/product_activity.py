@@ -0,0 +1,170 @@
+import bisect
+import json
+import threading
+from datetime import datetime
+from sqlalchemy import insert, delete, or_, and_
+from models import db, ProductList, ProductActivity
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def parse_activity_date(value):
+    """解析活动时间：新格式包含时分（ISO 8601，可带Z），旧格式只有日期"""
+    if 'T' in value:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).date()
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def parse_action_list(action_list):
+    """把action_list展开为 [(活动名称, 预热日期, 开始日期, 结束日期)]，格式不完整或日期错误的活动跳过"""
+    if not action_list:
+        return []
+    try:
+        activities = json.loads(action_list) if isinstance(action_list, str) else action_list
+    except (json.JSONDecodeError, TypeError):
+        return []
+    if not isinstance(activities, list):
+        return []
+
+    parsed = []
+    for activity in activities:
+        if not isinstance(activity, dict):
+            continue
+        activity_name = activity.get('name')
+        # 优先使用新格式（包含时分），其次使用旧格式（只有日期）
+        start_time_str = activity.get('start_time') or activity.get('start_date')
+        end_time_str = activity.get('end_time') or activity.get('end_date')
+        warmup_time_str = activity.get('warmup_time')
+        if not all([activity_name, start_time_str, end_time_str]):
+            continue
+        try:
+            warmup_date = parse_activity_date(warmup_time_str) if warmup_time_str else None
+            parsed.append((activity_name, warmup_date, parse_activity_date(start_time_str), parse_activity_date(end_time_str)))
+        except (ValueError, TypeError, AttributeError):
+            continue
+    return parsed
+
+
+def sync_product_activities(products):
+    """按产品当前的action_list重建其活动日历行（不提交事务）"""
+    products = [product for product in products if product.id]
+    if not products:
+        return 0
+
+    db.session.execute(delete(ProductActivity).where(
+        ProductActivity.product_list_id.in_([product.id for product in products])
+    ))
+    rows = [
+        {
+            'product_list_id': product.id,
+            'product_id': product.product_id,
+            'activity_name': name[:200],
+            'warmup_date': warmup_date,
+            'start_date': start_date,
+            'end_date': end_date,
+            'sequence': sequence,
+        }
+        for product in products
+        for sequence, (name, warmup_date, start_date, end_date) in enumerate(parse_action_list(product.action_list))
+    ]
+    if rows:
+        db.session.execute(insert(ProductActivity), rows)
+    return len(rows)
+
+
+def rebuild_product_activities(batch_size=1000):
+    """从product_list全量重建活动日历，返回写入的活动数"""
+    activity_count = 0
+    last_id = 0
+    while True:
+        products = ProductList.query.filter(
+            ProductList.id > last_id, ProductList.action_list.isnot(None)
+        ).order_by(ProductList.id).limit(batch_size).all()
+        if not products:
+            break
+        activity_count += sync_product_activities(products)
+        db.session.commit()
+        last_id = products[-1].id
+    logger.info(f"产品活动日历已重建: {activity_count} 个活动")
+    return activity_count
+
+
+def products_in_activity(activity_name, target_date):
+    """查询指定日期处于某活动（活动中或预热中）的产品活动行"""
+    return ProductActivity.query.filter(
+        ProductActivity.activity_name == activity_name,
+        or_(
+            and_(ProductActivity.start_date <= target_date, ProductActivity.end_date >= target_date),
+            and_(ProductActivity.warmup_date <= target_date, ProductActivity.start_date > target_date)
+        )
+    ).order_by(ProductActivity.product_list_id, ProductActivity.sequence).all()
+
+
+class ActivityIndex:
+    """活动日历内存索引 - 每个产品的活动区间按最早生效日期排序，按日期查询只需二分定位
+
+    每次查询前用一次 (行数, 最大ID) 校验活动日历是否变化（任一进程重建产品活动都会改变最大ID或行数），
+    变化后整体重新加载。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._signature = None
+        self._products = {}  # 产品总表ID -> (最早生效日期列表, 活动列表)
+
+    def _current_signature(self):
+        return tuple(db.session.query(db.func.count(ProductActivity.id), db.func.max(ProductActivity.id)).one())
+
+    def _load(self):
+        grouped = {}
+        rows = db.session.query(
+            ProductActivity.product_list_id, ProductActivity.sequence, ProductActivity.activity_name,
+            ProductActivity.warmup_date, ProductActivity.start_date, ProductActivity.end_date
+        ).all()
+        for product_list_id, sequence, name, warmup_date, start_date, end_date in rows:
+            effective_date = min(warmup_date, start_date) if warmup_date else start_date
+            grouped.setdefault(product_list_id, []).append((effective_date, sequence, name, warmup_date, start_date, end_date))
+
+        products = {}
+        for product_list_id, activities in grouped.items():
+            activities.sort()
+            products[product_list_id] = ([activity[0] for activity in activities], activities)
+        return products
+
+    def _ensure_loaded(self):
+        signature = self._current_signature()
+        with self._lock:
+            if signature == self._signature:
+                return
+        products = self._load()
+        with self._lock:
+            self._products = products
+            self._signature = signature
+
+    def matching(self, product_list_ids, target_dates):
+        """批量查询活动状态：{(产品总表ID, 日期): ['活动名 预热中' / '活动名 活动中', ...]}"""
+        self._ensure_loaded()
+        result = {}
+        with self._lock:
+            products = self._products
+        for product_list_id, target_date in set(zip(product_list_ids, target_dates)):
+            entry = products.get(product_list_id)
+            if entry is None or target_date is None:
+                continue
+            effective_dates, activities = entry
+            matched = []
+            # 只检查最早生效日期不晚于目标日期的活动
+            for _, sequence, name, warmup_date, start_date, end_date in activities[:bisect.bisect_right(effective_dates, target_date)]:
+                if warmup_date and warmup_date <= target_date < start_date:
+                    matched.append((sequence, f"{name} 预热中"))
+                elif start_date <= target_date <= end_date:
+                    matched.append((sequence, f"{name} 活动中"))
+            if matched:
+                # 保持action_list中的原始顺序
+                result[(product_list_id, target_date)] = [label for _, label in sorted(matched)]
+        return result
+
+
+# 全局活动日历索引实例
+activity_index = ActivityIndex()
@@ -0,0 +1,229 @@
+import threading
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import select, update, exists
+from models import db, ProductList, ProductListChange, ProductDataMerge, OrderDetailsMerge
+from services.daily_rollup import daily_rollup
+from utils import DebouncedTask
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# 影响merge表冗余字段的产品总表字段
+PRODUCT_MERGE_SOURCE_FIELDS = {
+    'product_id', 'product_name', 'listing_time', 'tmall_supplier_id', 'operator', 'category', 'main_image_url'
+}
+ORDER_MERGE_SOURCE_FIELDS = {'product_id', 'product_name', 'listing_time', 'tmall_supplier_id', 'operator'}
+
+
+def record_product_list_change(product, change_type, changed_fields=None, old_product_id=None, old_supplier_id=None):
+    """登记产品总表变更（只加入会话，由调用方随业务数据一起提交）
+
+    匹配键（产品ID/天猫供销ID）被修改时同时登记旧键，使原先匹配到该记录的merge行也被重新关联。
+    """
+    fields = ','.join(sorted(changed_fields)) if changed_fields else None
+    keys = {(product.product_id, product.tmall_supplier_id)}
+    if old_product_id is not None or old_supplier_id is not None:
+        keys.add((
+            old_product_id if old_product_id is not None else product.product_id,
+            old_supplier_id if old_supplier_id is not None else product.tmall_supplier_id
+        ))
+
+    for product_id, supplier_id in keys:
+        db.session.add(ProductListChange(
+            product_list_id=product.id,
+            product_id=product_id,
+            tmall_supplier_id=supplier_id,
+            change_type=change_type,
+            changed_fields=fields
+        ))
+
+
+class ProductListSync:
+    """产品总表增量回填服务类 - 按变更日志中的匹配键，用关联UPDATE只修补受影响的merge行
+
+    product_data_merge按产品ID、order_details_merge按天猫供销ID重新关联（同一键取最早一条，口径同合并计算）；
+    订单的操作人变化会影响运营成本匹配，回填后标记对应订单日期分区，由流水线重算订单成本汇总。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._debounced_task = None
+
+    def _pending_batch(self, batch_size):
+        return ProductListChange.query.filter(
+            ProductListChange.processed_at.is_(None)
+        ).order_by(ProductListChange.id).limit(batch_size).all()
+
+    def process_pending(self):
+        """处理全部待回填的变更，返回 {changes, product_rows, order_rows}"""
+        batch_size = current_app.config.get('PRODUCT_LIST_SYNC_BATCH_SIZE', 500)
+        stats = {'changes': 0, 'product_rows': 0, 'order_rows': 0}
+
+        with self._lock:
+            while True:
+                changes = self._pending_batch(batch_size)
+                if not changes:
+                    break
+
+                # 同一批内对同一键的多次修改合并为一次回填
+                product_ids = {change.product_id for change in changes if change.product_id}
+                supplier_ids = {change.tmall_supplier_id for change in changes if change.tmall_supplier_id}
+
+                try:
+                    product_rows, upload_dates = self._sync_product_data_merge(product_ids)
+                    stats['product_rows'] += product_rows
+                    order_rows, order_dates = self._sync_order_details_merge(supplier_ids)
+                    stats['order_rows'] += order_rows
+
+                    now = datetime.utcnow()
+                    for change in changes:
+                        change.processed_at = now
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    raise
+
+                stats['changes'] += len(changes)
+                # 延迟导入，避免与流水线模块循环依赖
+                from services.pipeline import pipeline_orchestrator
+                if product_rows:
+                    daily_rollup.refresh(upload_dates)
+                    # 仅供列式缓存识别分区变化，流水线步骤不消费该水位
+                    pipeline_orchestrator.mark_dirty('product_data_merge_patch', upload_dates)
+                if order_dates:
+                    pipeline_orchestrator.mark_dirty('order_details_merge', order_dates)
+
+        if stats['changes']:
+            logger.info(f"产品总表增量回填: {stats['changes']} 条变更，商品合并 {stats['product_rows']} 行，"
+                        f"订单合并 {stats['order_rows']} 行")
+        return stats
+
+    @staticmethod
+    def _canonical(key_column, keys):
+        """匹配键 -> 最早一条产品总表记录ID"""
+        return select(key_column.label('match_key'), db.func.min(ProductList.id).label('id')).where(
+            key_column.in_(keys)
+        ).group_by(key_column).subquery()
+
+    def _sync_product_data_merge(self, product_ids):
+        product_ids = [key for key in product_ids if key != '']
+        if not product_ids:
+            return 0, []
+
+        m = ProductDataMerge
+        # 先取受影响的日期，回填后刷新看板日汇总（操作人/类目分布）
+        upload_dates = [
+            upload_date for (upload_date,) in db.session.query(m.upload_date).filter(
+                m.tmall_product_code.in_(product_ids)
+            ).distinct().all()
+        ]
+
+        canonical = self._canonical(ProductList.product_id, product_ids)
+        matched = db.session.execute(
+            update(m).where(
+                m.tmall_product_code == canonical.c.match_key,
+                ProductList.id == canonical.c.id
+            ).values(
+                product_list_id=ProductList.id,
+                product_list_name=ProductList.product_name,
+                listing_time=ProductList.listing_time,
+                product_list_tmall_supplier_id=ProductList.tmall_supplier_id,
+                product_list_operator=ProductList.operator,
+                product_list_category=ProductList.category,
+                product_list_image=ProductList.main_image_url,
+                product_list_created_at=ProductList.created_at,
+                product_list_updated_at=ProductList.updated_at,
+                product_list_uploaded_by=ProductList.uploaded_by,
+                is_matched=True
+            ).execution_options(synchronize_session=False)
+        ).rowcount
+
+        # 键已不存在于产品总表（被修改或删除）的行解除关联
+        unmatched = db.session.execute(
+            update(m).where(
+                m.tmall_product_code.in_(product_ids),
+                m.is_matched.is_(True),
+                ~exists().where(ProductList.product_id == m.tmall_product_code)
+            ).values(
+                product_list_id=None,
+                product_list_name=None,
+                listing_time=None,
+                product_list_tmall_supplier_id=None,
+                product_list_operator=None,
+                product_list_category=None,
+                product_list_image=None,
+                product_list_created_at=None,
+                product_list_updated_at=None,
+                product_list_uploaded_by=None,
+                is_matched=False
+            ).execution_options(synchronize_session=False)
+        ).rowcount
+        return matched + unmatched, upload_dates
+
+    def _sync_order_details_merge(self, supplier_ids):
+        supplier_ids = [key for key in supplier_ids if key != '']
+        if not supplier_ids:
+            return 0, []
+
+        m = OrderDetailsMerge
+        # 先取受影响的订单日期，供流水线重算订单成本汇总
+        order_dates = {
+            order_time.date() for (order_time,) in db.session.query(m.order_time).filter(
+                m.store_style_code.in_(supplier_ids), m.order_time.isnot(None)
+            ).distinct().all()
+        }
+
+        canonical = self._canonical(ProductList.tmall_supplier_id, supplier_ids)
+        matched = db.session.execute(
+            update(m).where(
+                m.store_style_code == canonical.c.match_key,
+                ProductList.id == canonical.c.id
+            ).values(
+                product_list_product_id=ProductList.product_id,
+                product_list_product_name=ProductList.product_name,
+                product_list_listing_time=ProductList.listing_time,
+                product_list_tmall_supplier_id=ProductList.tmall_supplier_id,
+                product_list_operator=ProductList.operator,
+                is_product_list_matched=True
+            ).execution_options(synchronize_session=False)
+        ).rowcount
+
+        unmatched = db.session.execute(
+            update(m).where(
+                m.store_style_code.in_(supplier_ids),
+                m.is_product_list_matched.is_(True),
+                ~exists().where(ProductList.tmall_supplier_id == m.store_style_code)
+            ).values(
+                product_list_product_id=None,
+                product_list_product_name=None,
+                product_list_listing_time=None,
+                product_list_tmall_supplier_id=None,
+                product_list_operator=None,
+                is_product_list_matched=False
+            ).execution_options(synchronize_session=False)
+        ).rowcount
+        return matched + unmatched, sorted(order_dates)
+
+    def schedule(self, app):
+        """产品总表变更后调度一次回填，防抖窗口内的多次修改合并为一次执行"""
+        if self._debounced_task is None:
+            def run_in_app_context():
+                with app.app_context():
+                    stats = self.process_pending()
+                    if stats['order_rows']:
+                        from services.pipeline import pipeline_orchestrator
+                        pipeline_orchestrator.schedule(app)
+
+            self._debounced_task = DebouncedTask(
+                run_in_app_context,
+                app.config.get('PRODUCT_LIST_SYNC_DELAY_SECONDS', 2),
+                name='product_list_sync',
+                max_wait_seconds=app.config.get('PRODUCT_LIST_SYNC_MAX_WAIT_SECONDS', 30)
+            )
+        self._debounced_task.trigger()
+
+
+# 全局产品总表增量回填实例
+product_list_sync = ProductListSync()
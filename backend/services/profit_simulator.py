@@ -0,0 +1,226 @@
+import time
+from datetime import timedelta
+import numpy as np
+from sqlalchemy import select
+from models import db, ProductDataMerge, OrderDetailsMerge
+from services.business_calculator import (
+    LOGISTICS_COST_PER_UNIT, ORDER_DEDUCTION_RATE, TAX_INVOICE_RATE, UNIT_PRODUCT_COST
+)
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ProfitSimulator:
+    """利润模拟服务类 - 按调用方给定的成本参数对merge表做向量化毛利重算（只读，不写入任何数据）
+
+    product: 基于product_data_merge，口径同最终汇总（种菜物流成本和扣款按参数重新计算）
+    order: 基于order_details_merge，口径同订单成本汇总，仅统计已匹配运营成本的订单
+    """
+
+    # 默认参数取当前汇总计算使用的常量
+    DEFAULT_PARAMETERS = {
+        'logistics_cost_per_unit': LOGISTICS_COST_PER_UNIT,
+        'order_deduction_rate': ORDER_DEDUCTION_RATE,
+        'tax_invoice_rate': TAX_INVOICE_RATE,
+        'unit_product_cost': UNIT_PRODUCT_COST,
+        'supply_price_ratio': 1.0,  # 订单数据: 供货价调整倍数
+    }
+
+    # 分组维度 -> 各数据源的分组字段
+    GROUP_COLUMNS = {
+        'product': {
+            'store': ProductDataMerge.tmall_supplier_name,
+            'operator': ProductDataMerge.product_list_operator,
+            'category': ProductDataMerge.product_list_category,
+        },
+        'order': {
+            'store': OrderDetailsMerge.store_name,
+            'operator': OrderDetailsMerge.product_list_operator,
+        },
+    }
+
+    PROMOTION_COLUMNS = [
+        ProductDataMerge.sitewide_promotion, ProductDataMerge.keyword_promotion, ProductDataMerge.product_operation,
+        ProductDataMerge.crowd_promotion, ProductDataMerge.super_short_video, ProductDataMerge.multi_target_direct
+    ]
+
+    def parse_parameters(self, overrides):
+        """合并默认参数与调用方参数，参数非法时抛出ValueError"""
+        parameters = dict(self.DEFAULT_PARAMETERS)
+        for name, value in (overrides or {}).items():
+            if name not in parameters:
+                raise ValueError(f'未知的模拟参数: {name}')
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f'模拟参数 {name} 必须是数字')
+            if value < 0:
+                raise ValueError(f'模拟参数 {name} 不能为负数')
+            parameters[name] = value
+        return parameters
+
+    @staticmethod
+    def _sum(expression):
+        return db.func.sum(db.func.coalesce(expression, 0))
+
+    def _load_columns(self, columns, group_column, criteria):
+        """按分组汇总各基础项后加载为NumPy数组（NULL记为0），返回 (数值列字典, 分组键数组)
+
+        毛利公式对各行基础项是线性的，先在数据库内按分组求和再做参数计算，结果与逐行计算后求和一致，
+        且传输的数据量与分组数而非行数成正比。
+        """
+        names = list(columns.keys())
+        rows = db.session.execute(
+            select(group_column, *columns.values()).where(*criteria).group_by(group_column)
+        ).all()
+
+        if not rows:
+            return {name: np.zeros(0) for name in names}, np.array([], dtype=object)
+
+        values = list(zip(*rows))
+        arrays = {
+            name: np.nan_to_num(np.array(values[index + 1], dtype=float))
+            for index, name in enumerate(names)
+        }
+        return arrays, np.array(values[0], dtype=object)
+
+    def simulate(self, source, start_date, end_date, group_by, parameters):
+        """执行利润模拟，返回分组结果及合计"""
+        if source not in self.GROUP_COLUMNS:
+            raise ValueError(f'不支持的数据源: {source}')
+        if group_by not in self.GROUP_COLUMNS[source]:
+            raise ValueError(f'数据源 {source} 不支持按 {group_by} 分组')
+
+        started_at = time.time()
+        group_column = self.GROUP_COLUMNS[source][group_by]
+
+        if source == 'product':
+            m = ProductDataMerge
+            columns = {
+                'row_count': db.func.count(m.id),
+                'payment_amount': self._sum(m.payment_amount),
+                'refund_amount': self._sum(m.refund_amount),
+                'payment_buyer_count': self._sum(m.payment_buyer_count),
+                'payment_product_count': self._sum(m.payment_product_count),
+                'planting_orders': self._sum(m.planting_orders),
+                'planting_amount': self._sum(m.planting_amount),
+                'planting_cost': self._sum(m.planting_cost),
+                'promotion_cost': sum(self._sum(column) for column in self.PROMOTION_COLUMNS),
+                'gross_profit': self._sum(m.gross_profit),
+            }
+            arrays, keys = self._load_columns(columns, group_column, [
+                ProductDataMerge.upload_date >= start_date,
+                ProductDataMerge.upload_date <= end_date
+            ])
+            metrics = self._simulate_product(arrays, parameters)
+        else:
+            m = OrderDetailsMerge
+            columns = {
+                'row_count': db.func.count(m.id),
+                'quantity': self._sum(m.quantity),
+                'product_amount': self._sum(m.product_amount),
+                'supply_cost': self._sum(m.quantity * m.operation_cost_supply_price),
+                'gross_profit': self._sum(m.gross_profit),
+            }
+            # 口径同订单成本汇总：仅统计已匹配运营成本且数量、商品金额、供货价均非零的订单
+            arrays, keys = self._load_columns(columns, group_column, [
+                m.order_time >= start_date,
+                m.order_time < end_date + timedelta(days=1),
+                m.is_operation_cost_matched.is_(True),
+                db.func.coalesce(m.quantity, 0) != 0,
+                db.func.coalesce(m.product_amount, 0) != 0,
+                db.func.coalesce(m.operation_cost_supply_price, 0) != 0
+            ])
+            metrics = self._simulate_order(arrays, parameters)
+        load_seconds = time.time() - started_at
+        row_counts = arrays['row_count']
+
+        groups = self._build_groups(keys, row_counts, metrics)
+        totals = {name: float(values.sum()) for name, values in metrics.items()}
+        totals['row_count'] = int(row_counts.sum())
+        self._add_ratios(totals)
+
+        elapsed = time.time() - started_at
+        logger.info(f"利润模拟 {source}/{group_by} {start_date} ~ {end_date}: {totals['row_count']} 行 {len(keys)} 组，"
+                    f"加载 {load_seconds:.3f} 秒，共 {elapsed:.3f} 秒")
+
+        return {
+            'source': source,
+            'group_by': group_by,
+            'start_date': start_date.strftime('%Y-%m-%d'),
+            'end_date': end_date.strftime('%Y-%m-%d'),
+            'parameters': parameters,
+            'groups': groups,
+            'totals': totals,
+            'elapsed_ms': round(elapsed * 1000, 1)
+        }
+
+    def _simulate_product(self, a, p):
+        """最终汇总口径的向量化毛利计算"""
+        logistics = p['logistics_cost_per_unit']
+        deduction_rate = p['order_deduction_rate']
+
+        revenue = a['payment_amount'] - a['refund_amount'] - a['planting_amount']
+        real_product_count = a['payment_product_count'] - a['planting_orders']
+        product_cost = (real_product_count + a['payment_product_count'] - a['payment_buyer_count']) * p['unit_product_cost']
+        logistics_cost = real_product_count * logistics + a['planting_orders'] * logistics
+        deduction = revenue * deduction_rate + a['planting_amount'] * deduction_rate
+        tax_invoice = a['payment_amount'] * p['tax_invoice_rate']
+        gross_profit = (revenue - product_cost - logistics_cost - deduction - tax_invoice
+                        - a['planting_cost'] - a['promotion_cost'])
+
+        return {
+            'revenue': revenue,
+            'product_cost': product_cost,
+            'logistics_cost': logistics_cost,
+            'deduction': deduction,
+            'tax_invoice': tax_invoice,
+            'planting_cost': a['planting_cost'],
+            'promotion_cost': a['promotion_cost'],
+            'gross_profit': gross_profit,
+            'baseline_gross_profit': a['gross_profit'],
+        }
+
+    def _simulate_order(self, a, p):
+        """订单成本汇总口径的向量化毛利计算"""
+        revenue = a['product_amount']
+        product_cost = a['supply_cost'] * p['supply_price_ratio']
+        logistics_cost = a['quantity'] * p['logistics_cost_per_unit']
+        deduction = revenue * p['order_deduction_rate']
+        tax_invoice = revenue * p['tax_invoice_rate']
+
+        return {
+            'revenue': revenue,
+            'product_cost': product_cost,
+            'logistics_cost': logistics_cost,
+            'deduction': deduction,
+            'tax_invoice': tax_invoice,
+            'gross_profit': revenue - product_cost - logistics_cost - deduction - tax_invoice,
+            'baseline_gross_profit': a['gross_profit'],
+        }
+
+    @staticmethod
+    def _add_ratios(result):
+        result['gross_profit_delta'] = result['gross_profit'] - result['baseline_gross_profit']
+        result['profit_margin'] = (result['gross_profit'] / result['revenue'] * 100) if result['revenue'] else 0
+
+    def _build_groups(self, keys, row_counts, metrics):
+        """组装分组结果（空分组键合并为'未知'），按模拟毛利降序"""
+        groups = {}
+        for index, key in enumerate(keys):
+            group_name = key if key else '未知'
+            group = groups.setdefault(group_name, dict({'group': group_name, 'row_count': 0}, **{name: 0.0 for name in metrics}))
+            group['row_count'] += int(row_counts[index])
+            for name, values in metrics.items():
+                group[name] += float(values[index])
+
+        groups = list(groups.values())
+        for group in groups:
+            self._add_ratios(group)
+        groups.sort(key=lambda group: group['gross_profit'], reverse=True)
+        return groups
+
+
+# 全局利润模拟实例
+profit_simulator = ProfitSimulator()
@@ -0,0 +1,174 @@
+import gzip
+from decimal import Decimal
+from flask import current_app, jsonify, request
+from sqlalchemy import select
+
+try:
+    import orjson
+except ImportError:  # 未安装orjson时回退到Flask自带的JSON编码
+    orjson = None
+
+
+def _decimal(values):
+    """保留2位小数（与 utils.format_decimal 一致），空值为None"""
+    return [None if value is None else round(float(value), 2) for value in values]
+
+
+def _float_or_zero(values):
+    return [float(value) if value else 0 for value in values]
+
+
+def _isoformat(values):
+    return [value.isoformat() if value else None for value in values]
+
+
+def _datetime_text(values):
+    return [value.strftime('%Y-%m-%d %H:%M:%S') if value else None for value in values]
+
+
+def _list_or_empty(values):
+    return [value if value else [] for value in values]
+
+
+# 客户端在 Accept 中声明该类型时，列表接口返回列式数据 {columns: 字段列表, rows: 值数组}，不再逐行重复字段名
+COLUMNAR_MIMETYPE = 'application/vnd.columnar+json'
+
+# 可压缩的响应类型
+COMPRESSIBLE_MIMETYPES = ('application/json', COLUMNAR_MIMETYPE)
+
+
+def response_shape():
+    """本次请求协商的返回形状：Accept 中显式包含列式类型（或参数 shape=columns）时为 columns，否则为 records"""
+    if request.args.get('shape') == 'columns':
+        return 'columns'
+    accepts_columnar = any(
+        mimetype == COLUMNAR_MIMETYPE and quality > 0 for mimetype, quality in request.accept_mimetypes
+    )
+    return 'columns' if accepts_columnar else 'records'
+
+
+# 列格式 -> 按列批量转换的函数（raw 原样输出）
+FORMATTERS = {
+    'raw': None,
+    'decimal': _decimal,
+    'float0': _float_or_zero,
+    'iso': _isoformat,
+    'datetime_text': _datetime_text,
+    'list': _list_or_empty,
+}
+
+class Projection:
+    """列表接口的列投影 - 只查询响应需要的列（Core行元组，不构造ORM对象），按列批量格式化后输出
+
+    fields 为 (输出字段, 模型属性名, 格式) 列表；同一属性可输出为多个字段，只查询一次。
+    模型属性名为None的字段由接口另行计算，序列化时通过 extra 传入与行对齐的值列表。
+    """
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = fields
+        self.names = [name for name, _, _ in fields]
+        self.attributes = list(dict.fromkeys(attribute for _, attribute, _ in fields if attribute))
+        self._positions = {attribute: index for index, attribute in enumerate(self.attributes)}
+
+    @property
+    def columns(self):
+        return [getattr(self.model, attribute) for attribute in self.attributes]
+
+    def statement(self):
+        return select(*self.columns)
+
+    def apply(self, query):
+        """把ORM查询改为只查询投影列（保留原有的过滤、排序与分页）"""
+        return query.with_entities(*self.columns)
+
+    def format_columns(self, rows, extra=None):
+        """按列格式化，返回与 fields 对齐的值列表"""
+        raw_columns = list(zip(*rows)) if rows else [()] * len(self.attributes)
+        formatted = []
+        for name, attribute, kind in self.fields:
+            if attribute is None:
+                values = list(extra[name])
+            else:
+                values = raw_columns[self._positions[attribute]]
+                formatter = FORMATTERS[kind]
+                values = formatter(values) if formatter else list(values)
+            formatted.append(values)
+        return formatted
+
+    def serialize(self, rows, extra=None, shape='records'):
+        """records：[{字段: 值}]；columns：{'columns': 字段列表, 'rows': [[值, ...]]}"""
+        formatted = self.format_columns(rows, extra)
+        value_rows = list(zip(*formatted)) if rows else []
+        if shape == 'columns':
+            return {'columns': self.names, 'rows': value_rows}
+        names = self.names
+        return [dict(zip(names, values)) for values in value_rows]
+
+    def response(self, rows, extra=None, **meta):
+        """列表接口响应：按协商的形状返回对象数组（data）或列式数据（columns/rows），附带分页等信息"""
+        shape = response_shape()
+        if shape == 'columns':
+            payload = self.serialize(rows, extra, 'columns')
+        else:
+            payload = {'data': self.serialize(rows, extra)}
+        payload.update(meta)
+        return _list_response(payload, shape)
+
+
+def records_response(data, **meta):
+    """已构建好的对象数组按协商的形状返回（列式时字段顺序取第一行的键顺序）"""
+    shape = response_shape()
+    if shape == 'columns':
+        columns = list(data[0].keys()) if data else []
+        payload = {'columns': columns, 'rows': [[item[name] for name in columns] for item in data]}
+    else:
+        payload = {'data': data}
+    payload.update(meta)
+    return _list_response(payload, shape)
+
+
+def _list_response(payload, shape):
+    response = json_response(payload, mimetype=COLUMNAR_MIMETYPE if shape == 'columns' else None)
+    response.vary.add('Accept')
+    return response
+
+
+def _orjson_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f'无法序列化的类型: {type(value).__name__}')
+
+
+def json_response(payload, status=200, mimetype=None):
+    """JSON响应：安装了orjson时直接编码为bytes（比标准库快数倍），否则使用jsonify"""
+    if orjson is None:
+        response = jsonify(payload)
+        response.status_code = status
+        if mimetype:
+            response.mimetype = mimetype
+        return response
+    body = orjson.dumps(payload, default=_orjson_default,
+                        option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return current_app.response_class(body, status=status, mimetype=mimetype or 'application/json')
+
+
+def compress_response(response):
+    """after_request：客户端接受gzip且JSON响应体超过阈值时压缩（流式响应与文件下载不处理）"""
+    config = current_app.config
+    if (not config.get('RESPONSE_GZIP_ENABLED', True)
+            or response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or 'gzip' not in request.accept_encodings):
+        return response
+
+    body = response.get_data()
+    if len(body) < config.get('RESPONSE_GZIP_MIN_BYTES', 1024):
+        return response
+    response.set_data(gzip.compress(body, compresslevel=config.get('RESPONSE_GZIP_LEVEL', 5)))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
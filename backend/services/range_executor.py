@@ -0,0 +1,124 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from sqlalchemy.exc import OperationalError, DisconnectionError
+from models import db
+from services.business_calculator import CalculationDataMissing
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RangeExecutor:
+    """日期区间分区执行器 - 按天拆分区间，在有界线程池中并发执行
+
+    每个分区在独立的应用上下文中运行（即独立的数据库会话/连接），独立提交；
+    遇到连接断开、死锁等可重试的数据库错误时按分区重试。
+    """
+
+    def __init__(self, max_workers=4, max_retries=3, retry_delay=1):
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+
+    @staticmethod
+    def split_dates(start_date, end_date):
+        """将日期区间拆分为按天的分区"""
+        return [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+
+    def run(self, app, start_date, end_date, partition_func):
+        """对区间内每一天执行partition_func(date)，返回各分区结果列表"""
+        return self.map(app, self.split_dates(start_date, end_date), partition_func)
+
+    def map(self, app, partitions, partition_func):
+        """对每个分区执行partition_func(partition)，结果顺序与分区顺序一致"""
+        partitions = list(partitions)
+        if not partitions:
+            return []
+
+        max_workers = min(app.config.get('RANGE_EXECUTOR_WORKERS', self.max_workers), len(partitions))
+        if max_workers <= 1:
+            return [self._run_partition(app, partition, partition_func) for partition in partitions]
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='range-executor') as pool:
+            futures = [pool.submit(self._run_partition, app, partition, partition_func) for partition in partitions]
+            return [future.result() for future in futures]
+
+    def _run_partition(self, app, partition, partition_func):
+        """在独立应用上下文中执行单个分区，带重试"""
+        max_retries = app.config.get('RANGE_EXECUTOR_MAX_RETRIES', self.max_retries)
+        start_time = time.time()
+
+        with app.app_context():
+            attempts = 0
+            while True:
+                attempts += 1
+                try:
+                    result = partition_func(partition)
+                    return {
+                        'partition': partition,
+                        'status': 'completed',
+                        'result': result,
+                        'attempts': attempts,
+                        'duration_seconds': time.time() - start_time
+                    }
+                except CalculationDataMissing as e:
+                    db.session.rollback()
+                    return {
+                        'partition': partition,
+                        'status': 'skipped',
+                        'message': e.message,
+                        'error_type': e.error_type,
+                        'attempts': attempts,
+                        'duration_seconds': time.time() - start_time
+                    }
+                except (OperationalError, DisconnectionError) as e:
+                    db.session.rollback()
+                    if attempts < max_retries:
+                        logger.warning(f"分区 {partition} 数据库错误，第 {attempts} 次重试: {e}")
+                        db.session.close()
+                        time.sleep(self.retry_delay * attempts)
+                        continue
+                    logger.error(f"分区 {partition} 执行失败，已达到最大重试次数: {e}")
+                    return self._error_result(partition, e, attempts, start_time)
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"分区 {partition} 执行失败: {e}")
+                    return self._error_result(partition, e, attempts, start_time)
+
+    @staticmethod
+    def _error_result(partition, error, attempts, start_time):
+        return {
+            'partition': partition,
+            'status': 'error',
+            'message': str(error),
+            'attempts': attempts,
+            'duration_seconds': time.time() - start_time
+        }
+
+    @staticmethod
+    def merge_stats(stats_list):
+        """合并各分区的stats：数值求和、列表拼接、字典递归合并"""
+        merged = {}
+        for stats in stats_list:
+            for key, value in stats.items():
+                if key not in merged:
+                    if isinstance(value, dict):
+                        merged[key] = RangeExecutor.merge_stats([value])
+                    elif isinstance(value, list):
+                        merged[key] = list(value)
+                    else:
+                        merged[key] = value
+                elif isinstance(value, dict):
+                    merged[key] = RangeExecutor.merge_stats([merged[key], value])
+                elif isinstance(value, list):
+                    merged[key].extend(value)
+                elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                    merged[key] += value
+                else:
+                    merged[key] = value
+        return merged
+
+
+# 全局区间执行器实例
+range_executor = RangeExecutor()
@@ -0,0 +1,73 @@
+import threading
+import time
+from collections import OrderedDict
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """一次进行中的计算，相同请求在此等待结果"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.failed = False
+
+
+class ResultCache:
+    """查询结果缓存 - 相同请求合并为一次计算（single-flight），结果按 TTL + LRU 缓存
+
+    调用方把数据版本放进缓存键（见 services.data_version），上传或计算步骤推进水位后旧键自然失效，
+    无需显式清理；TTL 只用于回收长期不再访问的条目。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # 键 -> (过期时间, 结果)
+        self._flights = {}
+
+    def get_or_compute(self, key, compute, ttl, max_entries):
+        """返回缓存结果；未命中时同一键只有一个调用方执行 compute，其余等待其结果"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.time():
+                self._entries.move_to_end(key)
+                return entry[1]
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.event.wait()
+            if not flight.failed:
+                return flight.result
+            # 首个请求执行失败时各自重新计算，错误由各请求自行处理
+            return compute()[0]
+
+        try:
+            result, cacheable = compute()
+            flight.result = result
+            if cacheable:
+                with self._lock:
+                    self._entries[key] = (time.time() + ttl, result)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > max_entries:
+                        self._entries.popitem(last=False)
+            return result
+        except Exception:
+            flight.failed = True
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.event.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# 全局结果缓存实例
+result_cache = ResultCache()
@@ -0,0 +1,138 @@
+import threading
+from flask import current_app
+from sqlalchemy import select, false
+from sqlalchemy.dialects.mysql import match
+from models import db, ProductDataMerge, OrderDetailsMerge, ProductList
+from services.columnar_cache import PRODUCT_MERGE_VERSION_TABLES
+from services.data_version import data_version
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _merge_version():
+    return data_version(PRODUCT_MERGE_VERSION_TABLES)
+
+
+def _order_merge_version():
+    return data_version(['order_details_merge'])
+
+
+def _product_list_version():
+    return tuple(db.session.query(
+        db.func.count(ProductList.id), db.func.max(ProductList.id), db.func.max(ProductList.updated_at)
+    ).one())
+
+
+# 搜索字段 -> (列, 数据版本函数, 是否建有FULLTEXT ngram索引)
+SEARCH_FIELDS = {
+    'product_code': (ProductDataMerge.tmall_product_code, _merge_version, False),
+    'product_name': (ProductDataMerge.product_name, _merge_version, True),
+    'store': (ProductDataMerge.tmall_supplier_name, _merge_version, False),
+    'order_store': (OrderDetailsMerge.store_name, _order_merge_version, False),
+    'order_operator': (OrderDetailsMerge.product_list_operator, _order_merge_version, False),
+    'order_province': (OrderDetailsMerge.province, _order_merge_version, False),
+    'order_city': (OrderDetailsMerge.city, _order_merge_version, False),
+    'order_express_company': (OrderDetailsMerge.express_company, _order_merge_version, False),
+    'list_product_id': (ProductList.product_id, _product_list_version, False),
+    'list_product_name': (ProductList.product_name, _product_list_version, True),
+    'list_supplier_id': (ProductList.tmall_supplier_id, _product_list_version, False),
+    'list_operator': (ProductList.operator, _product_list_version, False),
+    'list_category': (ProductList.category, _product_list_version, False),
+}
+
+
+class NGramIndex:
+    """字段取值的n-gram倒排索引（1-gram + 2-gram，忽略大小写），子串查询先求候选交集再逐个确认"""
+
+    def __init__(self, values):
+        self.values = sorted(values, key=lambda value: (len(value), value))
+        self._lowered = [value.lower() for value in self.values]
+        self._postings = {}
+        for index, value in enumerate(self._lowered):
+            grams = set(value)
+            grams.update(value[i:i + 2] for i in range(len(value) - 1))
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(index)
+
+    def search(self, term):
+        """返回包含子串 term 的全部取值（按长度、字典序）"""
+        term = term.lower()
+        if not term:
+            return list(self.values)
+        grams = {term} if len(term) == 1 else {term[i:i + 2] for i in range(len(term) - 1)}
+        postings = sorted((self._postings.get(gram, []) for gram in grams), key=len)
+        if not postings[0]:
+            return []
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return []
+        return [self.values[index] for index in sorted(candidates) if term in self._lowered[index]]
+
+
+class SearchIndex:
+    """子串搜索服务 - 按字段维护去重取值的n-gram索引
+
+    筛选接口把 '%关键词%' 转换为 列 IN (匹配的取值)，可以走B-tree索引；数据版本变化后按需重建索引。
+    匹配取值过多时回退到 FULLTEXT ngram（MySQL，已建索引的字段）或 LIKE。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._indexes = {}  # 字段 -> (数据版本, NGramIndex)
+        self._build_locks = {field: threading.Lock() for field in SEARCH_FIELDS}
+
+    def _index(self, field):
+        column, version_func, _ = SEARCH_FIELDS[field]
+        version = version_func()
+        with self._lock:
+            entry = self._indexes.get(field)
+        if entry and entry[0] == version:
+            return entry[1]
+
+        # 同一字段只由一个请求重建，其余请求等待后直接使用
+        with self._build_locks[field]:
+            with self._lock:
+                entry = self._indexes.get(field)
+            if entry and entry[0] == version:
+                return entry[1]
+            values = db.session.execute(select(column).where(column.isnot(None)).distinct()).scalars().all()
+            index = NGramIndex([value for value in values if value != ''])
+            with self._lock:
+                self._indexes[field] = (version, index)
+            logger.info(f"搜索索引已重建: {field} 共 {len(index.values)} 个取值")
+            return index
+
+    def search(self, field, term):
+        """返回字段中包含 term 的全部取值；搜索索引未启用时返回None"""
+        if not current_app.config.get('SEARCH_INDEX_ENABLED', True):
+            return None
+        return self._index(field).search(term)
+
+    def suggest(self, field, term, limit=10):
+        """联想建议：前缀匹配优先，其次按取值长度"""
+        values = self.search(field, term) or []
+        term = term.lower()
+        prefixed = [value for value in values if value.lower().startswith(term)]
+        others = [value for value in values if not value.lower().startswith(term)]
+        return (prefixed + others)[:limit]
+
+    def substring_filter(self, field, term):
+        """返回等价于 列 ILIKE '%term%' 的过滤条件"""
+        column, _, has_fulltext = SEARCH_FIELDS[field]
+        values = self.search(field, term)
+        if values is not None and len(values) <= current_app.config.get('SEARCH_MAX_IN_VALUES', 1000):
+            return column.in_(values) if values else false()
+
+        condition = column.ilike(f'%{term}%')
+        phrase = term.replace('"', ' ').strip()
+        if has_fulltext and len(phrase) >= 2 and db.engine.dialect.name == 'mysql':
+            # FULLTEXT ngram 短语匹配先用全文索引缩小范围，LIKE 保证子串语义
+            condition = match(column, against=f'"{phrase}"').in_boolean_mode() & condition
+        return condition
+
+
+# 全局搜索索引实例
+search_index = SearchIndex()
@@ -0,0 +1,108 @@
+import uuid
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, insert, delete, literal
+from models import db, ProductDataMerge, OrderDetailsMerge, ProductDataMergeShadow, OrderDetailsMergeShadow
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+SHADOW_TABLES = {
+    ProductDataMerge: ProductDataMergeShadow,
+    OrderDetailsMerge: OrderDetailsMergeShadow,
+}
+
+
+def shadow_mode_enabled():
+    """是否启用影子分区模式（配置SHADOW_PARTITION_MODE）"""
+    return current_app.config.get('SHADOW_PARTITION_MODE', True)
+
+
+class ShadowPartition:
+    """影子分区 - 重算结果先写入影子表并提交，再用一个短事务替换正式表中的分区
+
+    构建期间正式表不加锁，读取方始终看到完整的旧分区或完整的新分区；
+    发布事务内依次执行 删除旧分区 -> INSERT...SELECT影子数据 -> 清理影子数据，行锁只在发布期间持有。
+    """
+
+    BUFFER_SIZE = 1000
+    STALE_BUILD_HOURS = 24  # 超过该时长仍未发布的构建视为中断遗留，构建前清理
+
+    def __init__(self, model, partition_criteria):
+        self.model = model
+        self.shadow = SHADOW_TABLES[model]
+        self.partition_criteria = partition_criteria
+        self.build_id = uuid.uuid4().hex
+        # 影子表与正式表共有的字段（不含自增主键和生成列）
+        self.columns = [column.name for column in self.shadow.columns
+                        if column.name not in ('shadow_id', 'build_id', 'built_at')]
+        self._buffer = []
+        self.built_count = 0
+        self._purge_stale_builds()
+
+    def _purge_stale_builds(self):
+        cutoff = datetime.utcnow() - timedelta(hours=self.STALE_BUILD_HOURS)
+        purged = db.session.execute(delete(self.shadow).where(self.shadow.c.built_at < cutoff)).rowcount
+        if purged:
+            db.session.commit()
+            logger.info(f"清理 {self.shadow.name} 中 {purged} 条未发布的遗留构建数据")
+
+    def add(self, values):
+        """缓冲一行新分区数据（字段同正式表模型）"""
+        self._buffer.append(values)
+        if len(self._buffer) >= self.BUFFER_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        db.session.execute(insert(self.shadow), [dict(row, build_id=self.build_id) for row in self._buffer])
+        self.built_count += len(self._buffer)
+        self._buffer = []
+
+    def insert_from_select(self, target_columns, source):
+        """集合式构建：INSERT INTO 影子表 SELECT ..."""
+        source = source.add_columns(literal(self.build_id))
+        count = db.session.execute(
+            insert(self.shadow).from_select(list(target_columns) + ['build_id'], source)
+        ).rowcount
+        self.built_count += count
+        return count
+
+    def publish(self):
+        """提交构建数据后在一个事务内替换正式表分区，返回 (删除行数, 发布行数)"""
+        self.flush()
+        db.session.commit()
+
+        try:
+            deleted_count = db.session.execute(
+                delete(self.model).where(*self.partition_criteria).execution_options(synchronize_session=False)
+            ).rowcount
+            published_count = db.session.execute(
+                insert(self.model).from_select(
+                    self.columns,
+                    select(*[self.shadow.c[name] for name in self.columns]).where(
+                        self.shadow.c.build_id == self.build_id
+                    ).order_by(self.shadow.c.shadow_id)
+                )
+            ).rowcount
+            db.session.execute(delete(self.shadow).where(self.shadow.c.build_id == self.build_id))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            self.discard()
+            raise
+
+        logger.info(f"影子分区发布 {self.model.__tablename__}: 替换 {deleted_count} 条为 {published_count} 条")
+        return deleted_count, published_count
+
+    def discard(self):
+        """放弃构建，清理影子数据"""
+        self._buffer = []
+        try:
+            db.session.execute(delete(self.shadow).where(self.shadow.c.build_id == self.build_id))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"清理影子构建 {self.build_id} 失败: {e}")
@@ -0,0 +1,63 @@
+"""历史回填：订单详情被删除后重新回填，清理残留的合并数据
+
+运行: cd backend && python -m unittest discover -s tests
+"""
+import unittest
+from datetime import date, datetime
+
+from app import create_app
+from models import db, OrderDetails, OrderDetailsMerge, InternalOrderSummary
+from services.backfill import BackfillRunner
+
+
+class BackfillDeletedSourceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+        self.day = date(2025, 1, 1)
+        for index in range(4):
+            db.session.add(OrderDetails(
+                internal_order_number=f'N{index}',
+                online_order_number=f'O{index}',
+                store_name='门店A',
+                order_time=datetime(2025, 1, 1, 10, index),
+                upload_date=self.day,
+                product_name=f'商品{index}',
+                quantity=1,
+                filename='orders.xlsx',
+                uploaded_by=1,
+            ))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def _backfill(self):
+        runner = BackfillRunner('orders', ['order_details_merge', 'order_cost_summary'], echo=lambda *_: None)
+        runner.reset()
+        return runner.run(self.day, self.day)
+
+    def test_deleted_source_clears_merge_rows(self):
+        self._backfill()
+        self.assertEqual(OrderDetailsMerge.query.count(), 4)
+        self.assertEqual(InternalOrderSummary.query.count(), 4)
+
+        OrderDetails.query.delete()
+        db.session.commit()
+        summary = self._backfill()
+
+        self.assertEqual(OrderDetailsMerge.query.count(), 0)
+        self.assertEqual(InternalOrderSummary.query.count(), 0)
+        # 合并步骤清理了残留数据记为完成；成本汇总没有数据可算，记为跳过
+        self.assertEqual(summary['completed'], 1)
+        self.assertEqual(summary['skipped'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
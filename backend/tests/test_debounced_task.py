@@ -0,0 +1,42 @@
+"""防抖任务：最后一次触发后静默才执行，最长等待时间到达时强制执行
+
+运行: cd backend && python -m unittest discover -s tests
+"""
+import time
+import unittest
+
+from utils import DebouncedTask
+
+
+class DebouncedTaskTest(unittest.TestCase):
+
+    def _trigger_stream(self, task, duration, interval=0.02):
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            task.trigger()
+            time.sleep(interval)
+
+    def _wait(self, task, timeout=2):
+        deadline = time.monotonic() + timeout
+        while task.is_pending() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_trailing_debounce_runs_once_after_last_trigger(self):
+        runs = []
+        task = DebouncedTask(lambda: runs.append(time.monotonic()), 0.1)
+        self._trigger_stream(task, 0.4)
+        last_trigger = time.monotonic()
+        self._wait(task)
+        self.assertEqual(len(runs), 1)
+        self.assertGreaterEqual(runs[0], last_trigger)
+
+    def test_max_wait_bounds_delay(self):
+        runs = []
+        task = DebouncedTask(lambda: runs.append(time.monotonic()), 0.1, max_wait_seconds=0.15)
+        self._trigger_stream(task, 0.5)
+        self._wait(task)
+        self.assertGreaterEqual(len(runs), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
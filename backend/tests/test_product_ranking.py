@@ -0,0 +1,63 @@
+"""商品排行：列式缓存与SQL分组查询两条路径的结果一致性
+
+运行: cd backend && python -m unittest discover -s tests
+"""
+import unittest
+from datetime import date
+
+from app import create_app
+from models import db, ProductDataMerge
+from routes.data import _product_ranking_from_cache, _product_ranking_from_sql
+
+
+class ProductRankingPathsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+        # 缓存窗口内的日期（列式缓存只覆盖最近 COLUMNAR_CACHE_DAYS 天）
+        self.day = date.today()
+        for index in range(15):
+            db.session.add(ProductDataMerge(
+                platform='淘宝',
+                product_name=f'商品{index}',
+                tmall_product_code=f'C{index}',
+                tmall_supplier_name='门店A',
+                payment_amount=100 + index * 10.5,
+                payment_product_count=index + 1,
+                # 部分商品的退款、种菜金额为空，排序时按0处理
+                refund_amount=None if index % 3 == 0 else index * 7.25,
+                planting_amount=None if index % 4 == 0 else index * 3.5,
+                filename='ranking.xlsx',
+                upload_date=self.day,
+            ))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def _ranking(self, sort_by, sort_order, page, per_page):
+        args = (self.day, self.day, 'store', '门店A', sort_by, sort_order)
+        cache_total, cache_items = _product_ranking_from_cache(*args, (page - 1) * per_page, per_page)
+        sql_total, sql_items = _product_ranking_from_sql(*args, page, per_page)
+        return (
+            (cache_total, [item.tmall_product_code for item in cache_items]),
+            (sql_total, [item.tmall_product_code for item in sql_items]),
+        )
+
+    def test_cache_and_sql_paths_agree(self):
+        for sort_by in ('real_amount', 'total_amount', 'total_quantity'):
+            for sort_order in ('desc', 'asc'):
+                for page in (1, 2, 3):
+                    with self.subTest(sort_by=sort_by, sort_order=sort_order, page=page):
+                        cache_result, sql_result = self._ranking(sort_by, sort_order, page, 5)
+                        self.assertEqual(cache_result, sql_result)
+
+
+if __name__ == '__main__':
+    unittest.main()
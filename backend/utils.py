@@ -7,20 +7,28 @@ import threading
 from datetime import datetime, timedelta
 from typing import Dict, Optional, Any
 import functools
+import json
 import time
+import weakref
 from sqlalchemy.exc import OperationalError, DisconnectionError
-from flask import jsonify
-from models import db
+from flask import jsonify, current_app, has_app_context
+from models import db, TaskProgress
 import logging
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
 class ProgressTracker:
-    """进度跟踪器 - 用于跟踪长时间运行的任务进度"""
+    """进度跟踪器 - 用于跟踪长时间运行的任务进度
+
+    任务进度保存在本进程内存中；启用 PROGRESS_TRACKER_PERSIST 时同时写入 task_progress 表，
+    多工作进程部署下轮询请求落在其他进程时从数据库读取。进度更新按间隔节流写入，状态变化时立即写入。
+    """
     
     def __init__(self):
         self._progress_data: Dict[str, Dict[str, Any]] = {}
+        self._persisted_at: Dict[str, float] = {}
+        self._db_cleaned_at = 0.0
         self._lock = threading.Lock()
     
     def create_task(self, task_id: str, total_items: int, description: str = "") -> None:
@@ -47,6 +55,7 @@ class ProgressTracker:
                     'processed_dates': []
                 }
             }
+        self._persist(task_id, force=True)
     
     def update_progress(self, task_id: str, processed_items: int, message: str = "", **kwargs) -> None:
         """更新任务进度"""
@@ -75,6 +84,7 @@ class ProgressTracker:
                     remaining_items = data['total_items'] - processed_items
                     if items_per_second > 0:
                         data['estimated_remaining_seconds'] = int(remaining_items / items_per_second)
+        self._persist(task_id)
     
     def set_batch_info(self, task_id: str, current_batch: int, total_batches: int) -> None:
         """设置批次信息"""
@@ -85,6 +95,7 @@ class ProgressTracker:
             data = self._progress_data[task_id]
             data['current_batch'] = current_batch
             data['total_batches'] = total_batches
+        self._persist(task_id)
     
     def complete_task(self, task_id: str, message: str = "任务完成") -> None:
         """标记任务完成"""
@@ -98,6 +109,7 @@ class ProgressTracker:
             data['end_time'] = datetime.utcnow()
             data['progress_percentage'] = 100
             data['estimated_remaining_seconds'] = 0
+        self._persist(task_id, force=True)
     
     def error_task(self, task_id: str, error_message: str) -> None:
         """标记任务错误"""
@@ -109,11 +121,16 @@ class ProgressTracker:
             data['status'] = 'error'
             data['error_message'] = error_message
             data['end_time'] = datetime.utcnow()
+        self._persist(task_id, force=True)
     
     def get_progress(self, task_id: str) -> Optional[Dict[str, Any]]:
-        """获取任务进度"""
+        """获取任务进度（本进程没有时从数据库读取其他进程的任务）"""
         with self._lock:
-            return self._progress_data.get(task_id, None)
+            data = self._progress_data.get(task_id, None)
+        if data is None and self._persistent():
+            rows = self._load(TaskProgress.task_id == task_id)
+            data = rows.get(task_id)
+        return data
     
     def cleanup_old_tasks(self, hours: int = 24) -> None:
         """清理旧任务（超过指定小时数的已完成任务）"""
@@ -128,15 +145,171 @@ class ProgressTracker:
             
             for task_id in to_remove:
                 del self._progress_data[task_id]
+                self._persisted_at.pop(task_id, None)
+        
+        # 数据库中的旧任务每分钟最多清理一次（进度轮询接口每次都会调用）
+        if self._persistent() and time.monotonic() - self._db_cleaned_at >= 60:
+            self._db_cleaned_at = time.monotonic()
+            try:
+                with db.engine.begin() as conn:
+                    conn.execute(TaskProgress.__table__.delete().where(
+                        TaskProgress.status.in_(['completed', 'error']),
+                        TaskProgress.end_time < cutoff_time
+                    ))
+            except Exception as e:
+                logger.warning(f"清理数据库中的旧任务进度失败: {e}")
     
     def list_tasks(self) -> Dict[str, Dict[str, Any]]:
-        """列出所有任务"""
+        """列出所有任务（含其他进程写入数据库的任务）"""
+        with self._lock:
+            tasks = self._progress_data.copy()
+        if self._persistent():
+            for task_id, data in self._load().items():
+                tasks.setdefault(task_id, data)
+        return tasks
+    
+    def has_running_tasks(self) -> bool:
+        """本进程是否有执行中的任务"""
+        with self._lock:
+            return any(data['status'] == 'running' for data in self._progress_data.values())
+    
+    @staticmethod
+    def _persistent() -> bool:
+        return has_app_context() and current_app.config.get('PROGRESS_TRACKER_PERSIST', False)
+    
+    def _persist(self, task_id: str, force: bool = False) -> None:
+        """把任务进度写入task_progress表（使用独立连接，不影响调用方的事务）"""
+        if not self._persistent():
+            return
+        interval = current_app.config.get('PROGRESS_TRACKER_PERSIST_INTERVAL', 1.0)
         with self._lock:
-            return self._progress_data.copy()
+            data = self._progress_data.get(task_id)
+            now = time.monotonic()
+            if data is None or (not force and now - self._persisted_at.get(task_id, 0) < interval):
+                return
+            self._persisted_at[task_id] = now
+            values = {
+                'status': data['status'],
+                'progress': json.dumps(
+                    {key: value for key, value in data.items() if key not in ('start_time', 'end_time')},
+                    ensure_ascii=False, default=str
+                ),
+                'start_time': data['start_time'],
+                'end_time': data['end_time'],
+                'updated_at': datetime.utcnow(),
+            }
+        
+        table = TaskProgress.__table__
+        try:
+            with db.engine.begin() as conn:
+                updated = conn.execute(table.update().where(table.c.task_id == task_id).values(**values)).rowcount
+                if not updated:
+                    conn.execute(table.insert().values(task_id=task_id, **values))
+        except Exception as e:
+            logger.warning(f"任务进度写入数据库失败，task_id: {task_id}, 错误: {e}")
+    
+    def _load(self, *criteria) -> Dict[str, Dict[str, Any]]:
+        """从task_progress表读取任务进度"""
+        try:
+            with db.engine.connect() as conn:
+                rows = conn.execute(TaskProgress.__table__.select().where(*criteria)).all()
+        except Exception as e:
+            logger.warning(f"从数据库读取任务进度失败: {e}")
+            return {}
+        tasks = {}
+        for row in rows:
+            data = json.loads(row.progress)
+            data['start_time'] = row.start_time
+            data['end_time'] = row.end_time
+            tasks[row.task_id] = data
+        return tasks
 
 # 全局进度跟踪器实例
 progress_tracker = ProgressTracker()
 
+# 本进程创建的防抖任务（工作进程退出前等待其执行完毕）
+_debounced_tasks = weakref.WeakSet()
+
+class DebouncedTask:
+    """防抖任务 - 最后一次触发后静默 delay_seconds 才执行，窗口内的多次触发合并为一次执行；
+    执行期间的触发会在结束后再补跑一次
+
+    max_wait_seconds：自第一次触发起最长等待时间，持续触发时到时也会执行，避免一直被推迟。
+    on_idle：每次执行结束且没有补跑时调用（不持有任务内部锁），供按键创建任务的调用方及时释放任务。
+    """
+
+    def __init__(self, func, delay_seconds: float, name: str = "", on_idle=None,
+                 max_wait_seconds: Optional[float] = None):
+        self._func = func
+        self._on_idle = on_idle
+        self._delay_seconds = delay_seconds
+        self._max_wait_seconds = max_wait_seconds
+        self._name = name
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._generation = 0
+        self._first_trigger_at = 0.0
+        self._running = False
+        self._rerun_requested = False
+        _debounced_tasks.add(self)
+
+    def trigger(self) -> None:
+        """触发执行（已有等待中的执行时重新开始静默窗口）"""
+        with self._lock:
+            if self._running:
+                self._rerun_requested = True
+                return
+            now = time.monotonic()
+            if self._timer is not None:
+                self._timer.cancel()
+            else:
+                self._first_trigger_at = now
+            delay = self._delay_seconds
+            if self._max_wait_seconds is not None:
+                delay = max(0.0, min(delay, self._first_trigger_at + self._max_wait_seconds - now))
+            # 已到期但尚未取得锁的旧定时器按代次识别后放弃执行
+            self._generation += 1
+            self._timer = threading.Timer(delay, self._run, args=(self._generation,))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def is_pending(self) -> bool:
+        """是否有等待中或执行中的任务"""
+        with self._lock:
+            return self._timer is not None or self._running
+
+    def _run(self, generation: int) -> None:
+        with self._lock:
+            if generation != self._generation or self._timer is None:
+                return
+            self._timer = None
+            self._running = True
+        try:
+            self._func()
+        except Exception as e:
+            logger.error(f"防抖任务 {self._name} 执行失败: {e}")
+        finally:
+            with self._lock:
+                self._running = False
+                rerun = self._rerun_requested
+                self._rerun_requested = False
+            if rerun:
+                self.trigger()
+            elif self._on_idle is not None:
+                self._on_idle(self)
+
+def wait_for_background_work(timeout: float, poll_seconds: float = 1.0) -> bool:
+    """等待本进程的后台任务（执行中的进度任务、等待中或执行中的防抖任务）结束，超时返回False
+
+    gunicorn 回收或停止工作进程前调用，避免文件处理、导出和合并任务被中途终止。
+    """
+    deadline = time.monotonic() + timeout
+    while progress_tracker.has_running_tasks() or any(task.is_pending() for task in list(_debounced_tasks)):
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(poll_seconds)
+    return True
+
 def handle_db_connection_error(max_retries=3, retry_delay=1):
     """
     数据库连接错误处理装饰器
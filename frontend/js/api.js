@@ -11,12 +11,73 @@ const APIService = {
         };
     },
 
+    // 列表接口的列式响应类型：字段名只传一次，由 handleResponse 还原为对象数组
+    COLUMNAR_MIMETYPE: 'application/vnd.columnar+json',
+
+    // 请求列式响应的认证头（服务端不支持时按普通JSON返回）
+    getColumnarHeaders() {
+        return {
+            ...this.getAuthHeaders(),
+            'Accept': `${this.COLUMNAR_MIMETYPE}, application/json;q=0.9`
+        };
+    },
+
+    // 列式数据 {columns, rows, ...} 还原为 {data: [{字段: 值}], ...}
+    decodeColumnar(payload) {
+        const { columns, rows, ...rest } = payload;
+        const data = new Array(rows.length);
+        for (let i = 0; i < rows.length; i++) {
+            const row = rows[i];
+            const item = {};
+            for (let j = 0; j < columns.length; j++) {
+                item[columns[j]] = row[j];
+            }
+            data[i] = item;
+        }
+        rest.data = data;
+        return rest;
+    },
+
+    // 按URL缓存的ETag与响应数据（数据未变化时服务端返回304，直接复用）
+    etagCache: new Map(),
+    ETAG_CACHE_SIZE: 50,
+
+    // 带条件请求的GET：携带If-None-Match，304时返回本地缓存的数据
+    async getWithETag(url, columnar = false) {
+        const cached = this.etagCache.get(url);
+        const headers = columnar ? this.getColumnarHeaders() : this.getAuthHeaders();
+        if (cached) {
+            headers['If-None-Match'] = cached.etag;
+        }
+
+        const response = await fetch(url, { headers, cache: 'no-store' });
+        if (response.status === 304 && cached) {
+            return cached.data;
+        }
+
+        const data = await this.handleResponse(response);
+        const etag = response.headers.get('ETag');
+        this.etagCache.delete(url);
+        if (etag) {
+            this.etagCache.set(url, { etag, data });
+            // 超出容量时淘汰最早写入的条目
+            if (this.etagCache.size > this.ETAG_CACHE_SIZE) {
+                this.etagCache.delete(this.etagCache.keys().next().value);
+            }
+        }
+        return data;
+    },
+
     // 统一错误处理
     async handleResponse(response) {
         if (!response.ok) {
             const errorData = await response.json().catch(() => ({}));
             throw new Error(errorData.message || `HTTP ${response.status}: ${response.statusText}`);
         }
+        const contentType = response.headers.get('Content-Type') || '';
+        if (contentType.includes(this.COLUMNAR_MIMETYPE)) {
+            return this.decodeColumnar(await response.json());
+        }
         return response.json();
     },
 
@@ -40,9 +101,14 @@ const APIService = {
     },
 
     // 数据查询相关API
-    async getDataList(page = 1, filters = {}, pageSize = 20, sortBy = 'upload_date', sortOrder = 'desc') {
+    async getDataList(page = 1, filters = {}, pageSize = 20, sortBy = 'upload_date', sortOrder = 'desc', cursor = null) {
         let url = `${AppConfig.API_BASE}/data?page=${page}&per_page=${pageSize}&sort_by=${sortBy}&sort_order=${sortOrder}`;
         
+        // 顺序翻页时使用上一页返回的游标
+        if (cursor) {
+            url += `&cursor=${encodeURIComponent(cursor)}`;
+        }
+        
         if (filters.uploadStartDate) {
             url += `&upload_start_date=${filters.uploadStartDate}`;
         }
@@ -62,7 +128,7 @@ const APIService = {
         const response = await fetch(url, {
             method: 'GET',
             credentials: 'include',
-            headers: this.getAuthHeaders()
+            headers: this.getColumnarHeaders()
         });
         return this.handleResponse(response);
     },
@@ -79,10 +145,7 @@ const APIService = {
             url += `?${params.toString()}`;
         }
         
-        const response = await fetch(url, {
-            headers: this.getAuthHeaders()
-        });
-        return this.handleResponse(response);
+        return this.getWithETag(url);
     },
 
     async getOperatorStats(startDate = null, endDate = null) {
@@ -97,10 +160,7 @@ const APIService = {
             url += `?${params.toString()}`;
         }
         
-        const response = await fetch(url, {
-            headers: this.getAuthHeaders()
-        });
-        return this.handleResponse(response);
+        return this.getWithETag(url);
     },
 
     async getCategoryStats(startDate = null, endDate = null) {
@@ -115,10 +175,23 @@ const APIService = {
             url += `?${params.toString()}`;
         }
         
-        const response = await fetch(url, {
-            headers: this.getAuthHeaders()
-        });
-        return this.handleResponse(response);
+        return this.getWithETag(url);
+    },
+
+    // 一次获取门店/负责人员/类目三个看板的统计数据
+    async getDashboardStats(startDate = null, endDate = null) {
+        let url = `${AppConfig.API_BASE}/stats/dashboard`;
+        
+        // 如果提供了日期参数，添加到URL
+        if (startDate && endDate) {
+            const params = new URLSearchParams({
+                start_date: startDate,
+                end_date: endDate
+            });
+            url += `?${params.toString()}`;
+        }
+        
+        return this.getWithETag(url);
     },
 
     // 获取商品销售排行数据
@@ -142,7 +215,13 @@ const APIService = {
         
         url += `?${params.toString()}`;
         
-        const response = await fetch(url, {
+        return this.getWithETag(url, true);
+    },
+
+    // 获取筛选框联想建议（field: product_code / product_name / store 等）
+    async getSearchSuggestions(field, q, limit = 10) {
+        const params = new URLSearchParams({ field, q, limit });
+        const response = await fetch(`${AppConfig.API_BASE}/search/suggest?${params.toString()}`, {
             headers: this.getAuthHeaders()
         });
         return this.handleResponse(response);
@@ -292,6 +371,45 @@ const APIService = {
             }
         });
         
+        if (!response.ok) {
+            throw new Error(`导出失败: ${response.status}`);
+        }
+        
+        // 大批量导出在后台生成文件：轮询任务进度，完成后下载生成的文件
+        if (response.status === 202) {
+            const job = await response.json();
+            await this.waitForTask(job.task_id);
+            return this.downloadExportFile(job.download_url);
+        }
+        return response.blob();
+    },
+
+    // 轮询后台任务直到完成（出错时抛出异常）
+    async waitForTask(taskId, intervalMs = 1000) {
+        while (true) {
+            const progress = await this.getUploadProgress(taskId);
+            if (progress.status === 'completed') {
+                return progress;
+            }
+            if (progress.status === 'error' || !progress.status) {
+                throw new Error(progress.error_message || progress.message || '后台任务失败');
+            }
+            await new Promise(resolve => setTimeout(resolve, intervalMs));
+        }
+    },
+
+    // 下载后台导出任务生成的文件
+    async downloadExportFile(downloadUrl) {
+        const token = localStorage.getItem(AppConfig.STORAGE_KEYS.TOKEN);
+        const url = AppConfig.API_BASE + downloadUrl.replace(/^\/api/, '');
+        const response = await fetch(url, {
+            method: 'GET',
+            credentials: 'include',
+            headers: {
+                'Authorization': `Bearer ${token}`
+            }
+        });
+        
         if (!response.ok) {
             throw new Error(`导出失败: ${response.status}`);
         }
@@ -396,11 +514,24 @@ const APIService = {
             url += `?${params.toString()}`;
         }
         
-        const response = await fetch(url, {
-            method: 'GET',
-            headers: this.getAuthHeaders()
+        return this.getWithETag(url);
+    },
+
+    // 批量获取多个商品的趋势数据（列式：dates + 每个商品每个指标一个数组，granularity 为 day/week/month）
+    async getProductTrends(tmallProductCodes, granularity = 'day', startDate = null, endDate = null, fields = null) {
+        const params = new URLSearchParams({
+            codes: tmallProductCodes.join(','),
+            granularity: granularity
         });
-        return this.handleResponse(response);
+        if (startDate && endDate) {
+            params.append('start_date', startDate);
+            params.append('end_date', endDate);
+        }
+        if (fields && fields.length > 0) {
+            params.append('fields', fields.join(','));
+        }
+
+        return this.getWithETag(`${AppConfig.API_BASE}/product-trends?${params.toString()}`);
     },
 
     // 获取商品subject_report数据
@@ -462,7 +593,7 @@ const APIService = {
         const response = await fetch(url, {
             method: 'GET',
             credentials: 'include',
-            headers: this.getAuthHeaders()
+            headers: this.getColumnarHeaders()
         });
         return this.handleResponse(response);
     },
@@ -478,6 +609,16 @@ const APIService = {
         return this.handleResponse(response);
     },
 
+    // 批量获取内部订单汇总（成本、销售金额、利润）
+    async getInternalOrderSummaries(internalOrderNumbers) {
+        const response = await fetch(`${AppConfig.API_BASE}/order-details/summaries`, {
+            method: 'POST',
+            headers: this.getAuthHeaders(),
+            body: JSON.stringify({ internal_order_numbers: internalOrderNumbers })
+        });
+        return this.handleResponse(response);
+    },
+
     // 获取店铺汇总信息
     async getStoreSummary(storeName, targetDate) {
         const url = `${AppConfig.API_BASE}/store-summary?store_name=${encodeURIComponent(storeName)}&target_date=${targetDate}`;
@@ -500,6 +641,31 @@ const APIService = {
         return this.handleResponse(response);
     },
 
+    // 获取指定日期所有店铺的汇总信息
+    async getStoreSummaries(targetDate) {
+        const url = `${AppConfig.API_BASE}/store-summary/batch?target_date=${targetDate}`;
+        
+        const response = await fetch(url, {
+            method: 'GET',
+            headers: this.getAuthHeaders()
+        });
+        return this.handleResponse(response);
+    },
+
+    // 获取指定日期所有操作人的汇总信息（可按店铺过滤）
+    async getOperatorSummaries(targetDate, storeName = null) {
+        let url = `${AppConfig.API_BASE}/operator-summary/batch?target_date=${targetDate}`;
+        if (storeName) {
+            url += `&store_name=${encodeURIComponent(storeName)}`;
+        }
+        
+        const response = await fetch(url, {
+            method: 'GET',
+            headers: this.getAuthHeaders()
+        });
+        return this.handleResponse(response);
+    },
+
     // 上传支付宝金额文件
     async uploadAlipayFile(file, startDate, endDate) {
         const formData = new FormData();
@@ -543,7 +709,7 @@ const APIService = {
         
         const response = await fetch(url, {
             method: 'GET',
-            headers: this.getAuthHeaders()
+            headers: this.getColumnarHeaders()
         });
         return this.handleResponse(response);
     },
@@ -21,13 +21,9 @@ const ChartsModule = {
         // 移除权限检查，允许所有用户加载数据
         // if (!AuthModule.isAdmin()) return;
         
-        // 并行加载所有统计数据
-        Promise.all([
-            APIService.getStats(startDate, endDate),
-            APIService.getOperatorStats(startDate, endDate),
-            APIService.getCategoryStats(startDate, endDate)
-        ])
-        .then(([storeData, operatorData, categoryData]) => {
+        // 一次请求加载所有看板统计数据
+        APIService.getDashboardStats(startDate, endDate)
+        .then(({ store: storeData, operator: operatorData, category: categoryData }) => {
             // 更新统计数字
             this.updateDashboardStats(storeData);
             
@@ -17,6 +17,9 @@ const DataModule = {
     currentSortBy: 'upload_date',
     currentSortOrder: 'desc',
     
+    // 页码 -> 分页游标（由上一页的 next_cursor 得到，重新查询时清空）
+    pageCursors: {},
+    
     // 列宽调整相关变量
     isResizing: false,
     currentColumn: null,
@@ -61,14 +64,29 @@ const DataModule = {
         
         console.log('请求参数:', { page, filters, pageSize: this.currentPageSize, sortBy: this.currentSortBy, sortOrder: this.currentSortOrder }); // 调试日志
         
-        APIService.getDataList(page, filters, this.currentPageSize, this.currentSortBy, this.currentSortOrder)
+        // 回到第一页（新的查询、排序或页大小）时丢弃旧游标，没有游标的页码按偏移量查询
+        if (page === 1) {
+            this.pageCursors = {};
+        }
+        const cursor = this.pageCursors[page] || null;
+        
+        APIService.getDataList(page, filters, this.currentPageSize, this.currentSortBy, this.currentSortOrder, cursor)
         .then(data => {
             console.log('接收到数据:', data.total, '条记录'); // 调试日志
+            if (data.next_cursor) {
+                this.pageCursors[page + 1] = data.next_cursor;
+            }
             this.renderDataTable(data.data);
             this.renderPagination(data.current_page, data.pages);
             this.updateDataInfo(data.current_page, data.per_page, data.total);
         })
         .catch(error => {
+            if (cursor) {
+                // 数据更新后游标失效，丢弃游标按页码重新加载
+                this.pageCursors = {};
+                this.loadDataList(page);
+                return;
+            }
             console.error('加载数据失败:', error); // 调试日志
             showAlert('加载数据失败：' + error.message, 'danger');
         });
@@ -1555,6 +1573,40 @@ const DataModule = {
         }
     },
     
+    // ======================== 筛选联想建议 ========================
+    
+    // 输入停顿后请求联想建议并填充到datalist
+    bindSearchSuggestions(inputId, datalistId, field) {
+        const input = document.getElementById(inputId);
+        const datalist = document.getElementById(datalistId);
+        if (!input || !datalist) return;
+        
+        let timer = null;
+        input.addEventListener('input', () => {
+            clearTimeout(timer);
+            const q = input.value.trim();
+            if (!q) {
+                datalist.innerHTML = '';
+                return;
+            }
+            timer = setTimeout(async () => {
+                try {
+                    const result = await APIService.getSearchSuggestions(field, q);
+                    // 输入已变化时丢弃过期的结果
+                    if (input.value.trim() !== q) return;
+                    datalist.innerHTML = '';
+                    result.suggestions.forEach(value => {
+                        const option = document.createElement('option');
+                        option.value = value;
+                        datalist.appendChild(option);
+                    });
+                } catch (error) {
+                    console.warn('获取搜索建议失败:', error);
+                }
+            }, 250);
+        });
+    },
+    
     // ======================== 模块初始化 ========================
     
     // 初始化模块
@@ -1598,6 +1650,10 @@ const DataModule = {
         // 加载列宽设置
         this.loadColumnWidths();
         
+        // 天猫ID、产品名称筛选框联想建议
+        this.bindSearchSuggestions('tmallProductCodeFilter', 'tmallProductCodeSuggestions', 'product_code');
+        this.bindSearchSuggestions('productNameFilter', 'productNameSuggestions', 'product_name');
+        
         console.log('数据模块初始化完成');
     }
 };
@@ -16,6 +16,9 @@ const OrderDataModule = {
     currentSortBy: 'order_time',
     currentSortOrder: 'desc',
     
+    // 按日期缓存的店铺/操作人汇总（一次请求取回当天所有店铺或操作人，重新加载列表时清空）
+    summaryCache: {},
+    
     // 列宽调整相关变量
     isResizing: false,
     currentColumn: null,
@@ -29,6 +32,8 @@ const OrderDataModule = {
         // 移除权限检查，允许所有用户加载数据
         // if (!AuthModule.isAdmin()) return;
         
+        this.summaryCache = {};
+        
         const startDateElement = document.getElementById('orderStartDateFilter');
         const endDateElement = document.getElementById('orderEndDateFilter');
         const storeNameElement = document.getElementById('orderStoreNameFilter');
@@ -97,6 +102,7 @@ const OrderDataModule = {
             this.renderOrderDataTable(data.data);
             this.renderOrderPagination(data.current_page, data.pages, data.total);
             this.updateOrderDataInfo(data.current_page, data.per_page, data.total);
+            this.loadInternalOrderSummaries(data.data);
         })
         .catch(error => {
             console.error('加载订单数据失败:', error); // 调试日志
@@ -518,6 +524,7 @@ const OrderDataModule = {
                             link.style.textDecoration = 'none';
                             link.style.cursor = 'pointer';
                             link.title = '点击查看订单详情';
+                            link.dataset.internalOrderNumber = value;
                             
                             link.addEventListener('click', (e) => {
                                 e.preventDefault();
@@ -933,11 +940,40 @@ const OrderDataModule = {
         this.loadStoreInfo(storeName, uploadDate);
     },
 
+    // 从当天的批量汇总中取出指定店铺/操作人的数据（同一天只请求一次）
+    getCachedSummary(type, targetDate, storeName, operator = null) {
+        const cacheKey = `${type}:${targetDate}`;
+        if (!this.summaryCache[cacheKey]) {
+            const request = type === 'store'
+                ? APIService.getStoreSummaries(targetDate)
+                : APIService.getOperatorSummaries(targetDate);
+            // 请求失败时不缓存，下次点击重新请求
+            this.summaryCache[cacheKey] = request.catch(error => {
+                delete this.summaryCache[cacheKey];
+                throw error;
+            });
+        }
+        
+        return this.summaryCache[cacheKey].then(result => {
+            const summary = result.data.find(item =>
+                item.store_name === storeName && (type === 'store' || item.operator === operator)
+            );
+            return summary || {
+                store_name: storeName,
+                operator: operator,
+                order_count: 0,
+                total_sales: 0,
+                total_cost: 0,
+                profit: 0
+            };
+        });
+    },
+
     // 加载店铺汇总信息
     loadStoreInfo(storeName, targetDate) {
         const formattedDate = this.formatDateForAPI(targetDate);
         
-        APIService.getStoreSummary(storeName, formattedDate)
+        this.getCachedSummary('store', formattedDate, storeName)
         .then(data => {
             console.log('店铺汇总数据:', data);
             this.updateStoreInfoModal(data);
@@ -1013,7 +1049,7 @@ const OrderDataModule = {
     loadOperatorInfo(storeName, operator, targetDate) {
         const formattedDate = this.formatDateForAPI(targetDate);
         
-        APIService.getOperatorSummary(storeName, operator, formattedDate)
+        this.getCachedSummary('operator', formattedDate, storeName, operator)
         .then(data => {
             console.log('操作人汇总数据:', data);
             this.updateOperatorInfoModal(data);
@@ -1304,6 +1340,27 @@ const OrderDataModule = {
 
     // ======================== 订单详情弹窗功能 ========================
 
+    // 一次请求取回当前页所有内部订单的汇总，显示在内部订单号的悬停提示中
+    loadInternalOrderSummaries(rows) {
+        if (!AuthModule.isAdmin()) return;
+        
+        const numbers = [...new Set(rows.map(row => row.internal_order_number).filter(Boolean))];
+        if (numbers.length === 0) return;
+        
+        APIService.getInternalOrderSummaries(numbers)
+        .then(result => {
+            document.querySelectorAll('#orderDataTable a[data-internal-order-number]').forEach(link => {
+                const summary = result.summaries[link.dataset.internalOrderNumber];
+                if (summary) {
+                    link.title = `销售金额 ¥${summary.sales_amount.toFixed(2)}，成本 ¥${summary.total_cost.toFixed(2)}，利润 ¥${summary.profit.toFixed(2)}（点击查看订单详情）`;
+                }
+            });
+        })
+        .catch(error => {
+            console.warn('加载内部订单汇总失败:', error);
+        });
+    },
+
     // 显示订单详情弹窗
     showOrderDetails(internalOrderNumber) {
         console.log('显示订单详情:', internalOrderNumber);
@@ -11,6 +11,9 @@ const TrendModule = {
     currentProductData: null,
     currentProductCode: null,
     
+    // 当前时间粒度（day/week/month，由服务端按周期聚合）
+    currentGranularity: 'day',
+    
     // 当前图表实例
     trendChart: null,
     
@@ -57,6 +60,7 @@ const TrendModule = {
         }
         
         this.currentProductCode = tmallProductCode;
+        this.setGranularity('day');
         
         // 更新弹窗标题
         document.getElementById('trendProductCode').textContent = tmallProductCode;
@@ -73,9 +77,14 @@ const TrendModule = {
     loadTrendData(tmallProductCode, startDate = null, endDate = null) {
         showSpinner();
         
-        APIService.getProductTrend(tmallProductCode, startDate, endDate)
-        .then(data => {
+        APIService.getProductTrends([tmallProductCode], this.currentGranularity, startDate, endDate)
+        .then(trends => {
             hideSpinner();
+            
+            if (trends.not_found.includes(tmallProductCode)) {
+                throw new Error(`未找到天猫ID为 ${tmallProductCode} 的商品数据`);
+            }
+            const data = this.toTrendData(trends, tmallProductCode);
             console.log('趋势数据加载成功:', data);
             
             this.currentProductData = data;
@@ -87,9 +96,10 @@ const TrendModule = {
             // 更新图表标题
             const isCustomRange = startDate && endDate;
             const dataCount = data.data ? data.data.length : 0;
+            const periodUnit = this.getPeriodUnit();
             const chartTitle = isCustomRange ? 
-                `（${data.start_date} 至 ${data.end_date}，${dataCount}天有数据）` : 
-                `（最近30天，${dataCount}天有数据）`;
+                `（${data.start_date} 至 ${data.end_date}，${dataCount}${periodUnit}有数据）` : 
+                `（最近30天，${dataCount}${periodUnit}有数据）`;
             document.getElementById('trendChartTitle').textContent = chartTitle;
             
             // 初始化字段选择器
@@ -110,6 +120,62 @@ const TrendModule = {
         });
     },
 
+    // 将批量趋势接口的列式数据转换为单个商品的逐周期数据（只保留有数据的周期）
+    toTrendData(trends, tmallProductCode) {
+        const product = trends.products.find(item => item.product_code === tmallProductCode);
+        const firstField = trends.fields[0];
+        const data = [];
+        
+        trends.dates.forEach((date, index) => {
+            if (product.metrics[firstField][index] === null) {
+                return;
+            }
+            const item = { date: date };
+            trends.fields.forEach(field => {
+                item[field] = product.metrics[field][index];
+            });
+            data.push(item);
+        });
+        
+        return {
+            product_code: product.product_code,
+            product_name: product.product_name,
+            start_date: trends.start_date,
+            end_date: trends.end_date,
+            granularity: trends.granularity,
+            dates: trends.dates,
+            data_count: data.length,
+            data: data
+        };
+    },
+
+    // 当前时间粒度对应的周期单位
+    getPeriodUnit() {
+        return { day: '天', week: '周', month: '个月' }[this.currentGranularity] || '天';
+    },
+
+    // 设置时间粒度并同步下拉框
+    setGranularity(granularity) {
+        this.currentGranularity = granularity;
+        const select = document.getElementById('trendGranularity');
+        if (select) {
+            select.value = granularity;
+        }
+    },
+
+    // 切换时间粒度（按日/周/月汇总），保留当前日期区间
+    changeGranularity(granularity) {
+        this.setGranularity(granularity);
+        
+        const startDate = document.getElementById('trendStartDate').value;
+        const endDate = document.getElementById('trendEndDate').value;
+        if (startDate && endDate) {
+            this.loadCustomDateRange();
+        } else {
+            this.loadTrendData(this.currentProductCode);
+        }
+    },
+
     // 加载自定义日期区间的数据
     loadCustomDateRange() {
         const startDateInput = document.getElementById('trendStartDate');
@@ -149,6 +215,7 @@ const TrendModule = {
         // 清空日期输入
         document.getElementById('trendStartDate').value = '';
         document.getElementById('trendEndDate').value = '';
+        this.setGranularity('day');
         
         // 重新加载默认数据
         this.loadTrendData(this.currentProductCode);
@@ -467,8 +534,9 @@ const TrendModule = {
             };
         }
         
-        // 生成完整的日期范围（从start_date到end_date）
-        const dateRange = this.generateDateRange(this.currentProductData.start_date, this.currentProductData.end_date);
+        // 完整的周期列表（服务端按粒度返回，无数据的周期也包含在内）
+        const dateRange = this.currentProductData.dates ||
+            this.generateDateRange(this.currentProductData.start_date, this.currentProductData.end_date);
         
         // 创建日期到数据的映射
         const dataMap = {};
@@ -480,6 +548,9 @@ const TrendModule = {
         
         // 生成日期标签
         const labels = dateRange.map(dateStr => {
+            if (this.currentGranularity === 'month') {
+                return dateStr.substring(0, 7);
+            }
             const date = new Date(dateStr);
             return date.toLocaleDateString('zh-CN', { month: '2-digit', day: '2-digit' });
         });
@@ -743,6 +814,9 @@ const TrendModule = {
         // 清空现有内容
         summaryContent.innerHTML = '';
 
+        const periodUnit = this.getPeriodUnit();
+        const averageLabel = { day: '日均', week: '周均', month: '月均' }[this.currentGranularity] || '日均';
+
         // 为每个统计字段创建展示卡片
         statsKeys.forEach(key => {
             const stat = summaryStats[key];
@@ -777,10 +851,10 @@ const TrendModule = {
                                     <div class="text-secondary" style="font-size: 0.9rem;">
                                         ${averageFormatted}
                                     </div>
-                                    <small class="text-muted">日均</small>
+                                    <small class="text-muted">${averageLabel}</small>
                                 </div>
                                 <small class="text-muted">
-                                    ${stat.count} 天有数据
+                                    ${stat.count} ${periodUnit}有数据
                                 </small>
                             </div>
                             <div class="ml-2">
@@ -803,7 +877,7 @@ const TrendModule = {
                 <div class="alert alert-info py-2 mb-0">
                     <i class="fas fa-info-circle"></i>
                     <strong>统计说明：</strong>
-                    共 ${totalDays} 天数据，显示 ${statsKeys.length} 个可汇总字段的统计信息。
+                    共 ${totalDays} ${periodUnit}数据，显示 ${statsKeys.length} 个可汇总字段的统计信息。
                     百分比类字段（如转化率、收藏率等）不参与汇总计算。
                 </div>
             `;
@@ -0,0 +1,41 @@
+-- 流水线编排表 - 创建脚本
+-- 说明: 记录各数据表(日期, 店铺)分区的数据版本(水位)，以及各计算步骤已消费的输入版本
+--       上传或计算后只重算输入发生变化的步骤和日期分区
+
+-- 设置字符集
+SET NAMES utf8mb4;
+SET CHARACTER SET utf8mb4;
+
+-- 使用数据库
+USE `ecommerce_db`;
+
+-- ================================
+-- 流水线水位表
+-- ================================
+CREATE TABLE IF NOT EXISTS `pipeline_watermark` (
+    `id` int NOT NULL AUTO_INCREMENT COMMENT '主键ID',
+    `table_name` varchar(100) NOT NULL COMMENT '数据表或计算步骤名称',
+    `partition_date` date NOT NULL COMMENT '分区日期',
+    `store_name` varchar(200) NOT NULL DEFAULT '' COMMENT '分区店铺（空字符串表示整天）',
+    `version` bigint NOT NULL DEFAULT 0 COMMENT '单调递增的数据版本号',
+    `updated_at` datetime DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+    PRIMARY KEY (`id`),
+    UNIQUE KEY `uq_pipeline_watermark_partition` (`table_name`, `partition_date`, `store_name`),
+    KEY `idx_pipeline_watermark_table_date` (`table_name`, `partition_date`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='流水线水位表';
+
+-- ================================
+-- 流水线步骤状态表
+-- ================================
+CREATE TABLE IF NOT EXISTS `pipeline_step_state` (
+    `id` int NOT NULL AUTO_INCREMENT COMMENT '主键ID',
+    `step_name` varchar(100) NOT NULL COMMENT '计算步骤名称',
+    `partition_date` date NOT NULL COMMENT '分区日期',
+    `input_version` bigint NOT NULL DEFAULT 0 COMMENT '上次运行时消费到的输入水位',
+    `status` varchar(20) NOT NULL DEFAULT 'completed' COMMENT '运行状态: completed/skipped/error',
+    `message` text COMMENT '运行结果说明',
+    `duration_seconds` float DEFAULT NULL COMMENT '运行耗时（秒）',
+    `last_run_at` datetime DEFAULT CURRENT_TIMESTAMP COMMENT '最近运行时间',
+    PRIMARY KEY (`id`),
+    UNIQUE KEY `uq_pipeline_step_partition` (`step_name`, `partition_date`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='流水线步骤状态表';
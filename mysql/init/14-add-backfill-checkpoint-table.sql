@@ -0,0 +1,39 @@
+-- 历史回填检查点表 - 创建脚本
+-- 说明: flask backfill 命令按(步骤, 日期)分区记录已完成的回填进度，中断后从未完成的分区继续
+--       同时为集合式计算的关联子查询补充复合索引
+
+-- 设置字符集
+SET NAMES utf8mb4;
+SET CHARACTER SET utf8mb4;
+
+-- 使用数据库
+USE `ecommerce_db`;
+
+-- ================================
+-- 历史回填检查点表
+-- ================================
+CREATE TABLE IF NOT EXISTS `backfill_checkpoint` (
+    `id` int NOT NULL AUTO_INCREMENT COMMENT '主键ID',
+    `job_name` varchar(100) NOT NULL COMMENT '回填作业名称',
+    `step_name` varchar(100) NOT NULL COMMENT '计算步骤名称',
+    `partition_date` date NOT NULL COMMENT '分区日期',
+    `status` varchar(20) NOT NULL DEFAULT 'completed' COMMENT '分区状态: completed/skipped',
+    `rows_affected` int DEFAULT 0 COMMENT '写入行数',
+    `duration_seconds` float DEFAULT NULL COMMENT '执行耗时（秒）',
+    `message` text COMMENT '执行结果说明',
+    `completed_at` datetime DEFAULT CURRENT_TIMESTAMP COMMENT '完成时间',
+    PRIMARY KEY (`id`),
+    UNIQUE KEY `uq_backfill_checkpoint_partition` (`job_name`, `step_name`, `partition_date`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='历史回填检查点表';
+
+-- ================================
+-- 集合式计算关联子查询使用的复合索引
+-- ================================
+ALTER TABLE `subject_report`
+ADD INDEX `idx_subject_report_date_subject` (`report_date`, `subject_id`);
+
+ALTER TABLE `operation_cost_pricing`
+ADD INDEX `idx_operation_staff_product_code` (`operation_staff`, `product_code`);
+
+ALTER TABLE `alipay_amount`
+ADD INDEX `idx_order_number_transaction_date` (`order_number`, `transaction_date`);
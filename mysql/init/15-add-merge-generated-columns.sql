@@ -0,0 +1,45 @@
+-- 合并表派生指标改为生成列 - 迁移脚本
+-- 说明: product_data_merge 与 order_details_merge 中纯算术派生的指标（转化率、真实金额、成本、税票、毛利、利润率等）
+--       改为 STORED 生成列，由数据库随源字段自动维护，最终汇总/订单成本汇总步骤不再回写这些字段
+-- 注意: 表达式中的成本参数与 backend/models.py 中的 LOGISTICS_COST_PER_UNIT / ORDER_DEDUCTION_RATE /
+--       TAX_INVOICE_RATE / UNIT_PRODUCT_COST 一致，修改参数时需新增迁移重建对应生成列
+
+-- 设置字符集
+SET NAMES utf8mb4;
+SET CHARACTER SET utf8mb4;
+
+-- 使用数据库
+USE `ecommerce_db`;
+
+-- ================================
+-- 产品数据合并表
+-- ================================
+ALTER TABLE `product_data_merge`
+    MODIFY COLUMN `planting_logistics_cost` float GENERATED ALWAYS AS (planting_orders * 2.5) STORED COMMENT '物流成本 (订单数 * 2.5)',
+    MODIFY COLUMN `planting_deduction` float GENERATED ALWAYS AS (planting_amount * 0.08) STORED COMMENT '扣款金额 (总金额 * 0.08)',
+    MODIFY COLUMN `conversion_rate` float GENERATED ALWAYS AS (CASE WHEN COALESCE(visitor_count, 0) > 0 THEN (COALESCE(payment_buyer_count, 0)) * 100.0 / visitor_count ELSE 0 END) STORED COMMENT '支付转化率',
+    MODIFY COLUMN `favorite_rate` float GENERATED ALWAYS AS (CASE WHEN COALESCE(visitor_count, 0) > 0 THEN (COALESCE(favorite_count, 0)) * 100.0 / visitor_count ELSE 0 END) STORED COMMENT '收藏率',
+    MODIFY COLUMN `cart_rate` float GENERATED ALWAYS AS (CASE WHEN COALESCE(visitor_count, 0) > 0 THEN (COALESCE(add_to_cart_count, 0)) * 100.0 / visitor_count ELSE 0 END) STORED COMMENT '加购率',
+    MODIFY COLUMN `uv_value` float GENERATED ALWAYS AS (CASE WHEN COALESCE(visitor_count, 0) > 0 THEN (COALESCE(payment_amount, 0)) * 1.0 / visitor_count ELSE 0 END) STORED COMMENT 'UV价值',
+    MODIFY COLUMN `real_conversion_rate` float GENERATED ALWAYS AS (CASE WHEN COALESCE(visitor_count, 0) > 0 THEN ((COALESCE(payment_buyer_count, 0) - COALESCE(planting_orders, 0))) * 100.0 / visitor_count ELSE 0 END) STORED COMMENT '真实转化率',
+    MODIFY COLUMN `real_amount` float GENERATED ALWAYS AS ((COALESCE(payment_amount, 0) - COALESCE(refund_amount, 0) - COALESCE(planting_amount, 0))) STORED COMMENT '真实金额',
+    MODIFY COLUMN `real_buyer_count` int GENERATED ALWAYS AS ((COALESCE(payment_buyer_count, 0) - COALESCE(planting_orders, 0))) STORED COMMENT '真实买家数',
+    MODIFY COLUMN `real_product_count` int GENERATED ALWAYS AS ((COALESCE(payment_product_count, 0) - COALESCE(planting_orders, 0))) STORED COMMENT '真实件数',
+    MODIFY COLUMN `product_cost` float GENERATED ALWAYS AS ((((COALESCE(payment_product_count, 0) - COALESCE(planting_orders, 0)) + COALESCE(payment_product_count, 0) - COALESCE(payment_buyer_count, 0)) * 10)) STORED COMMENT '产品成本',
+    MODIFY COLUMN `real_order_deduction` float GENERATED ALWAYS AS ((COALESCE(payment_amount, 0) - COALESCE(refund_amount, 0) - COALESCE(planting_amount, 0)) * 0.08) STORED COMMENT '真实订单扣点',
+    MODIFY COLUMN `tax_invoice` float GENERATED ALWAYS AS (COALESCE(payment_amount, 0) * 0.13) STORED COMMENT '税票',
+    MODIFY COLUMN `real_order_logistics_cost` float GENERATED ALWAYS AS ((COALESCE(payment_product_count, 0) - COALESCE(planting_orders, 0)) * 2.5) STORED COMMENT '真实订单物流成本',
+    MODIFY COLUMN `gross_profit` float GENERATED ALWAYS AS ((COALESCE(payment_amount, 0) - COALESCE(refund_amount, 0) - COALESCE(planting_amount, 0)) - (((COALESCE(payment_product_count, 0) - COALESCE(planting_orders, 0)) + COALESCE(payment_product_count, 0) - COALESCE(payment_buyer_count, 0)) * 10) - (COALESCE(payment_amount, 0) - COALESCE(refund_amount, 0) - COALESCE(planting_amount, 0)) * 0.08 - COALESCE(payment_amount, 0) * 0.13 - (COALESCE(payment_product_count, 0) - COALESCE(planting_orders, 0)) * 2.5 - (COALESCE(planting_cost, 0) + COALESCE(planting_orders, 0) * 2.5 + COALESCE(planting_amount, 0) * 0.08) - (COALESCE(sitewide_promotion, 0) + COALESCE(keyword_promotion, 0) + COALESCE(product_operation, 0) + COALESCE(crowd_promotion, 0) + COALESCE(super_short_video, 0) + COALESCE(multi_target_direct, 0))) STORED COMMENT '毛利';
+
+-- ================================
+-- 订单详情合并表（仅在匹配到运营成本且数量、商品金额、供货价均非零时计算，否则为NULL）
+-- ================================
+ALTER TABLE `order_details_merge`
+    MODIFY COLUMN `order_profit_margin` float GENERATED ALWAYS AS (CASE WHEN is_operation_cost_matched = 1 AND COALESCE(quantity, 0) <> 0 AND COALESCE(product_amount, 0) <> 0 AND COALESCE(operation_cost_supply_price, 0) <> 0 AND product_amount > 0 THEN (product_amount - quantity * operation_cost_supply_price - quantity * 2.5 - product_amount * 0.08 - product_amount * 0.13) * 100.0 / product_amount END) STORED COMMENT '订单利润率',
+    MODIFY COLUMN `avg_order_value` float GENERATED ALWAYS AS (CASE WHEN is_operation_cost_matched = 1 AND COALESCE(quantity, 0) <> 0 AND COALESCE(product_amount, 0) <> 0 AND COALESCE(operation_cost_supply_price, 0) <> 0 THEN product_amount END) STORED COMMENT '平均订单价值',
+    MODIFY COLUMN `product_cost` float GENERATED ALWAYS AS (CASE WHEN is_operation_cost_matched = 1 AND COALESCE(quantity, 0) <> 0 AND COALESCE(product_amount, 0) <> 0 AND COALESCE(operation_cost_supply_price, 0) <> 0 THEN quantity * operation_cost_supply_price END) STORED COMMENT '产品成本 (数量 * 运营成本价格)',
+    MODIFY COLUMN `order_logistics_cost` float GENERATED ALWAYS AS (CASE WHEN is_operation_cost_matched = 1 AND COALESCE(quantity, 0) <> 0 AND COALESCE(product_amount, 0) <> 0 AND COALESCE(operation_cost_supply_price, 0) <> 0 THEN quantity * 2.5 END) STORED COMMENT '订单物流成本 (数量 * 2.5)',
+    MODIFY COLUMN `order_deduction` float GENERATED ALWAYS AS (CASE WHEN is_operation_cost_matched = 1 AND COALESCE(quantity, 0) <> 0 AND COALESCE(product_amount, 0) <> 0 AND COALESCE(operation_cost_supply_price, 0) <> 0 THEN product_amount * 0.08 END) STORED COMMENT '订单扣点 (商品金额 * 0.08)',
+    MODIFY COLUMN `tax_invoice` float GENERATED ALWAYS AS (CASE WHEN is_operation_cost_matched = 1 AND COALESCE(quantity, 0) <> 0 AND COALESCE(product_amount, 0) <> 0 AND COALESCE(operation_cost_supply_price, 0) <> 0 THEN product_amount * 0.13 END) STORED COMMENT '税票 (商品金额 * 0.13)',
+    MODIFY COLUMN `gross_profit` float GENERATED ALWAYS AS (CASE WHEN is_operation_cost_matched = 1 AND COALESCE(quantity, 0) <> 0 AND COALESCE(product_amount, 0) <> 0 AND COALESCE(operation_cost_supply_price, 0) <> 0 THEN (product_amount - quantity * operation_cost_supply_price - quantity * 2.5 - product_amount * 0.08 - product_amount * 0.13) END) STORED COMMENT '毛利 (商品金额 - 产品成本 - 各项费用)',
+    MODIFY COLUMN `profit_per_unit` float GENERATED ALWAYS AS (CASE WHEN is_operation_cost_matched = 1 AND COALESCE(quantity, 0) <> 0 AND COALESCE(product_amount, 0) <> 0 AND COALESCE(operation_cost_supply_price, 0) <> 0 AND product_amount > 0 THEN CASE WHEN quantity > 0 THEN (product_amount - quantity * operation_cost_supply_price - quantity * 2.5 - product_amount * 0.08 - product_amount * 0.13) * 1.0 / quantity ELSE 0 END END) STORED COMMENT '单件利润';
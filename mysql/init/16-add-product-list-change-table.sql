@@ -0,0 +1,26 @@
+-- 产品总表变更日志表 - 创建脚本
+-- 说明: 产品总表新增/编辑时登记受影响的匹配键，后台任务按键增量回填product_data_merge和order_details_merge，
+--       避免操作人、类目等修改后重新合并整月数据
+
+-- 设置字符集
+SET NAMES utf8mb4;
+SET CHARACTER SET utf8mb4;
+
+-- 使用数据库
+USE `ecommerce_db`;
+
+-- ================================
+-- 产品总表变更日志表
+-- ================================
+CREATE TABLE IF NOT EXISTS `product_list_change` (
+    `id` int NOT NULL AUTO_INCREMENT COMMENT '主键ID',
+    `product_list_id` int DEFAULT NULL COMMENT '产品总表ID（新增记录提交前为空）',
+    `product_id` varchar(100) DEFAULT NULL COMMENT '产品ID（匹配product_data_merge.tmall_product_code）',
+    `tmall_supplier_id` varchar(200) DEFAULT NULL COMMENT '天猫供销ID（匹配order_details_merge.store_style_code）',
+    `change_type` varchar(20) NOT NULL COMMENT '变更类型: insert/update/delete',
+    `changed_fields` varchar(500) DEFAULT NULL COMMENT '变更字段，逗号分隔',
+    `created_at` datetime DEFAULT CURRENT_TIMESTAMP COMMENT '登记时间',
+    `processed_at` datetime DEFAULT NULL COMMENT '回填完成时间（为空表示待处理）',
+    PRIMARY KEY (`id`),
+    KEY `idx_product_list_change_processed` (`processed_at`, `id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='产品总表变更日志表';
@@ -0,0 +1,18 @@
+-- 店铺分区索引 - 创建脚本
+-- 说明: 商品数据按 (日期, 店铺) 分区增量合并，为上传替换和合并对齐补充复合索引
+
+-- 设置字符集
+SET NAMES utf8mb4;
+SET CHARACTER SET utf8mb4;
+
+-- 使用数据库
+USE `ecommerce_db`;
+
+-- ================================
+-- 店铺分区复合索引
+-- ================================
+ALTER TABLE `product_data`
+ADD INDEX `idx_product_data_date_store` (`upload_date`, `tmall_supplier_name`);
+
+ALTER TABLE `product_data_merge`
+ADD INDEX `idx_product_data_merge_date_store_code` (`upload_date`, `tmall_supplier_name`, `tmall_product_code`);
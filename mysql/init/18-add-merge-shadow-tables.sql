@@ -0,0 +1,134 @@
+-- 影子分区表 - 创建脚本
+-- 说明: 合并重算（商品数据合并、订单详情合并）先把分区的新数据写入影子表并提交，
+--       再在一个短事务内删除正式表分区并 INSERT...SELECT 影子数据，读取方不会看到只算了一半的分区
+--       影子表字段与merge表可写入字段一致（不含自增主键和生成列），build_id区分并发的构建批次
+
+-- 设置字符集
+SET NAMES utf8mb4;
+SET CHARACTER SET utf8mb4;
+
+-- 使用数据库
+USE `ecommerce_db`;
+
+-- ================================
+-- 商品数据合并影子表
+-- ================================
+CREATE TABLE IF NOT EXISTS `product_data_merge_shadow` (
+    `shadow_id` int NOT NULL AUTO_INCREMENT COMMENT '主键ID',
+    `build_id` varchar(32) NOT NULL COMMENT '构建批次ID',
+    `built_at` datetime DEFAULT CURRENT_TIMESTAMP COMMENT '构建时间',
+    `product_data_id` int DEFAULT NULL,
+    `platform` varchar(50) DEFAULT NULL,
+    `product_name` text DEFAULT NULL,
+    `tmall_product_code` varchar(100) DEFAULT NULL,
+    `tmall_supplier_name` varchar(200) DEFAULT NULL COMMENT '店铺名',
+    `visitor_count` int DEFAULT NULL,
+    `page_views` int DEFAULT NULL,
+    `search_guided_visitors` int DEFAULT NULL,
+    `add_to_cart_count` int DEFAULT NULL,
+    `favorite_count` int DEFAULT NULL,
+    `payment_amount` float DEFAULT NULL,
+    `payment_product_count` int DEFAULT NULL,
+    `payment_buyer_count` int DEFAULT NULL,
+    `search_guided_payment_buyers` int DEFAULT NULL,
+    `unit_price` float DEFAULT NULL,
+    `visitor_average_value` float DEFAULT NULL,
+    `payment_conversion_rate` float DEFAULT NULL,
+    `order_conversion_rate` float DEFAULT NULL,
+    `avg_stay_time` float DEFAULT NULL,
+    `detail_page_bounce_rate` float DEFAULT NULL,
+    `order_payment_conversion_rate` float DEFAULT NULL,
+    `search_payment_conversion_rate` float DEFAULT NULL,
+    `refund_amount` float DEFAULT NULL,
+    `refund_ratio` float DEFAULT NULL,
+    `filename` varchar(255) DEFAULT NULL,
+    `upload_date` date DEFAULT NULL,
+    `uploaded_by` int DEFAULT NULL,
+    `product_list_id` int DEFAULT NULL,
+    `product_list_name` varchar(500) DEFAULT NULL,
+    `listing_time` date DEFAULT NULL,
+    `product_list_tmall_supplier_id` varchar(200) DEFAULT NULL,
+    `product_list_operator` varchar(100) DEFAULT NULL,
+    `product_list_category` varchar(200) DEFAULT NULL,
+    `product_list_image` varchar(500) DEFAULT NULL,
+    `product_list_created_at` datetime DEFAULT NULL,
+    `product_list_updated_at` datetime DEFAULT NULL,
+    `product_list_uploaded_by` int DEFAULT NULL,
+    `sitewide_promotion` float DEFAULT NULL,
+    `keyword_promotion` float DEFAULT NULL,
+    `product_operation` float DEFAULT NULL,
+    `crowd_promotion` float DEFAULT NULL,
+    `super_short_video` float DEFAULT NULL,
+    `multi_target_direct` float DEFAULT NULL,
+    `promotion_summary_updated_at` datetime DEFAULT NULL,
+    `planting_orders` int DEFAULT NULL,
+    `planting_amount` float DEFAULT NULL,
+    `planting_cost` float DEFAULT NULL,
+    `planting_summary_updated_at` datetime DEFAULT NULL,
+    `is_matched` tinyint(1) DEFAULT NULL,
+    `created_at` datetime DEFAULT NULL,
+    `updated_at` datetime DEFAULT NULL,
+    PRIMARY KEY (`shadow_id`),
+    KEY `idx_product_data_merge_shadow_build_id` (`build_id`),
+    KEY `idx_product_data_merge_shadow_built_at` (`built_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='商品数据合并影子表';
+
+-- ================================
+-- 订单详情合并影子表
+-- ================================
+CREATE TABLE IF NOT EXISTS `order_details_merge_shadow` (
+    `shadow_id` int NOT NULL AUTO_INCREMENT COMMENT '主键ID',
+    `build_id` varchar(32) NOT NULL COMMENT '构建批次ID',
+    `built_at` datetime DEFAULT CURRENT_TIMESTAMP COMMENT '构建时间',
+    `order_details_id` int DEFAULT NULL COMMENT '订单详情表ID',
+    `internal_order_number` varchar(100) DEFAULT NULL COMMENT '内部订单号',
+    `online_order_number` varchar(100) DEFAULT NULL COMMENT '线上订单号',
+    `store_code` varchar(50) DEFAULT NULL COMMENT '店铺编号',
+    `store_name` varchar(200) DEFAULT NULL COMMENT '店铺名称',
+    `order_time` datetime DEFAULT NULL COMMENT '下单时间',
+    `payment_date` date DEFAULT NULL COMMENT '付款日期',
+    `shipping_date` date DEFAULT NULL COMMENT '发货日期',
+    `payable_amount` decimal(10,2) DEFAULT NULL COMMENT '应付金额',
+    `paid_amount` decimal(10,2) DEFAULT NULL COMMENT '已付金额',
+    `express_company` varchar(100) DEFAULT NULL COMMENT '快递公司',
+    `tracking_number` varchar(100) DEFAULT NULL COMMENT '快递单号',
+    `province` varchar(50) DEFAULT NULL COMMENT '省份',
+    `city` varchar(50) DEFAULT NULL COMMENT '城市',
+    `district` varchar(50) DEFAULT NULL COMMENT '区县',
+    `product_code` varchar(100) DEFAULT NULL COMMENT '商品编码',
+    `product_name` varchar(500) DEFAULT NULL COMMENT '商品名称',
+    `quantity` int DEFAULT NULL COMMENT '数量',
+    `unit_price` decimal(10,2) DEFAULT NULL COMMENT '商品单价',
+    `product_amount` decimal(10,2) DEFAULT NULL COMMENT '商品金额',
+    `payment_number` varchar(100) DEFAULT NULL COMMENT '支付单号',
+    `image_url` text DEFAULT NULL COMMENT '图片地址',
+    `store_style_code` varchar(100) DEFAULT NULL COMMENT '店铺款式编码',
+    `order_status` varchar(50) DEFAULT NULL COMMENT '子订单状态',
+    `order_details_filename` varchar(255) DEFAULT NULL COMMENT '订单详情源文件名',
+    `upload_date` date DEFAULT NULL COMMENT '上传日期',
+    `order_details_uploaded_by` int DEFAULT NULL COMMENT '订单详情上传用户ID',
+    `order_details_created_at` datetime DEFAULT NULL COMMENT '订单详情创建时间',
+    `order_details_updated_at` datetime DEFAULT NULL COMMENT '订单详情更新时间',
+    `product_list_product_id` varchar(100) DEFAULT NULL COMMENT '产品总表-产品ID',
+    `product_list_product_name` varchar(500) DEFAULT NULL COMMENT '产品总表-产品名称',
+    `product_list_listing_time` date DEFAULT NULL COMMENT '产品总表-上架时间',
+    `product_list_tmall_supplier_id` varchar(200) DEFAULT NULL COMMENT '产品总表-天猫供销ID',
+    `product_list_operator` varchar(100) DEFAULT NULL COMMENT '产品总表-操作人',
+    `operation_cost_brand_category` varchar(200) DEFAULT NULL COMMENT '运营成本-适配品牌分类',
+    `operation_cost_product_code` varchar(100) DEFAULT NULL COMMENT '运营成本-商品编码',
+    `operation_cost_product_name` varchar(500) DEFAULT NULL COMMENT '运营成本-产品名称',
+    `operation_cost_supply_price` decimal(10,2) DEFAULT NULL COMMENT '运营成本-供货价',
+    `operation_cost_operation_staff` varchar(100) DEFAULT NULL COMMENT '运营成本-运营人员',
+    `operation_cost_filename` varchar(255) DEFAULT NULL COMMENT '运营成本-源文件名',
+    `order_conversion_rate` float DEFAULT NULL COMMENT '订单转化率',
+    `net_profit` float DEFAULT NULL COMMENT '净利润',
+    `cost_summary_updated_at` datetime DEFAULT NULL COMMENT '成本汇总更新时间',
+    `profit_summary_updated_at` datetime DEFAULT NULL COMMENT '利润汇总更新时间',
+    `is_product_list_matched` tinyint(1) DEFAULT NULL COMMENT '是否成功匹配到product_list',
+    `is_operation_cost_matched` tinyint(1) DEFAULT NULL COMMENT '是否成功匹配到operation_cost_pricing',
+    `created_at` datetime DEFAULT NULL,
+    `updated_at` datetime DEFAULT NULL,
+    PRIMARY KEY (`shadow_id`),
+    KEY `idx_order_details_merge_shadow_build_id` (`build_id`),
+    KEY `idx_order_details_merge_shadow_built_at` (`built_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='订单详情合并影子表';
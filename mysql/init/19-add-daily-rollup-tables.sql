@@ -0,0 +1,153 @@
+-- 看板日汇总表 - 创建脚本
+-- 说明: /api/stats、/api/stats/operator、/api/stats/category 改为读取按日物化的汇总表，
+--       最终汇总步骤（以及商品数据合并、产品总表增量回填）按日期增量刷新；本脚本同时用现有merge数据初始化汇总
+
+-- 设置字符集
+SET NAMES utf8mb4;
+SET CHARACTER SET utf8mb4;
+
+-- 使用数据库
+USE `ecommerce_db`;
+
+-- ================================
+-- 门店日汇总表
+-- ================================
+CREATE TABLE IF NOT EXISTS `daily_store_rollup` (
+    `id` int NOT NULL AUTO_INCREMENT COMMENT '主键ID',
+    `summary_date` date NOT NULL COMMENT '汇总日期（product_data_merge.upload_date）',
+    `store_name` varchar(200) NOT NULL COMMENT '店铺名',
+    `payment_amount` double DEFAULT NULL COMMENT '支付金额',
+    `payment_product_count` bigint DEFAULT NULL COMMENT '支付商品件数',
+    `visitor_count` bigint DEFAULT NULL COMMENT '访客数',
+    `payment_buyer_count` bigint DEFAULT NULL COMMENT '支付买家数',
+    `planting_orders` bigint DEFAULT NULL COMMENT '种菜订单数',
+    `planting_amount` double DEFAULT NULL COMMENT '种菜金额',
+    `refund_amount` double DEFAULT NULL COMMENT '退款金额',
+    `sitewide_promotion` double DEFAULT NULL COMMENT '全站推广',
+    `keyword_promotion` double DEFAULT NULL COMMENT '关键词推广',
+    `product_operation` double DEFAULT NULL COMMENT '货品运营',
+    `crowd_promotion` double DEFAULT NULL COMMENT '人群推广',
+    `super_short_video` double DEFAULT NULL COMMENT '超级短视频',
+    `multi_target_direct` double DEFAULT NULL COMMENT '多目标直投',
+    `record_count` int NOT NULL DEFAULT 0 COMMENT '商品记录数',
+    `refreshed_at` datetime DEFAULT CURRENT_TIMESTAMP COMMENT '刷新时间',
+    PRIMARY KEY (`id`),
+    UNIQUE KEY `uq_daily_store_rollup` (`summary_date`, `store_name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='门店日汇总表';
+
+-- ================================
+-- 负责人员日汇总表
+-- ================================
+CREATE TABLE IF NOT EXISTS `daily_operator_rollup` (
+    `id` int NOT NULL AUTO_INCREMENT COMMENT '主键ID',
+    `summary_date` date NOT NULL COMMENT '汇总日期（product_data_merge.upload_date）',
+    `platform` varchar(50) NOT NULL COMMENT '平台（团队）',
+    `operator` varchar(100) NOT NULL COMMENT '操作人（未匹配为"未分配"）',
+    `payment_amount` double DEFAULT NULL COMMENT '支付金额',
+    `payment_product_count` bigint DEFAULT NULL COMMENT '支付商品件数',
+    `visitor_count` bigint DEFAULT NULL COMMENT '访客数',
+    `payment_buyer_count` bigint DEFAULT NULL COMMENT '支付买家数',
+    `planting_orders` bigint DEFAULT NULL COMMENT '种菜订单数',
+    `planting_amount` double DEFAULT NULL COMMENT '种菜金额',
+    `refund_amount` double DEFAULT NULL COMMENT '退款金额',
+    `sitewide_promotion` double DEFAULT NULL COMMENT '全站推广',
+    `keyword_promotion` double DEFAULT NULL COMMENT '关键词推广',
+    `product_operation` double DEFAULT NULL COMMENT '货品运营',
+    `crowd_promotion` double DEFAULT NULL COMMENT '人群推广',
+    `super_short_video` double DEFAULT NULL COMMENT '超级短视频',
+    `multi_target_direct` double DEFAULT NULL COMMENT '多目标直投',
+    `record_count` int NOT NULL DEFAULT 0 COMMENT '商品记录数',
+    `refreshed_at` datetime DEFAULT CURRENT_TIMESTAMP COMMENT '刷新时间',
+    PRIMARY KEY (`id`),
+    UNIQUE KEY `uq_daily_operator_rollup` (`summary_date`, `platform`, `operator`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='负责人员日汇总表';
+
+-- ================================
+-- 类目日汇总表
+-- ================================
+CREATE TABLE IF NOT EXISTS `daily_category_rollup` (
+    `id` int NOT NULL AUTO_INCREMENT COMMENT '主键ID',
+    `summary_date` date NOT NULL COMMENT '汇总日期（product_data_merge.upload_date）',
+    `category` varchar(200) NOT NULL COMMENT '产品类目（未匹配为"未分类"）',
+    `payment_amount` double DEFAULT NULL COMMENT '支付金额',
+    `payment_product_count` bigint DEFAULT NULL COMMENT '支付商品件数',
+    `visitor_count` bigint DEFAULT NULL COMMENT '访客数',
+    `payment_buyer_count` bigint DEFAULT NULL COMMENT '支付买家数',
+    `planting_orders` bigint DEFAULT NULL COMMENT '种菜订单数',
+    `planting_amount` double DEFAULT NULL COMMENT '种菜金额',
+    `refund_amount` double DEFAULT NULL COMMENT '退款金额',
+    `sitewide_promotion` double DEFAULT NULL COMMENT '全站推广',
+    `keyword_promotion` double DEFAULT NULL COMMENT '关键词推广',
+    `product_operation` double DEFAULT NULL COMMENT '货品运营',
+    `crowd_promotion` double DEFAULT NULL COMMENT '人群推广',
+    `super_short_video` double DEFAULT NULL COMMENT '超级短视频',
+    `multi_target_direct` double DEFAULT NULL COMMENT '多目标直投',
+    `record_count` int NOT NULL DEFAULT 0 COMMENT '商品记录数',
+    `refreshed_at` datetime DEFAULT CURRENT_TIMESTAMP COMMENT '刷新时间',
+    PRIMARY KEY (`id`),
+    UNIQUE KEY `uq_daily_category_rollup` (`summary_date`, `category`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='类目日汇总表';
+
+-- ================================
+-- 用现有merge数据初始化日汇总
+-- ================================
+INSERT INTO `daily_store_rollup` (`summary_date`, `store_name`, `payment_amount`, `payment_product_count`, `visitor_count`, `payment_buyer_count`, `planting_orders`, `planting_amount`, `refund_amount`, `sitewide_promotion`, `keyword_promotion`, `product_operation`, `crowd_promotion`, `super_short_video`, `multi_target_direct`, `record_count`)
+SELECT
+    `upload_date`, `tmall_supplier_name`,
+    SUM(`payment_amount`),
+    SUM(`payment_product_count`),
+    SUM(`visitor_count`),
+    SUM(`payment_buyer_count`),
+    SUM(`planting_orders`),
+    SUM(`planting_amount`),
+    SUM(`refund_amount`),
+    SUM(`sitewide_promotion`),
+    SUM(`keyword_promotion`),
+    SUM(`product_operation`),
+    SUM(`crowd_promotion`),
+    SUM(`super_short_video`),
+    SUM(`multi_target_direct`),
+    COUNT(*)
+FROM `product_data_merge`
+WHERE `tmall_supplier_name` IS NOT NULL
+GROUP BY `upload_date`, `tmall_supplier_name`;
+
+INSERT INTO `daily_operator_rollup` (`summary_date`, `platform`, `operator`, `payment_amount`, `payment_product_count`, `visitor_count`, `payment_buyer_count`, `planting_orders`, `planting_amount`, `refund_amount`, `sitewide_promotion`, `keyword_promotion`, `product_operation`, `crowd_promotion`, `super_short_video`, `multi_target_direct`, `record_count`)
+SELECT
+    `upload_date`, `platform`, COALESCE(`product_list_operator`, '未分配'),
+    SUM(`payment_amount`),
+    SUM(`payment_product_count`),
+    SUM(`visitor_count`),
+    SUM(`payment_buyer_count`),
+    SUM(`planting_orders`),
+    SUM(`planting_amount`),
+    SUM(`refund_amount`),
+    SUM(`sitewide_promotion`),
+    SUM(`keyword_promotion`),
+    SUM(`product_operation`),
+    SUM(`crowd_promotion`),
+    SUM(`super_short_video`),
+    SUM(`multi_target_direct`),
+    COUNT(*)
+FROM `product_data_merge`
+GROUP BY `upload_date`, `platform`, COALESCE(`product_list_operator`, '未分配');
+
+INSERT INTO `daily_category_rollup` (`summary_date`, `category`, `payment_amount`, `payment_product_count`, `visitor_count`, `payment_buyer_count`, `planting_orders`, `planting_amount`, `refund_amount`, `sitewide_promotion`, `keyword_promotion`, `product_operation`, `crowd_promotion`, `super_short_video`, `multi_target_direct`, `record_count`)
+SELECT
+    `upload_date`, COALESCE(`product_list_category`, '未分类'),
+    SUM(`payment_amount`),
+    SUM(`payment_product_count`),
+    SUM(`visitor_count`),
+    SUM(`payment_buyer_count`),
+    SUM(`planting_orders`),
+    SUM(`planting_amount`),
+    SUM(`refund_amount`),
+    SUM(`sitewide_promotion`),
+    SUM(`keyword_promotion`),
+    SUM(`product_operation`),
+    SUM(`crowd_promotion`),
+    SUM(`super_short_video`),
+    SUM(`multi_target_direct`),
+    COUNT(*)
+FROM `product_data_merge`
+GROUP BY `upload_date`, COALESCE(`product_list_category`, '未分类');
@@ -0,0 +1,24 @@
+-- 数据列表游标分页索引 - 创建脚本
+-- 说明: /api/data 按 (排序字段, id) 游标分页，为常用排序字段补充复合索引，
+--       翻页时沿索引从上一页末行继续读取，不再随页码深度扫描并丢弃前面的行
+--       只有下列字段（及映射到同一列的 real_buyer_count/real_product_count）使用游标分页，
+--       其余排序字段仍按页码偏移分页（见 routes/data.py 的 KEYSET_SORT_FIELDS）
+
+-- 设置字符集
+SET NAMES utf8mb4;
+SET CHARACTER SET utf8mb4;
+
+-- 使用数据库
+USE `ecommerce_db`;
+
+-- ================================
+-- 排序字段 + id 复合索引
+-- ================================
+ALTER TABLE `product_data_merge`
+ADD INDEX `idx_product_data_merge_date_id` (`upload_date`, `id`),
+ADD INDEX `idx_product_data_merge_payment_amount_id` (`payment_amount`, `id`),
+ADD INDEX `idx_product_data_merge_real_amount_id` (`real_amount`, `id`),
+ADD INDEX `idx_product_data_merge_gross_profit_id` (`gross_profit`, `id`),
+ADD INDEX `idx_product_data_merge_visitor_count_id` (`visitor_count`, `id`),
+ADD INDEX `idx_product_data_merge_payment_buyer_count_id` (`payment_buyer_count`, `id`),
+ADD INDEX `idx_product_data_merge_payment_product_count_id` (`payment_product_count`, `id`);
@@ -0,0 +1,31 @@
+-- 产品活动日历表 - 创建脚本
+-- 说明: 把product_list.action_list中的活动展开为带日期区间的行，数据列表按活动日历索引匹配活动状态，
+--       不再逐行解析JSON；并支持按 (活动名称, 日期) 查询参与活动的全部产品
+-- 注意: 已有数据库执行本脚本后需运行一次 flask --app app rebuild-product-activities 从action_list初始化活动日历
+
+-- 设置字符集
+SET NAMES utf8mb4;
+SET CHARACTER SET utf8mb4;
+
+-- 使用数据库
+USE `ecommerce_db`;
+
+-- ================================
+-- 产品活动日历表
+-- ================================
+CREATE TABLE IF NOT EXISTS `product_activity` (
+    `id` int NOT NULL AUTO_INCREMENT COMMENT '主键ID',
+    `product_list_id` int NOT NULL COMMENT '产品总表ID',
+    `product_id` varchar(100) NOT NULL COMMENT '产品ID/链接ID',
+    `activity_name` varchar(200) NOT NULL COMMENT '活动名称',
+    `warmup_date` date DEFAULT NULL COMMENT '预热开始日期',
+    `start_date` date NOT NULL COMMENT '活动开始日期',
+    `end_date` date NOT NULL COMMENT '活动结束日期',
+    `sequence` int NOT NULL DEFAULT 0 COMMENT '在action_list中的顺序',
+    `created_at` datetime DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+    PRIMARY KEY (`id`),
+    KEY `idx_product_activity_product_list` (`product_list_id`, `sequence`),
+    KEY `idx_product_activity_name_dates` (`activity_name`, `start_date`, `end_date`),
+    KEY `idx_product_activity_dates` (`start_date`, `end_date`),
+    CONSTRAINT `product_activity_ibfk_1` FOREIGN KEY (`product_list_id`) REFERENCES `product_list` (`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='产品活动日历表';
@@ -0,0 +1,20 @@
+-- 商品名称全文索引 - 创建脚本
+-- 说明: 商品名称模糊筛选匹配的取值过多、无法转换为 IN 查询时，先用 ngram FULLTEXT 短语匹配缩小范围，
+--       再由 LIKE 确认子串，避免 '%关键词%' 全表扫描
+-- 注意: ngram 分词长度由 ngram_token_size 决定（默认2），与搜索服务的最短短语长度一致
+
+-- 设置字符集
+SET NAMES utf8mb4;
+SET CHARACTER SET utf8mb4;
+
+-- 使用数据库
+USE `ecommerce_db`;
+
+-- ================================
+-- 商品名称 ngram 全文索引
+-- ================================
+ALTER TABLE `product_data_merge`
+ADD FULLTEXT INDEX `ft_product_data_merge_product_name` (`product_name`) WITH PARSER ngram;
+
+ALTER TABLE `product_list`
+ADD FULLTEXT INDEX `ft_product_list_product_name` (`product_name`) WITH PARSER ngram;
@@ -0,0 +1,19 @@
+-- 订单详情列表筛选索引 - 创建脚本
+-- 说明: /api/order-details 按下单时间区间（order_time >= 开始日期 AND order_time < 结束日期次日）筛选，
+--       并常与子订单状态、店铺、操作人组合；为这些组合补充 (筛选字段, order_time) 复合索引，
+--       内部订单号去重的窗口函数按已有的 idx_internal_order_number 分区
+
+-- 设置字符集
+SET NAMES utf8mb4;
+SET CHARACTER SET utf8mb4;
+
+-- 使用数据库
+USE `ecommerce_db`;
+
+-- ================================
+-- 筛选字段 + 下单时间 复合索引
+-- ================================
+ALTER TABLE `order_details_merge`
+ADD INDEX `idx_order_details_merge_status_time` (`order_status`, `order_time`),
+ADD INDEX `idx_order_details_merge_store_time` (`store_name`, `order_time`),
+ADD INDEX `idx_order_details_merge_operator_time` (`product_list_operator`, `order_time`);
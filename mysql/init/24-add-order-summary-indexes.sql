@@ -0,0 +1,17 @@
+-- 店铺/操作人汇总索引 - 创建脚本
+-- 说明: /api/store-summary 与 /api/operator-summary（含批量接口）按 店铺 + 上传日期 + 已发货状态
+--       一次分组汇总，上传日期改为直接比较（不再套 DATE() 函数），可以使用以下复合索引
+
+-- 设置字符集
+SET NAMES utf8mb4;
+SET CHARACTER SET utf8mb4;
+
+-- 使用数据库
+USE `ecommerce_db`;
+
+-- ================================
+-- 店铺/操作人汇总复合索引
+-- ================================
+ALTER TABLE `order_details_merge`
+ADD INDEX `idx_order_details_merge_store_upload_status` (`store_name`, `upload_date`, `order_status`),
+ADD INDEX `idx_order_details_merge_store_operator_upload` (`store_name`, `product_list_operator`, `upload_date`);
@@ -0,0 +1,30 @@
+-- 内部订单汇总表 - 创建脚本
+-- 说明: 每个内部订单号一行，保存订单行数、总成本、销售金额与利润，订单详情弹窗和批量汇总接口直接读取，
+--       不再每次按订单行重算；订单成本汇总、订单支付金额更新步骤完成后增量刷新涉及的订单
+-- 注意: 已有数据库执行本脚本后需运行一次 flask --app app rebuild-internal-order-summary --start-date ... --end-date ...
+--       初始化历史订单的汇总
+
+-- 设置字符集
+SET NAMES utf8mb4;
+SET CHARACTER SET utf8mb4;
+
+-- 使用数据库
+USE `ecommerce_db`;
+
+-- ================================
+-- 内部订单汇总表
+-- ================================
+CREATE TABLE IF NOT EXISTS `internal_order_summary` (
+    `internal_order_number` varchar(100) NOT NULL COMMENT '内部订单号',
+    `item_count` int NOT NULL DEFAULT 0 COMMENT '订单行数',
+    `total_cost` decimal(14,2) NOT NULL DEFAULT 0 COMMENT '总成本（运营成本供货价 × 数量）',
+    `sales_amount` decimal(12,2) NOT NULL DEFAULT 0 COMMENT '销售金额（最新下单行的已付金额）',
+    `profit` decimal(14,2) NOT NULL DEFAULT 0 COMMENT '利润（销售金额 - 总成本，不低于0）',
+    `store_name` varchar(200) DEFAULT NULL COMMENT '店铺名称',
+    `order_time` datetime DEFAULT NULL COMMENT '下单时间',
+    `upload_date` date DEFAULT NULL COMMENT '上传日期',
+    `updated_at` datetime DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+    PRIMARY KEY (`internal_order_number`),
+    KEY `idx_internal_order_summary_order_time` (`order_time`),
+    KEY `idx_internal_order_summary_upload_date` (`upload_date`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='内部订单汇总表';
@@ -0,0 +1,24 @@
+-- 任务进度表 - 创建脚本
+-- 说明: 多工作进程（gunicorn）部署时，文件处理、导出等后台任务的进度由执行任务的进程写入本表，
+--       进度查询请求落在其他工作进程时从本表读取；已完成任务超过24小时后清理
+
+-- 设置字符集
+SET NAMES utf8mb4;
+SET CHARACTER SET utf8mb4;
+
+-- 使用数据库
+USE `ecommerce_db`;
+
+-- ================================
+-- 任务进度表
+-- ================================
+CREATE TABLE IF NOT EXISTS `task_progress` (
+    `task_id` varchar(64) NOT NULL COMMENT '任务ID',
+    `status` varchar(20) NOT NULL DEFAULT 'running' COMMENT '状态: running, completed, error',
+    `progress` text NOT NULL COMMENT '进度信息(JSON)',
+    `start_time` datetime DEFAULT NULL COMMENT '开始时间',
+    `end_time` datetime DEFAULT NULL COMMENT '结束时间',
+    `updated_at` datetime DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
+    PRIMARY KEY (`task_id`),
+    KEY `idx_task_progress_status_end_time` (`status`, `end_time`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='任务进度表';